@@ -6,16 +6,23 @@ from shared.constants import (
     CLUE_INFO_ID, CLUE_METADATA_ID, VOLUME_METADATA_ID, NAME_TABLES_ID, INSTANCE_TYPES_ID,
     INSTANCE_TYPES
 )
+from shared import metrics
+from shared.tuid_index import TuidIndex
 from shared.utils import (
     read_u32_be, read_u16_be, read_float_be, read_string, sanitize_name, 
     find_next_level_dir, find_section_by_id, parse_sections
 )
 # Suppression de la collecte de pointeurs
 
-def extract_clues_from_dat(dat_path):
-    """Extrait les données Clue avec leurs métadonnées"""
-    with open(dat_path, 'rb') as f:
-        data = f.read()
+def extract_clues_from_dat(dat_path, data=None, index=None):
+    """Extrait les données Clue avec leurs métadonnées
+
+    data: contenu du fichier déjà en mémoire (bytes ou mmap), évite une relecture
+    index: TuidIndex du niveau déjà construit (noms des volumes), sinon index des seuls volumes"""
+    if data is None:
+        with open(dat_path, 'rb') as f:
+            data = f.read()
+        metrics.count('bytes_read', len(data))
 
     # Vérifier la version du fichier
     version_major = struct.unpack(">H", data[4:6])[0]
@@ -82,27 +89,9 @@ def extract_clues_from_dat(dat_path):
             if tuid != 0xFFFFFFFFFFFFFFFF:
                 instance_types[tuid] = type_id
 
-    # Extraire les métadonnées de volume (utilisées par les clues)
-    volume_metadata = {}
-    if volume_metadata_section:
-        for i in range(volume_metadata_section['count']):
-            entry_offset = volume_metadata_section['offset'] + i * volume_metadata_section['size']
-            tuid = struct.unpack(">Q", data[entry_offset:entry_offset+8])[0]
-            name_offset = read_u32_be(data, entry_offset + 8)
-            zone = read_u16_be(data, entry_offset + 12)  # Zone sur 2 bytes
-            
-            # Lire le nom
-            name = "Unknown_Volume"
-            if name_offset < len(data):
-                name = read_string(data, name_offset) or f"Volume_{i+1}"
-            
-            volume_metadata[tuid] = {
-                'index': i,
-                'tuid': tuid,
-                'name': name,
-                'name_offset': name_offset,
-                'zone': zone
-            }
+    # Volumes référencés par les clues: TUID -> nom via l'index global du niveau
+    if index is None and volume_metadata_section:
+        index = TuidIndex.from_dat(data, types=('volume',), references=False)
 
     # Extraire les Clues
     print("Extraction des Clues...")
@@ -149,8 +138,9 @@ def extract_clues_from_dat(dat_path):
             volume_name = "No volume"
             if volume_tuid_offset and volume_tuid_offset + 8 <= len(data):
                 volume_tuid = struct.unpack(">Q", data[volume_tuid_offset:volume_tuid_offset+8])[0]
-                if volume_tuid in volume_metadata:
-                    volume_name = volume_metadata[volume_tuid]['name']
+                volume = index.get(volume_tuid) if index is not None else None
+                if volume is not None and volume.type == 'volume':
+                    volume_name = volume.name
             
             clue_instance = {
                 'name': name,
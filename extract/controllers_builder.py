@@ -6,16 +6,21 @@ from shared.constants import (
     CONTROLLER_DATA_ID, CONTROLLER_METADATA_ID, NAME_TABLES_ID, INSTANCE_TYPES_ID,
     INSTANCE_TYPES
 )
+from shared import metrics
 from shared.utils import (
     read_u32_be, read_u16_be, read_float_be, read_string, sanitize_name, 
     find_next_level_dir, find_section_by_id, parse_sections
 )
 # Suppression de la collecte de pointeurs
 
-def extract_controllers_from_dat(dat_path):
-    """Extrait les données Controller avec leurs métadonnées"""
-    with open(dat_path, 'rb') as f:
-        data = f.read()
+def extract_controllers_from_dat(dat_path, data=None):
+    """Extrait les données Controller avec leurs métadonnées
+
+    data: contenu du fichier déjà en mémoire (bytes ou mmap), évite une relecture"""
+    if data is None:
+        with open(dat_path, 'rb') as f:
+            data = f.read()
+        metrics.count('bytes_read', len(data))
 
     # Vérifier la version du fichier
     version_major = struct.unpack(">H", data[4:6])[0]
@@ -6,16 +6,22 @@ from shared.constants import (
     MOBY_DATA_ID, MOBY_METADATA_ID, NAME_TABLES_ID, INSTANCE_TYPES_ID,
     INSTANCE_TYPES
 )
+from shared import metrics
+from shared.class_enum import moby_class_enum
 from shared.utils import (
     read_u32_be, read_u16_be, read_float_be, read_string, sanitize_name, 
     find_next_level_dir, find_section_by_id, parse_sections
 )
 # Suppression de la collecte de pointeurs
 
-def extract_mobys_from_dat(dat_path):
-    """Extrait les données Moby avec leurs métadonnées"""
-    with open(dat_path, 'rb') as f:
-        data = f.read()
+def extract_mobys_from_dat(dat_path, data=None):
+    """Extrait les données Moby avec leurs métadonnées
+
+    data: contenu du fichier déjà en mémoire (bytes ou mmap), évite une relecture"""
+    if data is None:
+        with open(dat_path, 'rb') as f:
+            data = f.read()
+        metrics.count('bytes_read', len(data))
 
     # Vérifier la version du fichier
     version_major = struct.unpack(">H", data[4:6])[0]
@@ -129,22 +135,7 @@ def extract_mobys_from_dat(dat_path):
             padding = data[data_offset + 60:data_offset + 64]
             
             # Extraire les données de classe si disponible
-            class_enum = -1
-            if subfile_offset and subfile_length and subfile_offset + subfile_length <= len(data):
-                subfile = data[subfile_offset:subfile_offset + subfile_length]
-                if subfile[:4] == b"IGHW":
-                    sub_version_major = struct.unpack(">H", subfile[4:6])[0]
-                    sub_section_count = struct.unpack(">I", subfile[8:12])[0]
-                    sub_section_start = 0x20 if sub_version_major >= 2 else 0x10
-                    for j in range(sub_section_count):
-                        sub_offset = sub_section_start + j * 16
-                        if sub_offset + 16 <= len(subfile):
-                            sub_id, sub_data_offset = struct.unpack(">II", subfile[sub_offset:sub_offset+8])
-                            if sub_id == 0x0002501C:
-                                class_offset = subfile_offset + sub_data_offset
-                                if class_offset + 4 <= len(data):
-                                    class_enum = struct.unpack(">I", data[class_offset:class_offset+4])[0]
-                                break
+            class_enum = moby_class_enum(data, subfile_offset, subfile_length)
             
             moby_instance = {
                 'name': name,
@@ -6,16 +6,24 @@ from shared.constants import (
     PATH_DATA_ID, PATH_METADATA_ID, PATH_POINTS_ID, NAME_TABLES_ID, INSTANCE_TYPES_ID,
     INSTANCE_TYPES
 )
+from shared import metrics
+from shared.path_points import PACKED_KEY, POINT_SIZE, encode_packed, expand_points
 from shared.utils import (
     read_u32_be, read_u16_be, read_float_be, read_string, sanitize_name, 
     find_next_level_dir, find_section_by_id, parse_sections
 )
 # Suppression de la collecte de pointeurs
 
-def extract_paths_from_dat(dat_path):
-    """Extrait les données Path avec leurs métadonnées"""
-    with open(dat_path, 'rb') as f:
-        data = f.read()
+def extract_paths_from_dat(dat_path, data=None, compact=False):
+    """Extrait les données Path avec leurs métadonnées
+
+    data: contenu du fichier déjà en mémoire (bytes ou mmap), évite une relecture
+    compact: points en octets bruts base64 ('points_packed', cf. shared.path_points) au lieu
+    de la liste 'points'"""
+    if data is None:
+        with open(dat_path, 'rb') as f:
+            data = f.read()
+        metrics.count('bytes_read', len(data))
 
     # Vérifier la version du fichier
     version_major = struct.unpack(">H", data[4:6])[0]
@@ -125,27 +133,12 @@ def extract_paths_from_dat(dat_path):
             # Convertir la durée en millisecondes
             duration_ms = int(total_duration * 1000 / 30)
             
-            # Extraire les points du path
-            points = []
+            # Extraire les points du path (16 bytes par point: X, Y, Z, Timestamp), tronqués
+            # aux points entiers présents dans le fichier
+            raw_points = b''
             if point_offset and point_count and path_points_section:
-                for j in range(point_count):
-                    point_addr = point_offset + j * 16  # 16 bytes par point (X, Y, Z, Timestamp)
-                    if point_addr + 16 <= len(data):
-                        x = read_float_be(data, point_addr)
-                        y = read_float_be(data, point_addr + 4)
-                        z = read_float_be(data, point_addr + 8)
-                        timestamp = read_float_be(data, point_addr + 12)
-                        
-                        # Convertir le timestamp en millisecondes
-                        timestamp_ms = int(timestamp * 1000 / 30)
-                        
-                        points.append({
-                            'index': j,
-                            'address': point_addr,
-                            'position': {'x': x, 'y': y, 'z': z},
-                            'timestamp': timestamp,
-                            'timestamp_ms': timestamp_ms
-                        })
+                available = max(0, (len(data) - point_offset) // POINT_SIZE)
+                raw_points = bytes(data[point_offset:point_offset + min(point_count, available) * POINT_SIZE])
             
             path_instance = {
                 'name': name,
@@ -159,8 +152,11 @@ def extract_paths_from_dat(dat_path):
                 'duration_ms': duration_ms,
                 'flags': flags,
                 'point_count': point_count,
-                'points': points
             }
+            if compact:
+                path_instance[PACKED_KEY] = encode_packed(raw_points)
+            else:
+                path_instance['points'] = expand_points(raw_points, point_offset)
             
             path_instances.append(path_instance)
             path_count += 1
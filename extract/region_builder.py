@@ -2,6 +2,7 @@
 import os
 import struct
 import json
+import time
 from shared.constants import (
     REGION_DATA_ID, REGION_POINTERS_ID, ZONE_METADATA_ID, ZONE_OFFSETS_ID, DEFAULT_REGION_NAMES_ID, ZONE_COUNTS_ID,
     NAME_TABLES_ID, INSTANCE_TYPES_ID, INSTANCE_TYPES
@@ -20,30 +21,55 @@ from extract.pods_builder import extract_pods_from_dat
 from extract.scents_builder import extract_scents_from_dat
 from extract.paths_builder import extract_paths_from_dat
 from extract.subfile_builder import extract_all_subfiles_from_instances
-from extract.subfile_builder import determine_subfile_type
+from extract.subfile_builder import determine_subfile_type, find_subfile_section_addresses
+from shared import metrics
+from shared.dat_index import DatIndex
+from shared.float32 import shorten_floats
+from shared.path_points import is_path_record
+from shared.tuid_index import TuidIndex
 
-def extract_regions_from_dat(dat_path, output_dir=None):
-    """Extrait toutes les régions et zones avec leurs instances"""
+def extract_regions_from_dat(dat_path, output_dir=None, compact_paths=False, short_floats=False):
+    """Extrait toutes les régions et zones avec leurs instances
+
+    compact_paths: points des paths en octets bruts base64 ('points_packed', cf.
+    shared.path_points) au lieu de listes de points
+    short_floats: float32 écrits avec le plus court décimal exact (cf. shared.float32)"""
     
     # Utiliser le dossier de sortie spécifié ou le dossier par défaut
     if output_dir is None:
         output_dir = find_next_level_dir()
     
     # Lire le fichier DAT
-    with open(dat_path, 'rb') as f:
-        data = f.read()
+    with metrics.span('read'):
+        with open(dat_path, 'rb') as f:
+            data = f.read()
+        metrics.count('bytes_read', len(data))
 
     print("Extraction des instances...")
     
+    # Index global des TUID (+ graphe des références), partagé par les builders; entrées lues
+    # dans le sidecar .polaris-idx s'il est présent et valide
+    with metrics.span('index'):
+        index = TuidIndex.from_dat(data, dat_index=DatIndex.load(dat_path))
+
     # Extraire tous les types d'instances
-    moby_instances = extract_mobys_from_dat(dat_path) or []
-    clue_instances = extract_clues_from_dat(dat_path) or []
-    volume_instances = extract_volumes_from_dat(dat_path) or []
-    controller_instances = extract_controllers_from_dat(dat_path) or []
-    area_instances = extract_areas_from_dat(dat_path) or []
-    pod_instances = extract_pods_from_dat(dat_path) or []
-    scent_instances = extract_scents_from_dat(dat_path) or []
-    path_instances = extract_paths_from_dat(dat_path) or []
+    with metrics.span('decode'):
+        with metrics.span('moby'):
+            moby_instances = extract_mobys_from_dat(dat_path, data) or []
+        with metrics.span('clue'):
+            clue_instances = extract_clues_from_dat(dat_path, data, index) or []
+        with metrics.span('volume'):
+            volume_instances = extract_volumes_from_dat(dat_path, data) or []
+        with metrics.span('controller'):
+            controller_instances = extract_controllers_from_dat(dat_path, data) or []
+        with metrics.span('area'):
+            area_instances = extract_areas_from_dat(dat_path, data) or []
+        with metrics.span('pod'):
+            pod_instances = extract_pods_from_dat(dat_path, data) or []
+        with metrics.span('scent'):
+            scent_instances = extract_scents_from_dat(dat_path, data) or []
+        with metrics.span('path'):
+            path_instances = extract_paths_from_dat(dat_path, data, compact=compact_paths) or []
     
     # Combiner toutes les instances
     all_instances = []
@@ -55,8 +81,14 @@ def extract_regions_from_dat(dat_path, output_dir=None):
     all_instances.extend(pod_instances)
     all_instances.extend(scent_instances)
     all_instances.extend(path_instances)
+    dangling = index.dangling_references()
+    if dangling:
+        print(f"⚠️  {len(dangling)} référence(s) vers des TUID absents du niveau")
     
+    metrics.count('records_decoded', len(all_instances))
+
     # Organiser les instances par zone
+    metrics.begin('group_zones')
     zone_instances = {}
     for instance in all_instances:
         zone = instance.get('zone', 0)
@@ -69,6 +101,8 @@ def extract_regions_from_dat(dat_path, output_dir=None):
     print(f"Zones utilisées par les instances: {zones_used}")
     
     for zone in zones_used:
+        if metrics.is_quiet():
+            break
         instances = zone_instances[zone]
         moby_count = len([i for i in instances if 'model_index' in i])
         clue_count = len([i for i in instances if 'volume_tuid' in i])
@@ -77,11 +111,14 @@ def extract_regions_from_dat(dat_path, output_dir=None):
         area_count = len([i for i in instances if 'path_offset' in i and 'volume_offset' in i])
         pod_count = len([i for i in instances if 'instance_references' in i and any('type' in ref for ref in i.get('instance_references', []))])
         scent_count = len([i for i in instances if 'instance_references' in i and not any('type' in ref for ref in i.get('instance_references', []))])
-        path_count = len([i for i in instances if 'points' in i and 'total_duration' in i])
+        path_count = len([i for i in instances if is_path_record(i)])
         
         print(f"  Zone {zone}: {len(instances)} instances ({moby_count} mobys, {clue_count} clues, {volume_count} volumes, {controller_count} controllers, {area_count} areas, {pod_count} pods, {scent_count} scents, {path_count} paths)")
     
+    metrics.end('group_zones')
+
     # Parser les sections de régions et zones
+    metrics.begin('parse_regions')
     version_major = struct.unpack(">H", data[4:6])[0]
     section_count = struct.unpack(">H" if version_major == 0 else ">I", 
                                  data[0x0A if version_major == 0 else 0x0C:
@@ -112,10 +149,12 @@ def extract_regions_from_dat(dat_path, output_dir=None):
     
     if not region_data_section:
         print("Section de données de région introuvable")
+        metrics.end('parse_regions')
         return None
     
     if not zone_metadata_section:
         print("Section de métadonnées de zone introuvable")
+        metrics.end('parse_regions')
         return None
     
     # Extraire les noms si disponible
@@ -319,8 +358,16 @@ def extract_regions_from_dat(dat_path, output_dir=None):
             'zones': zones
         })
     
+    metrics.end('parse_regions')
+
     # Créer la structure de dossiers et sauvegarder les instances
-    
+    metrics.begin('write')
+    json_time = 0.0
+    json_files = 0
+    subfile_time = 0.0
+    subfile_files = 0
+    bytes_written = 0       # JSON + subfiles (même compteur que la sortie .dat du repack)
+    subfile_sections = find_subfile_section_addresses(data)
     for region in regions:
         region_dir = os.path.join(output_dir, region['name'])
         
@@ -352,7 +399,7 @@ def extract_regions_from_dat(dat_path, output_dir=None):
                 elif 'path_offset' in instance and 'volume_offset' in instance:  # Area
                     instance_type = 'area'
                     extension = '.area.json'
-                elif 'points' in instance and 'total_duration' in instance:  # Path
+                elif is_path_record(instance):  # Path
                     instance_type = 'path'
                     extension = '.path.json'
                 elif 'instance_references' in instance and 'offset' in instance and 'count' in instance:
@@ -375,8 +422,12 @@ def extract_regions_from_dat(dat_path, output_dir=None):
                 filepath = os.path.join(zone_dir, filename)
                 
                 # Sauvegarder l'instance
+                t_write = time.perf_counter()
                 with open(filepath, 'w', encoding='utf-8') as f:
-                    json.dump(instance, f, indent=2, ensure_ascii=False)
+                    json.dump(shorten_floats(instance) if short_floats else instance, f, indent=2, ensure_ascii=False)
+                    bytes_written += f.tell()
+                json_time += time.perf_counter() - t_write
+                json_files += 1
                 
                 # Extraire le subfile si l'instance en a un
                 if 'subfile_offset' in instance and 'subfile_length' in instance:
@@ -392,19 +443,30 @@ def extract_regions_from_dat(dat_path, output_dir=None):
                             # Vérifier l'en-tête IGHW
                             if subfile_data[:4] == b"IGHW":
                                 # Déterminer le type de subfile en fonction de sa position
-                                subfile_type = determine_subfile_type(subfile_offset, data)
+                                subfile_type = determine_subfile_type(subfile_offset, data, subfile_sections)
                                 
                                 # Créer le nom du fichier subfile
                                 subfile_filename = f"{sanitized_name}_CLASS.{subfile_type}.dat"
                                 subfile_path = os.path.join(zone_dir, subfile_filename)
                                 
                                 # Sauvegarder le subfile
+                                t_write = time.perf_counter()
                                 with open(subfile_path, 'wb') as f:
                                     f.write(subfile_data)
+                                subfile_time += time.perf_counter() - t_write
+                                subfile_files += 1
+                                bytes_written += len(subfile_data)
                                 
                                 # print(f"      ✅ Subfile extrait: {subfile_filename} ({len(subfile_data)} bytes)")
         
         print(f"Région '{region['name']}': {len(region['zones'])} zones extraites")
+
+    # 'write' couvre aussi mkdir/tri/détection de type; json et subfiles en sont le détail
+    metrics.add_duration('json', json_time, calls=max(1, json_files))
+    metrics.add_duration('subfiles', subfile_time, calls=max(1, subfile_files))
+    metrics.end('write')
+    metrics.count('files_written', json_files + subfile_files)
+    metrics.count('bytes_written', bytes_written)
     
     # Lire et enregistrer les 4 u16 inconnus (tails) de 0x00025008 par zone
     zone_tail_u16 = []
@@ -454,8 +516,11 @@ def extract_regions_from_dat(dat_path, output_dir=None):
     }
     
     metadata_path = os.path.join(output_dir, "extraction_metadata.json")
-    with open(metadata_path, 'w', encoding='utf-8') as f:
-        json.dump(extraction_metadata, f, indent=2, ensure_ascii=False)
+    with metrics.span('write_metadata'):
+        with open(metadata_path, 'w', encoding='utf-8') as f:
+            json.dump(extraction_metadata, f, indent=2, ensure_ascii=False)
+            metrics.count('bytes_written', f.tell())
+        metrics.count('files_written')
     
     print(f"Extraction des régions terminée dans {output_dir}")
     return regions
@@ -6,16 +6,22 @@ from shared.constants import (
     SCENT_DATA_ID, SCENT_METADATA_ID, SCENT_OFFSETS_ID, NAME_TABLES_ID, INSTANCE_TYPES_ID,
     INSTANCE_TYPES
 )
+from shared import metrics
+from shared.tuid_index import scent_reference_tuid
 from shared.utils import (
     read_u32_be, read_u16_be, read_float_be, read_string, sanitize_name, 
     find_next_level_dir, find_section_by_id, parse_sections
 )
 # Suppression de la collecte de pointeurs
 
-def extract_scents_from_dat(dat_path):
-    """Extrait les données Scent avec leurs métadonnées"""
-    with open(dat_path, 'rb') as f:
-        data = f.read()
+def extract_scents_from_dat(dat_path, data=None):
+    """Extrait les données Scent avec leurs métadonnées
+
+    data: contenu du fichier déjà en mémoire (bytes ou mmap), évite une relecture"""
+    if data is None:
+        with open(dat_path, 'rb') as f:
+            data = f.read()
+        metrics.count('bytes_read', len(data))
 
     # Vérifier la version du fichier
     version_major = struct.unpack(">H", data[4:6])[0]
@@ -120,30 +126,7 @@ def extract_scents_from_dat(dat_path):
             if offsets_list_addr and count and scent_offsets_section:
                 for j in range(count):
                     ptr_pos = offsets_list_addr + j * 4
-                    tuid_val = 0
-                    # Essai u32 adresse -> TUID (normaliser à l'alignement 16B des entrées 0x25022)
-                    if inst_start is not None and ptr_pos + 4 <= len(data):
-                        addr = read_u32_be(data, ptr_pos)
-                        def read_tuid_at(a: int) -> int:
-                            if inst_start <= a < inst_end:
-                                rel = a - inst_start
-                                base = a - (rel % 16)
-                                if inst_start <= base < inst_end and base + 8 <= len(data):
-                                    return struct.unpack(">Q", data[base:base+8])[0]
-                            return 0
-                        # 1) Adresse absolue vers 0x25022
-                        tuid_val = read_tuid_at(addr)
-                        # 2) Si pas valide, interpréter la valeur comme offset relatif à 0x25022
-                        if tuid_val == 0:
-                            tuid_val = read_tuid_at(inst_start + addr)
-                        # 3) Si toujours pas valide, interpréter comme index (val * 16)
-                        if tuid_val == 0:
-                            tuid_val = read_tuid_at(inst_start + (addr * 16))
-                    # Fallback u64 direct
-                    if tuid_val == 0:
-                        q_addr = offsets_list_addr + j * 8
-                        if q_addr + 8 <= len(data):
-                            tuid_val = struct.unpack(">Q", data[q_addr:q_addr+8])[0]
+                    tuid_val = scent_reference_tuid(data, offsets_list_addr, j, inst_start, inst_end)
                     instance_references.append({
                         'index': j,
                         'address': ptr_pos,
@@ -5,6 +5,7 @@ import json
 from shared.constants import (
     HOST_CLASS_ID, LOCAL_CLASS_ID, CLASS_ENUM_ID
 )
+from shared import metrics
 from shared.utils import (
     read_u32_be, read_u16_be, read_float_be, read_string, sanitize_name
 )
@@ -51,14 +52,19 @@ def find_subfile_section_addresses(data):
     
     return host_section_address, local_section_address
 
-def determine_subfile_type(subfile_offset, data):
-    """Détermine si un subfile est .host ou .local en fonction de sa position"""
+def determine_subfile_type(subfile_offset, data, section_addresses=None):
+    """Détermine si un subfile est .host ou .local en fonction de sa position
+
+    section_addresses: (host, local) déjà trouvés par find_subfile_section_addresses(data),
+    évite de reparcourir la table des sections pour chaque subfile"""
     
     # Trouver dynamiquement les adresses des sections host/local dans ce fichier
-    host_section_address, local_section_address = find_subfile_section_addresses(data)
+    if section_addresses is None:
+        section_addresses = find_subfile_section_addresses(data)
+    host_section_address, local_section_address = section_addresses
     
     if host_section_address is None and local_section_address is None:
-        print(f"    ⚠️  Aucune section host/local trouvée, assume host")
+        metrics.log_item(f"    ⚠️  Aucune section host/local trouvée, assume host")
         return 'host'
     
     # Déterminer le type en fonction de l'offset du subfile
@@ -72,7 +78,7 @@ def determine_subfile_type(subfile_offset, data):
                 return 'host'
             else:
                 # Avant les deux sections, assume host
-                print(f"    ⚠️  Offset {subfile_offset:08X} avant sections host/local, assume host")
+                metrics.log_item(f"    ⚠️  Offset {subfile_offset:08X} avant sections host/local, assume host")
                 return 'host'
         else:
             # Section host est avant section local
@@ -82,21 +88,21 @@ def determine_subfile_type(subfile_offset, data):
                 return 'local'
             else:
                 # Avant les deux sections, assume host
-                print(f"    ⚠️  Offset {subfile_offset:08X} avant sections host/local, assume host")
+                metrics.log_item(f"    ⚠️  Offset {subfile_offset:08X} avant sections host/local, assume host")
                 return 'host'
     elif host_section_address is not None:
         # Si on n'a que la section host
         if subfile_offset >= host_section_address:
             return 'host'
         else:
-            print(f"    ⚠️  Offset {subfile_offset:08X} avant section host ({host_section_address:08X}), assume host")
+            metrics.log_item(f"    ⚠️  Offset {subfile_offset:08X} avant section host ({host_section_address:08X}), assume host")
             return 'host'
     elif local_section_address is not None:
         # Si on n'a que la section local
         if subfile_offset >= local_section_address:
             return 'local'
         else:
-            print(f"    ⚠️  Offset {subfile_offset:08X} avant section local ({local_section_address:08X}), assume host")
+            metrics.log_item(f"    ⚠️  Offset {subfile_offset:08X} avant section local ({local_section_address:08X}), assume host")
             return 'host'
     else:
         return 'host'  # Par défaut
@@ -138,7 +144,7 @@ def extract_subfile_from_instance(instance, data, instance_name, output_dir):
     
     # Vérifier que le subfile est valide
     if subfile_offset + subfile_length > len(data):
-        print(f"    ⚠️  Subfile invalide pour {instance_name}: offset={subfile_offset}, length={subfile_length}")
+        metrics.log_item(f"    ⚠️  Subfile invalide pour {instance_name}: offset={subfile_offset}, length={subfile_length}")
         return None
     
     # Extraire le subfile
@@ -146,7 +152,7 @@ def extract_subfile_from_instance(instance, data, instance_name, output_dir):
     
     # Vérifier l'en-tête IGHW
     if subfile_data[:4] != b"IGHW":
-        print(f"    ⚠️  En-tête IGHW invalide pour {instance_name}")
+        metrics.log_item(f"    ⚠️  En-tête IGHW invalide pour {instance_name}")
         return None
     
     # Déterminer le type de subfile (host ou local)
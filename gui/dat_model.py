@@ -0,0 +1,471 @@
+"""Modèle d'instances lu directement dans un .dat, sans extraction sur disque.
+
+Le fichier est projeté en mémoire (mmap, lecture seule) et sa table des sections lue une fois.
+L'ouverture ne lit que l'en-tête de chaque instance (TUID, nom, zone: quelques octets par
+entrée); l'enregistrement complet d'un type est décodé par son builder d'extraction la première
+fois qu'une de ses instances est affichée ou dépliée (hydrate()).
+
+Les instances ont la forme de celles du mode dossier ({'type', 'path', 'data'}) avec un chemin
+virtuel <fichier.dat>/<région>/<zone>/<Nom>.<type>.json: arbre, recherche et formulaires n'ont
+pas à distinguer les deux modes. Les modifications restent dans un overlay (edits) jusqu'à
+l'enregistrement:
+- save_dat(): patch d'une copie du .dat si seuls des champs de taille fixe ont changé
+  (PATCH_LAYOUTS), sinon export dans un dossier temporaire + rebuild complet;
+- export(): dossier d'extraction classique (extract_regions_from_dat) + overlay par-dessus.
+"""
+import copy
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+
+from shared.constants import (
+    REGION_DATA_ID, ZONE_METADATA_ID,
+    MOBY_DATA_ID, MOBY_METADATA_ID, CONTROLLER_DATA_ID, CONTROLLER_METADATA_ID,
+    PATH_DATA_ID, PATH_METADATA_ID, VOLUME_TRANSFORM_ID, VOLUME_METADATA_ID,
+    CLUE_INFO_ID, CLUE_METADATA_ID, AREA_DATA_ID, AREA_METADATA_ID,
+    POD_DATA_ID, POD_METADATA_ID, SCENT_DATA_ID, SCENT_METADATA_ID,
+)
+from shared.utils import parse_section_table, read_string, sanitize_name
+from shared.class_enum import class_id_from_subfile
+from shared.dat_index import DatIndex
+from shared.tuid_index import TuidIndex
+from gui.search_index import instance_class_id
+from extract.mobys_builder import extract_mobys_from_dat
+from extract.controllers_builder import extract_controllers_from_dat
+from extract.paths_builder import extract_paths_from_dat
+from extract.volumes_builder import extract_volumes_from_dat
+from extract.clues_builder import extract_clues_from_dat
+from extract.areas_builder import extract_areas_from_dat
+from extract.pods_builder import extract_pods_from_dat
+from extract.scents_builder import extract_scents_from_dat
+from extract.subfile_builder import determine_subfile_type, find_subfile_section_addresses
+
+
+# Type d'instance -> (section des métadonnées, section des données, builder d'extraction).
+# Les builders ne produisent une instance que pour les entrées i < nombre d'entrées de données:
+# l'index léger suit la même règle, les deux listes sont donc alignées.
+DAT_TYPES = {
+    'moby': (MOBY_METADATA_ID, MOBY_DATA_ID, extract_mobys_from_dat),
+    'controller': (CONTROLLER_METADATA_ID, CONTROLLER_DATA_ID, extract_controllers_from_dat),
+    'path': (PATH_METADATA_ID, PATH_DATA_ID, extract_paths_from_dat),
+    'volume': (VOLUME_METADATA_ID, VOLUME_TRANSFORM_ID, extract_volumes_from_dat),
+    'clue': (CLUE_METADATA_ID, CLUE_INFO_ID, extract_clues_from_dat),
+    'area': (AREA_METADATA_ID, AREA_DATA_ID, extract_areas_from_dat),
+    'pod': (POD_METADATA_ID, POD_DATA_ID, extract_pods_from_dat),
+    'scent': (SCENT_METADATA_ID, SCENT_DATA_ID, extract_scents_from_dat),
+}
+
+# Champs de taille fixe réécrits sur place dans une copie du .dat:
+# type -> (section des données, {champ: (décalage dans l'entrée, format struct ou longueur hex)})
+PATCH_LAYOUTS = {
+    'moby': (MOBY_DATA_ID, {
+        'model_index': (0, '>H'), 'zone_render_index': (2, '>H'),
+        'update_dist': (4, '>f'), 'display_dist': (8, '>f'),
+        'position.x': (20, '>f'), 'position.y': (24, '>f'), 'position.z': (28, '>f'),
+        'rotation.x': (32, '>f'), 'rotation.y': (36, '>f'), 'rotation.z': (40, '>f'),
+        'scale': (44, '>f'),
+        'flags': (48, 8), 'unknown': (56, 4), 'padding': (60, 4),
+    }),
+    'controller': (CONTROLLER_DATA_ID, {
+        'position.x': (8, '>f'), 'position.y': (12, '>f'), 'position.z': (16, '>f'),
+        'rotation.x': (20, '>f'), 'rotation.y': (24, '>f'), 'rotation.z': (28, '>f'),
+        'scale': (32, '>f'), 'scale_y': (36, '>f'), 'scale_z': (40, '>f'),
+    }),
+    'volume': (VOLUME_TRANSFORM_ID, {'transform_matrix': (0, '>16f')}),
+}
+
+
+def _leaves(d: dict) -> dict:
+    """Champs d'une instance à plat: {'position': {'x': ..}} -> {'position.x': ..}."""
+    out = {}
+    for key, value in d.items():
+        if isinstance(value, dict):
+            for sub, v in value.items():
+                out[f"{key}.{sub}"] = v
+        else:
+            out[key] = value
+    return out
+
+
+def _scaled(progress, start: float, span: float, total: float, prefix: str = ''):
+    """Callback de progression d'une sous-étape ramené dans [start, start+span] sur `total`."""
+    if progress is None:
+        return None
+    return lambda done, sub_total, step: progress(start + span * done / max(sub_total, 1), total, prefix + step)
+
+class DatModel:
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self._file = open(self.path, 'rb')
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Fichier vide: mmap refuse une longueur nulle
+            self._file.close()
+            raise ValueError(f"Fichier vide: {self.path}")
+        if self._data[:4] != b'IGHW':
+            self.close()
+            raise ValueError(f"En-tête IGHW absent: {self.path}")
+        # Sidecar .polaris-idx (main.py index / query) s'il est présent et valide: table des
+        # sections, TUID, noms, zones et ClassID des subfiles sans lire les entrées
+        self.dat_index = DatIndex.load(self.path)
+        self.sections = self.dat_index.sections if self.dat_index is not None else parse_section_table(self._data)
+        self.regions = self._read_regions()
+        self._subfile_sections = find_subfile_section_addresses(self._data)
+        self.instances: list[dict] = []
+        self.edits: dict[int, dict] = {}                   # id(inst) -> instance modifiée ou ajoutée
+        self.revision = 0                                  # incrémenté à chaque note_edit()
+        self._slots: dict[int, tuple[str, int]] = {}       # id(inst) -> (type, index d'entrée)
+        self._origin: dict[int, str] = {}                  # id(inst) -> chemin virtuel à l'ouverture
+        self._by_type: dict[str, list[dict]] = {}
+        self._decoded: set[str] = set()
+        self._class_ids: dict[tuple[int, int], int | None] = {}
+        self._read_entries()
+
+    def close(self) -> None:
+        if not self._data.closed:
+            self._data.close()
+        self._file.close()
+
+    def __len__(self) -> int:
+        return len(self.instances)
+
+    @property
+    def zone_names(self) -> list[str]:
+        """Zones de la première région, dans l'ordre des index (combobox de zone)."""
+        return list(self.regions[0][1]) if self.regions else []
+
+    # Index léger
+    def _read_regions(self) -> list[tuple[str, list[str]]]:
+        """[(nom de région, [noms de zones])] comme extract_regions_from_dat les écrit sur disque."""
+        data = self._data
+        region_section = self.sections.get(REGION_DATA_ID)
+        zone_section = self.sections.get(ZONE_METADATA_ID)
+        if not region_section or not zone_section:
+            return []
+        regions = []
+        for i in range(region_section['count']):
+            base = region_section['offset'] + i * region_section['size']
+            if base + 16 > len(data):
+                break
+            zone_offset, zone_count, name_offset = struct.unpack_from('>III', data, base)
+            name = 'default'
+            if name_offset and name_offset < len(data):
+                name = read_string(data, name_offset) or 'default'
+            zones = []
+            if zone_offset and zone_count:
+                for j in range(zone_count):
+                    meta = zone_section['offset'] + j * zone_section['size']
+                    zone_name = 'Unknown_Zone'
+                    if meta + 64 <= len(data):
+                        zone_name = read_string(data, meta).strip() or f"Zone_{j+1}"
+                    zones.append(zone_name)
+            regions.append((name, zones))
+        return regions
+
+    def _location(self, zone: int) -> tuple[str, str]:
+        """Dossier (région, zone) où l'extraction placerait une instance de cet index de zone."""
+        for region, zones in self.regions:
+            if 0 <= zone < len(zones):
+                return region, zones[zone]
+        return 'default', ''
+
+    def virtual_path(self, typ: str, name: str, zone: int) -> str:
+        region, zone_dir = self._location(zone)
+        return os.path.join(self.path, region, zone_dir, f"{sanitize_name(name)}.{typ}.json")
+
+    def _read_entries(self) -> None:
+        """TUID, nom et zone de chaque instance: les seuls champs lus à l'ouverture."""
+        data = self._data
+        size = len(data)
+        seen: set[str] = set()
+        for typ, (meta_id, data_id, _builder) in DAT_TYPES.items():
+            meta = self.sections.get(meta_id)
+            body = self.sections.get(data_id)
+            entries = self._by_type.setdefault(typ, [])
+            if not meta or not body:
+                continue
+            label = typ.capitalize()
+            index = self.dat_index
+            base = index.bases[typ] if index is not None else 0
+            for i in range(min(meta['count'], body['count'])):
+                if index is not None:
+                    tuid, name, zone = index.tuids[base + i], index.names[base + i], index.zones[base + i]
+                else:
+                    pos = meta['offset'] + i * meta['size']
+                    tuid, name_offset, zone = struct.unpack_from('>QIH', data, pos)
+                    if typ == 'moby':
+                        # JSON Moby: 'zone' = zone_render_index (entrée de données), pas la métadonnée
+                        zone = struct.unpack_from('>H', data, body['offset'] + i * body['size'] + 2)[0]
+                    name = f"Unknown_{label}"
+                    if name_offset < size:
+                        name = read_string(data, name_offset) or f"{label}_{i+1}"
+                path = self.virtual_path(typ, name, zone)
+                if path in seen:
+                    # Homonymes dans une zone (l'extraction n'en garde qu'un): chemins distincts pour l'arbre
+                    stem = path[:-len(f".{typ}.json")]
+                    idx = 2
+                    while f"{stem}_{idx}.{typ}.json" in seen:
+                        idx += 1
+                    path = f"{stem}_{idx}.{typ}.json"
+                seen.add(path)
+                inst = {'type': typ, 'path': path, 'data': {'name': name, 'tuid': tuid, 'zone': zone}}
+                self._slots[id(inst)] = (typ, i)
+                self._origin[id(inst)] = inst['path']
+                entries.append(inst)
+                self.instances.append(inst)
+
+    # Décodage à la demande
+    def _decode_records(self, typ: str) -> list[dict]:
+        builder = DAT_TYPES[typ][2]
+        return builder(self.path, self._data) or []
+
+    def is_decoded(self, inst: dict) -> bool:
+        slot = self._slots.get(id(inst))
+        return slot is None or slot[0] in self._decoded
+
+    def hydrate(self, inst: dict) -> list[dict]:
+        """Décode (une fois par type) les enregistrements complets du type de `inst`. Renvoie les
+        instances dont les données viennent d'être remplacées (vide si déjà décodé)."""
+        slot = self._slots.get(id(inst))
+        if slot is None or slot[0] in self._decoded:
+            return []
+        typ = slot[0]
+        self._decoded.add(typ)
+        changed = []
+        for entry, record in zip(self._by_type.get(typ, []), self._decode_records(typ)):
+            if id(entry) in self.edits or record.get('tuid') != entry['data'].get('tuid'):
+                continue
+            entry['data'] = record
+            changed.append(entry)
+        return changed
+
+    def subfile(self, inst: dict) -> tuple[str, int, int] | None:
+        """(host|local, offset, longueur) du subfile IGHW d'une instance décodée, sinon None."""
+        d = inst['data']
+        try:
+            offset, length = int(d.get('subfile_offset') or 0), int(d.get('subfile_length') or 0)
+        except (TypeError, ValueError):
+            return None
+        if not offset or not length or offset + length > len(self._data) or self._data[offset:offset+4] != b'IGHW':
+            return None
+        return determine_subfile_type(offset, self._data, self._subfile_sections), offset, length
+
+    def subfile_class_id(self, inst: dict) -> int | None:
+        """ClassID du subfile d'une instance déjà décodée, ou lu dans le sidecar (None sinon: pas
+        de décodage ici)."""
+        slot = self._slots.get(id(inst))
+        if self.dat_index is not None and slot is not None and id(inst) not in self.edits:
+            sub = self.dat_index.subfile(self.dat_index.slot(*slot))
+            return sub[3] if sub is not None else None
+        if not self.is_decoded(inst):
+            return None
+        sub = self.subfile(inst)
+        if sub is None:
+            return None
+        key = sub[1:]
+        if key not in self._class_ids:
+            _kind, offset, length = sub
+            self._class_ids[key] = class_id_from_subfile(self._data[offset:offset+length])
+        return self._class_ids[key]
+
+    def class_id(self, inst: dict) -> int | None:
+        """ClassID de recherche d'une instance pas encore décodée (class_enum des mobys, class_id des
+        clues, ClassID du subfile des controllers): lu dans le sidecar s'il y en a un, sinon celui
+        du subfile si l'instance est décodée."""
+        slot = self._slots.get(id(inst))
+        if self.dat_index is not None and slot is not None and id(inst) not in self.edits:
+            return self.dat_index.class_id(self.dat_index.slot(*slot))
+        return self.subfile_class_id(inst)
+
+    def search_class_id(self, inst: dict) -> int | None:
+        """ClassID de la recherche class: celui du JSON, sinon class_id(). À passer à SearchIndex
+        dès l'ouverture (l'index est construit avant que l'éditeur ne connaisse le modèle)."""
+        class_id = instance_class_id(inst)
+        return class_id if class_id is not None else self.class_id(inst)
+
+    def tuid_index(self) -> TuidIndex:
+        """Index des TUID et graphe des références du fichier tel qu'enregistré (sans l'overlay),
+        lu dans les pointeurs du .dat sans décoder les enregistrements."""
+        return TuidIndex.from_dat(self._data, dat_index=self.dat_index)
+
+    # Overlay
+    def note_edit(self, inst: dict) -> None:
+        """Instance modifiée (ou ajoutée) par l'éditeur: gardée en mémoire jusqu'à l'enregistrement."""
+        self.edits[id(inst)] = inst
+        self.revision += 1
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.edits)
+
+    def snapshot_edits(self) -> dict[int, dict]:
+        """Copie figée de l'overlay (mêmes clés): à passer à export()/write_dat() exécutés dans un
+        autre thread pendant que l'éditeur continue de modifier les instances."""
+        return {key: copy.deepcopy(inst) for key, inst in self.edits.items()}
+
+    # Enregistrement
+    def _export_path(self, out_dir: str, path: str) -> str:
+        return os.path.join(out_dir, os.path.relpath(path, self.path))
+
+    def _export_instance(self, out_dir: str, key: int, inst: dict) -> None:
+        target = self._export_path(out_dir, inst['path'])
+        suffix = f".{inst['type']}.json"
+        target_base = target[:-len(suffix)] if target.endswith(suffix) else target
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        origin = self._origin.get(key)
+        if origin is not None and origin != inst['path']:
+            # Renommée ou changée de zone: retirer le JSON extrait sous l'ancien chemin, suivre les subfiles
+            old = self._export_path(out_dir, origin)
+            old_base = old[:-len(suffix)] if old.endswith(suffix) else old
+            if os.path.exists(old):
+                os.remove(old)
+            for kind in ('host', 'local'):
+                oldp, newp = f"{old_base}_CLASS.{kind}.dat", f"{target_base}_CLASS.{kind}.dat"
+                if os.path.exists(oldp) and not os.path.exists(newp):
+                    os.replace(oldp, newp)
+        with open(target, 'w', encoding='utf-8') as f:
+            json.dump(inst['data'], f, indent=2, ensure_ascii=False)
+        if origin is not None:
+            return
+        # Instance ajoutée: subfile de l'original dupliqué (resté dans le .dat), ou host vide pour
+        # un Clue créé (comme create_new_clue en mode dossier)
+        sub = self.subfile(inst)
+        if sub is not None:
+            kind, offset, length = sub
+            raw = self._data[offset:offset+length]
+        elif inst['type'] == 'clue':
+            kind, raw = 'host', b''
+        else:
+            return
+        subfile_path = f"{target_base}_CLASS.{kind}.dat"
+        if not os.path.exists(subfile_path):
+            with open(subfile_path, 'wb') as f:
+                f.write(raw)
+
+    def export(self, out_dir: str, edits: dict[int, dict] | None = None, progress=None) -> int:
+        """Dossier d'extraction complet du .dat, puis instances de l'overlay (ou de l'instantané
+        `edits`, cf. snapshot_edits()) écrites par-dessus. Renvoie le nombre d'instances écrites.
+        progress(fait, total, étape): comme pour rebuild_dat_from_folder (peut lever pour annuler)."""
+        from extract.region_builder import extract_regions_from_dat
+        edits = self.edits if edits is None else edits
+        if progress is not None:
+            progress(0, 2, 'extract')
+        os.makedirs(out_dir, exist_ok=True)
+        if extract_regions_from_dat(self.path, out_dir) is None:
+            raise ValueError("Sections de régions/zones introuvables: export impossible")
+        for done, (key, inst) in enumerate(edits.items()):
+            if progress is not None:
+                progress(1 + done / len(edits), 2, 'overlay')
+            self._export_instance(out_dir, key, inst)
+        return len(edits)
+
+    def _patch_entry(self, typ: str, index: int, before: dict, after: dict) -> list[tuple[int, bytes]] | None:
+        """Octets à réécrire pour passer de `before` à `after`, None si un champ modifié n'est pas
+        de taille fixe (nom, TUID, zone, références...)."""
+        section_id, fields = PATCH_LAYOUTS[typ]
+        section = self.sections.get(section_id)
+        if section is None:
+            return None
+        base = section['offset'] + index * section['size']
+        old, new = _leaves(before), _leaves(after)
+        patches = []
+        for key in old.keys() | new.keys():
+            if old.get(key) == new.get(key):
+                continue
+            spec = fields.get(key)
+            if spec is None or key not in new:
+                return None
+            offset, fmt = spec
+            value = new[key]
+            try:
+                if isinstance(fmt, int):
+                    raw = bytes.fromhex(value)
+                    if len(raw) != fmt:
+                        return None
+                elif key == 'transform_matrix':
+                    cells = [float(v) for row in value for v in row]
+                    if len(value) != 4 or len(cells) != 16:
+                        return None
+                    raw = struct.pack(fmt, *cells)
+                else:
+                    raw = struct.pack(fmt, float(value) if fmt.endswith('f') else int(value))
+            except (TypeError, ValueError, struct.error):
+                return None
+            patches.append((base + offset, raw))
+        return patches
+
+    def _patches(self, edits: dict[int, dict]) -> list[tuple[int, bytes]] | None:
+        """Patchs de tout l'overlay, None s'il faut un rebuild (instance ajoutée, champ variable)."""
+        originals: dict[str, list[dict]] = {}
+        patches = []
+        for key, inst in edits.items():
+            slot = self._slots.get(key)
+            if slot is None or slot[0] not in PATCH_LAYOUTS:
+                return None
+            typ, index = slot
+            if typ not in originals:
+                originals[typ] = self._decode_records(typ)
+            if index >= len(originals[typ]):
+                return None
+            entry = self._patch_entry(typ, index, originals[typ][index], inst['data'])
+            if entry is None:
+                return None
+            patches.extend(entry)
+        return patches
+
+    def same_file(self, path: str) -> bool:
+        try:
+            return os.path.samefile(path, self.path)
+        except OSError:
+            return False
+
+    def write_dat(self, path: str, edits: dict[int, dict] | None = None, progress=None) -> str:
+        """Écrit le niveau avec l'overlay (ou l'instantané `edits`) dans `path`, à remplacer ensuite
+        par install(); renvoie le mode utilisé: 'copie' (aucune modification), 'patch' (champs de
+        taille fixe réécrits dans une copie) ou 'rebuild' (export temporaire + rebuild complet).
+        progress(fait, total, étape): comme pour rebuild_dat_from_folder (peut lever pour annuler)."""
+        edits = self.edits if edits is None else edits
+        patches = self._patches(edits) if edits else []
+        if patches is not None:
+            if progress is not None:
+                progress(0, 1, 'patch' if patches else 'copie')
+            buf = bytearray(self._data)
+            for offset, raw in patches:
+                buf[offset:offset+len(raw)] = raw
+            with open(path, 'wb') as f:
+                f.write(buf)
+            return 'patch' if patches else 'copie'
+        work = tempfile.mkdtemp(prefix='polaris-')
+        try:
+            # Export: premier tiers de la progression, rebuild: le reste
+            self.export(work, edits, progress=_scaled(progress, 0, 1, 3, 'export/'))
+            from main import rebuild_dat_from_folder
+            rebuild_dat_from_folder(work, path, progress=_scaled(progress, 1, 2, 3, 'rebuild/'))
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+        return 'rebuild'
+
+    def install(self, tmp: str, out_path: str) -> None:
+        """Remplace out_path par le fichier écrit par write_dat(). Remplacer le fichier ouvert
+        ferme le modèle (le mmap doit être fermé avant, sous Windows)."""
+        if self.same_file(out_path):
+            self.close()
+        os.replace(tmp, out_path)
+
+    def save_dat(self, out_path: str) -> str:
+        """write_dat() dans un fichier temporaire à côté de out_path puis install()."""
+        out_path = os.path.abspath(out_path)
+        fd, tmp = tempfile.mkstemp(suffix='.dat', dir=os.path.dirname(out_path))
+        os.close(fd)
+        try:
+            mode = self.write_dat(tmp)
+            self.install(tmp, out_path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return mode
@@ -1,5 +1,7 @@
 import os
 import json
+import shutil
+import tempfile
 import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
@@ -8,6 +10,17 @@ from typing import Any
 from shared.utils import sanitize_name
 from extract.region_builder import extract_regions_from_dat
 from shared.constants import INSTANCE_TYPES
+from shared.class_enum import ClassIdCache
+from shared.project_cache import ProjectCache, paused_gc
+from shared.path_points import PACKED_KEY, point_list, store_points
+from gui.search_index import SearchIndex, instance_class_id
+from gui.ref_options import ReferenceOptions
+from gui.ref_list import RefListView
+from gui.map_view import MAP_TYPES, MapView
+from gui.tuid_registry import TuidRegistry
+from gui.dat_model import DatModel
+from gui.jobs import Job, JobCancelled, JobRunner, snapshot_folder
+from shared.tuid_index import REFERENCE_FIELDS, TuidIndex
 
 
 INSTANCE_SUFFIXES = {
@@ -22,74 +35,153 @@ INSTANCE_SUFFIXES = {
 }
 
 
-def _scan_instances(root_dir: str):
+SUBFILE_SUFFIXES = ('_CLASS.host.dat', '_CLASS.local.dat')
+# Période de scrutation du chargement en arrière-plan (ms)
+LOAD_POLL_MS = 100
+# Période de rafraîchissement de la progression des tâches (rebuild, enregistrement, export) (ms)
+JOB_POLL_MS = 150
+# Délai sans frappe avant d'appliquer la recherche de l'arbre (ms)
+SEARCH_DEBOUNCE_MS = 150
+# Idem pour le filtrage des combobox de référence (area, pod, scent, clue)
+OPTION_FILTER_MS = 120
+
+
+def _scan_instances(
+    root_dir: str,
+    subfiles: set | None = None,
+    previous: dict | None = None,
+    stats: dict | None = None,
+    progress=None,
+    cache: ProjectCache | None = None,
+):
+    """Charge tous les JSON d'instances sous root_dir.
+
+    subfiles: si fourni, reçoit les chemins des *_CLASS.host.dat / *_CLASS.local.dat vus pendant
+    le même parcours (index d'existence: évite un os.path.isfile par instance dans l'arbre).
+    previous/stats: {chemin: (mtime_ns, taille, item)}; un fichier dont mtime et taille n'ont pas
+    changé depuis `previous` n'est pas relu (l'item est réutilisé), `stats` est rempli pour le
+    prochain scan. progress(n): appelé régulièrement avec le nombre de JSON traités.
+    cache: cache du dossier (.polaris-cache); les fichiers absents de `previous` y sont lus, seuls
+    ceux modifiés depuis son écriture sont analysés."""
     items = []
-    for base, _dirs, files in os.walk(root_dir):
-        for fn in files:
-            for suf, typ in INSTANCE_SUFFIXES.items():
-                if fn.endswith(suf):
-                    p = os.path.join(base, fn)
-                    try:
-                        with open(p, 'r', encoding='utf-8') as f:
-                            obj = json.load(f)
-                        items.append({'type': typ, 'path': p, 'data': obj})
-                    except Exception:
-                        pass
-                    break
-    # Tri: type, zone, tuid
-    def _key(it):
-        d = it['data']
-        return (it['type'], int(d.get('zone', 0)), int(d.get('tuid', 0)))
-    items.sort(key=_key)
+    seen = 0
+    with paused_gc():
+        for base, _dirs, files in os.walk(root_dir):
+            for fn in files:
+                if subfiles is not None and fn.endswith(SUBFILE_SUFFIXES):
+                    subfiles.add(os.path.join(base, fn))
+                    continue
+                for suf, typ in INSTANCE_SUFFIXES.items():
+                    if fn.endswith(suf):
+                        p = os.path.join(base, fn)
+                        seen += 1
+                        if progress is not None and seen % 500 == 0:
+                            progress(seen)
+                        key = st = None
+                        if previous is not None or stats is not None or cache is not None:
+                            try:
+                                st = os.stat(p)
+                                key = (st.st_mtime_ns, st.st_size)
+                            except OSError:
+                                break
+                        old = previous.get(p) if previous else None
+                        if old is not None and key == old[:2]:
+                            items.append(old[2])
+                            if stats is not None:
+                                stats[p] = old
+                            break
+                        try:
+                            if cache is not None:
+                                obj = cache.load_json(p, st)
+                            else:
+                                with open(p, 'r', encoding='utf-8') as f:
+                                    obj = json.load(f)
+                            item = {'type': typ, 'path': p, 'data': obj}
+                            items.append(item)
+                            if stats is not None:
+                                stats[p] = key + (item,)
+                        except Exception:
+                            pass
+                        break
+        if progress is not None:
+            progress(seen)
+        # Tri: type, zone, tuid
+        def _key(it):
+            d = it['data']
+            return (it['type'], int(d.get('zone', 0)), int(d.get('tuid', 0)))
+        items.sort(key=_key)
     return items
 
 
-def _read_subfile_class_id(subfile_path: str) -> int | None:
-    try:
-        with open(subfile_path, 'rb') as f:
-            data = f.read()
-        if data[:4] != b'IGHW':
-            return None
-        version_major = int.from_bytes(data[4:6], 'big')
-        section_count = int.from_bytes(data[12:16], 'big') if version_major >= 1 else int.from_bytes(data[8:10], 'big')
-        section_start = 0x20 if version_major >= 1 else 0x10
-        for i in range(section_count):
-            off = section_start + i * 16
-            if off + 16 > len(data):
-                break
-            sid = int.from_bytes(data[off:off+4], 'big')
-            doff = int.from_bytes(data[off+4:off+8], 'big')
-            if sid == 0x0002501C and doff + 4 <= len(data):
-                return int.from_bytes(data[doff:doff+4], 'big')
-    except Exception:
-        return None
-    return None
-
-
 class EditorApp(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("Polaris Level Editor (Lite)")
         self.geometry("1100x700")
         self.extract_dir: str | None = None
+        # Mode DAT: .dat ouvert directement (mmap, décodage paresseux, modifications en overlay)
+        self.dat_path: str | None = None
+        self.dat_model: DatModel | None = None
         self.instances: list[dict] = []
         self.zone_names: list[str] = []
         self.pending_path_point: tuple[dict, int] | None = None
+        # Options des combobox de référence (path/volume/clue/pod), invalidées par type d'instance
+        self.ref_options = ReferenceOptions()
+        # TUID -> instance et allocation de TUID libres (tenu à jour avec self.instances)
+        self.tuid_registry = TuidRegistry()
+        # Index global des TUID + graphe inverse des références: construit à la première
+        # question (« référencé par », références cassées), mis à jour à chaque écriture
+        self._ref_index: TuidIndex | None = None
+        # ClassID des subfiles (en-têtes lus en arrière-plan au chargement, conservés sur disque)
+        self.class_ids = ClassIdCache()
+        self._class_ids_root: str | None = None
+        # Chargement: {chemin JSON: (mtime_ns, taille, item)} du dernier scan de _scan_root
+        self._file_stats: dict[str, tuple] = {}
+        self._scan_root: str | None = None
+        # Cache binaire du dossier (.polaris-cache): JSON analysés des sessions précédentes
+        self._project_cache: ProjectCache | None = None
+        self._project_cache_lock = threading.Lock()
+        self._load_generation = 0
+        self._status_busy = False
+        # Recherche: index tenu à jour avec self.instances, requête appliquée après SEARCH_DEBOUNCE_MS
+        self.search_index = SearchIndex(self._instance_location, self._instance_class_id)
+        self._search_after: str | None = None
+        # Formulaires par type: construits une fois, puis reliés aux données à chaque sélection
+        self._type_forms: dict[str, dict] = {}
+        self._shown_type_form: dict | None = None
+        self._generic_fields_type: str | None = None
+        # Rebuild / enregistrement / export: un seul thread de travail, progression scrutée
+        self.jobs = JobRunner()
+        self._jobs_polling = False
+        # Pris par les écritures de JSON (_write_instance, déplacements de save_current, d'où le
+        # RLock) et par l'instantané d'un rebuild au démarrage de la tâche: l'instantané ne voit
+        # jamais une écriture à moitié faite
+        self._write_lock = threading.RLock()
+        self._last_rebuild_out: str | None = None
 
         self._build_ui()
+        self.protocol("WM_DELETE_WINDOW", self.on_quit)
 
     def _build_ui(self):
         # Menus
         menubar = tk.Menu(self)
         filemenu = tk.Menu(menubar, tearoff=0)
         filemenu.add_command(label="Ouvrir DAT...", command=self.menu_open_dat)
+        filemenu.add_command(label="Extraire DAT vers dossier...", command=self.menu_extract_dat)
         filemenu.add_command(label="Ouvrir dossier d'extraction...", command=self.menu_open_folder)
+        filemenu.add_command(label="Recharger les fichiers modifiés", command=self.reload_instances)
         filemenu.add_separator()
+        filemenu.add_command(label="Enregistrer DAT...", command=self.menu_save_dat)
+        filemenu.add_command(label="Exporter en dossier...", command=self.menu_export_folder)
         filemenu.add_command(label="Rebuild vers DAT...", command=self.menu_rebuild)
+        filemenu.add_command(label="Relancer le rebuild", accelerator="Ctrl+B", command=self.rebuild_again)
+        filemenu.add_command(label="Annuler la tâche en cours", command=self.cancel_jobs)
+        filemenu.add_command(label="Références cassées...", command=self.menu_check_references)
         filemenu.add_separator()
-        filemenu.add_command(label="Quitter", command=self.destroy)
+        filemenu.add_command(label="Quitter", command=self.on_quit)
         menubar.add_cascade(label="Fichier", menu=filemenu)
         self.config(menu=menubar)
+        self.bind_all('<Control-b>', self.rebuild_again)
 
         # Layout
         main = ttk.Panedwindow(self, orient=tk.HORIZONTAL)
@@ -110,7 +202,21 @@ class EditorApp(tk.Tk):
         self.nav_search_var = tk.StringVar()
         nav_search = ttk.Entry(search_row, textvariable=self.nav_search_var)
         nav_search.pack(side=tk.LEFT, fill=tk.X, expand=True)
-        nav_search.bind('<KeyRelease>', lambda _e: self.refresh_tree())
+        nav_search.bind('<KeyRelease>', self._on_search_key)
+        # Barre d'état: progression du chargement en arrière-plan
+        self.status_row = status_row = ttk.Frame(left)
+        status_row.pack(side=tk.BOTTOM, fill=tk.X, padx=4)
+        self.status_var = tk.StringVar()
+        ttk.Label(status_row, textvariable=self.status_var).pack(side=tk.LEFT)
+        self.status_bar = ttk.Progressbar(status_row, mode='indeterminate', length=80)
+        self.status_bar.pack(side=tk.RIGHT)
+        # Tâche en cours (rebuild, enregistrement, export): affichée seulement pendant la tâche
+        self.job_row = ttk.Frame(left)
+        self.job_var = tk.StringVar()
+        ttk.Label(self.job_row, textvariable=self.job_var).pack(side=tk.TOP, anchor='w')
+        ttk.Button(self.job_row, text='Annuler', command=self.cancel_jobs).pack(side=tk.RIGHT)
+        self.job_bar = ttk.Progressbar(self.job_row, mode='determinate', maximum=100)
+        self.job_bar.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 4))
         nav_container = ttk.Frame(left)
         nav_container.pack(fill=tk.BOTH, expand=True, padx=4, pady=4)
         self.nav_tree = ttk.Treeview(nav_container, show='tree')
@@ -125,8 +231,17 @@ class EditorApp(tk.Tk):
         self.nav_tree.bind('<ButtonPress-1>', self._on_tree_button_press, add='+')
         self.nav_tree.bind('<B1-Motion>', self._on_tree_motion, add='+')
         self.nav_tree.bind('<ButtonRelease-1>', self._on_tree_button_release, add='+')
+        self.nav_tree.bind('<<TreeviewOpen>>', self._on_tree_open)
         self.node_to_instance: dict[str, dict] = {}
         self.node_action: dict[str, dict] = {}
+        # Arbre paresseux: iid stable par clé (région/zone/type/chemin d'instance), noeuds peuplés
+        # à l'ouverture; les noeuds non peuplés ont un unique enfant factice '<iid>~'
+        self.subfile_index: set[str] = set()
+        self._tree_groups: dict[str, dict[str, dict[str, list[dict]]]] = {}
+        self._key_iids: dict[tuple, str] = {}
+        self._node_kind: dict[str, tuple] = {}
+        self._node_text: dict[str, str] = {}
+        self._populated: set[str] = set()
 
         # Center: fields with scrollbar
         fields_container = ttk.Frame(center)
@@ -179,9 +294,12 @@ class EditorApp(tk.Tk):
         ttk.Button(btns, text="Nouveau Clue", command=self.create_new_clue).pack(side=tk.LEFT)
         self.btns_frame = btns
 
-        # Right: Subfile info with scrollbar
-        subf = ttk.Frame(right)
-        subf.pack(fill=tk.BOTH, expand=True, padx=4, pady=4)
+        # Right: onglets Détails (subfile + JSON) et Carte (vue de dessus)
+        right_tabs = ttk.Notebook(right)
+        right_tabs.pack(fill=tk.BOTH, expand=True, padx=4, pady=4)
+        # Subfile info with scrollbar
+        subf = ttk.Frame(right_tabs)
+        right_tabs.add(subf, text='Détails')
         ttk.Label(subf, text="Subfile").pack(anchor='w')
         subfile_frame = ttk.Frame(subf)
         subfile_frame.pack(fill=tk.BOTH, expand=True)
@@ -201,10 +319,50 @@ class EditorApp(tk.Tk):
         self.json_text.pack(side='left', fill=tk.BOTH, expand=True)
         json_scroll.pack(side='right', fill='y')
 
+        # Carte: ne se dessine que quand son onglet est visible
+        self.map_view = MapView(right_tabs, lambda: self.search_index, self._on_map_pick, self._map_prepare)
+        right_tabs.add(self.map_view.frame, text='Carte')
+
     # Menu actions
+    def _confirm_discard(self) -> bool:
+        """Mode DAT: demande confirmation avant de perdre des modifications non enregistrées."""
+        if self.dat_model is None or not self.dat_model.dirty:
+            return True
+        n = len(self.dat_model.edits)
+        return messagebox.askyesno("Modifications non enregistrées",
+                                   f"{n} instance(s) modifiée(s) dans {os.path.basename(self.dat_model.path)} "
+                                   "ne sont pas enregistrées. Continuer quand même ?")
+
+    def on_quit(self):
+        if not self._confirm_discard():
+            return
+        job = self.jobs.current
+        if job is not None or self.jobs.pending():
+            label = job.label if job is not None else "Tâche en attente"
+            if not messagebox.askyesno("Tâche en cours", f"{label}: annuler et quitter ?"):
+                return
+            self.cancel_jobs()
+            self._quit_when_idle()
+            return
+        self.destroy()
+
+    def _quit_when_idle(self):
+        """Attend la fin de la tâche annulée (fichiers temporaires et instantané nettoyés) puis quitte."""
+        if not self.jobs.idle:
+            self.after(JOB_POLL_MS, self._quit_when_idle)
+            return
+        self.destroy()
+
     def menu_open_dat(self):
         path = filedialog.askopenfilename(title="Choisir gp_prius.dat", filetypes=[("DAT","*.dat"), ("Tous","*.*")])
-        if not path:
+        if not path or not self._confirm_discard():
+            return
+        self._last_rebuild_out = None
+        self.open_dat(path)
+
+    def menu_extract_dat(self):
+        path = filedialog.askopenfilename(title="Choisir gp_prius.dat", filetypes=[("DAT","*.dat"), ("Tous","*.*")])
+        if not path or not self._confirm_discard():
             return
         out_dir = filedialog.askdirectory(title="Choisir dossier d'extraction")
         if not out_dir:
@@ -212,44 +370,203 @@ class EditorApp(tk.Tk):
         def run():
             try:
                 extract_regions_from_dat(path, out_dir)
-                self.extract_dir = out_dir
-                self.reload_instances()
+                self.after(0, self._open_folder, out_dir)
             except Exception as e:
                 messagebox.showerror("Erreur extraction", str(e))
         threading.Thread(target=run, daemon=True).start()
 
     def menu_open_folder(self):
         path = filedialog.askdirectory(title="Choisir dossier d'extraction")
-        if not path:
+        if not path or not self._confirm_discard():
             return
+        self._open_folder(path)
+
+    def _open_folder(self, path: str):
+        self._last_rebuild_out = None
+        self.dat_path = None
+        self.dat_model = None
         self.extract_dir = path
         self.reload_instances()
 
+    def menu_save_dat(self):
+        if self.dat_model is None:
+            self.menu_rebuild()
+            return
+        model = self.dat_model
+        out = filedialog.asksaveasfilename(title="Enregistrer le DAT", defaultextension=".dat",
+                                           initialfile=os.path.basename(model.path), filetypes=[("DAT","*.dat")])
+        if not out:
+            return
+        self._start_save_dat(out)
+
+    def _start_save_dat(self, out: str):
+        """Enregistre le DAT ouvert dans la file de tâches: l'overlay est copié maintenant, les
+        modifications faites pendant l'écriture ne sont pas incluses."""
+        model = self.dat_model
+        out = os.path.abspath(out)
+        self._last_rebuild_out = out
+        edits, revision = model.snapshot_edits(), model.revision
+        key = ('save', out)
+
+        def work(job):
+            fd, tmp = tempfile.mkstemp(suffix='.dat', dir=os.path.dirname(out))
+            os.close(fd)
+            try:
+                return tmp, model.write_dat(tmp, edits, progress=job.progress)
+            except BaseException:
+                os.remove(tmp)
+                raise
+
+        def done(result):
+            tmp, mode = result
+            if self.jobs.has(key):
+                # Une demande plus récente vers la même sortie suit: c'est elle qui sera installée
+                os.remove(tmp)
+                return
+            self._dat_saved(model, tmp, out, mode, revision)
+
+        self._submit_job(Job(key, f"Enregistrement de {os.path.basename(out)}", work, done,
+                             lambda e: self._job_failed("Erreur enregistrement", e)))
+
+    def _dat_saved(self, model: DatModel, tmp: str, out: str, mode: str, revision: int):
+        """Installe le .dat écrit. Sans modification depuis l'instantané, il devient le fichier ouvert
+        (overlay vidé: ses modifications y sont)."""
+        current = model is self.dat_model
+        later_edits = current and model.revision != revision
+        if later_edits and model.same_file(out):
+            # Remplacer le fichier ouvert ferme le modèle: les modifications faites depuis seraient perdues
+            if not messagebox.askyesno("Enregistrer DAT",
+                                       "Des instances ont été modifiées pendant l'enregistrement et ne sont pas "
+                                       f"dans le fichier écrit. Remplacer {os.path.basename(out)} quand même "
+                                       "(ces modifications seront perdues) ?"):
+                os.remove(tmp)
+                return
+            later_edits = False
+        try:
+            model.install(tmp, out)
+        except OSError as e:
+            os.remove(tmp)
+            messagebox.showerror("Erreur enregistrement", str(e))
+            return
+        if current and not later_edits:
+            self.open_dat(out)
+        note = "\nLes modifications faites pendant l'enregistrement n'y sont pas." if later_edits else ""
+        messagebox.showinfo("Enregistrer DAT", f"Enregistré ({mode}): {out}{note}")
+
+    def menu_export_folder(self):
+        if self.dat_model is None:
+            messagebox.showinfo("Info", "Ouvrez un DAT d'abord")
+            return
+        model = self.dat_model
+        out_dir = filedialog.askdirectory(title="Choisir dossier d'export")
+        if not out_dir:
+            return
+        edits = model.snapshot_edits()
+        self._submit_job(Job(('export', os.path.abspath(out_dir)), f"Export vers {out_dir}",
+                             lambda job: model.export(out_dir, edits, progress=job.progress),
+                             lambda n: messagebox.showinfo("Export", f"Export terminé: {out_dir} ({n} instance(s) modifiée(s))"),
+                             lambda e: self._job_failed("Erreur export", e)))
+
     def menu_rebuild(self):
+        if self.dat_model is not None:
+            self.menu_save_dat()
+            return
         if not self.extract_dir:
             messagebox.showinfo("Info", "Ouvrez un dossier d'extraction d'abord")
             return
         out = filedialog.asksaveasfilename(title="Rebuild vers", defaultextension=".dat", filetypes=[("DAT","*.dat")])
         if not out:
             return
-        def run():
+        self._start_rebuild(out)
+
+    def rebuild_again(self, _event=None):
+        """Relance le dernier rebuild / enregistrement vers la même sortie (sans dialogue). Des
+        demandes répétées pendant qu'un rebuild tourne sont regroupées en une seule."""
+        if not self._last_rebuild_out:
+            self.menu_rebuild()
+        elif self.dat_model is not None:
+            self._start_save_dat(self._last_rebuild_out)
+        elif self.extract_dir:
+            self._start_rebuild(self._last_rebuild_out)
+
+    def _start_rebuild(self, out: str):
+        """Rebuild du dossier d'extraction dans la file de tâches. L'instantané du dossier est pris
+        par la tâche à son démarrage (les JSON modifiés ensuite n'y entrent pas): une demande
+        remplacée par une plus récente avant d'avoir démarré n'en prend aucun."""
+        out = os.path.abspath(out)
+        self._last_rebuild_out = out
+        src = self.extract_dir
+
+        def work(job):
+            from main import rebuild_dat_from_folder
             try:
-                from main import rebuild_dat_from_folder
-                rebuild_dat_from_folder(self.extract_dir, out)
+                with self._write_lock:
+                    snapshot = snapshot_folder(src)
+            except OSError as e:
+                raise OSError(f"Instantané du dossier impossible: {e}") from e
+            try:
+                fd, tmp = tempfile.mkstemp(suffix='.dat', dir=os.path.dirname(out))
+                os.close(fd)
+                try:
+                    rebuild_dat_from_folder(snapshot, tmp, progress=job.progress)
+                    os.replace(tmp, out)
+                except BaseException:
+                    os.remove(tmp)
+                    raise
                 # Générer instance.lua à côté du DAT sauvegardé
                 try:
                     from tools.generate_instance_handles_lua import generate_instance_handles_lua
-                    out_dir = os.path.dirname(out)
-                    generate_instance_handles_lua(self.extract_dir, os.path.join(out_dir, 'instance.lua'))
+                    generate_instance_handles_lua(snapshot, os.path.join(os.path.dirname(out), 'instance.lua'))
                 except Exception:
                     pass
-                messagebox.showinfo("Rebuild", f"Rebuild terminé: {out}")
-            except Exception as e:
-                messagebox.showerror("Erreur rebuild", str(e))
-        threading.Thread(target=run, daemon=True).start()
+            finally:
+                shutil.rmtree(snapshot, ignore_errors=True)
+            return out
+
+        self._submit_job(Job(('rebuild', out), f"Rebuild vers {os.path.basename(out)}", work,
+                             lambda path: messagebox.showinfo("Rebuild", f"Rebuild terminé: {path}"),
+                             lambda e: self._job_failed("Erreur rebuild", e)))
+
+    # Tâches longues (un seul thread de travail, cf. gui/jobs.py)
+    def _submit_job(self, job: Job):
+        self.jobs.submit(job)
+        if not self._jobs_polling:
+            self._jobs_polling = True
+            self._poll_jobs()
+
+    def _poll_jobs(self):
+        self.jobs.dispatch()
+        job = self.jobs.current
+        if job is None and not self.jobs.busy:
+            self._jobs_polling = False
+            self.job_row.pack_forget()
+            return
+        if not self.job_row.winfo_ismapped():
+            self.job_row.pack(side=tk.BOTTOM, fill=tk.X, padx=4, before=self.status_row)
+        if job is not None:
+            waiting = self.jobs.pending()
+            step = f" — {job.step}" if job.step else ""
+            queued = f" (+{waiting} en attente)" if waiting else ""
+            self.job_var.set(f"{job.label}{step} {int(job.fraction * 100)}%{queued}")
+            self.job_bar['value'] = job.fraction * 100
+        self.after(JOB_POLL_MS, self._poll_jobs)
+
+    def cancel_jobs(self, _event=None):
+        if self.jobs.cancel_all():
+            self.job_var.set("Annulation...")
+
+    def _job_failed(self, title: str, error: BaseException):
+        if isinstance(error, JobCancelled):
+            self._set_status("Tâche annulée")
+            return
+        messagebox.showerror(title, str(error))
 
     # Data loading
-    def reload_instances(self):
+    def reload_instances(self, background: bool = True, full: bool = False):
+        """(Re)charge le dossier d'extraction en un seul parcours. Seuls les JSON dont mtime/taille
+        ont changé depuis le dernier chargement sont relus (full=True: tout relire). En arrière-plan
+        par défaut: le parcours tourne dans un thread, l'UI affiche la progression et applique le
+        résultat quand il est prêt (un rechargement plus récent annule le précédent)."""
         if not self.extract_dir:
             return
         # collect zone names: assume structure <extract_dir>/<region>/<zone>/*
@@ -264,225 +581,577 @@ class EditorApp(tk.Tk):
         except Exception:
             self.zone_names = []
         self.zone_combo['values'] = self.zone_names
-        # collect volume options for Clue linking (name + tuid)
-        self.volume_options = []
-        self.volume_by_tuid = {}
-        # collect clue options for Scent linking (name + tuid)
-        self.clue_options = []
-        self.clue_by_tuid = {}
-        try:
-            all_items = _scan_instances(self.extract_dir)
-            for it in all_items:
-                if it['type'] == 'volume':
-                    name = it['data'].get('name') or os.path.basename(it['path'])
-                    tuid = it['data'].get('tuid')
-                    try:
-                        tuid_int = int(tuid, 0) if isinstance(tuid, str) else int(tuid)
-                        tuid_hex = f"0x{tuid_int:016X}"
-                    except Exception:
-                        tuid_int = None
-                        tuid_hex = str(tuid)
-                    self.volume_options.append((f"{name} ({tuid_hex})", tuid))
-                    if tuid_int is not None:
-                        self.volume_by_tuid[tuid_int] = it['data']
-                elif it['type'] == 'clue':
-                    name = it['data'].get('name') or os.path.basename(it['path'])
-                    tuid = it['data'].get('tuid')
-                    try:
-                        tuid_int = int(tuid, 0) if isinstance(tuid, str) else int(tuid)
-                        tuid_hex = f"0x{tuid_int:016X}"
-                    except Exception:
-                        tuid_int = None
-                        tuid_hex = str(tuid)
-                    self.clue_options.append((f"{name} ({tuid_hex})", tuid))
-                    if tuid_int is not None:
-                        self.clue_by_tuid[tuid_int] = it['data']
-            # sort by name
-            self.volume_options.sort(key=lambda x: x[0].lower())
-            self.clue_options.sort(key=lambda x: x[0].lower())
-        except Exception:
-            self.volume_options = []
-            self.clue_options = []
-        self.instances = _scan_instances(self.extract_dir)
+
+        root_dir = self.extract_dir
+        previous = None if full or self._scan_root != root_dir else dict(self._file_stats)
+        self._load_generation += 1
+        generation = self._load_generation
+        state = {'done': False, 'count': 0, 'result': None, 'error': None}
+        known = self.search_index.known_ids() if previous is not None else None
+        cache = self._project_cache
+        if cache is not None and (full or cache.root != root_dir):
+            cache = None
+
+        def work():
+            project = cache
+            try:
+                subfiles: set[str] = set()
+                stats: dict = {}
+                # Un seul scan à la fois par cache (un rechargement plus récent attend l'ancien)
+                with self._project_cache_lock, paused_gc():
+                    if project is None:
+                        project = ProjectCache(root_dir) if full else ProjectCache.load(root_dir)
+                    items = _scan_instances(root_dir, subfiles, previous, stats,
+                                            progress=lambda n: state.__setitem__('count', n),
+                                            cache=project)
+                    # Index de recherche calculé ici, hors du thread UI: complet au premier
+                    # chargement, sinon seulement les entrées des instances nouvelles ou relues
+                    if known is None:
+                        index, prepared = SearchIndex(self._instance_location, self._instance_class_id), None
+                        index.sync(items)
+                    else:
+                        index, prepared = None, self.search_index.prepare(items, known)
+                state['result'] = (items, subfiles, stats, index, prepared)
+                state['project'] = project
+            except Exception as e:
+                state['error'] = e
+            state['done'] = True
+            # Cache écrit après coup: l'affichage n'attend pas l'écriture
+            if project is not None and state['error'] is None:
+                with self._project_cache_lock:
+                    project.save()
+
+        if not background:
+            work()
+            self._finish_load(generation, root_dir, state)
+            return
+        self._set_status(f"Chargement de {root_dir}...", busy=True)
+        threading.Thread(target=work, daemon=True).start()
+        self.after(LOAD_POLL_MS, self._poll_load, generation, root_dir, state)
+
+    def open_dat(self, path: str, background: bool = True):
+        """Ouvre un .dat directement (DatModel): seul l'index léger des instances (TUID, nom, zone)
+        est lu, les enregistrements complets sont décodés à l'affichage. Même chargement en
+        arrière-plan que reload_instances()."""
+        self.extract_dir = None
+        self.dat_model = None
+        self.dat_path = root_dir = os.path.abspath(path)
+        self._load_generation += 1
+        generation = self._load_generation
+        state = {'done': False, 'count': 0, 'result': None, 'error': None, 'model': None}
+
+        def work():
+            try:
+                model = DatModel(root_dir)
+                state['count'] = len(model)
+                # ClassID lus par ce modèle: self.dat_model n'est assigné qu'à la fin du chargement
+                index = SearchIndex(self._instance_location, model.search_class_id)
+                index.sync(model.instances)
+                state['model'] = model
+                state['result'] = (model.instances, set(), {}, index, None)
+            except Exception as e:
+                state['error'] = e
+            state['done'] = True
+
+        if not background:
+            work()
+            self._finish_load(generation, root_dir, state)
+            return
+        self._set_status(f"Ouverture de {root_dir}...", busy=True)
+        threading.Thread(target=work, daemon=True).start()
+        self.after(LOAD_POLL_MS, self._poll_load, generation, root_dir, state)
+
+    def _poll_load(self, generation: int, root_dir: str, state: dict):
+        if generation != self._load_generation:
+            return
+        if not state['done']:
+            self._set_status(f"Chargement... {state['count']} fichiers", busy=True)
+            self.after(LOAD_POLL_MS, self._poll_load, generation, root_dir, state)
+            return
+        self._finish_load(generation, root_dir, state)
+
+    def _finish_load(self, generation: int, root_dir: str, state: dict):
+        if generation != self._load_generation:
+            return
+        if state['error'] is not None:
+            self._set_status("")
+            messagebox.showerror("Erreur chargement", str(state['error']))
+            return
+        items, subfiles, stats, index, prepared = state['result']
+        self.dat_model = state.get('model')
+        if self.dat_model is not None:
+            self.zone_names = self.dat_model.zone_names
+            self.zone_combo['values'] = self.zone_names
+        self._scan_root = root_dir
+        self._file_stats = stats
+        self._project_cache = state.get('project')
+        self.instances = items
+        self.subfile_index = subfiles
+        if index is not None:
+            self.search_index = index
+        else:
+            self.search_index.sync(items, prepared)
+        self.ref_options.sync(items)
+        self.tuid_registry.sync(items)
+        self._ref_index = None
         self.refresh_list()
+        self.map_view.reset()
+        self._set_status(f"{len(items)} instances")
+        if self.dat_model is None:
+            self._refresh_class_ids(generation, root_dir, subfiles)
+
+    def _refresh_class_ids(self, generation: int, root_dir: str, subfiles: set[str]):
+        """Remplit le cache des ClassID en arrière-plan: cache du disque au premier chargement du
+        dossier, puis seuls les subfiles nouveaux ou modifiés sont relus (en-têtes seulement)."""
+        cache = self.class_ids
+        load_saved = self._class_ids_root != root_dir
+        self._class_ids_root = root_dir
+        state = {'done': False, 'count': 0, 'read': 0}
+
+        def work():
+            try:
+                if load_saved:
+                    cache.load(root_dir)
+                before = len(cache)
+                state['read'] = cache.refresh(sorted(subfiles), progress=lambda n: state.__setitem__('count', n))
+                if state['read'] or len(cache) != before or load_saved:
+                    cache.save(root_dir)
+            except Exception:
+                pass
+            state['done'] = True
+
+        self._set_status(f"{len(self.instances)} instances — ClassID des subfiles...", busy=True)
+        threading.Thread(target=work, daemon=True).start()
+        self.after(LOAD_POLL_MS, self._poll_class_ids, generation, state)
+
+    def _poll_class_ids(self, generation: int, state: dict):
+        if generation != self._load_generation:
+            return
+        if not state['done']:
+            self.after(LOAD_POLL_MS, self._poll_class_ids, generation, state)
+            return
+        # Recherche class: les instances sans ClassID dans leur JSON (controllers) prennent celui du subfile
+        for inst in self.instances:
+            if inst['type'] in ('moby', 'controller', 'clue') and instance_class_id(inst) is None:
+                self.search_index.update(inst)
+        self._set_status(f"{len(self.instances)} instances")
+
+    def _set_status(self, text: str, busy: bool = False):
+        self.status_var.set(text)
+        if busy and not self._status_busy:
+            self.status_bar.start(80)
+        elif not busy and self._status_busy:
+            self.status_bar.stop()
+        self._status_busy = busy
+
+    def _record_write(self, inst: dict, old_path: str | None = None):
+        """À appeler après avoir écrit le JSON d'une instance depuis l'éditeur: met à jour le cache
+        de stats (le prochain rechargement ne le relira pas) sans rescanner le dossier."""
+        if old_path and old_path != inst['path']:
+            self._file_stats.pop(old_path, None)
+        try:
+            st = os.stat(inst['path'])
+            self._file_stats[inst['path']] = (st.st_mtime_ns, st.st_size, inst)
+        except OSError:
+            self._file_stats.pop(inst['path'], None)
+        self.search_index.update(inst)
+        self.ref_options.note_write(inst)
+        old_tuid = self.tuid_registry.tuid_of(inst)
+        self.tuid_registry.update(inst)
+        if self._ref_index is not None:
+            # Entrée et références sortantes de cette instance seulement (pas de reconstruction)
+            self._ref_index.update(inst['type'], inst['data'], old_tuid)
+        self.map_view.invalidate(volumes=inst.get('type') == 'volume')
+
+    def _write_instance(self, inst: dict):
+        """Persiste une instance: son JSON en mode dossier, l'overlay du modèle en mode DAT
+        (écrit au prochain Enregistrer DAT / Exporter)."""
+        if self.dat_model is not None:
+            self.dat_model.note_edit(inst)
+            return
+        # Écriture puis os.replace: un instantané déjà pris (liens physiques, cf. snapshot_folder)
+        # garde l'ancien fichier
+        tmp = inst['path'] + '.tmp'
+        with self._write_lock:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(inst['data'], f, indent=2, ensure_ascii=False)
+            os.replace(tmp, inst['path'])
+
+    def _add_instance(self, typ: str, path: str, data: dict) -> dict:
+        """Écrit et ajoute au modèle une nouvelle instance (duplication, création)."""
+        inst = {'type': typ, 'path': path, 'data': data}
+        self._write_instance(inst)
+        self.instances.append(inst)
+        self._record_write(inst)
+        return inst
+
+    def _apply_own_edits(self):
+        """Répercute sur l'UI des modifications faites par l'éditeur lui-même (pas de rescan)."""
+        self.refresh_tree()
 
     def refresh_list(self):
         # Backward compatibility no-op
         self.refresh_tree()
 
     def refresh_tree(self):
-        # Clear tree
-        for i in self.nav_tree.get_children():
-            self.nav_tree.delete(i)
-        self.node_to_instance.clear()
-        self.node_action.clear()
-        # index by tuid for navigation
-        self.tuid_to_instance: dict[int, dict] = {}
-        # Optional filter by search
-        filter_text = ''
+        """Met l'arbre en accord avec self.instances (et le filtre de recherche) par différences:
+        seuls les noeuds déjà peuplés sont comparés; le reste sera construit à l'ouverture."""
+        # Optional filter by search (index: pas de reformatage des instances à chaque frappe)
         try:
-            filter_text = (self.nav_search_var.get() or '').strip().lower()
+            query = self.nav_search_var.get() or ''
         except Exception:
-            filter_text = ''
-        def _matches(it: dict) -> bool:
-            if not filter_text:
-                return True
-            d = it['data']
-            name = str(d.get('name') or '')
-            typ = str(it.get('type') or '')
-            path = str(it.get('path') or '')
-            # include tuid string and hex
-            tu = d.get('tuid')
-            tu_s = ''
-            try:
-                tu_i = int(tu, 0) if isinstance(tu, str) else int(tu)
-                tu_s = f"0x{tu_i:016X}"
-            except Exception:
-                tu_s = str(tu or '')
-            blob = ' '.join([name, typ, path, tu_s]).lower()
-            return filter_text in blob
-        items_source = [it for it in self.instances if _matches(it)]
-        for it in items_source:
-            tuid = it['data'].get('tuid')
-            try:
-                self.tuid_to_instance[int(tuid,0) if isinstance(tuid,str) else int(tuid)] = it
-            except Exception:
-                pass
-        # Group by region then type
+            query = ''
+        items_source = self.search_index.search(query)
+        if items_source is None:
+            items_source = self.instances
+        # Group by region then zone then type
         grouped: dict[str, dict[str, dict[str, list[dict]]]] = {}
-        base_parts = self.extract_dir.rstrip(os.sep).split(os.sep) if self.extract_dir else []
         for it in items_source:
-            path_parts = it['path'].split(os.sep)
-            region = 'default'
-            zone = ''
-            if len(path_parts) > len(base_parts):
-                region = path_parts[len(base_parts)]
-            if len(path_parts) > len(base_parts)+1:
-                zone = path_parts[len(base_parts)+1]
-            grouped.setdefault(region, {})
-            grouped[region].setdefault(zone, {})
-            grouped[region][zone].setdefault(it['type'], []).append(it)
-        # Build nodes
-        for region in sorted(grouped.keys()):
-            rid = self.nav_tree.insert('', 'end', text=region)
-            for zone in sorted(grouped[region].keys()):
-                zid_text = zone if zone else '(racine)'
-                zid = self.nav_tree.insert(rid, 'end', text=zid_text)
-                for typ in sorted(grouped[region][zone].keys()):
-                    tid = self.nav_tree.insert(zid, 'end', text=typ)
-                    items = grouped[region][zone][typ]
-                    # sort instances by name
-                    items_sorted = sorted(items, key=lambda x: (str(x['data'].get('name') or os.path.basename(x['path']))).lower())
-                    for inst in items_sorted:
-                        name = inst['data'].get('name') or os.path.basename(inst['path'])
-                        iid = self.nav_tree.insert(tid, 'end', text=name)
-                        self.node_to_instance[iid] = inst
-                        # expandables for container-like types
-                        if inst['type'] == 'area':
-                            an = self.nav_tree.insert(iid, 'end', text='Paths')
-                            self.node_action[an] = {'action': 'container_header', 'container': inst, 'container_type': 'area', 'sublist': 'paths'}
-                            for ref in inst['data'].get('path_references') or []:
-                                # Show name if known via tuid index
-                                txt = f"TUID {ref.get('tuid')}"
-                                try:
-                                    rinst = self.tuid_to_instance.get(int(ref.get('tuid')))
-                                    if rinst:
-                                        rname = rinst['data'].get('name') or os.path.basename(rinst['path'])
-                                        txt = f"{rname} (TUID {ref.get('tuid')})"
-                                except Exception:
-                                    pass
-                                rn = self.nav_tree.insert(an, 'end', text=txt)
-                                try:
-                                    self.node_action[rn] = {'action':'ref_tuid', 'tuid': int(ref.get('tuid')), 'container': inst, 'container_type': 'area', 'sublist': 'paths', 'ref': {'tuid': int(ref.get('tuid'))}}
-                                except Exception:
-                                    pass
-                            vn = self.nav_tree.insert(iid, 'end', text='Volumes')
-                            self.node_action[vn] = {'action': 'container_header', 'container': inst, 'container_type': 'area', 'sublist': 'volumes'}
-                            for ref in inst['data'].get('volume_references') or []:
-                                txt = f"TUID {ref.get('tuid')}"
-                                try:
-                                    rinst = self.tuid_to_instance.get(int(ref.get('tuid')))
-                                    if rinst:
-                                        rname = rinst['data'].get('name') or os.path.basename(rinst['path'])
-                                        txt = f"{rname} (TUID {ref.get('tuid')})"
-                                except Exception:
-                                    pass
-                                rn = self.nav_tree.insert(vn, 'end', text=txt)
-                                try:
-                                    self.node_action[rn] = {'action':'ref_tuid', 'tuid': int(ref.get('tuid')), 'container': inst, 'container_type': 'area', 'sublist': 'volumes', 'ref': {'tuid': int(ref.get('tuid'))}}
-                                except Exception:
-                                    pass
-                        elif inst['type'] == 'pod':
-                            pn = self.nav_tree.insert(iid, 'end', text='Références')
-                            self.node_action[pn] = {'action': 'container_header', 'container': inst, 'container_type': 'pod'}
-                            for ref in inst['data'].get('instance_references') or []:
-                                txt = f"type {ref.get('type')} - tuid {ref.get('tuid')}"
-                                try:
-                                    rinst = self.tuid_to_instance.get(int(ref.get('tuid')))
-                                    if rinst:
-                                        rname = rinst['data'].get('name') or os.path.basename(rinst['path'])
-                                        txt = f"{rname} (type {ref.get('type')} - tuid {ref.get('tuid')})"
-                                except Exception:
-                                    pass
-                                rn = self.nav_tree.insert(pn, 'end', text=txt)
-                                try:
-                                    self.node_action[rn] = {'action':'ref_tuid', 'tuid': int(ref.get('tuid')), 'type': int(ref.get('type')), 'container': inst, 'container_type': 'pod', 'ref': {'type': int(ref.get('type')), 'tuid': int(ref.get('tuid'))}}
-                                except Exception:
-                                    pass
-                        elif inst['type'] == 'scent':
-                            sn = self.nav_tree.insert(iid, 'end', text='Références')
-                            self.node_action[sn] = {'action': 'container_header', 'container': inst, 'container_type': 'scent'}
-                            for ref in inst['data'].get('instance_references') or []:
-                                txt = f"tuid {ref.get('tuid')}"
-                                try:
-                                    rinst = self.tuid_to_instance.get(int(ref.get('tuid')))
-                                    if rinst:
-                                        rname = rinst['data'].get('name') or os.path.basename(rinst['path'])
-                                        txt = f"{rname} (tuid {ref.get('tuid')})"
-                                except Exception:
-                                    pass
-                                rn = self.nav_tree.insert(sn, 'end', text=txt)
-                                try:
-                                    self.node_action[rn] = {'action':'ref_tuid', 'tuid': int(ref.get('tuid')), 'container': inst, 'container_type': 'scent', 'ref': {'tuid': int(ref.get('tuid'))}}
-                                except Exception:
-                                    pass
-                        elif inst['type'] == 'path':
-                            # Add point children under the path instance
-                            pts = inst['data'].get('points') or []
-                            pn = self.nav_tree.insert(iid, 'end', text='Points')
-                            for idx, pt in enumerate(pts):
-                                ts = pt.get('timestamp', '')
-                                child = self.nav_tree.insert(pn, 'end', text=f'Point {idx} (t={ts})')
-                                self.node_action[child] = {'action': 'path_point', 'instance': inst, 'index': idx, 'node': child}
-                        # subfile child for types with subfiles
-                        if inst['type'] in ('moby','controller','clue'):
-                            base_dir = os.path.dirname(inst['path'])
-                            sname = sanitize_name(inst['data'].get('name') or '')
-                            host = os.path.join(base_dir, f"{sname}_CLASS.host.dat")
-                            local = os.path.join(base_dir, f"{sname}_CLASS.local.dat")
-                            if os.path.isfile(host) or os.path.isfile(local):
-                                sroot = self.nav_tree.insert(iid, 'end', text='Subfiles')
-                                if os.path.isfile(host):
-                                    hn = self.nav_tree.insert(sroot, 'end', text='host')
-                                    self.node_action[hn] = {'action':'subfile', 'path': host}
-                                if os.path.isfile(local):
-                                    ln = self.nav_tree.insert(sroot, 'end', text='local')
-                                    self.node_action[ln] = {'action':'subfile', 'path': local}
-                            if inst['type'] == 'clue':
-                                # linked volume
-                                vol_tuid = inst['data'].get('volume_tuid')
-                                try:
-                                    v_int = int(vol_tuid,0) if isinstance(vol_tuid,str) else int(vol_tuid)
-                                except Exception:
-                                    v_int = None
-                                label = 'Linked Volume'
-                                if v_int is not None and v_int in self.volume_by_tuid:
-                                    vname = self.volume_by_tuid[v_int].get('name') or ''
-                                    if vname:
-                                        label = f'Linked Volume ({vname})'
-                                vn = self.nav_tree.insert(iid, 'end', text=label)
-                                if v_int is not None:
-                                    self.node_action[vn] = {'action':'ref_tuid', 'tuid': v_int}
+            region, zone = self._instance_location(it)
+            grouped.setdefault(region, {}).setdefault(zone, {}).setdefault(it['type'], []).append(it)
+        self._tree_groups = grouped
+        self._sync_children('', self._wanted_children(('root',)))
+        # Noeuds déjà ouverts: resynchroniser leurs enfants (parents avant enfants)
+        pending = [iid for iid in self.nav_tree.get_children('') if iid in self._populated]
+        while pending:
+            iid = pending.pop()
+            if not self.nav_tree.exists(iid) or iid not in self._populated:
+                continue
+            kind = self._node_kind.get(iid)
+            if kind and kind[0] == 'inst':
+                self._populate(iid, rebuild=True)
+                continue
+            self._sync_children(iid, self._wanted_children(kind))
+            pending.extend(c for c in self.nav_tree.get_children(iid) if c in self._populated)
+
+    def _on_search_key(self, _evt=None):
+        """Frappe dans la recherche: l'arbre n'est filtré qu'une fois la saisie en pause."""
+        if self._search_after is not None:
+            self.after_cancel(self._search_after)
+        self._search_after = self.after(SEARCH_DEBOUNCE_MS, self._apply_search)
+
+    def _apply_search(self):
+        self._search_after = None
+        self.refresh_tree()
+
+    def _instance_class_id(self, inst: dict) -> int | None:
+        """ClassID du JSON, sinon celui du sidecar .polaris-idx (mode DAT) ou du subfile host/local
+        s'il est déjà en cache (pas de lecture)."""
+        if self.dat_model is not None:
+            return self.dat_model.search_class_id(inst)
+        class_id = instance_class_id(inst)
+        if class_id is None and inst['type'] in ('moby', 'controller', 'clue'):
+            for path in self._subfile_paths(inst):
+                class_id = self.class_ids.peek(path)
+                if class_id is not None:
+                    break
+        return class_id
+
+    def _root_dir(self) -> str | None:
+        """Racine des chemins d'instances: dossier d'extraction, ou .dat ouvert (chemins virtuels)."""
+        return self.extract_dir or self.dat_path
+
+    def _ensure_decoded(self, inst: dict) -> None:
+        """Mode DAT: décode les enregistrements complets du type de l'instance avant affichage."""
+        if self.dat_model is not None:
+            changed = self.dat_model.hydrate(inst)
+            for it in changed:
+                self.search_index.update(it)
+            if changed:
+                self.map_view.invalidate(volumes=True)
+
+    def _map_prepare(self) -> None:
+        """Mode DAT: la carte a besoin des positions, décodées par type à sa première ouverture."""
+        if self.dat_model is None:
+            return
+        for typ in MAP_TYPES:
+            slots = self.search_index.slots(typ)
+            if slots:
+                self._ensure_decoded(self.search_index.item(next(iter(slots))))
+
+    def _on_map_pick(self, inst: dict) -> None:
+        """Clic sur la carte: sélectionne l'instance dans l'arbre (affiche son formulaire)."""
+        node = self._reveal_instance(inst)
+        if node is None:
+            self._set_status("Instance masquée par le filtre de recherche")
+            return
+        self.nav_tree.selection_set(node)
+        self.nav_tree.see(node)
+
+    def _reference_index(self) -> TuidIndex:
+        """Index des TUID et des références du modèle courant, construit une fois par chargement
+        puis tenu à jour par _record_write. En mode DAT sans modification, il est lu dans le
+        fichier; sinon les types qui portent des références (area, pod, scent, clue) sont
+        d'abord décodés."""
+        if self._ref_index is None and self.dat_model is not None and not self.dat_model.dirty:
+            self._ref_index = self.dat_model.tuid_index()
+        if self._ref_index is None:
+            if self.dat_model is not None:
+                pending = set(REFERENCE_FIELDS) | {'clue'}
+                for inst in self.instances:
+                    if inst['type'] in pending:
+                        pending.discard(inst['type'])
+                        self._ensure_decoded(inst)
+                        if not pending:
+                            break
+            self._ref_index = TuidIndex.from_instances(self.instances)
+        return self._ref_index
+
+    def menu_check_references(self):
+        """Liste les références (area, pod, scent, clue) vers des TUID absents du niveau."""
+        if not self.instances:
+            messagebox.showinfo("Info", "Ouvrez un DAT ou un dossier d'extraction d'abord")
+            return
+        index = self._reference_index()
+        dangling = index.dangling_references()
+        if not dangling:
+            messagebox.showinfo("Références", f"Aucune référence cassée ({index.reference_count} références)")
+            return
+        lines = [f"{ref.name} ({ref.type}) → 0x{tuid:016X} [{kind}]" for ref, tuid, kind in dangling[:40]]
+        if len(dangling) > 40:
+            lines.append(f"... et {len(dangling) - 40} autre(s)")
+        messagebox.showwarning("Références cassées", f"{len(dangling)} référence(s) introuvable(s):\n" + "\n".join(lines))
+
+    def _instance_location(self, it: dict) -> tuple[str, str]:
+        """(région, zone) d'une instance d'après son chemin <extract_dir>/<region>/<zone>/fichier."""
+        root = self._root_dir()
+        base_parts = root.rstrip(os.sep).split(os.sep) if root else []
+        path_parts = it['path'].split(os.sep)
+        region = 'default'
+        zone = ''
+        if len(path_parts) > len(base_parts) + 1:
+            region = path_parts[len(base_parts)]
+        if len(path_parts) > len(base_parts) + 2:
+            zone = path_parts[len(base_parts) + 1]
+        return region, zone
+
+    def _node_iid(self, key: tuple) -> str:
+        iid = self._key_iids.get(key)
+        if iid is None:
+            iid = self._key_iids[key] = f"n{len(self._key_iids)}"
+        return iid
+
+    def _instance_has_children(self, inst: dict) -> bool:
+        if inst['type'] in ('area', 'pod', 'scent', 'path', 'clue'):
+            return True
+        if inst['type'] in ('moby', 'controller'):
+            if self.dat_model is not None:
+                self._ensure_decoded(inst)
+                return self.dat_model.subfile(inst) is not None
+            host, local = self._subfile_paths(inst)
+            return host in self.subfile_index or local in self.subfile_index
+        return False
+
+    def _subfile_paths(self, inst: dict) -> tuple[str, str]:
+        base_dir = os.path.dirname(inst['path'])
+        sname = sanitize_name(inst['data'].get('name') or '')
+        return (os.path.join(base_dir, f"{sname}_CLASS.host.dat"),
+                os.path.join(base_dir, f"{sname}_CLASS.local.dat"))
+
+    def _wanted_children(self, kind: tuple | None) -> list[tuple[str, str, tuple, dict | None, bool]]:
+        """Enfants attendus d'un noeud de regroupement: [(iid, texte, kind, instance, a_des_enfants)]."""
+        wanted = []
+        if not kind:
+            return wanted
+        if kind[0] == 'root':
+            for region in sorted(self._tree_groups):
+                key = ('region', region)
+                wanted.append((self._node_iid(key), region, key, None, True))
+        elif kind[0] == 'region':
+            region = kind[1]
+            for zone in sorted(self._tree_groups.get(region, {})):
+                key = ('zone', region, zone)
+                wanted.append((self._node_iid(key), zone if zone else '(racine)', key, None, True))
+        elif kind[0] == 'zone':
+            _k, region, zone = kind
+            for typ in sorted(self._tree_groups.get(region, {}).get(zone, {})):
+                key = ('type', region, zone, typ)
+                wanted.append((self._node_iid(key), typ, key, None, True))
+        elif kind[0] == 'type':
+            _k, region, zone, typ = kind
+            items = self._tree_groups.get(region, {}).get(zone, {}).get(typ, [])
+            # sort instances by name
+            for inst in sorted(items, key=lambda x: (str(x['data'].get('name') or os.path.basename(x['path']))).lower()):
+                key = ('inst', inst['path'])
+                name = inst['data'].get('name') or os.path.basename(inst['path'])
+                wanted.append((self._node_iid(key), name, key, inst, self._instance_has_children(inst)))
+        return wanted
+
+    def _set_placeholder(self, iid: str, wanted: bool) -> None:
+        ph = iid + '~'
+        if wanted and not self.nav_tree.exists(ph):
+            self.nav_tree.insert(iid, 'end', iid=ph, text='…')
+        elif not wanted and self.nav_tree.exists(ph):
+            self.nav_tree.delete(ph)
+
+    def _sync_children(self, parent: str, wanted: list) -> None:
+        """Aligne les enfants de `parent` sur `wanted` (ajouts, suppressions, renommages, ordre)
+        sans toucher aux noeuds inchangés."""
+        wanted_ids = [w[0] for w in wanted]
+        wanted_set = set(wanted_ids)
+        current = self.nav_tree.get_children(parent)
+        for c in current:
+            if c not in wanted_set:
+                self._delete_node(c)
+        for iid, text, kind, inst, has_children in wanted:
+            if iid in self._node_text:
+                if self._node_text[iid] != text:
+                    self.nav_tree.item(iid, text=text)
+                    self._node_text[iid] = text
+                if iid not in self._populated:
+                    self._set_placeholder(iid, has_children)
+            else:
+                self.nav_tree.insert(parent, 'end', iid=iid, text=text)
+                self._node_text[iid] = text
+                if has_children:
+                    self._set_placeholder(iid, True)
+            self._node_kind[iid] = kind
+            if inst is not None:
+                self.node_to_instance[iid] = inst
+        if list(self.nav_tree.get_children(parent)) != wanted_ids:
+            self.nav_tree.set_children(parent, *wanted_ids)
+
+    def _forget_node(self, iid: str) -> None:
+        self.node_to_instance.pop(iid, None)
+        self.node_action.pop(iid, None)
+        self._node_kind.pop(iid, None)
+        self._node_text.pop(iid, None)
+        self._populated.discard(iid)
+
+    def _delete_node(self, iid: str) -> None:
+        stack = [iid]
+        while stack:
+            node = stack.pop()
+            stack.extend(self.nav_tree.get_children(node))
+            self._forget_node(node)
+        self.nav_tree.delete(iid)
+
+    def _on_tree_open(self, _evt=None):
+        iid = self.nav_tree.focus()
+        if iid and iid not in self._populated:
+            self._populate(iid)
+
+    def _populate(self, iid: str, rebuild: bool = False) -> None:
+        """Construit les enfants d'un noeud à sa première ouverture (rebuild: les reconstruire)."""
+        kind = self._node_kind.get(iid)
+        if not kind:
+            return
+        if iid not in self._populated or rebuild:
+            for c in self.nav_tree.get_children(iid):
+                self._delete_node(c)
+        self._populated.add(iid)
+        if kind[0] == 'inst':
+            inst = self.node_to_instance.get(iid)
+            if inst is not None:
+                self._insert_instance_children(iid, inst)
+        else:
+            self._sync_children(iid, self._wanted_children(kind))
+
+    def _reveal_instance(self, inst: dict) -> str | None:
+        """Peuple et ouvre les ancêtres d'une instance puis renvoie l'iid de son noeud."""
+        region, zone = self._instance_location(inst)
+        for key in (('region', region), ('zone', region, zone), ('type', region, zone, inst['type'])):
+            iid = self._key_iids.get(key)
+            if not iid or not self.nav_tree.exists(iid):
+                return None
+            if iid not in self._populated:
+                self._populate(iid)
+            self.nav_tree.item(iid, open=True)
+        iid = self._key_iids.get(('inst', inst['path']))
+        return iid if iid and self.nav_tree.exists(iid) else None
+
+    def _ref_text(self, tuid, fmt_known: str, fmt_unknown: str) -> str:
+        try:
+            rinst = self.tuid_registry.get(int(tuid))
+            if rinst:
+                rname = rinst['data'].get('name') or os.path.basename(rinst['path'])
+                return fmt_known.format(name=rname)
+        except Exception:
+            pass
+        return fmt_unknown
+
+    def _insert_instance_children(self, iid: str, inst: dict) -> None:
+        self._ensure_decoded(inst)
+        # expandables for container-like types
+        if inst['type'] == 'area':
+            an = self.nav_tree.insert(iid, 'end', text='Paths')
+            self.node_action[an] = {'action': 'container_header', 'container': inst, 'container_type': 'area', 'sublist': 'paths'}
+            for ref in inst['data'].get('path_references') or []:
+                # Show name if known via tuid index
+                txt = self._ref_text(ref.get('tuid'), f"{{name}} (TUID {ref.get('tuid')})", f"TUID {ref.get('tuid')}")
+                rn = self.nav_tree.insert(an, 'end', text=txt)
+                try:
+                    self.node_action[rn] = {'action':'ref_tuid', 'tuid': int(ref.get('tuid')), 'container': inst, 'container_type': 'area', 'sublist': 'paths', 'ref': {'tuid': int(ref.get('tuid'))}}
+                except Exception:
+                    pass
+            vn = self.nav_tree.insert(iid, 'end', text='Volumes')
+            self.node_action[vn] = {'action': 'container_header', 'container': inst, 'container_type': 'area', 'sublist': 'volumes'}
+            for ref in inst['data'].get('volume_references') or []:
+                txt = self._ref_text(ref.get('tuid'), f"{{name}} (TUID {ref.get('tuid')})", f"TUID {ref.get('tuid')}")
+                rn = self.nav_tree.insert(vn, 'end', text=txt)
+                try:
+                    self.node_action[rn] = {'action':'ref_tuid', 'tuid': int(ref.get('tuid')), 'container': inst, 'container_type': 'area', 'sublist': 'volumes', 'ref': {'tuid': int(ref.get('tuid'))}}
+                except Exception:
+                    pass
+        elif inst['type'] == 'pod':
+            pn = self.nav_tree.insert(iid, 'end', text='Références')
+            self.node_action[pn] = {'action': 'container_header', 'container': inst, 'container_type': 'pod'}
+            for ref in inst['data'].get('instance_references') or []:
+                txt = self._ref_text(ref.get('tuid'), f"{{name}} (type {ref.get('type')} - tuid {ref.get('tuid')})", f"type {ref.get('type')} - tuid {ref.get('tuid')}")
+                rn = self.nav_tree.insert(pn, 'end', text=txt)
+                try:
+                    self.node_action[rn] = {'action':'ref_tuid', 'tuid': int(ref.get('tuid')), 'type': int(ref.get('type')), 'container': inst, 'container_type': 'pod', 'ref': {'type': int(ref.get('type')), 'tuid': int(ref.get('tuid'))}}
+                except Exception:
+                    pass
+        elif inst['type'] == 'scent':
+            sn = self.nav_tree.insert(iid, 'end', text='Références')
+            self.node_action[sn] = {'action': 'container_header', 'container': inst, 'container_type': 'scent'}
+            for ref in inst['data'].get('instance_references') or []:
+                txt = self._ref_text(ref.get('tuid'), f"{{name}} (tuid {ref.get('tuid')})", f"tuid {ref.get('tuid')}")
+                rn = self.nav_tree.insert(sn, 'end', text=txt)
+                try:
+                    self.node_action[rn] = {'action':'ref_tuid', 'tuid': int(ref.get('tuid')), 'container': inst, 'container_type': 'scent', 'ref': {'tuid': int(ref.get('tuid'))}}
+                except Exception:
+                    pass
+        elif inst['type'] == 'path':
+            # Add point children under the path instance
+            pts = point_list(inst['data'])
+            pn = self.nav_tree.insert(iid, 'end', text='Points')
+            for idx, pt in enumerate(pts):
+                ts = pt.get('timestamp', '')
+                child = self.nav_tree.insert(pn, 'end', text=f'Point {idx} (t={ts})')
+                self.node_action[child] = {'action': 'path_point', 'instance': inst, 'index': idx, 'node': child}
+        # subfile child for types with subfiles
+        if inst['type'] in ('moby','controller','clue'):
+            if self.dat_model is not None:
+                # Subfile resté dans le .dat (offset/longueur de l'instance)
+                sub = self.dat_model.subfile(inst)
+                subfiles = [(sub[0], {'action': 'dat_subfile', 'instance': inst})] if sub else []
+            else:
+                host, local = self._subfile_paths(inst)
+                subfiles = [(kind, {'action': 'subfile', 'path': p})
+                            for kind, p in (('host', host), ('local', local)) if p in self.subfile_index]
+            if subfiles:
+                sroot = self.nav_tree.insert(iid, 'end', text='Subfiles')
+                for kind, action in subfiles:
+                    sn = self.nav_tree.insert(sroot, 'end', text=kind)
+                    self.node_action[sn] = action
+            if inst['type'] == 'clue':
+                # linked volume
+                vol_tuid = inst['data'].get('volume_tuid')
+                try:
+                    v_int = int(vol_tuid,0) if isinstance(vol_tuid,str) else int(vol_tuid)
+                except Exception:
+                    v_int = None
+                label = 'Linked Volume'
+                vol = self.ref_options.get('volume').instance_for(v_int) if v_int is not None else None
+                if vol is not None:
+                    vname = vol['data'].get('name') or ''
+                    if vname:
+                        label = f'Linked Volume ({vname})'
+                vn = self.nav_tree.insert(iid, 'end', text=label)
+                if v_int is not None:
+                    self.node_action[vn] = {'action':'ref_tuid', 'tuid': v_int}
 
     def _current_item(self):
         sel = self.nav_tree.selection()
@@ -492,7 +1161,7 @@ class EditorApp(tk.Tk):
         # handle actions: navigate to referenced instance or show subfile
         act = self.node_action.get(node_id)
         if act and act.get('action') == 'ref_tuid':
-            target = self.tuid_to_instance.get(act.get('tuid'))
+            target = self.tuid_registry.get(act.get('tuid'))
             if target:
                 # Ne pas changer la sélection globale; permettre l'édition in-place
                 return target
@@ -501,10 +1170,19 @@ class EditorApp(tk.Tk):
             try:
                 self.subfile_text.delete('1.0', tk.END)
                 p = act.get('path')
-                cid = _read_subfile_class_id(p)
+                cid = self.class_ids.get(p)
                 self.subfile_text.insert(tk.END, f"{os.path.basename(p)}\nClassID: {cid}\n")
             except Exception:
                 pass
+        if act and act.get('action') == 'dat_subfile' and self.dat_model is not None:
+            inst = act.get('instance')
+            sub = self.dat_model.subfile(inst)
+            if sub:
+                kind, offset, length = sub
+                self.subfile_text.delete('1.0', tk.END)
+                self.subfile_text.insert(tk.END, f"{kind}.dat (dans {os.path.basename(self.dat_model.path)})\n"
+                                                 f"Offset: 0x{offset:X}, {length} octets\n"
+                                                 f"ClassID: {self.dat_model.subfile_class_id(inst)}\n")
         if act and act.get('action') == 'path_point':
             # set pending path-point to focus in the encart; return the instance
             inst = act.get('instance')
@@ -518,6 +1196,8 @@ class EditorApp(tk.Tk):
         it = self._current_item()
         if not it:
             return
+        self._ensure_decoded(it)
+        self.map_view.select(it)
         d = it['data']
         self.lbl_path.config(text=it['path'])
         # Reset fields
@@ -532,8 +1212,8 @@ class EditorApp(tk.Tk):
             parts = it['path'].split(os.sep)
             # .../<extract>/<region>/<zone>/file
             if len(parts) >= 2:
-                # find region folder under extract_dir
-                base_parts = self.extract_dir.rstrip(os.sep).split(os.sep)
+                # find region folder under extract_dir (ou sous le .dat: chemins virtuels)
+                base_parts = self._root_dir().rstrip(os.sep).split(os.sep)
                 idx = len(base_parts)
                 if len(parts) > idx + 1:
                     current_zone_name = parts[idx + 1]
@@ -555,20 +1235,34 @@ class EditorApp(tk.Tk):
 
         # Subfile info (affiché uniquement pour moby/controller/clue)
         self.subfile_text.delete('1.0', tk.END)
-        if it['type'] in ('moby','controller','clue'):
-            base_dir = os.path.dirname(it['path'])
-            sname = sanitize_name(d.get('name') or '')
-            host = os.path.join(base_dir, f"{sname}_CLASS.host.dat")
-            local = os.path.join(base_dir, f"{sname}_CLASS.local.dat")
-            if os.path.isfile(host):
-                cid = _read_subfile_class_id(host)
+        if it['type'] in ('moby','controller','clue') and self.dat_model is not None:
+            sub = self.dat_model.subfile(it)
+            if sub:
+                self.subfile_text.insert(tk.END, f"{sub[0]}.dat présent (dans le DAT)\nClassID: {self.dat_model.subfile_class_id(it)}\n")
+            else:
+                self.subfile_text.insert(tk.END, "Aucun subfile détecté\n")
+        elif it['type'] in ('moby','controller','clue'):
+            host, local = self._subfile_paths(it)
+            has_host = host in self.subfile_index
+            has_local = local in self.subfile_index
+            if has_host:
+                cid = self.class_ids.get(host)
                 self.subfile_text.insert(tk.END, f"host.dat présent\nClassID: {cid}\n")
-            if os.path.isfile(local):
-                cid = _read_subfile_class_id(local)
+            if has_local:
+                cid = self.class_ids.get(local)
                 self.subfile_text.insert(tk.END, f"local.dat présent\nClassID: {cid}\n")
-            if not os.path.isfile(host) and not os.path.isfile(local):
+            if not has_host and not has_local:
                 self.subfile_text.insert(tk.END, "Aucun subfile détecté\n")
 
+        # Instances qui référencent celle-ci (graphe inverse: O(nombre de référents))
+        referrers = self._reference_index().referrers(d.get('tuid'))
+        if referrers:
+            self.subfile_text.insert(tk.END, f"\nRéférencé par ({len(referrers)}):\n")
+            for ref, kind in referrers[:50]:
+                self.subfile_text.insert(tk.END, f"  {ref.name} ({ref.type}) [{kind}]\n")
+            if len(referrers) > 50:
+                self.subfile_text.insert(tk.END, f"  ... et {len(referrers) - 50} autre(s)\n")
+
         # JSON raw
         try:
             self.json_text.delete('1.0', tk.END)
@@ -630,6 +1324,7 @@ class EditorApp(tk.Tk):
             return
         if target_container is None:
             return
+        self._ensure_decoded(target_container)
         # Ask move or copy
         ans = messagebox.askyesnocancel('Déplacer la référence ?', 'Oui = Déplacer (supprimer de la source), Non = Copier (garder la source), Annuler = annuler')
         if ans is None:
@@ -679,14 +1374,9 @@ class EditorApp(tk.Tk):
                         type_id = None
                 if type_id is None:
                     type_map = {'moby':0,'path':1,'volume':2,'clue':3,'controller':4,'scent':5,'area':6,'pod':7}
-                    for inst in self.instances:
-                        try:
-                            tu = inst['data'].get('tuid')
-                            if int(tu,0) if isinstance(tu,str) else int(tu) == ref_tuid:
-                                type_id = type_map.get(inst['type'])
-                                break
-                        except Exception:
-                            continue
+                    ref_inst = self.tuid_registry.get(ref_tuid)
+                    if ref_inst is not None:
+                        type_id = type_map.get(ref_inst['type'])
                 if type_id is not None:
                     tgt_list = target_container['data'].get('instance_references') or []
                     if not any(int(r.get('tuid')) == ref_tuid and int(r.get('type')) == int(type_id) for r in tgt_list):
@@ -701,15 +1391,8 @@ class EditorApp(tk.Tk):
                     list_key = 'volume_references'
                 else:
                     # detect
-                    is_path = False
-                    for inst in self.instances:
-                        try:
-                            tu = inst['data'].get('tuid')
-                            if int(tu,0) if isinstance(tu,str) else int(tu) == ref_tuid:
-                                is_path = (inst['type'] == 'path')
-                                break
-                        except Exception:
-                            continue
+                    ref_inst = self.tuid_registry.get(ref_tuid)
+                    is_path = ref_inst is not None and ref_inst['type'] == 'path'
                     list_key = 'path_references' if is_path else 'volume_references'
                 tgt_list = target_container['data'].get(list_key) or []
                 if not any(int(r.get('tuid')) == ref_tuid for r in tgt_list):
@@ -722,19 +1405,22 @@ class EditorApp(tk.Tk):
         try:
             def _save_container(inst):
                 try:
-                    with open(inst['path'], 'w', encoding='utf-8') as f:
-                        json.dump(inst['data'], f, indent=2, ensure_ascii=False)
+                    self._write_instance(inst)
+                    self._record_write(inst)
                 except Exception:
                     pass
             _save_container(target_container)
             if move and src_container:
                 _save_container(src_container)
-            self.reload_instances()
+            self._apply_own_edits()
         except Exception as e:
             messagebox.showerror('Erreur DnD', str(e))
 
     def _adapt_generic_fields(self, typ: str):
         """Show/hide generic fields based on instance type"""
+        if typ == self._generic_fields_type:
+            return  # même type que la sélection précédente: rien à re-packer
+        self._generic_fields_type = typ
         # Hide all generic fields first
         for label, widget in self.generic_rows.items():
             widget.pack_forget()
@@ -770,31 +1456,85 @@ class EditorApp(tk.Tk):
                 widget.pack(fill=tk.X)
 
     def _clear_type_form(self):
-        for w in self.type_frame.winfo_children():
-            w.destroy()
+        """Masque le formulaire de type affiché (les gabarits restent construits pour la suite)."""
+        if self._shown_type_form is not None:
+            self._shown_type_form['frame'].pack_forget()
+            self._shown_type_form = None
         self.type_widgets = {}
 
     def _build_type_form(self, typ: str, data: dict):
-        self._clear_type_form()
+        """Affiche le gabarit du type (construit à la première sélection d'une instance de ce
+        type) et le relie aux données de l'instance: aucun widget n'est créé ni détruit ensuite."""
+        form = self._type_forms.get(typ)
+        if form is None:
+            form = self._type_forms[typ] = self._make_type_form(typ)
+        if self._shown_type_form is not form:
+            self._clear_type_form()
+            form['frame'].pack(fill=tk.BOTH, expand=True)
+            self._shown_type_form = form
+        form['bind'](data)
+        self.type_widgets = form['widgets']
+
+    def _make_type_form(self, typ: str) -> dict:
+        """Gabarit de formulaire d'un type: {'frame', 'widgets' (lus par save_current), 'bind'(data)}."""
+        frame = ttk.Frame(self.type_frame)
+        widgets: dict[str, Any] = {}
+
         # Utility to add a labeled entry
-        def add_entry(parent, label, initial=""):
+        def add_entry(parent, label):
             row = ttk.Frame(parent)
             row.pack(fill=tk.X, pady=2)
             ttk.Label(row, text=label, width=18).pack(side=tk.LEFT)
-            var = tk.StringVar(value=str(initial))
+            var = tk.StringVar()
             ent = ttk.Entry(row, textvariable=var)
             ent.pack(side=tk.LEFT, fill=tk.X, expand=True)
-            self.type_widgets[label] = var
+            widgets[label] = var
             return var
 
+        def add_matrix(parent) -> list[list[tk.StringVar]]:
+            ttk.Label(parent, text='Transform 4x4').pack(anchor='w')
+            grid = ttk.Frame(parent)
+            grid.pack()
+            mat_vars = []
+            for r in range(4):
+                row_vars = []
+                for c in range(4):
+                    var = tk.StringVar()
+                    e = ttk.Entry(grid, textvariable=var, width=10)
+                    e.grid(row=r, column=c, padx=2, pady=2)
+                    row_vars.append(var)
+                mat_vars.append(row_vars)
+            return mat_vars
+
+        def set_matrix(mat_vars, mat):
+            if not mat:
+                mat = [[0,0,0,0] for _ in range(4)]
+            for r in range(4):
+                for c in range(4):
+                    mat_vars[r][c].set(str(mat[r][c]))
+
+        def tuid_of(value) -> int | None:
+            try:
+                return int(value, 0) if isinstance(value, str) else int(value)
+            except Exception:
+                return None
+
+        def bind(data: dict):
+            pass
+
         if typ == 'moby':
-            add_entry(self.type_frame, 'model_index', data.get('model_index', ''))
-            add_entry(self.type_frame, 'zone_render_index', data.get('zone_render_index', data.get('zone', '')))
-            add_entry(self.type_frame, 'update_dist', data.get('update_dist', ''))
-            add_entry(self.type_frame, 'display_dist', data.get('display_dist', ''))
-            add_entry(self.type_frame, 'flags_hex', data.get('flags', ''))
-            add_entry(self.type_frame, 'unknown_hex', data.get('unknown', ''))
-            add_entry(self.type_frame, 'padding_hex', data.get('padding', ''))
+            keys = [
+                ('model_index', 'model_index'), ('zone_render_index', 'zone_render_index'),
+                ('update_dist', 'update_dist'), ('display_dist', 'display_dist'),
+                ('flags_hex', 'flags'), ('unknown_hex', 'unknown'), ('padding_hex', 'padding'),
+            ]
+            for label, _key in keys:
+                add_entry(frame, label)
+
+            def bind(data: dict):
+                for label, key in keys:
+                    default = data.get('zone', '') if key == 'zone_render_index' else ''
+                    widgets[label].set(str(data.get(key, default)))
 
         elif typ == 'controller':
             # scale_y/z already present in generic fields; no duplicates here
@@ -802,80 +1542,56 @@ class EditorApp(tk.Tk):
 
         elif typ == 'clue':
             # class_id + volume tuid (combobox + raw)
-            add_entry(self.type_frame, 'class_id', data.get('class_id', ''))
+            add_entry(frame, 'class_id')
             # volume selector
-            row = ttk.Frame(self.type_frame)
+            row = ttk.Frame(frame)
             row.pack(fill=tk.X, pady=2)
             ttk.Label(row, text='volume_tuid', width=18).pack(side=tk.LEFT)
             vol_var = tk.StringVar()
-            combo = ttk.Combobox(row, textvariable=vol_var, values=[opt[0] for opt in self.volume_options])
-            # preselect current
-            current_v = data.get('volume_tuid')
-            if current_v is not None:
-                try:
-                    cur_int = int(current_v, 0) if isinstance(current_v, str) else int(current_v)
-                    cur_hex = f"0x{cur_int:016X}"
-                except Exception:
-                    cur_int = None
-                    cur_hex = str(current_v)
-                for label, tu in self.volume_options:
-                    if cur_hex in label:
-                        vol_var.set(label)
-                        break
-            combo.pack(side=tk.LEFT, fill=tk.X, expand=True)
-            self.type_widgets['volume_tuid_combo'] = vol_var
+            self._reference_combo(row, vol_var, 'volume').pack(side=tk.LEFT, fill=tk.X, expand=True)
+            widgets['volume_tuid_combo'] = vol_var
             # raw fallback
-            add_entry(self.type_frame, 'volume_tuid_raw', data.get('volume_tuid', ''))
-            
+            add_entry(frame, 'volume_tuid_raw')
             # Editor identique à Volume: grille 4x4 éditable
-            ttk.Label(self.type_frame, text='Transform 4x4').pack(anchor='w')
-            grid = ttk.Frame(self.type_frame)
-            grid.pack()
-            vol_matrix_vars = []
-            vol_matrix = None
-            if current_v is not None:
-                try:
-                    v_int = int(current_v, 0) if isinstance(current_v, str) else int(current_v)
-                except Exception:
-                    v_int = None
-                if v_int is not None and v_int in self.volume_by_tuid:
-                    vol = self.volume_by_tuid[v_int]
-                    vol_matrix = vol.get('transform_matrix')
-            if not vol_matrix:
-                vol_matrix = [[0,0,0,0] for _ in range(4)]
-            for r in range(4):
-                row_vars = []
-                for c in range(4):
-                    var = tk.StringVar(value=str(vol_matrix[r][c]))
-                    e = ttk.Entry(grid, textvariable=var, width=10)
-                    e.grid(row=r, column=c, padx=2, pady=2)
-                    row_vars.append(var)
-                vol_matrix_vars.append(row_vars)
-            self.type_widgets['clue_volume_matrix'] = vol_matrix_vars
+            widgets['clue_volume_matrix'] = add_matrix(frame)
+
+            def bind(data: dict):
+                widgets['class_id'].set(str(data.get('class_id', '')))
+                current_v = data.get('volume_tuid')
+                widgets['volume_tuid_raw'].set(str(data.get('volume_tuid', '')))
+                # preselect current
+                v_int = tuid_of(current_v) if current_v is not None else None
+                volumes = self.ref_options.get('volume')
+                vol_var.set((volumes.label_for(v_int) if v_int is not None else None) or '')
+                vol = volumes.instance_for(v_int) if v_int is not None else None
+                set_matrix(widgets['clue_volume_matrix'], vol['data'].get('transform_matrix') if vol is not None else None)
 
         elif typ == 'path':
             # Focus editor for a single point (selected from tree)
-            pts = data.get('points') or []
-            sel_idx = 0
-            if self.pending_path_point and self.pending_path_point[0] is not None and self.pending_path_point[0]['path'] == data.get('path', None):
-                sel_idx = int(self.pending_path_point[1])
-            elif self.pending_path_point and self.pending_path_point[0] is not None and self.pending_path_point[0]['data'] is data:
-                sel_idx = int(self.pending_path_point[1])
-            sel_idx = min(max(sel_idx, 0), len(pts)-1) if pts else 0
-            
-            ttk.Label(self.type_frame, text=f'Point sélectionné: {sel_idx}').pack(anchor='w')
-            ex = add_entry(self.type_frame, 'pt.x', pts[sel_idx].get('position',{}).get('x','') if pts else '')
-            ey = add_entry(self.type_frame, 'pt.y', pts[sel_idx].get('position',{}).get('y','') if pts else '')
-            ez = add_entry(self.type_frame, 'pt.z', pts[sel_idx].get('position',{}).get('z','') if pts else '')
-            et = add_entry(self.type_frame, 'timestamp', pts[sel_idx].get('timestamp','') if pts else '')
-            
+            state = {'pts': [], 'sel': 0, 'data': {}}
+            sel_var = tk.StringVar()
+            ttk.Label(frame, textvariable=sel_var).pack(anchor='w')
+            ex = add_entry(frame, 'pt.x')
+            ey = add_entry(frame, 'pt.y')
+            ez = add_entry(frame, 'pt.z')
+            et = add_entry(frame, 'timestamp')
+
+            def sync_pts():
+                # Points paquetés ('points_packed'): la liste éditée est une copie, la réencoder
+                if PACKED_KEY in state['data']:
+                    store_points(state['data'], state['pts'])
             def add_pt():
+                pts = state['pts']
                 pts.append({'index': len(pts), 'position': {'x':0.0,'y':0.0,'z':0.0}, 'timestamp': 0.0})
+                sync_pts()
             def del_pt():
-                if pts:
+                pts, sel_idx = state['pts'], state['sel']
+                if pts and sel_idx < len(pts):
                     pts.pop(sel_idx)
+                    sync_pts()
             def apply_pt():
-                if not pts:
+                pts, sel_idx = state['pts'], state['sel']
+                if not pts or sel_idx >= len(pts):
                     return
                 try:
                     x = float(ex.get()); y = float(ey.get()); z = float(ez.get()); t = float(et.get())
@@ -887,312 +1603,103 @@ class EditorApp(tk.Tk):
                 pts.sort(key=lambda p: float(p.get('timestamp',0)))
                 for i, p in enumerate(pts):
                     p['index'] = i
-            
-            row = ttk.Frame(self.type_frame)
+                sync_pts()
+
+            row = ttk.Frame(frame)
             row.pack(fill=tk.X, pady=4)
             ttk.Button(row, text='Ajouter', command=add_pt).pack(side=tk.LEFT)
             ttk.Button(row, text='Supprimer', command=del_pt).pack(side=tk.LEFT, padx=4)
             ttk.Button(row, text='Appliquer', command=apply_pt).pack(side=tk.LEFT)
-            
+
             # header fields
-            add_entry(self.type_frame, 'total_duration', data.get('total_duration',''))
-            add_entry(self.type_frame, 'flags', data.get('flags',''))
-            add_entry(self.type_frame, 'point_count', data.get('point_count', len(pts)))
+            add_entry(frame, 'total_duration')
+            add_entry(frame, 'flags')
+            add_entry(frame, 'point_count')
+
+            def bind(data: dict):
+                pts = point_list(data)
+                sel_idx = 0
+                if self.pending_path_point and self.pending_path_point[0] is not None and self.pending_path_point[0]['path'] == data.get('path', None):
+                    sel_idx = int(self.pending_path_point[1])
+                elif self.pending_path_point and self.pending_path_point[0] is not None and self.pending_path_point[0]['data'] is data:
+                    sel_idx = int(self.pending_path_point[1])
+                sel_idx = min(max(sel_idx, 0), len(pts)-1) if pts else 0
+                state['pts'], state['sel'], state['data'] = pts, sel_idx, data
+                sel_var.set(f'Point sélectionné: {sel_idx}')
+                pt = pts[sel_idx] if pts else {}
+                ex.set(str(pt.get('position',{}).get('x',''))); ey.set(str(pt.get('position',{}).get('y','')))
+                ez.set(str(pt.get('position',{}).get('z',''))); et.set(str(pt.get('timestamp','')))
+                widgets['total_duration'].set(str(data.get('total_duration','')))
+                widgets['flags'].set(str(data.get('flags','')))
+                widgets['point_count'].set(str(data.get('point_count', len(pts))))
 
         elif typ == 'volume':
-            # Move buttons temporarily to place matrix above them
-            self.btns_frame.pack_forget()
-            ttk.Label(self.type_frame, text='Transform 4x4').pack(anchor='w')
-            grid = ttk.Frame(self.type_frame)
-            grid.pack()
-            mat_vars = []
-            mat = data.get('transform_matrix') or [[0,0,0,0] for _ in range(4)]
-            for r in range(4):
-                row_vars = []
-                for c in range(4):
-                    var = tk.StringVar(value=str(mat[r][c]))
-                    e = ttk.Entry(grid, textvariable=var, width=10)
-                    e.grid(row=r, column=c, padx=2, pady=2)
-                    row_vars.append(var)
-                mat_vars.append(row_vars)
-            self.type_widgets['volume_matrix'] = mat_vars
-            # Place buttons back after matrix
-            self.btns_frame.pack(after=self.type_frame, fill=tk.X, pady=8)
-
-        elif typ == 'area':
-            ttk.Label(self.type_frame, text='Paths').pack(anchor='w')
-            paths_container = ttk.Frame(self.type_frame)
-            paths_container.pack(fill=tk.BOTH, expand=True)
-            ttk.Label(self.type_frame, text='Volumes').pack(anchor='w')
-            vols_container = ttk.Frame(self.type_frame)
-            vols_container.pack(fill=tk.BOTH, expand=True)
-
-            # options
-            path_options: list[tuple[str,int]] = []
-            vol_options: list[tuple[str,int]] = []
-            try:
-                for inst in self.instances:
-                    if inst['type'] in ('path','volume'):
-                        tu = inst['data'].get('tuid')
-                        try:
-                            tu_int = int(tu,0) if isinstance(tu,str) else int(tu)
-                        except Exception:
-                            continue
-                        label = inst['data'].get('name') or os.path.basename(inst['path'])
-                        hexid = f"0x{tu_int:016X}"
-                        (path_options if inst['type']=='path' else vol_options).append((f"{label} ({hexid})", tu_int))
-                path_options.sort(key=lambda x: x[0].lower())
-                vol_options.sort(key=lambda x: x[0].lower())
-            except Exception:
-                pass
-
-            area_path_rows: list[tk.Widget] = []
-            area_vol_rows: list[tk.Widget] = []
-
-            def make_area_row(container_frame, options, initial_tuid: int | None, rows_store: list[tk.Widget]):
-                row = ttk.Frame(container_frame); row.pack(fill=tk.X, pady=2)
-                var = tk.StringVar(); cmb = ttk.Combobox(row, textvariable=var, values=[lbl for lbl,_tu in options])
-                def _filter(_evt=None):
-                    typed = var.get().lower().strip(); base = [lbl for lbl,_tu in options]
-                    cmb['values'] = base if not typed else [lbl for lbl in base if typed in lbl.lower()]
-                cmb.bind('<KeyRelease>', _filter)
-                if initial_tuid is not None:
-                    try:
-                        for lbl, tu in options:
-                            if int(tu) == int(initial_tuid):
-                                var.set(lbl); break
-                    except Exception:
-                        pass
-                cmb.pack(side=tk.LEFT, fill=tk.X, expand=True)
-                def remove_this():
-                    try:
-                        rows_store.remove(row)
-                    except Exception:
-                        pass
-                    row.destroy()
-                ttk.Button(row, text='Supprimer', command=remove_this).pack(side=tk.RIGHT, padx=4)
-                rows_store.append(row)
-
-            for ref in data.get('path_references') or []:
-                try: tu = int(ref.get('tuid'),0) if isinstance(ref.get('tuid'),str) else int(ref.get('tuid'))
-                except Exception: tu = None
-                make_area_row(paths_container, path_options, tu, area_path_rows)
-            for ref in data.get('volume_references') or []:
-                try: tu = int(ref.get('tuid'),0) if isinstance(ref.get('tuid'),str) else int(ref.get('tuid'))
-                except Exception: tu = None
-                make_area_row(vols_container, vol_options, tu, area_vol_rows)
-
-            # ajout path (bouton à gauche + combobox)
-            addp = ttk.Frame(self.type_frame); addp.pack(fill=tk.X, pady=4)
-            addp_var = tk.StringVar(); addp_cmb = ttk.Combobox(addp, textvariable=addp_var, values=[lbl for lbl,_tu in path_options])
-            def addp_filter(_evt=None):
-                typed = addp_var.get().lower().strip(); base = [lbl for lbl,_tu in path_options]
-                addp_cmb['values'] = base if not typed else [lbl for lbl in base if typed in lbl.lower()]
-            def do_addp():
-                sel = addp_var.get(); tu = None
-                for lbl, v in path_options:
-                    if lbl == sel: tu = v; break
-                if tu is None: return
-                make_area_row(paths_container, path_options, tu, area_path_rows)
-                addp_var.set('')
-            ttk.Button(addp, text='Ajouter Path', command=do_addp).pack(side=tk.LEFT, padx=4)
-            addp_cmb.bind('<KeyRelease>', addp_filter)
-            addp_cmb.pack(side=tk.LEFT, fill=tk.X, expand=True)
-
-            # ajout volume (bouton à gauche + combobox)
-            addv = ttk.Frame(self.type_frame); addv.pack(fill=tk.X, pady=4)
-            addv_var = tk.StringVar(); addv_cmb = ttk.Combobox(addv, textvariable=addv_var, values=[lbl for lbl,_tu in vol_options])
-            def addv_filter(_evt=None):
-                typed = addv_var.get().lower().strip(); base = [lbl for lbl,_tu in vol_options]
-                addv_cmb['values'] = base if not typed else [lbl for lbl in base if typed in lbl.lower()]
-            def do_addv():
-                sel = addv_var.get(); tu = None
-                for lbl, v in vol_options:
-                    if lbl == sel: tu = v; break
-                if tu is None: return
-                make_area_row(vols_container, vol_options, tu, area_vol_rows)
-                addv_var.set('')
-            ttk.Button(addv, text='Ajouter Volume', command=do_addv).pack(side=tk.LEFT, padx=4)
-            addv_cmb.bind('<KeyRelease>', addv_filter)
-            addv_cmb.pack(side=tk.LEFT, fill=tk.X, expand=True)
-
-            self.type_widgets['area_path_rows'] = (area_path_rows, path_options)
-            self.type_widgets['area_vol_rows'] = (area_vol_rows, vol_options)
-
-        elif typ == 'pod':
-            ttk.Label(self.type_frame, text='Références (Mobys / Controllers)').pack(anchor='w')
-            container = ttk.Frame(self.type_frame)
-            container.pack(fill=tk.BOTH, expand=True)
-
-            # Options: seulement moby et controller
-            type_map = {'moby':0, 'controller':4}
-            inv_type_map = {v:k for k,v in type_map.items()}
-            options: list[tuple[str,int,int]] = []  # (label, type_id, tuid)
-            label_to_ref: dict[str, tuple[int,int]] = {}
-            try:
-                for inst in self.instances:
-                    if inst['type'] in ('moby','controller'):
-                        tu = inst['data'].get('tuid')
-                        try:
-                            tu_int = int(tu,0) if isinstance(tu,str) else int(tu)
-                        except Exception:
+            widgets['volume_matrix'] = add_matrix(frame)
+
+            def bind(data: dict):
+                set_matrix(widgets['volume_matrix'], data.get('transform_matrix'))
+
+        elif typ in ('area', 'pod', 'scent'):
+            # Listes virtualisées (Listbox): pas de widgets par référence
+            if typ == 'area':
+                lists = [
+                    ('area_path_rows', 'path_references', RefListView(frame, 'Paths', 'path', self.ref_options.get, self._reference_combo, 'Ajouter Path')),
+                    ('area_vol_rows', 'volume_references', RefListView(frame, 'Volumes', 'volume', self.ref_options.get, self._reference_combo, 'Ajouter Volume')),
+                ]
+            elif typ == 'pod':
+                lists = [('pod_row_widgets', 'instance_references', RefListView(frame, 'Références (Mobys / Controllers)', 'pod', self.ref_options.get, self._reference_combo))]
+            else:
+                lists = [('scent_row_widgets', 'instance_references', RefListView(frame, 'Références (Clues)', 'clue', self.ref_options.get, self._reference_combo))]
+            for key, _field, view in lists:
+                view.frame.pack(fill=tk.BOTH, expand=True)
+                widgets[key] = view
+
+            def bind(data: dict):
+                for _key, field, view in lists:
+                    values = []
+                    for ref in data.get(field) or []:
+                        tu = tuid_of(ref.get('tuid'))
+                        if tu is None:
                             continue
-                        label = inst['data'].get('name') or os.path.basename(inst['path'])
-                        hexid = f"0x{tu_int:016X}"
-                        t_id = type_map[inst['type']]
-                        full = f"{label} ({inv_type_map[t_id]}) ({hexid})"
-                        options.append((full, t_id, tu_int))
-                        label_to_ref[full] = (t_id, tu_int)
-                options.sort(key=lambda x: x[0].lower())
-            except Exception:
-                pass
-
-            pod_rows: list[tk.Widget] = []
-
-            def make_row(initial_type_id: int | None, initial_tuid: int | None):
-                row = ttk.Frame(container); row.pack(fill=tk.X, pady=2)
-                var = tk.StringVar()
-                cmb = ttk.Combobox(row, textvariable=var, values=[lbl for lbl, _ty, _tu in options])
-                def _filter(_evt=None):
-                    typed = var.get().lower().strip(); base = [lbl for lbl,_ty,_tu in options]
-                    cmb['values'] = base if not typed else [lbl for lbl in base if typed in lbl.lower()]
-                cmb.bind('<KeyRelease>', _filter)
-                # preselect
-                if initial_type_id is not None and initial_tuid is not None:
-                    try:
-                        wanted = None
-                        for lbl, ty, tu in options:
-                            if int(ty) == int(initial_type_id) and int(tu) == int(initial_tuid):
-                                wanted = lbl; break
-                        if wanted:
-                            var.set(wanted)
-                    except Exception:
-                        pass
-                cmb.pack(side=tk.LEFT, fill=tk.X, expand=True)
-                def remove_this():
-                    try: pod_rows.remove(row)
-                    except Exception: pass
-                    row.destroy()
-                ttk.Button(row, text='Supprimer', command=remove_this).pack(side=tk.RIGHT, padx=4)
-                pod_rows.append(row)
-
-            # Existing rows
-            for ref in data.get('instance_references') or []:
-                try:
-                    ty = int(ref.get('type'))
-                except Exception:
-                    ty = None
-                try:
-                    tu = int(ref.get('tuid'))
-                except Exception:
-                    tu = None
-                # ignorer autres types que moby/controller
-                if ty not in (0,4):
-                    continue
-                make_row(ty, tu)
-
-            # Add row (bouton Ajouter + combobox)
-            add_row = ttk.Frame(self.type_frame); add_row.pack(fill=tk.X, pady=4)
-            new_var = tk.StringVar()
-            def add_filter(_evt=None):
-                typed = new_var.get().lower().strip(); base = [lbl for lbl,_ty,_tu in options]
-                add_cmb['values'] = base if not typed else [lbl for lbl in base if typed in lbl.lower()]
-            ttk.Button(add_row, text='Ajouter', command=lambda: (
-                (lambda sel=new_var.get(): (
-                    (lambda ref=label_to_ref.get(sel): (
-                        make_row(ref[0], ref[1]) if ref else None,
-                        new_var.set('')
-                    ))()
-                ))()
-            )).pack(side=tk.LEFT, padx=4)
-            add_cmb = ttk.Combobox(add_row, textvariable=new_var, values=[lbl for lbl,_ty,_tu in options])
-            add_cmb.bind('<KeyRelease>', add_filter)
-            add_cmb.pack(side=tk.LEFT, fill=tk.X, expand=True)
-
-            # store for save
-            self.type_widgets['pod_row_widgets'] = (pod_rows, label_to_ref)
-
-        elif typ == 'scent':
-            ttk.Label(self.type_frame, text='Références (Clues)').pack(anchor='w')
-            refs_container = ttk.Frame(self.type_frame)
-            refs_container.pack(fill=tk.BOTH, expand=True)
-            scent_ref_rows: list[tuple[tk.Widget, int | None]] = []
-            all_labels = [opt[0] for opt in self.clue_options]
-
-            def make_row(initial_tuid: int | None):
-                row = ttk.Frame(refs_container)
-                row.pack(fill=tk.X, pady=2)
-                var = tk.StringVar()
-                cmb = ttk.Combobox(row, textvariable=var, values=all_labels, state='normal')
-                def _filter_values(_evt=None):
-                    typed = var.get().lower().strip()
-                    cmb['values'] = all_labels if not typed else [lbl for lbl in all_labels if typed in lbl.lower()]
-                cmb.bind('<KeyRelease>', _filter_values)
-                # pré-sélectionner depuis TUID
-                if initial_tuid is not None:
-                    try:
-                        for lbl, tu in self.clue_options:
+                        if view.kind == 'pod':
                             try:
-                                if (int(tu,0) if isinstance(tu,str) else int(tu)) == int(initial_tuid):
-                                    var.set(lbl)
-                                    break
+                                ty = int(ref.get('type'))
                             except Exception:
                                 continue
-                    except Exception:
-                        pass
-                cmb.pack(side=tk.LEFT, fill=tk.X, expand=True)
-                def remove_this():
-                    try:
-                        scent_ref_rows.remove((row, initial_tuid))
-                    except Exception:
-                        pass
-                    row.destroy()
-                ttk.Button(row, text='Supprimer', command=remove_this).pack(side=tk.RIGHT, padx=4)
-                scent_ref_rows.append((row, initial_tuid))
-
-            # Lignes existantes
-            for ref in data.get('instance_references') or []:
-                try:
-                    tu = int(ref.get('tuid'), 0) if isinstance(ref.get('tuid'), str) else int(ref.get('tuid'))
-                except Exception:
-                    tu = None
-                make_row(tu)
-
-            # Ligne d'ajout (bouton Ajouter à gauche + combobox à droite)
-            add_row = ttk.Frame(self.type_frame)
-            add_row.pack(fill=tk.X, pady=4)
-            new_var = tk.StringVar()
-            def add_new():
-                sel = new_var.get(); target = None
-                for lbl, tu in self.clue_options:
-                    if lbl == sel:
-                        try:
-                            target = int(tu,0) if isinstance(tu,str) else int(tu)
-                        except Exception:
-                            target = None
-                        break
-                if target is None:
-                    return
-                # éviter doublons visuels
-                current_tuids = []
-                for _row, tu in scent_ref_rows:
-                    try: current_tuids.append(int(tu) if tu is not None else None)
-                    except Exception: current_tuids.append(tu)
-                if target in current_tuids:
-                    return
-                make_row(target)
-                new_var.set('')
-            ttk.Button(add_row, text='Ajouter', command=add_new).pack(side=tk.LEFT, padx=4)
-            add_cmb = ttk.Combobox(add_row, textvariable=new_var, values=all_labels, state='normal')
-            def _filter_new(_evt=None):
-                typed = new_var.get().lower().strip()
-                add_cmb['values'] = all_labels if not typed else [lbl for lbl in all_labels if typed in lbl.lower()]
-            add_cmb.bind('<KeyRelease>', _filter_new)
-            add_cmb.pack(side=tk.LEFT, fill=tk.X, expand=True)
-            
-
-            # Stocker pour persistance
-            self.type_widgets['scent_row_widgets'] = (scent_ref_rows, refs_container)
+                            # ignorer autres types que moby/controller
+                            if ty not in (0,4):
+                                continue
+                            values.append((ty, tu))
+                        else:
+                            values.append(tu)
+                    view.bind(values)
+
+        return {'frame': frame, 'widgets': widgets, 'bind': bind}
+
+    def _reference_combo(self, parent, var: tk.StringVar, kind: str, **kw) -> ttk.Combobox:
+        """Combobox de référence: ses valeurs viennent de la liste d'options `kind` du modèle et ne
+        sont calculées qu'à l'ouverture ou après une pause de frappe (OPTION_FILTER_MS), pas à la
+        création de chaque ligne."""
+        state = {'after': None, 'shown': None}
+
+        def apply():
+            state['after'] = None
+            options = self.ref_options.get(kind)
+            typed = var.get()
+            if options.value_for(typed) is not None:
+                typed = ''  # valeur déjà choisie: proposer toute la liste
+            if state['shown'] != (options, typed):
+                state['shown'] = (options, typed)
+                cmb.configure(values=options.filter(typed))
+
+        def on_key(_evt=None):
+            if state['after'] is not None:
+                self.after_cancel(state['after'])
+            state['after'] = self.after(OPTION_FILTER_MS, apply)
+
+        cmb = ttk.Combobox(parent, textvariable=var, postcommand=apply, **kw)
+        cmb.bind('<KeyRelease>', on_key)
+        return cmb
 
     def save_current(self):
         it = self._current_item()
@@ -1200,6 +1707,7 @@ class EditorApp(tk.Tk):
             return
         d = it['data']
         typ = it['type']
+        old_path = it['path']
         # Update fields present
         name = self.form_vars['name'].get().strip()
         if name:
@@ -1256,291 +1764,263 @@ class EditorApp(tk.Tk):
             pass
         # Write JSON
         try:
-            # If zone folder changes, move files first
-            new_path = it['path']
-            if self.zone_names and target_zone_name and os.path.basename(os.path.dirname(it['path'])) != target_zone_name:
-                # compute new dir under extract_dir/<region>/<target_zone>
-                regions = [dname for dname in os.listdir(self.extract_dir) if os.path.isdir(os.path.join(self.extract_dir, dname))]
-                region_dir = os.path.join(self.extract_dir, regions[0]) if regions else self.extract_dir
-                new_dir = os.path.join(region_dir, target_zone_name)
-                os.makedirs(new_dir, exist_ok=True)
-                # move json and subfiles
-                new_path = os.path.join(new_dir, os.path.basename(it['path']))
-                os.replace(it['path'], new_path)
-                base_dir_old = os.path.dirname(it['path'])
-                base_dir_new = new_dir
-                sname = sanitize_name(d.get('name') or '')
-                for suf in ('host', 'local'):
-                    oldp = os.path.join(base_dir_old, f"{sname}_CLASS.{suf}.dat")
-                    newp = os.path.join(base_dir_new, f"{sname}_CLASS.{suf}.dat")
-                    if os.path.exists(oldp):
-                        os.replace(oldp, newp)
-                it['path'] = new_path
-            # Rename subfile if name changed
-            base_dir = os.path.dirname(it['path'])
-            s_old = sanitize_name(it['data'].get('name') or '')
-            s_new = sanitize_name(d.get('name') or '')
-            if s_old and s_new and s_old != s_new:
-                for suf in ('host', 'local'):
-                    oldp = os.path.join(base_dir, f"{s_old}_CLASS.{suf}.dat")
-                    newp = os.path.join(base_dir, f"{s_new}_CLASS.{suf}.dat")
-                    if os.path.exists(oldp) and not os.path.exists(newp):
-                        os.rename(oldp, newp)
-                # Rename JSON file to reflect new name
-                old_json = it['path']
-                new_json = os.path.join(base_dir, f"{s_new}.{it['type']}.json")
-                try:
-                    if os.path.exists(old_json) and (old_json != new_json):
-                        if not os.path.exists(new_json):
-                            os.replace(old_json, new_json)
-                            it['path'] = new_json
-                            self.lbl_path.config(text=new_json)
-                except Exception:
-                    pass
-            # Type-specific persistence (mutates d)
-            if typ == 'moby':
-                def _int(v):
+            # Déplacements, renommages et écriture sous le verrou d'écriture: un instantané de
+            # rebuild (cf. _start_rebuild) voit l'instance avant ou après, jamais entre les deux
+            with self._write_lock:
+                # If zone folder changes, move files first
+                new_path = it['path']
+                if self.zone_names and target_zone_name and os.path.basename(os.path.dirname(it['path'])) != target_zone_name:
+                    if self.dat_model is not None:
+                        # Mode DAT: seul le chemin virtuel change (même région, dossier de la nouvelle zone)
+                        region, _zone = self._instance_location(it)
+                        new_path = self._unique_json_path(os.path.join(self.dat_path, region, target_zone_name), d.get('name') or '', typ)
+                    else:
+                        # compute new dir under extract_dir/<region>/<target_zone>
+                        regions = [dname for dname in os.listdir(self.extract_dir) if os.path.isdir(os.path.join(self.extract_dir, dname))]
+                        region_dir = os.path.join(self.extract_dir, regions[0]) if regions else self.extract_dir
+                        new_dir = os.path.join(region_dir, target_zone_name)
+                        os.makedirs(new_dir, exist_ok=True)
+                        # move json and subfiles
+                        new_path = os.path.join(new_dir, os.path.basename(it['path']))
+                        os.replace(it['path'], new_path)
+                        base_dir_old = os.path.dirname(it['path'])
+                        base_dir_new = new_dir
+                        sname = sanitize_name(d.get('name') or '')
+                        for suf in ('host', 'local'):
+                            oldp = os.path.join(base_dir_old, f"{sname}_CLASS.{suf}.dat")
+                            newp = os.path.join(base_dir_new, f"{sname}_CLASS.{suf}.dat")
+                            if os.path.exists(oldp):
+                                os.replace(oldp, newp)
+                                self.subfile_index.discard(oldp)
+                                self.subfile_index.add(newp)
+                                self.class_ids.invalidate(newp)
+                    it['path'] = new_path
+                # Rename subfile if name changed
+                base_dir = os.path.dirname(it['path'])
+                s_old = sanitize_name(it['data'].get('name') or '')
+                s_new = sanitize_name(d.get('name') or '')
+                if s_old and s_new and s_old != s_new:
+                    for suf in ('host', 'local'):
+                        oldp = os.path.join(base_dir, f"{s_old}_CLASS.{suf}.dat")
+                        newp = os.path.join(base_dir, f"{s_new}_CLASS.{suf}.dat")
+                        if os.path.exists(oldp) and not os.path.exists(newp):
+                            os.rename(oldp, newp)
+                            self.subfile_index.discard(oldp)
+                            self.subfile_index.add(newp)
+                            self.class_ids.invalidate(newp)
+                    # Rename JSON file to reflect new name
+                    old_json = it['path']
+                    new_json = os.path.join(base_dir, f"{s_new}.{it['type']}.json")
                     try:
-                        return int(v, 0)
+                        if os.path.exists(old_json) and (old_json != new_json):
+                            if not os.path.exists(new_json):
+                                os.replace(old_json, new_json)
+                                it['path'] = new_json
+                                self.lbl_path.config(text=new_json)
                     except Exception:
-                        return None
-                mi = self.type_widgets.get('model_index'); zri = self.type_widgets.get('zone_render_index')
-                ud = self.type_widgets.get('update_dist'); dd = self.type_widgets.get('display_dist')
-                if isinstance(mi, tk.StringVar):
-                    v = _int(mi.get());
-                    if v is not None: d['model_index'] = v
-                if isinstance(zri, tk.StringVar):
-                    v = _int(zri.get());
-                    if v is not None: d['zone_render_index'] = v
-                if isinstance(ud, tk.StringVar):
-                    try: d['update_dist'] = float(ud.get())
-                    except Exception: pass
-                if isinstance(dd, tk.StringVar):
-                    try: d['display_dist'] = float(dd.get())
-                    except Exception: pass
-                for key_json, key_ui in [('flags','flags_hex'), ('unknown','unknown_hex'), ('padding','padding_hex')]:
-                    ui = self.type_widgets.get(key_ui)
-                    if isinstance(ui, tk.StringVar) and ui.get():
-                        d[key_json] = ui.get()
-
-            elif typ == 'controller':
-                sy = self.type_widgets.get('scale_y'); sz = self.type_widgets.get('scale_z')
-                if isinstance(sy, tk.StringVar):
-                    try: d['scale_y'] = float(sy.get())
-                    except Exception: pass
-                if isinstance(sz, tk.StringVar):
-                    try: d['scale_z'] = float(sz.get())
-                    except Exception: pass
-
-            elif typ == 'clue':
-                cid = self.type_widgets.get('class_id')
-                if isinstance(cid, tk.StringVar):
-                    try: d['class_id'] = int(cid.get(), 0)
-                    except Exception: pass
-                lab = self.type_widgets.get('volume_tuid_combo')
-                if isinstance(lab, tk.StringVar) and lab.get():
-                    for lbl, tu in self.volume_options:
-                        if lbl == lab.get():
-                            try: d['volume_tuid'] = int(tu, 0) if isinstance(tu, str) else int(tu)
-                            except Exception: d['volume_tuid'] = tu
-                            break
-                else:
-                    raw = self.type_widgets.get('volume_tuid_raw')
-                    if isinstance(raw, tk.StringVar):
-                        try: d['volume_tuid'] = int(raw.get(), 0)
-                        except Exception: pass
-                # Sauvegarder la matrice si éditée (écriture dans le volume lié)
-                vol_matrix_vars = self.type_widgets.get('clue_volume_matrix')
-                if vol_matrix_vars:
-                    new_mat = []
-                    for r in vol_matrix_vars:
-                        row = []
-                        for var in r:
-                            try: row.append(float(var.get()))
-                            except Exception: row.append(0.0)
-                            
-                        new_mat.append(row)
-                    vol_tuid = d.get('volume_tuid')
-                    if vol_tuid is not None:
-                        try:
-                            v_int = int(vol_tuid, 0) if isinstance(vol_tuid, str) else int(vol_tuid)
-                        except Exception:
-                            v_int = None
-                        if v_int is not None:
-                            # Mettre à jour le JSON du volume correspondant
-                            for vol_inst in self.instances:
-                                try:
-                                    if vol_inst['type'] == 'volume':
-                                        t = vol_inst['data'].get('tuid')
-                                        t_int = int(t, 0) if isinstance(t, str) else int(t)
-                                        if t_int == v_int:
-                                            vol_inst['data']['transform_matrix'] = new_mat
-                                            with open(vol_inst['path'], 'w', encoding='utf-8') as f:
-                                                json.dump(vol_inst['data'], f, indent=2, ensure_ascii=False)
-                                            break
-                                except Exception:
-                                    pass
-
-            elif typ == 'path':
-                tpl = self.type_widgets.get('path_points_list')
-                if isinstance(tpl, tuple) and len(tpl) == 2:
-                    pts = tpl[1]
-                    for idx, pt in enumerate(pts):
-                        pt['index'] = idx
-                    d['points'] = pts
-                    d['point_count'] = len(pts)
-                td = self.type_widgets.get('total_duration')
-                if isinstance(td, tk.StringVar):
-                    try: d['total_duration'] = float(td.get())
-                    except Exception: pass
-                fl = self.type_widgets.get('flags')
-                if isinstance(fl, tk.StringVar):
-                    try: d['flags'] = int(fl.get(), 0)
-                    except Exception: pass
-
-            elif typ == 'volume':
-                mats = self.type_widgets.get('volume_matrix')
-                if mats:
-                    new_mat = []
-                    for r in mats:
-                        row = []
-                        for var in r:
-                            try: row.append(float(var.get()))
-                            except Exception: row.append(0.0)
-                        new_mat.append(row)
-                    d['transform_matrix'] = new_mat
-
-            elif typ == 'area':
-                # Read from combobox rows
-                pr = self.type_widgets.get('area_path_rows')
-                vr = self.type_widgets.get('area_vol_rows')
-                path_refs: list[dict] = []
-                vol_refs: list[dict] = []
-                def rows_to_refs(rows_tuple, out_list):
-                    if not isinstance(rows_tuple, tuple) or len(rows_tuple) != 2:
-                        return
-                    rows_list, options = rows_tuple
-                    label_to_tuid = {lbl: tu for (lbl, tu) in options}
-                    for row in rows_list:
+                        pass
+                # Type-specific persistence (mutates d)
+                if typ == 'moby':
+                    def _int(v):
                         try:
-                            for child in row.winfo_children():
-                                if isinstance(child, ttk.Combobox):
-                                    lbl = child.get()
-                                    if lbl in label_to_tuid:
-                                        tu = label_to_tuid[lbl]
-                                        if not any(int(r.get('tuid')) == int(tu) for r in out_list):
-                                            out_list.append({'tuid': int(tu)})
-                                    break
+                            return int(v, 0)
                         except Exception:
-                            continue
-                rows_to_refs(pr, path_refs)
-                rows_to_refs(vr, vol_refs)
-                d['path_references'] = path_refs
-                d['volume_references'] = vol_refs
+                            return None
+                    mi = self.type_widgets.get('model_index'); zri = self.type_widgets.get('zone_render_index')
+                    ud = self.type_widgets.get('update_dist'); dd = self.type_widgets.get('display_dist')
+                    if isinstance(mi, tk.StringVar):
+                        v = _int(mi.get());
+                        if v is not None: d['model_index'] = v
+                    if isinstance(zri, tk.StringVar):
+                        v = _int(zri.get());
+                        if v is not None: d['zone_render_index'] = v
+                    if isinstance(ud, tk.StringVar):
+                        try: d['update_dist'] = float(ud.get())
+                        except Exception: pass
+                    if isinstance(dd, tk.StringVar):
+                        try: d['display_dist'] = float(dd.get())
+                        except Exception: pass
+                    for key_json, key_ui in [('flags','flags_hex'), ('unknown','unknown_hex'), ('padding','padding_hex')]:
+                        ui = self.type_widgets.get(key_ui)
+                        if isinstance(ui, tk.StringVar) and ui.get():
+                            d[key_json] = ui.get()
+
+                elif typ == 'controller':
+                    sy = self.type_widgets.get('scale_y'); sz = self.type_widgets.get('scale_z')
+                    if isinstance(sy, tk.StringVar):
+                        try: d['scale_y'] = float(sy.get())
+                        except Exception: pass
+                    if isinstance(sz, tk.StringVar):
+                        try: d['scale_z'] = float(sz.get())
+                        except Exception: pass
 
-            elif typ == 'pod':
-                # Read from single-combobox rows (label encodes type and tuid)
-                pod_tuple = self.type_widgets.get('pod_row_widgets')
-                refs: list[dict] = []
-                if isinstance(pod_tuple, tuple) and len(pod_tuple) == 2:
-                    rows_list, label_to_ref = pod_tuple
-                    for row in rows_list:
-                        try:
-                            for child in row.winfo_children():
-                                if isinstance(child, ttk.Combobox):
-                                    lbl = child.get()
-                                    ref = label_to_ref.get(lbl)
-                                    if ref:
-                                        ty, tu = ref
-                                        if not any(int(r.get('tuid'))==int(tu) and int(r.get('type'))==int(ty) for r in refs):
-                                            refs.append({'type': int(ty), 'tuid': int(tu)})
-                                    break
-                        except Exception:
-                            continue
-                d['instance_references'] = refs
-
-            elif typ == 'scent':
-                rows = self.type_widgets.get('scent_row_widgets')
-                if isinstance(rows, tuple) and len(rows) == 2:
-                    scent_ref_rows, _container = rows
-                    refs = []
-                    for row, _tuid in scent_ref_rows:
-                        # lire la valeur sélectionnée dans la combobox de cette ligne
+                elif typ == 'clue':
+                    cid = self.type_widgets.get('class_id')
+                    if isinstance(cid, tk.StringVar):
+                        try: d['class_id'] = int(cid.get(), 0)
+                        except Exception: pass
+                    lab = self.type_widgets.get('volume_tuid_combo')
+                    if isinstance(lab, tk.StringVar) and lab.get():
+                        tu = self.ref_options.get('volume').value_for(lab.get())
+                        if tu is not None:
+                            d['volume_tuid'] = tu
+                    else:
+                        raw = self.type_widgets.get('volume_tuid_raw')
+                        if isinstance(raw, tk.StringVar):
+                            try: d['volume_tuid'] = int(raw.get(), 0)
+                            except Exception: pass
+                    # Sauvegarder la matrice si éditée (écriture dans le volume lié)
+                    vol_matrix_vars = self.type_widgets.get('clue_volume_matrix')
+                    if vol_matrix_vars:
+                        new_mat = []
+                        for r in vol_matrix_vars:
+                            row = []
+                            for var in r:
+                                try: row.append(float(var.get()))
+                                except Exception: row.append(0.0)
+                            
+                            new_mat.append(row)
+                        vol_tuid = d.get('volume_tuid')
+                        if vol_tuid is not None:
+                            try:
+                                v_int = int(vol_tuid, 0) if isinstance(vol_tuid, str) else int(vol_tuid)
+                            except Exception:
+                                v_int = None
+                            if v_int is not None:
+                                # Mettre à jour le JSON du volume correspondant
+                                vol_inst = self.tuid_registry.get(v_int)
+                                if vol_inst is not None and vol_inst['type'] == 'volume':
+                                    try:
+                                        self._ensure_decoded(vol_inst)
+                                        vol_inst['data']['transform_matrix'] = new_mat
+                                        self._write_instance(vol_inst)
+                                        self._record_write(vol_inst)
+                                    except Exception:
+                                        pass
+
+                elif typ == 'path':
+                    tpl = self.type_widgets.get('path_points_list')
+                    if isinstance(tpl, tuple) and len(tpl) == 2:
+                        pts = tpl[1]
+                        for idx, pt in enumerate(pts):
+                            pt['index'] = idx
+                        d['points'] = pts
+                        d['point_count'] = len(pts)
+                    td = self.type_widgets.get('total_duration')
+                    if isinstance(td, tk.StringVar):
+                        try: d['total_duration'] = float(td.get())
+                        except Exception: pass
+                    fl = self.type_widgets.get('flags')
+                    if isinstance(fl, tk.StringVar):
+                        try: d['flags'] = int(fl.get(), 0)
+                        except Exception: pass
+
+                elif typ == 'volume':
+                    mats = self.type_widgets.get('volume_matrix')
+                    if mats:
+                        new_mat = []
+                        for r in mats:
+                            row = []
+                            for var in r:
+                                try: row.append(float(var.get()))
+                                except Exception: row.append(0.0)
+                            new_mat.append(row)
+                        d['transform_matrix'] = new_mat
+
+                elif typ == 'area':
+                    # Read from the reference lists (values = TUID)
+                    for key, field in (('area_path_rows', 'path_references'), ('area_vol_rows', 'volume_references')):
+                        view = self.type_widgets.get(key)
+                        if isinstance(view, RefListView):
+                            d[field] = [{'tuid': int(tu)} for tu in dict.fromkeys(view.values)]
+
+                elif typ == 'pod':
+                    # values = (type_id, tuid)
+                    view = self.type_widgets.get('pod_row_widgets')
+                    if isinstance(view, RefListView):
+                        d['instance_references'] = [{'type': int(ty), 'tuid': int(tu)} for ty, tu in dict.fromkeys(view.values)]
+
+                elif typ == 'scent':
+                    view = self.type_widgets.get('scent_row_widgets')
+                    if isinstance(view, RefListView):
+                        refs = [{'tuid': int(tu)} for tu in dict.fromkeys(view.values)]
+                        d['instance_references'] = refs
                         try:
-                            # enfants: [combobox, bouton Supprimer]; on lit la combobox
-                            for child in row.winfo_children():
-                                if isinstance(child, ttk.Combobox):
-                                    label = child.get()
-                                    target = None
-                                    for lbl, tu in self.clue_options:
-                                        if lbl == label:
-                                            try:
-                                                target = int(tu,0) if isinstance(tu,str) else int(tu)
-                                            except Exception:
-                                                target = None
-                                            break
-                                    if target is not None and not any(int(r.get('tuid'))==int(target) for r in refs):
-                                        refs.append({'tuid': int(target)})
-                                    break
+                            d['count'] = int(len(refs))
                         except Exception:
-                            continue
-                    d['instance_references'] = refs
-                    try:
-                        d['count'] = int(len(refs))
-                    except Exception:
-                        pass
+                            pass
 
-            # Write JSON after all mutations
-            with open(new_path, 'w', encoding='utf-8') as f:
-                json.dump(d, f, indent=2, ensure_ascii=False)
-            # Auto-générer instance.lua à la racine d'extraction
-            try:
-                from tools.generate_instance_handles_lua import generate_instance_handles_lua
-                if self.extract_dir and os.path.isdir(self.extract_dir):
-                    generate_instance_handles_lua(self.extract_dir, os.path.join(self.extract_dir, 'instance.lua'))
-            except Exception:
-                pass
-            it['path'] = new_path
-            it['data'] = d
-            messagebox.showinfo("Enregistré", "Modifications enregistrées")
+                # Write JSON after all mutations
+                it['path'] = new_path
+                it['data'] = d
+                self._write_instance(it)
+                # Auto-générer instance.lua à la racine d'extraction
+                try:
+                    from tools.generate_instance_handles_lua import generate_instance_handles_lua
+                    if self.extract_dir and os.path.isdir(self.extract_dir):
+                        generate_instance_handles_lua(self.extract_dir, os.path.join(self.extract_dir, 'instance.lua'))
+                except Exception:
+                    pass
+            # Modèle et arbre mis à jour à partir de l'édition elle-même (pas de rescan du dossier)
+            self._record_write(it, old_path)
+            self._apply_own_edits()
+            if it['path'] != old_path:
+                node = self._reveal_instance(it)
+                if node:
+                    self.nav_tree.selection_set(node)
+                    self.nav_tree.see(node)
+            if self.dat_model is not None:
+                messagebox.showinfo("Enregistré", "Modifications gardées en mémoire (Fichier > Enregistrer DAT pour écrire le .dat)")
+            else:
+                messagebox.showinfo("Enregistré", "Modifications enregistrées")
         except Exception as e:
             messagebox.showerror("Erreur", str(e))
 
     def _next_free_tuid(self) -> int:
-        seen = set()
-        for it in self.instances:
-            v = it['data'].get('tuid', 0)
-            try:
-                seen.add(int(v, 0) if isinstance(v, str) else int(v))
-            except Exception:
-                pass
-        x = max(seen) + 1 if seen else 1
-        while x in seen:
-            x += 1
-        return x
+        """TUID libre, réservé jusqu'à l'enregistrement de l'instance (cf. TuidRegistry)."""
+        return self.tuid_registry.allocate()
 
-    def duplicate_current(self):
-        it = self._current_item()
-        if not it:
-            return
+    def _selected_instances(self) -> list[dict]:
+        """Instances des noeuds sélectionnés dans l'arbre (sinon l'instance courante)."""
+        items = []
+        seen = set()
+        for iid in self.nav_tree.selection():
+            inst = self.node_to_instance.get(iid)
+            if inst is not None and id(inst) not in seen:
+                seen.add(id(inst))
+                items.append(inst)
+        if not items:
+            it = self._current_item()
+            if it:
+                items.append(it)
+        return items
+
+    def _unique_json_path(self, base_dir: str, name: str, typ: str) -> str:
+        """<base_dir>/<nom>.<type>.json, suffixé _2, _3... si le fichier existe déjà (mode DAT:
+        si une instance du modèle porte déjà ce chemin virtuel)."""
+        if self.dat_model is not None:
+            exists = {it['path'] for it in self.instances}.__contains__
+        else:
+            exists = os.path.exists
+        base_name = sanitize_name(name)
+        new_json = os.path.join(base_dir, f"{base_name}.{typ}.json")
+        # ensure unique filename if already exists
+        idx = 2
+        while exists(new_json):
+            new_json = os.path.join(base_dir, f"{base_name}_{idx}.{typ}.json")
+            idx += 1
+        return new_json
+
+    def _duplicate_instance(self, it: dict) -> dict:
+        """Copie une instance (JSON, subfiles, volume lié d'un Clue) et l'ajoute au modèle."""
+        self._ensure_decoded(it)
         d = json.loads(json.dumps(it['data']))
         d['tuid'] = self._next_free_tuid()
         # nouveau nom
         name = (d.get('name') or 'Instance') + "_copy"
         d['name'] = name
         base_dir = os.path.dirname(it['path'])
-        # chemin
-        base_name = sanitize_name(name)
-        new_json = os.path.join(base_dir, f"{base_name}.{it['type']}.json")
-        # ensure unique filename if already exists
-        if os.path.exists(new_json):
-            idx = 2
-            while True:
-                candidate = os.path.join(base_dir, f"{base_name}_{idx}.{it['type']}.json")
-                if not os.path.exists(candidate):
-                    new_json = candidate
-                    break
-                idx += 1
+        new_json = self._unique_json_path(base_dir, name, it['type'])
         # copier subfiles si présent
         s_old = sanitize_name(it['data'].get('name') or '')
         s_new = sanitize_name(name)
@@ -1548,76 +2028,70 @@ class EditorApp(tk.Tk):
             oldp = os.path.join(base_dir, f"{s_old}_CLASS.{suf}.dat")
             newp = os.path.join(base_dir, f"{s_new}_CLASS.{suf}.dat")
             try:
-                if os.path.isfile(oldp) and not os.path.exists(newp):
+                if oldp in self.subfile_index and not os.path.exists(newp):
                     with open(oldp, 'rb') as fsrc, open(newp, 'wb') as fdst:
                         fdst.write(fsrc.read())
+                    self.subfile_index.add(newp)
+                    self.class_ids.invalidate(newp)
             except Exception:
                 pass
         # Si on duplique un Clue: dupliquer aussi le Volume lié (s'il existe)
         if it['type'] == 'clue':
             try:
-                vol_tuid = it['data'].get('volume_tuid')
-                if vol_tuid is not None:
-                    v_int = int(vol_tuid, 0) if isinstance(vol_tuid, str) else int(vol_tuid)
-                    # retrouver l'instance volume
-                    vol_inst = None
-                    for cand in self.instances:
-                        if cand['type'] == 'volume':
-                            try:
-                                cand_tuid = cand['data'].get('tuid')
-                                cand_int = int(cand_tuid, 0) if isinstance(cand_tuid, str) else int(cand_tuid)
-                                if cand_int == v_int:
-                                    vol_inst = cand
-                                    break
-                            except Exception:
-                                continue
-                    if vol_inst:
-                        # cloner volume avec nouveau TUID et nom dérivé
-                        new_vol = json.loads(json.dumps(vol_inst['data']))
-                        new_vol_tuid = self._next_free_tuid()
-                        new_vol['tuid'] = new_vol_tuid
-                        new_vol['name'] = (new_vol.get('name') or 'Volume') + "_copy"
-                        vol_dir = os.path.dirname(vol_inst['path'])
-                        new_vol_path = os.path.join(vol_dir, f"{sanitize_name(new_vol['name'])}.volume.json")
-                        with open(new_vol_path, 'w', encoding='utf-8') as vf:
-                            json.dump(new_vol, vf, indent=2, ensure_ascii=False)
-                        # mettre à jour le clue cloné pour pointer vers le nouveau volume
-                        d['volume_tuid'] = new_vol_tuid
+                vol_inst = self.tuid_registry.get(it['data'].get('volume_tuid'))
+                if vol_inst is not None and vol_inst['type'] == 'volume':
+                    # cloner volume avec nouveau TUID et nom dérivé
+                    self._ensure_decoded(vol_inst)
+                    new_vol = json.loads(json.dumps(vol_inst['data']))
+                    new_vol_tuid = self._next_free_tuid()
+                    new_vol['tuid'] = new_vol_tuid
+                    new_vol['name'] = (new_vol.get('name') or 'Volume') + "_copy"
+                    vol_dir = os.path.dirname(vol_inst['path'])
+                    new_vol_path = self._unique_json_path(vol_dir, new_vol['name'], 'volume')
+                    self._add_instance('volume', new_vol_path, new_vol)
+                    # mettre à jour le clue cloné pour pointer vers le nouveau volume
+                    d['volume_tuid'] = new_vol_tuid
             except Exception:
                 pass
+        return self._add_instance(it['type'], new_json, d)
+
+    def duplicate_current(self):
+        """Duplique l'instance courante, ou toutes les instances sélectionnées (arbre et modèle
+        mis à jour une seule fois à la fin)."""
+        items = self._selected_instances()
+        if not items:
+            return
+        created: list[dict] = []
         try:
-            with open(new_json, 'w', encoding='utf-8') as f:
-                json.dump(d, f, indent=2, ensure_ascii=False)
-            self.reload_instances()
-            # Sélectionner automatiquement la nouvelle instance dans l'arbre
-            try:
-                # Rechercher par TUID (plus robuste que le chemin)
-                target_tuid = d.get('tuid')
-                target_node = None
-                for nid, inst in self.node_to_instance.items():
-                    try:
-                        tu = inst['data'].get('tuid')
-                        tu_int = int(tu, 0) if isinstance(tu, str) else int(tu)
-                        if tu_int == int(target_tuid):
-                            target_node = nid
-                            break
-                    except Exception:
-                        continue
-                if target_node:
-                    self.nav_tree.selection_set(target_node)
-                    self.nav_tree.see(target_node)
-                    self.on_select()
-            except Exception:
-                pass
-            messagebox.showinfo("Duplication", f"Créé: {new_json}")
+            for it in items:
+                created.append(self._duplicate_instance(it))
         except Exception as e:
             messagebox.showerror("Erreur duplication", str(e))
+        if not created:
+            return
+        self._apply_own_edits()
+        # Sélectionner automatiquement les nouvelles instances dans l'arbre (ancêtres peuplés)
+        try:
+            nodes = [n for n in (self._reveal_instance(inst) for inst in created) if n]
+            if nodes:
+                self.nav_tree.selection_set(nodes)
+                self.nav_tree.see(nodes[-1])
+                self.on_select()
+        except Exception:
+            pass
+        if len(created) == 1:
+            messagebox.showinfo("Duplication", f"Créé: {created[0]['path']}")
+        else:
+            messagebox.showinfo("Duplication", f"{len(created)} instances créées")
 
     def create_new_clue(self):
-        if not self.extract_dir:
+        if not self._root_dir():
             return
         # créer un Clue minimal dans le dossier de l'item courant ou à la racine
         folder = os.path.dirname(self._current_item()['path']) if self._current_item() else self.extract_dir
+        if folder is None:
+            # Mode DAT sans sélection: première zone
+            folder = os.path.dirname(self.dat_model.virtual_path('clue', 'Clue', 0))
         tuid = self._next_free_tuid()
         name = f"Clue_{tuid}"
         d = {
@@ -1629,24 +2103,47 @@ class EditorApp(tk.Tk):
         }
         p = os.path.join(folder, f"{sanitize_name(name)}.clue.json")
         try:
-            with open(p, 'w', encoding='utf-8') as f:
-                json.dump(d, f, indent=2, ensure_ascii=False)
-            # créer subfile vide (host) pour que le rebuilder puisse lier si besoin
-            hostp = os.path.join(folder, f"{sanitize_name(name)}_CLASS.host.dat")
-            with open(hostp, 'wb') as f:
-                f.write(b'')
-            self.reload_instances()
+            if self.dat_model is None:
+                # créer subfile vide (host) pour que le rebuilder puisse lier si besoin
+                # (mode DAT: écrit à l'export)
+                hostp = os.path.join(folder, f"{sanitize_name(name)}_CLASS.host.dat")
+                with open(hostp, 'wb') as f:
+                    f.write(b'')
+                self.subfile_index.add(hostp)
+                self.class_ids.invalidate(hostp)
+            self._add_instance('clue', p, d)
+            self._apply_own_edits()
             messagebox.showinfo("Nouveau Clue", f"Créé: {p}")
         except Exception as e:
             messagebox.showerror("Erreur", str(e))
 
 
-def launch(initial_dir: str | None = None):
+def launch(initial_path: str | None = None, ui_trace: str | None = None, slow_ms: float | None = None):
+    """initial_path: dossier d'extraction, ou .dat ouvert directement.
+    ui_trace: active la mesure de latence des callbacks Tk (gui/latency.py) et écrit la trace de
+    la session dans ce fichier à la fermeture; slow_ms: seuil d'un callback lent."""
+    monitor = None
+    if ui_trace:
+        from gui.latency import LatencyMonitor, LatencyOverlay, SLOW_MS
+        monitor = LatencyMonitor(slow_ms=slow_ms or SLOW_MS)
+        monitor.install()
     app = EditorApp()
-    if initial_dir and os.path.isdir(initial_dir):
-        app.extract_dir = initial_dir
+    if monitor is not None:
+        LatencyOverlay(app, monitor)
+        monitor.start_heartbeat(app)
+    if initial_path and os.path.isdir(initial_path):
+        app.extract_dir = initial_path
         app.reload_instances()
-    app.mainloop()
+    elif initial_path and os.path.isfile(initial_path):
+        app.open_dat(initial_path)
+    try:
+        app.mainloop()
+    finally:
+        if monitor is not None:
+            monitor.uninstall()
+            monitor.write_trace(ui_trace)
+            print(monitor.format_summary())
+            print(f"📈 Trace UI écrite dans {ui_trace} (chrome://tracing ou ui.perfetto.dev)")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,203 @@
+"""File des tâches longues de l'éditeur (rebuild, enregistrement DAT, export).
+
+Un seul thread de travail exécute les tâches l'une après l'autre: le rebuild passe par des
+états globaux au module (rebuild.classfiles_aggregator, shared.metrics), deux rebuilds ne
+doivent donc jamais tourner en même temps. Le thread UI ne fait que soumettre, scruter
+(poll()) et appliquer les résultats; une tâche ne touche jamais à Tk.
+
+- Progression: la tâche reçoit Job.progress(fait, total, étape), à transmettre au pipeline
+  (rebuild_dat_from_folder, DatModel.write_dat); l'UI lit job.fraction / job.step.
+- Annulation: Job.cancel() marque la tâche, le prochain appel à progress() lève JobCancelled
+  dans le thread de travail (la sortie doit donc être écrite dans un fichier temporaire).
+- Regroupement: une tâche soumise avec la même clé qu'une tâche encore en attente la
+  remplace (seule la plus récente s'exécutera); celle en cours n'est pas interrompue.
+- Instantané: l'état du projet est figé par la tâche elle-même au démarrage (snapshot_folder()
+  en mode dossier, sous le verrou d'écriture de l'éditeur: une tâche remplacée n'en prend
+  jamais) ou à la soumission (copie de l'overlay en mode DAT). cleanup() est appelé dans le
+  thread de travail après la tâche, ou quand elle est remplacée/annulée avant d'avoir démarré.
+"""
+import os
+import shutil
+import tempfile
+import threading
+from collections import deque
+
+
+class JobCancelled(Exception):
+    """Levée par Job.progress() dans le thread de travail quand la tâche a été annulée."""
+
+
+class Job:
+    def __init__(self, key, label: str, work, on_done=None, on_error=None, cleanup=None):
+        """work(job) -> résultat, exécuté dans le thread de travail; on_done(résultat) et
+        on_error(exception) sont appelés dans le thread UI par JobRunner.poll()."""
+        self.key = key
+        self.label = label
+        self.work = work
+        self.on_done = on_done
+        self.on_error = on_error
+        self.cleanup = cleanup
+        self.done = 0.0
+        self.total = 1.0
+        self.step = ''
+        self.coalesced = 0              # demandes identiques regroupées dans celle-ci
+        self._cancelled = threading.Event()
+
+    def progress(self, done: float, total: float, step: str = '') -> None:
+        if self._cancelled.is_set():
+            raise JobCancelled()
+        self.done, self.total, self.step = done, total, step
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def fraction(self) -> float:
+        return min(1.0, max(0.0, self.done / self.total)) if self.total else 0.0
+
+
+class JobRunner:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending: deque[Job] = deque()
+        self._dropped: list[Job] = []       # remplacées/annulées avant démarrage: cleanup à faire
+        self._cleaning = False
+        self._finished: list[tuple[Job, object, BaseException | None]] = []
+        self.current: Job | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def busy(self) -> bool:
+        with self._cond:
+            return self.current is not None or bool(self._pending) or bool(self._finished)
+
+    @property
+    def idle(self) -> bool:
+        """Rien en cours ni en attente, nettoyages compris (résultats non lus ignorés)."""
+        with self._cond:
+            return self.current is None and not self._pending and not self._dropped and not self._cleaning
+
+    def has(self, key) -> bool:
+        """Une tâche de clé `key` est en cours ou en attente."""
+        with self._cond:
+            return (self.current is not None and self.current.key == key) or any(j.key == key for j in self._pending)
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def submit(self, job: Job) -> Job:
+        with self._cond:
+            for i, other in enumerate(self._pending):
+                if other.key == job.key:
+                    job.coalesced = other.coalesced + 1
+                    self._pending[i] = job
+                    self._dropped.append(other)
+                    break
+            else:
+                self._pending.append(job)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='editor-jobs', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return job
+
+    def cancel_all(self) -> int:
+        """Annule la tâche en cours et vide la file; renvoie le nombre de tâches annulées."""
+        with self._cond:
+            dropped = list(self._pending)
+            self._pending.clear()
+            for job in dropped:
+                job.cancel()
+                self._finished.append((job, None, JobCancelled()))
+            self._dropped.extend(dropped)
+            n = len(dropped)
+            if self.current is not None:
+                self.current.cancel()
+                n += 1
+            self._cond.notify()
+        return n
+
+    def poll(self) -> list[tuple[Job, object, BaseException | None]]:
+        """Tâches terminées depuis le dernier appel (thread UI): (job, résultat, erreur)."""
+        with self._cond:
+            finished, self._finished = self._finished, []
+        return finished
+
+    def dispatch(self) -> None:
+        """poll() puis callbacks on_done/on_error (thread UI). Une annulation n'appelle on_error
+        que si la tâche en a un (l'UI peut l'ignorer)."""
+        for job, result, error in self.poll():
+            if error is None:
+                if job.on_done is not None:
+                    job.on_done(result)
+            elif job.on_error is not None:
+                job.on_error(error)
+
+    def _cleanup(self, job: Job) -> None:
+        if job.cleanup is not None:
+            try:
+                job.cleanup()
+            except Exception:
+                pass
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._dropped:
+                    self._cond.wait()
+                dropped, self._dropped = self._dropped, []
+                job = self._pending.popleft() if self._pending else None
+                self.current = job
+                self._cleaning = bool(dropped)
+            for old in dropped:
+                self._cleanup(old)
+            with self._cond:
+                self._cleaning = False
+            if job is None:
+                continue
+            result, error = None, None
+            try:
+                job.progress(0, 1, '')
+                result = job.work(job)
+            except BaseException as e:
+                error = e
+            self._cleanup(job)
+            with self._cond:
+                self.current = None
+                self._finished.append((job, result, error))
+
+
+def snapshot_folder(src: str) -> str:
+    """Instantané d'un dossier d'extraction pour une tâche: arborescence recréée à côté de src
+    (même volume) avec des liens physiques vers les fichiers, ou des copies si le système de
+    fichiers n'en permet pas. L'éditeur remplace ses JSON (écriture + os.replace) au lieu de
+    les réécrire sur place: les modifications faites pendant la tâche ne l'atteignent pas.
+    Renvoie le dossier créé (à supprimer par le cleanup de la tâche)."""
+    src = os.path.abspath(src)
+    try:
+        dst = tempfile.mkdtemp(prefix='.polaris-snapshot-', dir=os.path.dirname(src))
+    except OSError:
+        dst = tempfile.mkdtemp(prefix='polaris-snapshot-')
+    link = getattr(os, 'link', None)
+    try:
+        for base, _dirs, files in os.walk(src):
+            target = os.path.join(dst, os.path.relpath(base, src))
+            os.makedirs(target, exist_ok=True)
+            for fn in files:
+                a, b = os.path.join(base, fn), os.path.join(target, fn)
+                if link is not None:
+                    try:
+                        link(a, b)
+                        continue
+                    except OSError:
+                        link = None
+                shutil.copy2(a, b)
+    except BaseException:
+        shutil.rmtree(dst, ignore_errors=True)
+        raise
+    return dst
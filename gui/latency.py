@@ -0,0 +1,263 @@
+"""Latence de la boucle d'événements Tk de l'éditeur (opt-in: `main.py gui <chemin> --ui-trace trace.json`).
+
+Tous les callbacks Python appelés par Tk (bind, command=, after, traces de variables) passent par
+tkinter.CallWrapper: install() l'enveloppe pour chronométrer chacun (on_select, refresh_tree,
+save_current, filtres des combobox, glisser-déposer de l'arbre...).
+- Un thread d'échantillonnage relève la pile du thread UI pendant qu'un callback dure plus de
+  la moitié du seuil; un callback lent (>= slow_ms) est journalisé avec ses piles les plus
+  fréquentes.
+- Un battement (after toutes les HEARTBEAT_MS) mesure aussi le retard de la boucle elle-même:
+  un retard sans callback Python lent correspond au travail de Tcl/Tk (redessin de l'arbre...).
+- write_trace(): fichier au format Chrome Trace Event (chrome://tracing, ui.perfetto.dev),
+  un événement par callback de plus de TRACE_MIN_MS, les lents avec leur pile.
+- LatencyOverlay: petite fenêtre des pires callbacks, rafraîchie en continu.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+import tkinter as tk
+from collections import Counter
+from tkinter import ttk
+
+
+# Seuil par défaut d'un callback lent (ms)
+SLOW_MS = 50.0
+# Période d'échantillonnage de la pile du thread UI pendant un callback long (ms)
+SAMPLE_MS = 5.0
+# Callbacks plus courts: comptés dans les statistiques mais absents du fichier de trace (ms)
+TRACE_MIN_MS = 1.0
+# Période du battement qui mesure le retard de la boucle d'événements (ms)
+HEARTBEAT_MS = 20
+# Plafonds mémoire d'une session
+MAX_EVENTS = 200_000
+MAX_SAMPLES = 200
+STACK_DEPTH = 12
+# Pistes du fichier de trace
+TID_CALLBACKS = 1
+TID_LOOP = 2
+
+
+def callback_name(func) -> str:
+    """Nom lisible d'un callback Tk: Classe.méthode, ou fonction (fichier:ligne) pour les lambdas
+    et fonctions locales. Les callit de Misc.after sont remontés à la fonction planifiée."""
+    code = getattr(func, '__code__', None)
+    if code is not None and code.co_name == 'callit' and 'func' in code.co_freevars:
+        try:
+            func = func.__closure__[code.co_freevars.index('func')].cell_contents
+        except (IndexError, ValueError):
+            pass
+    target = getattr(func, '__func__', func)
+    name = getattr(target, '__qualname__', None) or type(func).__name__
+    code = getattr(target, '__code__', None)
+    if code is not None and ('<lambda>' in name or '<locals>' in name):
+        name = f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return name
+
+
+def _format_stack(frame) -> tuple[str, ...]:
+    return tuple(f"{os.path.basename(f.filename)}:{f.lineno} {f.name}"
+                 for f in traceback.extract_stack(frame)[-STACK_DEPTH:])
+
+
+class LatencyMonitor:
+    def __init__(self, slow_ms: float = SLOW_MS, sample_ms: float = SAMPLE_MS, log=print):
+        self.slow_ms = slow_ms
+        self.sample_ms = sample_ms
+        self._log = log
+        self._origin = time.perf_counter()
+        self._stack: list[list] = []              # [nom, début, piles échantillonnées]
+        self.events: list[dict] = []
+        self.dropped_events = 0
+        self.stats: dict[str, list] = {}          # nom -> [appels, total s, max s, lents]
+        self.loop_lag = [0, 0.0]                  # retards de la boucle >= slow_ms: [nombre, max s]
+        self._ui_thread = threading.get_ident()
+        self._original_call = None
+        self._sampler: threading.Thread | None = None
+        self._running = False
+        self._heartbeat_widget = None
+        self._expected = 0.0
+
+    # Installation
+    def install(self) -> None:
+        if self._original_call is not None:
+            return
+        original = tk.CallWrapper.__call__
+        monitor = self
+
+        def timed_call(wrapper, *args):
+            entry = monitor._enter(wrapper.func)
+            try:
+                return original(wrapper, *args)
+            finally:
+                monitor._exit(entry)
+
+        self._original_call = original
+        tk.CallWrapper.__call__ = timed_call
+        self._ui_thread = threading.get_ident()
+        self._running = True
+        self._sampler = threading.Thread(target=self._sample_loop, name='ui-latency-sampler', daemon=True)
+        self._sampler.start()
+
+    def uninstall(self) -> None:
+        if self._original_call is not None:
+            tk.CallWrapper.__call__ = self._original_call
+            self._original_call = None
+        self._running = False
+        self._heartbeat_widget = None
+
+    def start_heartbeat(self, widget) -> None:
+        """Mesure le retard de la boucle d'événements via un after() périodique sur `widget`."""
+        self._heartbeat_widget = widget
+        self._expected = time.perf_counter() + HEARTBEAT_MS / 1000
+        widget.after(HEARTBEAT_MS, self._heartbeat)
+
+    def _heartbeat(self) -> None:
+        widget = self._heartbeat_widget
+        if widget is None:
+            return
+        now = time.perf_counter()
+        lag = now - self._expected
+        if lag * 1000 >= self.slow_ms:
+            self.loop_lag[0] += 1
+            self.loop_lag[1] = max(self.loop_lag[1], lag)
+            self._add_event({'name': 'retard boucle Tk', 'cat': 'loop', 'ph': 'X', 'tid': TID_LOOP,
+                             'ts': self._us(self._expected), 'dur': lag * 1e6})
+        self._expected = now + HEARTBEAT_MS / 1000
+        try:
+            widget.after(HEARTBEAT_MS, self._heartbeat)
+        except tk.TclError:
+            pass
+
+    # Mesure
+    def _enter(self, func) -> list:
+        entry = [callback_name(func), time.perf_counter(), []]
+        self._stack.append(entry)
+        return entry
+
+    def _exit(self, entry: list) -> None:
+        end = time.perf_counter()
+        if self._stack and self._stack[-1] is entry:
+            self._stack.pop()
+        elif entry in self._stack:
+            self._stack.remove(entry)
+        name, start, samples = entry
+        dur = end - start
+        st = self.stats.get(name)
+        if st is None:
+            st = self.stats[name] = [0, 0.0, 0.0, 0]
+        st[0] += 1
+        st[1] += dur
+        st[2] = max(st[2], dur)
+        ms = dur * 1000
+        if ms < TRACE_MIN_MS:
+            return
+        event = {'name': name, 'cat': 'tk', 'ph': 'X', 'tid': TID_CALLBACKS, 'ts': self._us(start), 'dur': dur * 1e6}
+        if ms >= self.slow_ms:
+            st[3] += 1
+            hot = Counter(samples).most_common(3)
+            event['args'] = {'samples': len(samples),
+                             'stacks': [{'count': n, 'stack': list(stack)} for stack, n in hot]}
+            where = f" — {hot[0][0][-1]}" if hot else ""
+            self._log(f"🐢 {name}: {ms:.0f} ms ({len(samples)} échantillons){where}")
+        self._add_event(event)
+
+    def _add_event(self, event: dict) -> None:
+        if len(self.events) >= MAX_EVENTS:
+            self.dropped_events += 1
+            return
+        event['pid'] = os.getpid()
+        self.events.append(event)
+
+    def _us(self, t: float) -> float:
+        return round((t - self._origin) * 1e6, 1)
+
+    def _sample_loop(self) -> None:
+        period = self.sample_ms / 1000
+        half = self.slow_ms / 2000
+        while self._running:
+            time.sleep(period)
+            try:
+                entry = self._stack[-1]
+            except IndexError:
+                continue
+            if time.perf_counter() - entry[1] < half or len(entry[2]) >= MAX_SAMPLES:
+                continue
+            frame = sys._current_frames().get(self._ui_thread)
+            if frame is not None:
+                entry[2].append(_format_stack(frame))
+
+    # Résultats
+    def worst(self, n: int = 15) -> list[tuple[str, int, int, float, float]]:
+        """(nom, appels, lents, max ms, total ms) des callbacks au pire temps le plus long."""
+        rows = [(name, st[0], st[3], st[2] * 1000, st[1] * 1000) for name, st in self.stats.items()]
+        rows.sort(key=lambda r: (r[3], r[4]), reverse=True)
+        return rows[:n]
+
+    def format_summary(self, n: int = 10) -> str:
+        lines = [f"⏱️  Latence UI (seuil {self.slow_ms:.0f} ms):"]
+        for name, calls, slow, worst, total in self.worst(n):
+            lines.append(f"  {name}: max {worst:.1f} ms, {slow}/{calls} lents, total {total:.0f} ms")
+        if self.loop_lag[0]:
+            lines.append(f"  retard boucle Tk: {self.loop_lag[0]} fois, max {self.loop_lag[1] * 1000:.0f} ms")
+        return "\n".join(lines)
+
+    def write_trace(self, output_path: str) -> None:
+        pid = os.getpid()
+        meta = [
+            {'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': 'Polaris Editor'}},
+            {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': TID_CALLBACKS, 'args': {'name': 'Callbacks Tk'}},
+            {'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': TID_LOOP, 'args': {'name': 'Retard boucle'}},
+        ]
+        summary = [{'name': name, 'calls': calls, 'slow': slow, 'max_ms': round(worst, 3), 'total_ms': round(total, 3)}
+                   for name, calls, slow, worst, total in self.worst(len(self.stats))]
+        data = {
+            'traceEvents': meta + self.events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'slow_ms': self.slow_ms, 'dropped_events': self.dropped_events, 'callbacks': summary},
+        }
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+
+class LatencyOverlay:
+    """Fenêtre des pires callbacks (rafraîchie toutes les REFRESH_MS). Fermée, elle se rouvre avec F12."""
+    REFRESH_MS = 1000
+
+    def __init__(self, root: tk.Misc, monitor: LatencyMonitor):
+        self.root = root
+        self.monitor = monitor
+        self.window: tk.Toplevel | None = None
+        self.tree: ttk.Treeview | None = None
+        root.bind_all('<F12>', lambda _e: self.show())
+        self.show()
+
+    def show(self) -> None:
+        if self.window is not None and self.window.winfo_exists():
+            self.window.lift()
+            return
+        self.window = tk.Toplevel(self.root)
+        self.window.title(f"Latence UI (> {self.monitor.slow_ms:.0f} ms)")
+        self.window.geometry("560x300")
+        columns = ('calls', 'slow', 'max', 'total')
+        self.tree = ttk.Treeview(self.window, columns=columns)
+        self.tree.heading('#0', text='Callback')
+        for col, title in zip(columns, ('Appels', 'Lents', 'Max (ms)', 'Total (ms)')):
+            self.tree.heading(col, text=title)
+            self.tree.column(col, width=70, anchor='e', stretch=False)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        self.lag_var = tk.StringVar()
+        ttk.Label(self.window, textvariable=self.lag_var).pack(anchor='w')
+        self._refresh()
+
+    def _refresh(self) -> None:
+        if self.window is None or not self.window.winfo_exists():
+            return
+        self.tree.delete(*self.tree.get_children())
+        for name, calls, slow, worst, total in self.monitor.worst():
+            self.tree.insert('', 'end', text=name, values=(calls, slow, f"{worst:.1f}", f"{total:.0f}"))
+        count, lag = self.monitor.loop_lag
+        self.lag_var.set(f"Retards de la boucle Tk: {count} (max {lag * 1000:.0f} ms)")
+        self.window.after(self.REFRESH_MS, self._refresh)
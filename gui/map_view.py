@@ -0,0 +1,353 @@
+"""Carte vue de dessus des instances (onglet « Carte » de l'éditeur), dans un tk.Canvas.
+
+Mobys (carrés), controllers (losanges), paths (polylignes) et volumes (enveloppe de leur boîte
+projetée) sur un plan XY ou XZ. Seul ce qui recoupe la vue est dessiné: les positions viennent
+de la grille de l'index de recherche (SearchIndex.spatial(), clé: slot) interrogée sur la boîte
+de la vue, sans limite sur l'axe vertical; les volumes d'un VolumeIndex (AABB) construit à la
+demande. Quand les cellules de la grille font moins de CLUSTER_CELL_PX à l'écran, ou que la vue
+compte plus de MAX_ITEMS objets, les cellules occupées sont regroupées en pastilles de
+CLUSTER_PX avec leur nombre d'objets.
+
+Déplacement (glisser) et zoom (molette) décalent ou agrandissent d'abord les items déjà
+dessinés; le redessin complet suit, groupé par REDRAW_MS. Un clic sans glisser choisit
+l'instance la plus proche (on_pick), une pastille zoome dessus.
+"""
+import math
+import tkinter as tk
+from tkinter import ttk
+
+from shared.volume_index import VolumeIndex
+
+REDRAW_MS = 40
+CLUSTER_CELL_PX = 6
+CLUSTER_PX = 28
+MAX_ITEMS = 6000
+PICK_PX = 6
+ZOOM_STEP = 1.25
+CLUSTER_ZOOM = 4.0
+MARKER_PX = 3
+# Plan affiché -> (axe horizontal, axe vertical de l'écran, axe ignoré)
+PLANES = {'XY (Z haut)': (0, 1, 2), 'XZ (Y haut)': (0, 2, 1)}
+MAP_TYPES = ('moby', 'controller', 'path', 'volume')
+COLORS = {'moby': '#4fc3f7', 'controller': '#ffb74d', 'path': '#81c784', 'volume': '#ba68c8'}
+SELECTED_COLOR = '#ff5252'
+CLUSTER_COLOR = '#78909c'
+BACKGROUND = '#1e1e1e'
+
+
+def _hull(points: list[tuple[float, float]]) -> list[tuple[float, float]]:
+    """Enveloppe convexe (chaîne monotone), sens trigonométrique."""
+    pts = sorted(set(points))
+    if len(pts) <= 2:
+        return pts
+
+    def half(seq):
+        out: list[tuple[float, float]] = []
+        for p in seq:
+            while len(out) >= 2 and ((out[-1][0] - out[-2][0]) * (p[1] - out[-2][1])
+                                     - (out[-1][1] - out[-2][1]) * (p[0] - out[-2][0])) <= 0:
+                out.pop()
+            out.append(p)
+        return out[:-1]
+
+    return half(pts) + half(reversed(pts))
+
+
+def _inside(hull: list[tuple[float, float]], x: float, y: float) -> bool:
+    """Point dans une enveloppe convexe (sommets dans un même sens de parcours)."""
+    if len(hull) < 3:
+        return False
+    sign = 0
+    for (ax, ay), (bx, by) in zip(hull, hull[1:] + hull[:1]):
+        cross = (bx - ax) * (y - ay) - (by - ay) * (x - ax)
+        if cross:
+            if sign and (cross > 0) != (sign > 0):
+                return False
+            sign = cross
+    return True
+
+
+def _area(hull: list[tuple[float, float]]) -> float:
+    return abs(sum(ax * by - bx * ay for (ax, ay), (bx, by) in zip(hull, hull[1:] + hull[:1]))) / 2
+
+
+class MapView:
+    def __init__(self, parent, get_index, on_pick, prepare=None):
+        """get_index() -> SearchIndex courant (remplacé à chaque chargement); on_pick(inst) à la
+        sélection d'une instance sur la carte; prepare() avant chaque dessin (mode DAT: décodage
+        des types de MAP_TYPES à la première ouverture, suivi d'un invalidate())."""
+        self._get_index = get_index
+        self._on_pick = on_pick
+        self._prepare = prepare
+        self._axes = PLANES['XY (Z haut)']
+        self._center = (0.0, 0.0)
+        self._scale: float | None = None           # pixels par unité (None: recadrer)
+        self._volumes: VolumeIndex | None = None
+        self._volume_source = None                 # SearchIndex dont viennent les volumes
+        self._selected: dict | None = None
+        self._pending = None
+        self._drag: tuple[float, float, bool] | None = None
+        self._item_slot: dict[int, tuple[int, float | None, float | None]] = {}
+        self._clusters: set[int] = set()
+        self._hulls: list[tuple[float, int, list]] = []
+
+        self.frame = ttk.Frame(parent)
+        bar = ttk.Frame(self.frame)
+        bar.pack(fill=tk.X)
+        ttk.Label(bar, text='Plan').pack(side=tk.LEFT)
+        self.plane_var = tk.StringVar(value='XY (Z haut)')
+        plane = ttk.Combobox(bar, textvariable=self.plane_var, values=list(PLANES), state='readonly', width=12)
+        plane.pack(side=tk.LEFT, padx=4)
+        plane.bind('<<ComboboxSelected>>', self._on_plane)
+        ttk.Button(bar, text='Recadrer', command=self.reset_view).pack(side=tk.LEFT)
+        self.info_var = tk.StringVar()
+        ttk.Label(bar, textvariable=self.info_var).pack(side=tk.RIGHT)
+        self.canvas = tk.Canvas(self.frame, background=BACKGROUND, highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        c = self.canvas
+        c.bind('<Configure>', lambda _e: self.schedule())
+        c.bind('<Map>', lambda _e: self.schedule())
+        c.bind('<ButtonPress-1>', self._on_press)
+        c.bind('<B1-Motion>', self._on_drag)
+        c.bind('<ButtonRelease-1>', self._on_release)
+        c.bind('<MouseWheel>', lambda e: self._zoom(ZOOM_STEP if e.delta > 0 else 1 / ZOOM_STEP, e.x, e.y))
+        c.bind('<Button-4>', lambda e: self._zoom(ZOOM_STEP, e.x, e.y))
+        c.bind('<Button-5>', lambda e: self._zoom(1 / ZOOM_STEP, e.x, e.y))
+
+    # État
+    def reset(self) -> None:
+        """Nouveau chargement: recadrage, volumes et sélection oubliés."""
+        self._volumes = None
+        self._selected = None
+        self.reset_view()
+
+    def reset_view(self) -> None:
+        self._scale = None
+        self.schedule()
+
+    def invalidate(self, volumes: bool = False) -> None:
+        """Instance modifiée (la grille de l'index est déjà à jour; les volumes sont reconstruits)."""
+        if volumes:
+            self._volumes = None
+        self.schedule()
+
+    def select(self, inst: dict | None) -> None:
+        """Instance sélectionnée dans l'arbre: surlignée sur la carte."""
+        if inst is not self._selected:
+            self._selected = inst
+            self.schedule()
+
+    def _on_plane(self, _evt=None) -> None:
+        self._axes = PLANES.get(self.plane_var.get(), PLANES['XY (Z haut)'])
+        self.reset_view()
+
+    # Repère
+    def _size(self) -> tuple[int, int]:
+        return self.canvas.winfo_width(), self.canvas.winfo_height()
+
+    def _to_screen(self, u: float, v: float, w: int, h: int) -> tuple[float, float]:
+        s = self._scale
+        return w / 2 + (u - self._center[0]) * s, h / 2 - (v - self._center[1]) * s
+
+    def _view_box(self, w: int, h: int) -> tuple[list[float], list[float]]:
+        """Boîte monde de la vue (axe ignoré: infini)."""
+        u, v, up = self._axes
+        half_u, half_v = w / 2 / self._scale, h / 2 / self._scale
+        lo, hi = [0.0] * 3, [0.0] * 3
+        lo[u], hi[u] = self._center[0] - half_u, self._center[0] + half_u
+        lo[v], hi[v] = self._center[1] - half_v, self._center[1] + half_v
+        lo[up], hi[up] = -math.inf, math.inf
+        return lo, hi
+
+    def _fit(self, grid, w: int, h: int) -> None:
+        """Cadre le cœur du niveau (quantiles 2-98 %: les objets isolés n'écrasent pas la vue)."""
+        u, v, _up = self._axes
+        core = grid.core_box()
+        if core is None:
+            # Moins de 2 points: centré sur le seul objet, s'il y en a un
+            found = grid.box((-math.inf,) * 3, (math.inf,) * 3)
+            p = found[0][1] if found else (0.0, 0.0, 0.0)
+            self._center, self._scale = (p[u], p[v]), 1.0
+            return
+        lo, hi = core
+        span_u, span_v = hi[u] - lo[u], hi[v] - lo[v]
+        self._center = ((lo[u] + hi[u]) / 2, (lo[v] + hi[v]) / 2)
+        scales = [size * 0.9 / span for size, span in ((w, span_u), (h, span_v)) if span > 0]
+        self._scale = min(scales) if scales else 1.0
+
+    # Dessin
+    def schedule(self) -> None:
+        if self._pending is None:
+            self._pending = self.canvas.after(REDRAW_MS, self.redraw)
+
+    def _volume_index(self, index) -> VolumeIndex:
+        if self._volumes is None or self._volume_source is not index:
+            items = []
+            for slot in sorted(index.slots('volume')):
+                inst = index.item(slot)
+                matrix = inst['data'].get('transform_matrix') if inst else None
+                if matrix:
+                    items.append((slot, matrix))
+            self._volumes, self._volume_source = VolumeIndex(items), index
+        return self._volumes
+
+    def redraw(self) -> None:
+        self._pending = None
+        canvas = self.canvas
+        w, h = self._size()
+        if not canvas.winfo_ismapped() or w <= 1 or h <= 1:
+            return
+        if self._prepare is not None:
+            self._prepare()
+        index = self._get_index()
+        grid = index.spatial()
+        if self._scale is None:
+            self._fit(grid, w, h)
+        canvas.delete('all')
+        self._item_slot.clear()
+        self._clusters.clear()
+        self._hulls.clear()
+        lo, hi = self._view_box(w, h)
+        # Comptes par cellule avant tout: une vue trop chargée ne parcourt pas ses points
+        cells = grid.occupancy(lo, hi)
+        if grid.cell * self._scale < CLUSTER_CELL_PX or sum(n for _cell, n in cells) > MAX_ITEMS:
+            self._draw_clusters(grid, cells, w, h)
+            return
+        volumes = self._volume_index(index)
+        self._draw_items(index, [key for key, _p in grid.box(lo, hi)], volumes, volumes.in_box(lo, hi), w, h)
+
+    def _draw_clusters(self, grid, cells: list, w: int, h: int) -> None:
+        u, v, _up = self._axes
+        bins: dict[tuple[int, int], list[float]] = {}
+        for cell, n in cells:
+            center = grid.cell_center(cell)
+            x, y = self._to_screen(center[u], center[v], w, h)
+            key = (int(x // CLUSTER_PX), int(y // CLUSTER_PX))
+            acc = bins.get(key)
+            if acc is None:
+                bins[key] = [n, x * n, y * n]
+            else:
+                acc[0] += n
+                acc[1] += x * n
+                acc[2] += y * n
+        canvas = self.canvas
+        total = 0
+        for n, sx, sy in bins.values():
+            n = int(n)
+            total += n
+            x, y = sx / n, sy / n
+            r = min(3 + 2 * math.log2(n), CLUSTER_PX / 2)
+            item = canvas.create_oval(x - r, y - r, x + r, y + r, fill=CLUSTER_COLOR, outline='')
+            self._clusters.add(item)
+            if r >= 7:
+                canvas.create_text(x, y, text=str(n), fill='white', font=('TkDefaultFont', 7))
+        self.info_var.set(f"{len(bins)} groupes, {total} objets (zoomer pour le détail)")
+
+    def _draw_items(self, index, hits: list[int], volumes: VolumeIndex, shown: list[int], w: int, h: int) -> None:
+        u, v, _up = self._axes
+        canvas = self.canvas
+        selected = self._selected
+        for i in shown:
+            slot = volumes.keys[i]
+            inst = index.item(slot)
+            if inst is None:
+                continue
+            hull = _hull([self._to_screen(p[u], p[v], w, h) for p in volumes.corners(i)])
+            if len(hull) < 2:
+                continue
+            color = SELECTED_COLOR if inst is selected else COLORS['volume']
+            coords = [c for p in hull for c in p]
+            width = 2 if inst is selected else 1
+            if len(hull) == 2:
+                # Volume vu par la tranche
+                canvas.create_line(*coords, fill=color, width=width)
+            else:
+                canvas.create_polygon(*coords, outline=color, fill='', width=width)
+            self._hulls.append((_area(hull), slot, hull))
+        markers = []
+        for slot in hits:
+            inst = index.item(slot)
+            typ = inst.get('type') if inst else None
+            if typ == 'path':
+                line = [self._to_screen(p[u], p[v], w, h) for p in index.points(slot)]
+                color = SELECTED_COLOR if inst is selected else COLORS['path']
+                if len(line) >= 2:
+                    item = canvas.create_line(*[c for p in line for c in p], fill=color,
+                                              width=2 if inst is selected else 1)
+                    self._item_slot[item] = (slot, None, None)
+                elif line:
+                    markers.append((slot, inst, typ, line[0]))
+            elif typ in ('moby', 'controller'):
+                p = index.points(slot)[0]
+                markers.append((slot, inst, typ, self._to_screen(p[u], p[v], w, h)))
+        # Sélection dessinée en dernier (au-dessus des autres)
+        markers.sort(key=lambda m: m[1] is selected)
+        m = MARKER_PX
+        for slot, inst, typ, (x, y) in markers:
+            color = SELECTED_COLOR if inst is selected else COLORS.get(typ, COLORS['path'])
+            if typ == 'controller':
+                item = canvas.create_polygon(x, y - m - 1, x + m + 1, y, x, y + m + 1, x - m - 1, y,
+                                             fill=color, outline='')
+            else:
+                item = canvas.create_rectangle(x - m, y - m, x + m, y + m, fill=color, outline='')
+            self._item_slot[item] = (slot, x, y)
+        self.info_var.set(f"{len(self._item_slot) + len(self._hulls)} objets affichés")
+
+    # Souris
+    def _on_press(self, evt) -> None:
+        self._drag = (evt.x, evt.y, False)
+
+    def _on_drag(self, evt) -> None:
+        if self._drag is None or self._scale is None:
+            return
+        x, y, moved = self._drag
+        dx, dy = evt.x - x, evt.y - y
+        if not moved and abs(dx) + abs(dy) < 3:
+            return
+        self.canvas.move('all', dx, dy)
+        self._center = (self._center[0] - dx / self._scale, self._center[1] + dy / self._scale)
+        self._drag = (evt.x, evt.y, True)
+        self.schedule()
+
+    def _on_release(self, evt) -> None:
+        drag, self._drag = self._drag, None
+        if drag is not None and not drag[2]:
+            self._pick(evt.x, evt.y)
+
+    def _zoom(self, factor: float, x: float, y: float) -> None:
+        """Zoom centré sur le curseur: le point monde sous (x, y) reste en place."""
+        if self._scale is None:
+            return
+        w, h = self._size()
+        s = self._scale
+        wu, wv = self._center[0] + (x - w / 2) / s, self._center[1] - (y - h / 2) / s
+        self._scale = s * factor
+        self._center = (wu - (x - w / 2) / self._scale, wv + (y - h / 2) / self._scale)
+        self.canvas.scale('all', x, y, factor, factor)
+        self.schedule()
+
+    def _pick(self, x: float, y: float) -> None:
+        """Clic: pastille -> zoom; sinon marqueur le plus proche, path, puis plus petit volume."""
+        canvas = self.canvas
+        best = None
+        for item in canvas.find_overlapping(x - PICK_PX, y - PICK_PX, x + PICK_PX, y + PICK_PX):
+            if item in self._clusters:
+                self._zoom(CLUSTER_ZOOM, x, y)
+                return
+            hit = self._item_slot.get(item)
+            if hit is None:
+                continue
+            slot, mx, my = hit
+            d = math.hypot(mx - x, my - y) if mx is not None else PICK_PX + 1
+            if best is None or d <= best[0]:
+                best = (d, slot)
+        if best is None:
+            inside = [(area, slot) for area, slot, hull in self._hulls if _inside(hull, x, y)]
+            if inside:
+                best = min(inside)
+        if best is None:
+            return
+        inst = self._get_index().item(best[1])
+        if inst is not None:
+            self.select(inst)
+            self._on_pick(inst)
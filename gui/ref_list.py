@@ -0,0 +1,69 @@
+"""Liste de références d'un formulaire (area, pod, scent) affichée dans un tk.Listbox.
+
+Le Listbox ne dessine que les lignes visibles: une instance avec des centaines de références
+ne crée plus une ligne de widgets (combobox + bouton) par référence. Les valeurs (TUID, ou
+(type_id, TUID) pour les pods) sont la source de vérité; les libellés viennent de la liste
+d'options courante du modèle.
+"""
+import tkinter as tk
+from tkinter import ttk
+
+
+def _fallback_label(value) -> str:
+    """Libellé d'une référence absente des options (instance introuvable dans le dossier)."""
+    if isinstance(value, tuple):
+        ty, tu = value
+        return f"type {ty} (0x{tu:016X}) (introuvable)"
+    return f"0x{value:016X} (introuvable)"
+
+
+class RefListView:
+    def __init__(self, parent, title: str, kind: str, get_options, make_combo, add_text: str = 'Ajouter', height: int = 8):
+        """get_options(kind) -> OptionList courante; make_combo(parent, var, kind) -> combobox de référence."""
+        self.kind = kind
+        self.values: list = []
+        self._get_options = get_options
+        self.frame = ttk.Frame(parent)
+        ttk.Label(self.frame, text=title).pack(anchor='w')
+        body = ttk.Frame(self.frame)
+        body.pack(fill=tk.BOTH, expand=True)
+        self.listbox = tk.Listbox(body, height=height, selectmode=tk.EXTENDED, exportselection=False)
+        scroll = ttk.Scrollbar(body, orient='vertical', command=self.listbox.yview)
+        self.listbox.configure(yscrollcommand=scroll.set)
+        self.listbox.pack(side='left', fill=tk.BOTH, expand=True)
+        scroll.pack(side='right', fill='y')
+        self.listbox.bind('<Delete>', lambda _e: self.remove_selected())
+
+        add_row = ttk.Frame(self.frame)
+        add_row.pack(fill=tk.X, pady=4)
+        self.add_var = tk.StringVar()
+        ttk.Button(add_row, text=add_text, command=self.add_current).pack(side=tk.LEFT, padx=4)
+        ttk.Button(add_row, text='Supprimer', command=self.remove_selected).pack(side=tk.RIGHT, padx=4)
+        make_combo(add_row, self.add_var, kind).pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+    def _label(self, options, value) -> str:
+        return options.label_for(value) or _fallback_label(value)
+
+    def bind(self, values: list) -> None:
+        """Affiche les références d'une nouvelle instance (un seul insert Tcl pour toute la liste)."""
+        self.values = list(values)
+        self.add_var.set('')
+        options = self._get_options(self.kind)
+        self.listbox.delete(0, tk.END)
+        if self.values:
+            self.listbox.insert(tk.END, *[self._label(options, v) for v in self.values])
+
+    def add_current(self) -> None:
+        options = self._get_options(self.kind)
+        value = options.value_for(self.add_var.get())
+        if value is None or value in self.values:
+            return
+        self.values.append(value)
+        self.listbox.insert(tk.END, self._label(options, value))
+        self.listbox.see(tk.END)
+        self.add_var.set('')
+
+    def remove_selected(self) -> None:
+        for i in sorted(self.listbox.curselection(), reverse=True):
+            del self.values[i]
+            self.listbox.delete(i)
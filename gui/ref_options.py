@@ -0,0 +1,163 @@
+"""Listes d'options des combobox de référence (path, volume, clue, moby/controller).
+
+Chaque liste est construite une fois depuis le modèle d'instances puis gardée tant qu'aucune
+instance de ses types n'est ajoutée, renommée ou retirée; les formulaires (area, pod, scent,
+clue) ne reparcourent donc plus self.instances à chaque sélection.
+
+Filtrage: libellés triés en minuscules -> les préfixes sont une plage bisect, les autres
+sous-chaînes un str.find sur les libellés concaténés. Les préfixes viennent en premier.
+"""
+import os
+from bisect import bisect_left, bisect_right
+from typing import Any
+
+
+# Genre de liste -> types d'instances qu'elle contient
+OPTION_KINDS = {
+    'path': ('path',),
+    'volume': ('volume',),
+    'clue': ('clue',),
+    'pod': ('moby', 'controller'),
+}
+# Type d'instance référencé par un pod -> id de type (instance_references[].type)
+POD_TYPE_IDS = {'moby': 0, 'controller': 4}
+
+
+def _tuid_int(value) -> int | None:
+    try:
+        return int(value, 0) if isinstance(value, str) else int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def option_label(kind: str, inst: dict) -> str | None:
+    """Libellé affiché pour une instance ('Nom (0x...)'), None si son TUID est illisible."""
+    tu = _tuid_int(inst['data'].get('tuid'))
+    if tu is None:
+        return None
+    name = inst['data'].get('name') or os.path.basename(inst['path'])
+    if kind == 'pod':
+        return f"{name} ({inst['type']}) (0x{tu:016X})"
+    return f"{name} (0x{tu:016X})"
+
+
+def option_value(kind: str, inst: dict) -> Any:
+    tu = _tuid_int(inst['data'].get('tuid'))
+    return (POD_TYPE_IDS[inst['type']], tu) if kind == 'pod' else tu
+
+
+class OptionList:
+    def __init__(self, kind: str, instances: list[dict]):
+        types = OPTION_KINDS[kind]
+        entries = []
+        self._label_of: dict[int, str] = {}        # id(inst) -> libellé (détection des renommages)
+        self._ids: set[int] = set()                # toutes les instances des types, même sans libellé
+        for inst in instances:
+            if inst['type'] not in types:
+                continue
+            self._ids.add(id(inst))
+            label = option_label(kind, inst)
+            if label is None:
+                continue
+            self._label_of[id(inst)] = label
+            entries.append((label.lower(), label, option_value(kind, inst), inst))
+        entries.sort(key=lambda e: e[0])
+        self.kind = kind
+        self.labels = [e[1] for e in entries]
+        self._lower = [e[0] for e in entries]
+        self._joined = '\n'.join(self._lower)
+        self._starts = []
+        pos = 0
+        for low in self._lower:
+            self._starts.append(pos)
+            pos += len(low) + 1
+        self._by_label = {e[1]: (e[2], e[3]) for e in entries}
+        self._by_value: dict[Any, tuple[str, dict]] = {}
+        for _low, label, value, inst in entries:
+            self._by_value.setdefault(value, (label, inst))
+        self._last: tuple[str, list[int]] | None = None
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def label_for(self, value) -> str | None:
+        hit = self._by_value.get(value)
+        return hit[0] if hit else None
+
+    def value_for(self, label: str):
+        hit = self._by_label.get(label)
+        return hit[0] if hit else None
+
+    def instance_for(self, value) -> dict | None:
+        hit = self._by_value.get(value)
+        return hit[1] if hit else None
+
+    def has_label(self, label: str, inst: dict) -> bool:
+        return self._label_of.get(id(inst)) == label
+
+    def filter(self, typed: str) -> list[str]:
+        """Libellés contenant `typed` (insensible à la casse): préfixes d'abord, puis le reste."""
+        typed = typed.strip().lower()
+        if not typed:
+            return self.labels
+        if self._last is not None and typed.startswith(self._last[0]):
+            # Saisie prolongée: ne refiltrer que le résultat précédent
+            idx = [i for i in self._last[1] if typed in self._lower[i]]
+            idx.sort(key=lambda i: (not self._lower[i].startswith(typed), i))
+        else:
+            lo = bisect_left(self._lower, typed)
+            hi = bisect_left(self._lower, typed + '\uffff', lo)
+            idx = list(range(lo, hi))
+            last = len(self._starts) - 1
+            pos = self._joined.find(typed)
+            while pos != -1:
+                i = bisect_right(self._starts, pos) - 1
+                if not lo <= i < hi:
+                    idx.append(i)
+                if i >= last:
+                    break
+                pos = self._joined.find(typed, self._starts[i + 1])
+        self._last = (typed, idx)
+        return [self.labels[i] for i in idx]
+
+
+class ReferenceOptions:
+    """Listes d'options par genre, possédées par le modèle et invalidées par type d'instance."""
+
+    def __init__(self):
+        self._instances: list[dict] = []
+        self._lists: dict[str, OptionList] = {}
+
+    def get(self, kind: str) -> OptionList:
+        opts = self._lists.get(kind)
+        if opts is None:
+            opts = self._lists[kind] = OptionList(kind, self._instances)
+        return opts
+
+    def invalidate(self, typ: str) -> None:
+        for kind, types in OPTION_KINDS.items():
+            if typ in types:
+                self._lists.pop(kind, None)
+
+    def sync(self, instances: list[dict]) -> None:
+        """Nouveau modèle (rechargement): une liste n'est refaite que si une instance de ses types
+        a été ajoutée, relue ou retirée (le scan incrémental réutilise les items inchangés)."""
+        self._instances = instances
+        if not self._lists:
+            return
+        ids: dict[str, set[int]] = {}
+        for it in instances:
+            ids.setdefault(it['type'], set()).add(id(it))
+        for kind, opts in list(self._lists.items()):
+            current = set()
+            for typ in OPTION_KINDS[kind]:
+                current |= ids.get(typ, set())
+            if current != opts._ids:
+                del self._lists[kind]
+
+    def note_write(self, inst: dict) -> None:
+        """Instance écrite ou ajoutée par l'éditeur: invalide ses listes si son libellé a changé."""
+        for kind, types in OPTION_KINDS.items():
+            opts = self._lists.get(kind)
+            if opts is not None and inst['type'] in types and not opts.has_label(option_label(kind, inst), inst):
+                del self._lists[kind]
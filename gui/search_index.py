@@ -0,0 +1,429 @@
+"""Index de recherche de l'arbre de navigation.
+
+Construit à côté du modèle d'instances (EditorApp.instances) et tenu à jour par instance
+(ajout / modification / retrait), au lieu de reformater nom, chemin et TUID de toutes les
+instances à chaque frappe.
+
+- Texte libre: chaque instance a une ligne en minuscules (nom ou fichier, type, ClassID),
+  découpée en mots (lettres/chiffres); un index mot -> slots répond aux sous-chaînes: le terme
+  est cherché (str.find + bisect) dans la chaîne des mots distincts, bien plus courte que
+  l'ensemble des lignes, et les slots des mots trouvés sont réunis. Un terme à séparateurs
+  ('crate_1') part des mots de ses morceaux puis vérifie la ligne des seuls candidats. Les TUID
+  (hex sur 16 chiffres et décimal) sont une liste triée: un terme hexadécimal/décimal trouve les
+  TUID qui commencent par lui (bisect). Région et dossier de zone, communs à des milliers
+  d'instances, sont cherchés dans leurs dictionnaires (quelques clés).
+- Champs qualifiés: dictionnaires valeur -> ensemble de slots pour type:, zone:, class:, tuid:
+  (tuid: partiel: préfixe de TUID seulement; name: sous-chaîne des noms seuls, via les mots).
+- Champs spatiaux near:x,y,z,r et knn:x,y,z,k (évalué en dernier: les k plus proches parmi les
+  candidats des autres termes, comme `main.py query`): grille des positions par slot
+  (shared.spatial_index), construite à la première requête spatiale puis tenue à jour avec le
+  reste de l'index (une position modifiée ne déplace que les points de son instance). Les clues
+  n'ont pas de position propre (celle de leur volume) et n'y figurent pas.
+
+Les termes séparés par des espaces sont combinés en ET: `type:moby zone:3 prius`.
+"""
+import heapq
+import os
+import re
+from bisect import bisect_left, bisect_right
+
+from shared.class_enum import load_class_enum
+from shared.spatial_index import SpatialIndex, instance_points
+
+
+FIELDS = ('type', 'zone', 'class', 'tuid', 'name', 'near', 'knn')
+_WORD = re.compile(r'[^\W_]+')
+_NUMBER = re.compile(r'(0x)?[0-9a-f]+')
+# Au-delà de ce nombre de résultats, un filtre de candidats passe par l'index plutôt que ligne à ligne
+LINEAR_FILTER_MAX = 2000
+
+
+def _to_int(value) -> int | None:
+    try:
+        return int(value, 0) if isinstance(value, str) else int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_number(text: str) -> int | None:
+    """'1234', '0x4D2' ou un hex nu ('96d3e3...') -> int."""
+    try:
+        return int(text, 0)
+    except ValueError:
+        pass
+    try:
+        return int(text, 16)
+    except ValueError:
+        return None
+
+
+def instance_class_id(inst: dict) -> int | None:
+    """ClassID connu par le JSON (class_id des clues, class_enum des mobys)."""
+    d = inst['data']
+    for key in ('class_id', 'class_enum'):
+        if key in d:
+            return _to_int(d[key])
+    return None
+
+
+class SearchIndex:
+    def __init__(self, locate, class_of=instance_class_id):
+        """locate(inst) -> (région, zone): position de l'instance dans le dossier d'extraction.
+        class_of(inst) -> ClassID ou None (par défaut: celui du JSON)."""
+        self._locate = locate
+        self._class_of = class_of
+        self.clear()
+
+    def clear(self):
+        self._slot_of: dict[int, int] = {}           # id(inst) -> slot
+        self._items: list[dict | None] = []
+        self._blobs: list[str] = []
+        self._names: list[str] = []
+        self._keys: list[tuple | None] = []          # (type, zones, class_id, tuid, région) par slot
+        self._points: list[list] = []                # positions monde par slot
+        self._spatial: SpatialIndex | None = None    # grille des _points (construite à la demande)
+        self._free: list[int] = []
+        self._by_type: dict[str, set[int]] = {}
+        self._by_zone: dict[str, set[int]] = {}
+        self._by_region: dict[str, set[int]] = {}
+        self._by_class: dict[int, set[int]] = {}
+        self._by_tuid: dict[int, set[int]] = {}
+        self._words: dict[str, set[int]] = {}       # mot -> slots
+        self._word_text: tuple[str, list[int], list[str]] | None = None   # mots joints, débuts, mots
+        self._tuid_keys: list[str] = []              # TUID hex (16 chiffres) et décimal, triés
+        self._tuid_slots: list[int] = []             # slot de chaque entrée de _tuid_keys
+        self._tuid_bulk = False                      # sync() massif: ajout en fin puis un seul tri
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    # Mise à jour
+    def sync(self, items: list[dict], prepared: dict[int, tuple] | None = None) -> None:
+        """Aligne l'index sur `items` (après un rechargement): seules les instances nouvelles ou
+        disparues sont (dés)indexées; les items réutilisés par le scan incrémental restent.
+        prepared: entrées déjà calculées par prepare() (id(item) -> entrée)."""
+        prepared = prepared or {}
+        current = {id(it): it for it in items}
+        for key in [k for k in self._slot_of if k not in current]:
+            self._remove_slot(self._slot_of.pop(key))
+        if len(self._free) > len(self._slot_of):
+            # Beaucoup de trous (changement de dossier): repartir de zéro
+            self.clear()
+        added = [(key, it) for key, it in current.items() if key not in self._slot_of]
+        self._tuid_bulk = len(added) > len(self._tuid_keys) // 8
+        try:
+            for key, it in added:
+                self._add(it, prepared.get(key))
+        finally:
+            if self._tuid_bulk:
+                self._tuid_bulk = False
+                order = sorted(range(len(self._tuid_keys)), key=self._tuid_keys.__getitem__)
+                self._tuid_keys = [self._tuid_keys[i] for i in order]
+                self._tuid_slots = [self._tuid_slots[i] for i in order]
+
+    def update(self, inst: dict) -> None:
+        """(Ré)indexe une instance dont le JSON vient d'être écrit (nom, TUID, chemin modifiés)."""
+        slot = self._slot_of.pop(id(inst), None)
+        if slot is not None:
+            self._remove_slot(slot)
+        self._add(inst)
+
+    def remove(self, inst: dict) -> None:
+        slot = self._slot_of.pop(id(inst), None)
+        if slot is not None:
+            self._remove_slot(slot)
+
+    def prepare(self, items: list[dict], known: set[int] | None = None) -> dict[int, tuple]:
+        """Entrées d'index des items absents de `known` (ids déjà indexés, cf. known_ids()).
+        Sans état partagé: peut tourner dans le thread de chargement, sync() n'a plus qu'à les insérer."""
+        known = known or set()
+        return {id(it): self._entry(it) for it in items if id(it) not in known}
+
+    def known_ids(self) -> set[int]:
+        return set(self._slot_of)
+
+    def _entry(self, inst: dict) -> tuple:
+        """(ligne texte libre, nom, (type, zones, class_id, tuid, région), positions, mots de la
+        ligne) d'une instance."""
+        d = inst['data']
+        typ = str(inst.get('type') or '')
+        name = str(d.get('name') or '').lower().replace('\n', ' ')
+        region, zone_dir = self._locate(inst)
+        zones = {zone_dir.lower()} if zone_dir else set()
+        zone_idx = _to_int(d.get('zone'))
+        if zone_idx is not None:
+            zones.add(str(zone_idx))
+        tuid = _to_int(d.get('tuid'))
+        class_id = self._class_of(inst)
+        parts = [name or os.path.basename(inst['path']).lower(), typ]
+        if tuid is None:
+            parts.append(str(d.get('tuid') or '').lower())
+        if class_id is not None:
+            parts.append(f"class={class_id}")
+        blob = ' '.join(parts).replace('\n', ' ')
+        return (blob, name, (typ, tuple(zones), class_id, tuid, region.lower()), instance_points(typ, d),
+                tuple(set(_WORD.findall(blob))))
+
+    def _add(self, inst: dict, entry: tuple | None = None) -> None:
+        blob, name, keys, points, words = entry or self._entry(inst)
+        typ, zones, class_id, tuid, region = keys
+        if self._free:
+            slot = self._free.pop()
+            self._items[slot] = inst
+            self._blobs[slot] = blob
+            self._names[slot] = name
+            self._keys[slot] = keys
+            self._points[slot] = points
+        else:
+            slot = len(self._items)
+            self._items.append(inst)
+            self._blobs.append(blob)
+            self._names.append(name)
+            self._keys.append(keys)
+            self._points.append(points)
+        if self._spatial is not None and points:
+            self._spatial.insert(slot, points)
+        self._slot_of[id(inst)] = slot
+        self._by_type.setdefault(typ, set()).add(slot)
+        for z in zones:
+            self._by_zone.setdefault(z, set()).add(slot)
+        if class_id is not None:
+            self._by_class.setdefault(class_id, set()).add(slot)
+        if tuid is not None:
+            self._by_tuid.setdefault(tuid, set()).add(slot)
+        self._by_region.setdefault(region, set()).add(slot)
+        index = self._words
+        for word in words:
+            slots = index.get(word)
+            if slots is None:
+                index[word] = {slot}
+                self._word_text = None
+            else:
+                slots.add(slot)
+        if tuid is not None:
+            for text in self._tuid_strings(tuid):
+                if self._tuid_bulk:
+                    self._tuid_keys.append(text)
+                    self._tuid_slots.append(slot)
+                else:
+                    i = bisect_right(self._tuid_keys, text)
+                    self._tuid_keys.insert(i, text)
+                    self._tuid_slots.insert(i, slot)
+
+    def _remove_slot(self, slot: int) -> None:
+        typ, zones, class_id, tuid, region = self._keys[slot]
+        self._discard(self._by_type, typ, slot)
+        for z in zones:
+            self._discard(self._by_zone, z, slot)
+        if class_id is not None:
+            self._discard(self._by_class, class_id, slot)
+        if tuid is not None:
+            self._discard(self._by_tuid, tuid, slot)
+        self._discard(self._by_region, region, slot)
+        for word in set(_WORD.findall(self._blobs[slot])):
+            slots = self._words.get(word)
+            if slots is not None:
+                slots.discard(slot)
+                if not slots:
+                    del self._words[word]
+                    self._word_text = None
+        if tuid is not None:
+            keys = self._tuid_keys
+            for text in self._tuid_strings(tuid):
+                i = bisect_left(keys, text)
+                while i < len(keys) and keys[i] == text:
+                    if self._tuid_slots[i] == slot:
+                        del keys[i]
+                        del self._tuid_slots[i]
+                        break
+                    i += 1
+        self._items[slot] = None
+        self._blobs[slot] = ''
+        self._names[slot] = ''
+        self._keys[slot] = None
+        self._points[slot] = []
+        if self._spatial is not None:
+            self._spatial.remove(slot)
+        self._free.append(slot)
+
+    @staticmethod
+    def _discard(index: dict, key, slot: int) -> None:
+        slots = index.get(key)
+        if slots is not None:
+            slots.discard(slot)
+            if not slots:
+                del index[key]
+
+    # Recherche
+    @staticmethod
+    def _tuid_strings(tuid: int) -> tuple[str, str]:
+        return f"{tuid:016x}", str(tuid)
+
+    def _word_slots(self, part: str) -> set[int]:
+        """Slots dont un mot contient `part` (sous-chaîne cherchée dans la chaîne des mots distincts)."""
+        if self._word_text is None:
+            words = list(self._words)
+            starts = []
+            pos = 0
+            for word in words:
+                starts.append(pos)
+                pos += len(word) + 1
+            self._word_text = ('\n'.join(words), starts, words)
+        text, starts, words = self._word_text
+        index = self._words
+        found: set[int] = set()
+        last = len(starts) - 1
+        # Réunir les ensembles de mots coûte ~1 µs par mot trouvé, tester chaque ligne ~0.2 µs
+        budget = max(64, len(self._blobs) // 16)
+        matched = 0
+        pos = text.find(part)
+        while pos != -1:
+            matched += 1
+            if matched > budget:
+                # Terme très fréquent: un test par ligne coûte moins que de réunir des milliers
+                # d'ensembles (`part` n'a pas de séparateur: dans un mot <=> dans la ligne)
+                return {i for i, line in enumerate(self._blobs) if part in line}
+            i = bisect_right(starts, pos) - 1
+            found |= index[words[i]]
+            if i >= last:
+                break
+            pos = text.find(part, starts[i + 1])
+        return found
+
+    @staticmethod
+    def _prefixes(value: str) -> set[str]:
+        """Préfixes de TUID désignés par `value` (hex avec ou sans 0x, décimal)."""
+        if not _NUMBER.fullmatch(value):
+            return set()
+        return {p for p in (value[2:] if value.startswith('0x') else value, value) if p}
+
+    def _tuid_prefix(self, value: str) -> set[int]:
+        """Slots dont le TUID (hex sur 16 chiffres, ou décimal) commence par `value`."""
+        keys = self._tuid_keys
+        found: set[int] = set()
+        for prefix in self._prefixes(value):
+            # Les clés qui commencent par `prefix` sont entre prefix et son successeur
+            end = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+            found.update(self._tuid_slots[bisect_left(keys, prefix):bisect_left(keys, end)])
+        return found
+
+    def _text(self, term: str) -> set[int]:
+        """Slots dont la ligne contient `term` ou dont le TUID commence par lui."""
+        parts = _WORD.findall(term)
+        if not parts:
+            found = {i for i, line in enumerate(self._blobs) if term in line}
+        else:
+            found = None
+            for part in sorted(set(parts), key=len, reverse=True):
+                slots = self._word_slots(part)
+                found = slots if found is None else found & slots
+                if not found:
+                    break
+            if parts != [term]:
+                found = {i for i in found if term in self._blobs[i]}
+        return found | self._tuid_prefix(term)
+
+    def _text_match(self, slot: int, term: str) -> bool:
+        """_text() pour un seul slot (filtre d'un petit ensemble de candidats)."""
+        if term in self._blobs[slot]:
+            return True
+        tuid = self._keys[slot][3]
+        return tuid is not None and any(text.startswith(prefix) for text in self._tuid_strings(tuid)
+                                        for prefix in self._prefixes(term))
+
+    @staticmethod
+    def _union(index: dict, keys) -> set[int]:
+        out: set[int] = set()
+        for k in keys:
+            out |= index.get(k, set())
+        return out
+
+    def _places(self, term: str) -> set[int]:
+        """Instances dont la région ou le dossier de zone contient `term` (texte libre)."""
+        out = self._union(self._by_region, [r for r in self._by_region if term in r])
+        return out | self._union(self._by_zone, [z for z in self._by_zone if not z.isdigit() and term in z])
+
+    def spatial(self) -> SpatialIndex:
+        """Grille des positions (clé: slot), construite au premier appel."""
+        if self._spatial is None:
+            self._spatial = SpatialIndex.build((slot, points) for slot, points in enumerate(self._points) if points)
+        return self._spatial
+
+    def item(self, slot: int) -> dict | None:
+        return self._items[slot] if 0 <= slot < len(self._items) else None
+
+    def points(self, slot: int) -> list:
+        """Positions monde indexées d'un slot (tous les points d'un path)."""
+        return self._points[slot] if 0 <= slot < len(self._points) else []
+
+    def slots(self, typ: str) -> set[int]:
+        return self._by_type.get(typ, set())
+
+    def _near(self, field: str, value: str, among: set[int] | None = None) -> set[int]:
+        """near:x,y,z,r (slots à distance <= r) ou knn:x,y,z,k (k slots les plus proches, parmi
+        `among` s'il est donné: candidats laissés par les autres termes, comme `main.py query`)."""
+        try:
+            x, y, z, n = (float(v) for v in value.split(','))
+        except ValueError:
+            return set()
+        if field == 'near':
+            return {slot for _d, slot, _p in self.spatial().radius((x, y, z), n)}
+        if among is None:
+            return {slot for _d, slot, _p in self.spatial().nearest((x, y, z), int(n))}
+        distances = []
+        for slot in among:
+            points = self._points[slot]
+            if points:
+                distances.append((min((px - x) ** 2 + (py - y) ** 2 + (pz - z) ** 2 for px, py, pz in points), slot))
+        return {slot for _d, slot in heapq.nsmallest(int(n), distances)}
+
+    def _field(self, field: str, value: str, among: set[int] | None = None) -> set[int]:
+        if field in ('near', 'knn'):
+            return self._near(field, value, among)
+        if field == 'name':
+            return {i for i in self._text(value) if value in self._names[i]}
+        if field == 'type':
+            if value in self._by_type:
+                return set(self._by_type[value])
+            return self._union(self._by_type, [t for t in self._by_type if t.startswith(value)])
+        if field == 'zone':
+            if value.isdigit():
+                return set(self._by_zone.get(str(int(value)), set()))
+            return self._union(self._by_zone, [z for z in self._by_zone if value in z])
+        if field == 'class':
+            class_id = _parse_number(value) if value[:1].isdigit() else None
+            if class_id is not None:
+                return set(self._by_class.get(class_id, set()))
+            names = load_class_enum()
+            return self._union(self._by_class, [cid for cid in self._by_class if value in names.get(cid, '').lower()])
+        # tuid
+        tuid = _parse_number(value)
+        if tuid is not None and tuid in self._by_tuid:
+            return set(self._by_tuid[tuid])
+        return self._tuid_prefix(value)
+
+    def search(self, query: str) -> list[dict] | None:
+        """Instances correspondant à la requête (ET de tous les termes), None si requête vide."""
+        terms = query.strip().lower().split()
+        if not terms:
+            return None
+        result: set[int] | None = None
+        # Champs qualifiés (dictionnaires) d'abord: le texte libre ne filtre ensuite que peu de slots;
+        # knn en dernier: il classe les candidats laissés par tous les autres termes
+        terms.sort(key=lambda t: (t.split(':', 1)[0] == 'knn', t.split(':', 1)[0] not in FIELDS))
+        for term in terms:
+            field, sep, value = term.partition(':')
+            if sep and field in FIELDS:
+                if not value:
+                    continue
+                slots = self._field(field, value, result)
+            elif result is not None and len(result) <= LINEAR_FILTER_MAX:
+                slots = {s for s in result if self._text_match(s, term)} | (result & self._places(term))
+            else:
+                slots = self._text(term) | self._places(term)
+            result = slots if result is None else result & slots
+            if not result:
+                return []
+        if result is None:
+            return None
+        return [self._items[s] for s in result]
@@ -0,0 +1,93 @@
+"""Registre des TUID du modèle d'instances de l'éditeur.
+
+TUID -> instance en O(1), tenu à jour par instance (chargement, écriture, ajout) au lieu d'être
+reconstruit à chaque rafraîchissement de l'arbre, et allocation de TUID libres par curseur:
+chaque appel reprend où le précédent s'est arrêté, un TUID alloué est réservé tant que
+l'instance qui le porte n'est pas enregistrée (deux allocations de suite ne rendent jamais le
+même TUID, ex. Clue + Volume lors d'une duplication).
+"""
+
+TUID_MAX = 0xFFFFFFFFFFFFFFFF
+
+
+def _to_int(value) -> int | None:
+    try:
+        return int(value, 0) if isinstance(value, str) else int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class TuidRegistry:
+    def __init__(self):
+        self._by_tuid: dict[int, dict] = {}
+        self._tuid_of: dict[int, int] = {}      # id(inst) -> TUID enregistré
+        self._items: dict[int, dict] = {}       # id(inst) -> inst (garde l'objet en vie)
+        self._reserved: set[int] = set()
+        self._cursor = 1
+
+    def __len__(self) -> int:
+        return len(self._by_tuid)
+
+    def get(self, tuid) -> dict | None:
+        t = _to_int(tuid)
+        return self._by_tuid.get(t) if t is not None else None
+
+    def __contains__(self, tuid) -> bool:
+        return self.get(tuid) is not None
+
+    def tuid_of(self, inst: dict) -> int | None:
+        """TUID sous lequel l'instance est enregistrée (avant une mise à jour: l'ancien)."""
+        return self._tuid_of.get(id(inst))
+
+    # Mise à jour
+    def sync(self, items: list[dict]) -> None:
+        """Aligne le registre sur un nouveau modèle (rechargement): seules les instances nouvelles
+        ou disparues sont traitées, les items réutilisés par le scan incrémental restent."""
+        current = {id(it): it for it in items}
+        for key in [k for k in self._items if k not in current]:
+            self._forget(key)
+        for key, it in current.items():
+            if key not in self._items:
+                self.update(it)
+
+    def update(self, inst: dict) -> None:
+        """(Ré)enregistre une instance (nouvelle, ou dont le TUID a pu changer)."""
+        key = id(inst)
+        tuid = _to_int(inst['data'].get('tuid'))
+        old = self._tuid_of.get(key)
+        if old is not None and old != tuid and self._by_tuid.get(old) is inst:
+            del self._by_tuid[old]
+        self._items[key] = inst
+        if tuid is None:
+            self._tuid_of.pop(key, None)
+            return
+        self._tuid_of[key] = tuid
+        self._by_tuid[tuid] = inst
+        self._reserved.discard(tuid)
+        if self._cursor <= tuid < TUID_MAX:
+            self._cursor = tuid + 1
+
+    def remove(self, inst: dict) -> None:
+        self._forget(id(inst))
+
+    def _forget(self, key: int) -> None:
+        inst = self._items.pop(key, None)
+        tuid = self._tuid_of.pop(key, None)
+        if tuid is not None and self._by_tuid.get(tuid) is inst:
+            del self._by_tuid[tuid]
+
+    # Allocation
+    def allocate(self) -> int:
+        """TUID libre (au-delà du plus grand vu, puis depuis 1 une fois TUID_MAX atteint), réservé
+        jusqu'à l'enregistrement de l'instance qui le porte. Jamais 0 ni TUID_MAX (valeur
+        « aucune instance » des références)."""
+        t = self._cursor
+        while True:
+            if t >= TUID_MAX or t < 1:
+                t = 1
+            if t not in self._by_tuid and t not in self._reserved:
+                break
+            t += 1
+        self._cursor = t + 1
+        self._reserved.add(t)
+        return t
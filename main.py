@@ -1,10 +1,39 @@
 # main.py
 import sys
 import os
-from extract.region_builder import extract_regions_from_dat
-from shared.utils import find_next_level_dir
+from shared import metrics
 
-def rebuild_dat_from_folder(source_dir, output_path):
+# Étapes de rebuild_dat_from_folder, dans l'ordre (rapportées au callback de progression)
+REBUILD_STEPS = ('names', 'mobys', 'controllers', 'paths', 'volumes', 'instance_types',
+                 'clues', 'areas', 'pods', 'scents', 'zones', 'assemble')
+
+
+def rebuild_dat_from_folder(source_dir, output_path, progress=None):
+    """Reconstruit un .dat depuis un dossier d'extraction (ou une base SQLite du projet, cf.
+    shared.project_store: mêmes collecteurs, lus dans la base).
+
+    progress(fait, total, étape): appelé au début de chaque étape de REBUILD_STEPS, puis pendant
+    l'écriture du fichier (fait fractionnaire dans la dernière étape). Une exception levée par le
+    callback (annulation) interrompt le rebuild: output_path peut alors être incomplet, écrire
+    dans un fichier temporaire si la sortie doit rester valide."""
+    total_steps = len(REBUILD_STEPS)
+
+    def step(name):
+        if progress is not None:
+            progress(REBUILD_STEPS.index(name), total_steps, name)
+
+    # Cache du dossier (.polaris-cache): seuls les JSON modifiés depuis le dernier rebuild ou
+    # la dernière ouverture dans l'éditeur sont analysés; ou base SQLite du projet
+    from shared import project_cache
+    project_cache.activate(source_dir)
+    try:
+        _rebuild_sections(source_dir, output_path, progress, step, total_steps)
+    finally:
+        project_cache.deactivate()
+
+
+def _rebuild_sections(source_dir, output_path, progress, step, total_steps):
+    """Corps de rebuild_dat_from_folder (cache du projet actif)."""
     from rebuild.mobys_rebuilder import rebuild_mobys_from_folder
     from rebuild.controllers_rebuilder import rebuild_controllers_from_folder
     from rebuild.names_registry import build_name_tables_section
@@ -16,161 +45,494 @@ def rebuild_dat_from_folder(source_dir, output_path):
     from rebuild.scents_rebuilder import rebuild_scents_from_folder
     from rebuild.zones_rebuilder import rebuild_zones_from_folder
     # TODO: Import other rebuilders
-    
     all_sections = {}
     # Réinitialiser l’agrégateur host/local
     from rebuild.classfiles_aggregator import reset, build_sections
     reset()
     
     # Name tables d'abord (communes)
-    name_sections, name_to_offset = build_name_tables_section(source_dir)
-    all_sections.update(name_sections)
+    step('names')
+    with metrics.span('names'):
+        name_sections, name_to_offset = build_name_tables_section(source_dir)
+        all_sections.update(name_sections)
 
     # Rebuild each type
-    all_sections.update(rebuild_mobys_from_folder(source_dir, name_to_offset))
-    all_sections.update(rebuild_controllers_from_folder(source_dir))
-    all_sections.update(rebuild_paths_from_folder(source_dir, name_to_offset))
+    step('mobys')
+    with metrics.span('mobys'):
+        all_sections.update(rebuild_mobys_from_folder(source_dir, name_to_offset))
+    step('controllers')
+    with metrics.span('controllers'):
+        all_sections.update(rebuild_controllers_from_folder(source_dir))
+    step('paths')
+    with metrics.span('paths'):
+        all_sections.update(rebuild_paths_from_folder(source_dir, name_to_offset))
 
     # Volumes (métadonnées + matrices)
-    vol_sections = rebuild_volumes_from_folder(source_dir, name_to_offset)
-    all_sections.update(vol_sections)
+    step('volumes')
+    with metrics.span('volumes'):
+        vol_sections = rebuild_volumes_from_folder(source_dir, name_to_offset)
+        all_sections.update(vol_sections)
 
-    # Mapping TUID Volume -> offset d'entrée, aligné au même ordre
-    from rebuild.volumes_rebuilder import compute_volume_meta_mapping
-    volume_meta_tuid_to_offset = compute_volume_meta_mapping(source_dir)
+        # Mapping TUID Volume -> offset d'entrée, aligné au même ordre
+        from rebuild.volumes_rebuilder import compute_volume_meta_mapping
+        volume_meta_tuid_to_offset = compute_volume_meta_mapping(source_dir)
 
     # Instance Types (0x00025022): construire une table GLOBALE couvrant toutes les références
-    from rebuild.instance_types_global import build_instance_types_global
-    inst_sections, inst_types_map = build_instance_types_global(source_dir)
-    all_sections.update(inst_sections)
+    step('instance_types')
+    with metrics.span('instance_types'):
+        from rebuild.instance_types_global import build_instance_types_global
+        inst_sections, inst_types_map = build_instance_types_global(source_dir)
+        all_sections.update(inst_sections)
 
     # Clues (metadata + info + subfiles) – utilisent 0x25022 global
-    all_sections.update(rebuild_clues_from_folder(source_dir, name_to_offset, inst_types_map))
+    step('clues')
+    with metrics.span('clues'):
+        all_sections.update(rebuild_clues_from_folder(source_dir, name_to_offset, inst_types_map))
 
     # Areas, Pods, Scents
-    all_sections.update(rebuild_areas_from_folder(source_dir, name_to_offset, inst_types_map))
-    all_sections.update(rebuild_pods_from_folder(source_dir, name_to_offset, inst_types_map))
-    all_sections.update(rebuild_scents_from_folder(source_dir, name_to_offset, inst_types_map))
+    step('areas')
+    with metrics.span('areas'):
+        all_sections.update(rebuild_areas_from_folder(source_dir, name_to_offset, inst_types_map))
+    step('pods')
+    with metrics.span('pods'):
+        all_sections.update(rebuild_pods_from_folder(source_dir, name_to_offset, inst_types_map))
+    step('scents')
+    with metrics.span('scents'):
+        all_sections.update(rebuild_scents_from_folder(source_dir, name_to_offset, inst_types_map))
 
     # Zones (metadata, offsets, counts) – on laisse les "Region" pour plus tard
-    all_sections.update(rebuild_zones_from_folder(source_dir))
+    step('zones')
+    with metrics.span('zones'):
+        all_sections.update(rebuild_zones_from_folder(source_dir))
     
     # Ajouter les sections host/local globales agrégées
     all_sections.update(build_sections())
 
     # Assemble
     from rebuild.sections_assembler import assemble_sections
-    assemble_sections(all_sections, output_path, version_major=1, version_minor=1)
+    step('assemble')
+    assemble_progress = None
+    if progress is not None:
+        def assemble_progress(done, total, label):
+            progress(total_steps - 1 + done / max(total, 1), total_steps, f"assemble/{label}")
+    with metrics.span('assemble'):
+        assemble_sections(all_sections, output_path, version_major=1, version_minor=1, progress=assemble_progress)
 
-def main():
+
+def _pop_option_value(argv, flag):
+    """Retire `flag <valeur>` de argv (modifié en place) et renvoie la valeur, ou None."""
+    if flag not in argv:
+        return None
+    i = argv.index(flag)
+    value = argv[i + 1] if i + 1 < len(argv) else None
+    del argv[i:i + 2]
+    return value
+
+
+def _pop_global_options(argv):
+    """Retire --metrics <out.json>, --memprofile <out.json> et --quiet de argv (modifié en place).
+    Retourne (metrics_path | None, memprofile_path | None, quiet)."""
+    metrics_path = _pop_option_value(argv, '--metrics')
+    memprofile_path = _pop_option_value(argv, '--memprofile')
+    quiet = '--quiet' in argv
+    while '--quiet' in argv:
+        argv.remove('--quiet')
+    return metrics_path, memprofile_path, quiet
+
+# --- Commandes ----------------------------------------------------------------
+# Chaque commande importe son sous-système à l'appel: `main.py mkheader` ou `main.py gui`
+# ne chargent pas les huit extracteurs, `main.py extract` ne charge pas les rebuilders.
+# args = sys.argv[2:] (la cible est args[0]).
+
+def _cmd_extract(args):
+    args = list(args)
+    store = _pop_option_value(args, '--store') or 'folder'
+    compact_paths = '--compact-paths' in args
+    short_floats = '--short-floats' in args
+    args = [a for a in args if a not in ('--compact-paths', '--short-floats')]
+    target = args[0]
+    if not os.path.isfile(target):
+        print(f"❌ Erreur: Le fichier {target} n'existe pas")
+        return
+    if store not in ('folder', 'sqlite'):
+        print(f"❌ Erreur: --store attend folder ou sqlite (reçu {store!r})")
+        return
+    if store == 'sqlite':
+        _extract_to_store(target, args[1] if len(args) > 1 else None, compact_paths, short_floats)
+        return
+    from extract.region_builder import extract_regions_from_dat
+
+    print(f"[INFO] Extraction complète...")
+
+    # Créer le dossier de sortie (nom du niveau optionnel, par défaut automatique)
+    if len(args) > 1:
+        output_dir = args[1]
+    else:
+        from shared.utils import find_next_level_dir
+        output_dir = find_next_level_dir()
+
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"[INFO] Dossier de sortie: {output_dir}")
+
+    # Extraction simple des régions
+    extract_regions_from_dat(target, output_dir, compact_paths=compact_paths, short_floats=short_floats)
+
+    print(f"✅ Extraction terminée dans {output_dir}")
+    print(f"📁 Structure: {output_dir}/default/[zones]")
+
+
+def _extract_to_store(target, output_path, compact_paths=False, short_floats=False):
+    """Extraction vers une base SQLite (shared.project_store): l'extraction habituelle dans un
+    dossier temporaire à côté de la sortie, importé dans la base puis supprimé."""
+    import shutil
+    import tempfile
+    from extract.region_builder import extract_regions_from_dat
+    from shared.project_store import import_folder
+
+    if output_path is None:
+        from shared.utils import find_next_level_dir
+        output_path = find_next_level_dir() + '.sqlite'
+    print(f"[INFO] Extraction complète...")
+    print(f"[INFO] Base de sortie: {output_path}")
+    tmp_dir = tempfile.mkdtemp(prefix='.polaris-extract-', dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        extract_regions_from_dat(target, tmp_dir, compact_paths=compact_paths, short_floats=short_floats)
+        with metrics.span('store'):
+            counts = import_folder(tmp_dir, output_path, source=os.path.basename(target))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    instances = sum(n for key, n in counts.items() if key not in ('subfiles', 'blobs', 'files'))
+    print(f"✅ Extraction terminée dans {output_path}")
+    print(f"📦 {instances} instances, {counts['subfiles']} subfiles ({counts['blobs']} distincts), "
+          f"{counts['files']} autres fichiers")
+
+
+def _cmd_repack(args):
+    target = args[0]
+    from shared.project_store import is_project_store
+    if not os.path.isdir(target) and not is_project_store(target):
+        print(f"❌ Erreur: Le dossier {target} n'existe pas")
+        return
+
+    print(f"[INFO] Repackage...")
+    print(f"[INFO] Source: {target}")
+
+    # Définir le fichier de sortie
+    default_name = os.path.splitext(os.path.basename(target))[0] if os.path.isfile(target) else os.path.basename(target)
+    output_path = args[1] if len(args) > 1 else f"{default_name}_rebuilt.dat"
+    print(f"[INFO] Fichier de sortie: {output_path}")
+
+    rebuild_dat_from_folder(target, output_path)
+
+    print(f"✅ Repackage terminé dans {output_path}")
+
+
+def _cmd_mkheader(args):
+    # Créer un fichier IGHW vide (juste l'entête)
+    from rebuild.ighw_header import write_empty_ighw_file
+    output_path = args[0]
+    version_major = int(args[1]) if len(args) > 1 else 1
+    version_minor = int(args[2]) if len(args) > 2 else 0
+    write_empty_ighw_file(output_path, version_major=version_major, version_minor=version_minor)
+    print(f"✅ En-tête IGHW écrit dans {output_path} (v{version_major}.{version_minor})")
+
+
+def _cmd_genlua(args):
+    # Génère un fichier instances.lua depuis un dossier d'extraction
+    extraction_dir = args[0]
+    if not os.path.isdir(extraction_dir):
+        print(f"❌ Erreur: Le dossier {extraction_dir} n'existe pas")
+        return
+    out_path = args[1] if len(args) > 1 else None
+    from tools.generate_instances_lua import generate_instances_lua
+    produced = generate_instances_lua(extraction_dir, out_path)
+    print(f"✅ instances.lua généré: {produced}")
+
+
+def _cmd_genhandles(args):
+    # Génère un fichier instance.lua (variables + handle:new(a,b,c,d))
+    extraction_dir = args[0]
+    if not os.path.isdir(extraction_dir):
+        print(f"❌ Erreur: Le dossier {extraction_dir} n'existe pas")
+        return
+    out_path = args[1] if len(args) > 1 else None
+    from tools.generate_instance_handles_lua import generate_instance_handles_lua
+    produced = generate_instance_handles_lua(extraction_dir, out_path)
+    print(f"✅ instance.lua généré: {produced}")
+
+
+def _cmd_gensynth(args):
+    # Génère un niveau synthétique déterministe (aucun fichier réel requis)
+    from tools.generate_synthetic_level import main as gensynth_main
+    gensynth_main(args)
+
+
+def _cmd_bench(args):
+    # Benchmark extract/repack/compare/GUI sur des niveaux synthétiques
+    from tools.bench_scaling import main as bench_main
+    bench_main(args)
+
+
+def _cmd_membudget(args):
+    # Vérifie les budgets mémoire par phase sur un niveau synthétique (code de sortie 1 si dépassé)
+    from tools.check_memory_budget import main as membudget_main
+    membudget_main(args)
+
+
+def _cmd_startup(args):
+    # Vérifie le budget de temps d'import au démarrage de la CLI (python -X importtime)
+    from tools.check_startup_time import main as startup_main
+    startup_main(args)
+
+
+def _cmd_batch(args):
+    # extract/repack/verify sur tout un corpus de niveaux (pool de processus, résumé unique)
+    from tools.batch_levels import main as batch_main
+    batch_main(args)
+
+
+def _cmd_refs(args):
+    # Index des TUID d'un niveau: qui référence un TUID, ou liste des références cassées
+    target = args[0]
+    if not os.path.exists(target):
+        print(f"❌ Erreur: {target} n'existe pas")
+        return
+    from shared.tuid_index import TuidIndex
+    if os.path.isdir(target):
+        index = TuidIndex.from_folder(target)
+    else:
+        from shared.dat_index import DatIndex
+        with open(target, 'rb') as f:
+            index = TuidIndex.from_dat(f.read(), dat_index=DatIndex.load(target))
+    print(f"[INFO] {len(index)} instances, {index.reference_count} références, {len(index.dangling)} cassée(s)")
+    if len(args) > 1:
+        try:
+            tuid = int(args[1], 0)
+        except ValueError:
+            tuid = int(args[1], 16)
+        entry = index.get(tuid)
+        if entry is None:
+            print(f"❌ TUID 0x{tuid:016X} absent du niveau")
+            return
+        referrers = index.referrers(tuid)
+        print(f"{entry.name} ({entry.type}, zone {entry.zone}, index {entry.index}): {len(referrers)} référent(s)")
+        for ref, kind in referrers:
+            print(f"  ← {ref.name} ({ref.type}, 0x{ref.tuid:016X}) [{kind}]")
+        return
+    for ref, tuid, kind in index.dangling_references():
+        print(f"  ⚠️  {ref.name} ({ref.type}, 0x{ref.tuid:016X}) → 0x{tuid:016X} [{kind}] introuvable")
+
+
+def _cmd_index(args):
+    # Crée ou met à jour le sidecar <file.dat>.polaris-idx (index lu par query, extract, refs, gui)
+    target = args[0]
+    if not os.path.isfile(target):
+        print(f"❌ Erreur: Le fichier {target} n'existe pas")
+        return
+    import time
+    from shared.dat_index import DatIndex
+    t0 = time.perf_counter()
+    index, cached = DatIndex.for_file(target)
+    elapsed = (time.perf_counter() - t0) * 1000
+    state = f"valide, chargé en {elapsed:.1f} ms" if cached else f"construit en {elapsed:.0f} ms"
+    print(f"[INFO] {DatIndex.sidecar_path(target)}: {state}")
+    print(f"  {len(index)} instances, {len(index.sections)} sections, {index.subfile_count} subfiles, "
+          f"{len(index.pointer_table[1])} pointeurs")
+
+
+def _cmd_query(args):
+    # Filtre les instances d'un .dat sans extraction; une ligne JSON par instance sur stdout
+    # --limit <n>: s'arrêter après n résultats; --count: seulement le nombre; --no-cache: pas de sidecar
+    limit = _pop_option_value(args, '--limit')
+    count_only = '--count' in args
+    persist = '--no-cache' not in args
+    args = [a for a in args if a not in ('--count', '--no-cache')]
+    target = args[0]
+    if not os.path.isfile(target):
+        print(f"❌ Erreur: Le fichier {target} n'existe pas")
+        return
+    import json
+    import mmap
+    import time
+    from shared.dat_index import DatIndex
+    from shared.dat_query import Query, QueryError, run_query
+    try:
+        query = Query(' '.join(args[1:]))
+    except QueryError as e:
+        print(f"❌ Requête invalide: {e}", file=sys.stderr)
+        return
+    t0 = time.perf_counter()
+    with open(target, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if persist:
+            index, cached = DatIndex.for_file(target, data)
+        else:
+            index, cached = DatIndex.build(data), False
+        t1 = time.perf_counter()
+        n = 0
+        for record in run_query(data, query, index, limit=int(limit) if limit else None):
+            if not count_only:
+                sys.stdout.write(json.dumps(record, ensure_ascii=False) + '\n')
+            n += 1
+    if count_only:
+        print(n)
+    source = 'sidecar' if cached else 'construit'
+    print(f"[INFO] {n} résultat(s) — index {source} en {(t1 - t0) * 1000:.0f} ms, "
+          f"requête {(time.perf_counter() - t1) * 1000:.0f} ms", file=sys.stderr)
+
+
+def _cmd_volumes(args):
+    # Couverture des volumes d'un .dat: mobys, controllers et points de paths contenus par chaque
+    # volume (boîtes orientées + BVH, shared.volume_index); --overlaps: paires qui se chevauchent
+    overlaps = '--overlaps' in args
+    args = [a for a in args if a != '--overlaps']
+    target = args[0]
+    if not os.path.isfile(target):
+        print(f"❌ Erreur: Le fichier {target} n'existe pas")
+        return
+    import mmap
+    import time
+    from shared.dat_index import DatIndex
+    from shared.dat_query import DatColumns
+    from shared.volume_index import VolumeIndex
+    t0 = time.perf_counter()
+    with open(target, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        index, _cached = DatIndex.for_file(target, data)
+        volumes = VolumeIndex.from_dat(data, index)
+        columns = DatColumns(data, index)
+        kinds, points = [], []
+        for typ in ('moby', 'controller', 'path'):
+            for i in range(index.counts.get(typ, 0)):
+                for point in columns.positions(typ, i):
+                    kinds.append(typ)
+                    points.append(point)
+    hits = volumes.containing(points)
+    pairs = volumes.overlaps() if overlaps else []
+    elapsed = (time.perf_counter() - t0) * 1000
+    counts = {slot: {'moby': 0, 'controller': 0, 'path': 0} for slot in volumes.keys}
+    for typ, found in zip(kinds, hits):
+        for slot in found:
+            counts[slot][typ] += 1
+    empty = 0
+    for slot in volumes.keys:
+        c = counts[slot]
+        if not any(c.values()):
+            empty += 1
+        print(f"  {index.names[slot]} (0x{index.tuids[slot]:016X}): {c['moby']} mobys, "
+              f"{c['controller']} controllers, {c['path']} points de paths")
+    for a, b in pairs:
+        print(f"  ⧉ {index.names[a]} ∩ {index.names[b]}")
+    inside = sum(1 for found in hits if found)
+    print(f"[INFO] {len(volumes)} volumes ({empty} vides), {inside}/{len(points)} positions dans au moins un volume"
+          + (f", {len(pairs)} chevauchement(s)" if overlaps else "") + f" — {elapsed:.0f} ms")
+
+
+def _cmd_gui(args):
+    # Lance une GUI minimale pour éditer rapidement les instances (dossier d'extraction ou .dat direct)
+    # --ui-trace <trace.json>: chronomètre les callbacks Tk (fenêtre des pires, trace Chrome à la fermeture)
+    ui_trace = _pop_option_value(args, '--ui-trace')
+    slow_ms = _pop_option_value(args, '--ui-slow-ms')
+    initial_path = args[0] if args and os.path.exists(args[0]) else None
+    from gui.editor import launch
+    launch(initial_path, ui_trace=ui_trace, slow_ms=float(slow_ms) if slow_ms else None)
+
+
+COMMANDS = {
+    'extract': _cmd_extract,
+    'repack': _cmd_repack,
+    'mkheader': _cmd_mkheader,
+    'genlua': _cmd_genlua,
+    'genhandles': _cmd_genhandles,
+    'gensynth': _cmd_gensynth,
+    'bench': _cmd_bench,
+    'membudget': _cmd_membudget,
+    'startup': _cmd_startup,
+    'batch': _cmd_batch,
+    'refs': _cmd_refs,
+    'index': _cmd_index,
+    'query': _cmd_query,
+    'volumes': _cmd_volumes,
+    'gui': _cmd_gui,
+}
+
+# Commandes utilisables sans cible (arguments tous optionnels)
+NO_TARGET_COMMANDS = {'bench', 'membudget', 'startup'}
+
+
+def _print_usage():
+    print("Usage: python main.py <extract|repack|mkheader> <path_to_gpprius.dat or folder|output_file> [output_dir] [--metrics out.json] [--memprofile mem.json] [--quiet]")
+    print("Exemples:")
+    print("  python main.py extract gp_prius.dat")
+    print("  python main.py extract gp_prius.dat my_level")
+    print("  python main.py extract gp_prius.dat gp_prius2")
+    print("  python main.py extract gp_prius.dat gp_prius.sqlite --store sqlite")
+    print("  python main.py extract gp_prius.dat my_level --compact-paths --short-floats")
+    print("  python main.py repack gp_prius.sqlite gp_prius_rebuilt.dat")
+    print("  python main.py mkheader empty.dat")
+    print("  python main.py gensynth synthetic.dat 100000 --seed 1")
+    print("  python main.py bench 1000,10000 --out bench_results.json")
+    print("  python main.py startup --runs 5")
+    print("  python main.py batch extract 'build/**/gp_prius.dat' --out levels --jobs 8")
+    print("  python main.py refs gp_prius.dat 0x0123456789ABCDEF")
+    print("  python main.py index gp_prius.dat")
+    print("  python main.py query gp_prius.dat \"type:moby class:Crate zone:3\" --limit 20")
+    print("  python main.py query gp_prius.dat \"type:moby knn:120,4.5,-30,10\"")
+    print("  python main.py volumes gp_prius.dat --overlaps")
+    print("  python main.py gui gp_prius.dat --ui-trace ui_trace.json --ui-slow-ms 50")
+
+
+def _main():
     # Support drag-and-drop: if only one argument (the file path), assume extraction
     if len(sys.argv) == 2 and os.path.isfile(sys.argv[1]):
         dat_path = sys.argv[1]
         print(f"[INFO] Fichier détecté via drag-and-drop: {dat_path}")
-        
+
         # Utiliser un nom de dossier automatique basé sur le nom du fichier
+        from shared.utils import find_next_level_dir
+        from extract.region_builder import extract_regions_from_dat
         output_dir = find_next_level_dir()
         os.makedirs(output_dir, exist_ok=True)
-        
+
         # Extraction simple des régions
         extract_regions_from_dat(dat_path, output_dir)
         return
-    
-    if len(sys.argv) < 3:
-        print("Usage: python main.py <extract|repack|mkheader> <path_to_gpprius.dat or folder|output_file> [output_dir]")
-        print("Exemples:")
-        print("  python main.py extract gp_prius.dat")
-        print("  python main.py extract gp_prius.dat my_level")
-        print("  python main.py extract gp_prius.dat gp_prius2")
-        print("  python main.py mkheader empty.dat")
-        return
-    
-    command = sys.argv[1].lower()
-    target = sys.argv[2]
-    
-    # Nom du niveau (optionnel, par défaut automatique)
-    level_name = sys.argv[3] if len(sys.argv) > 3 else None
-    
-    if command == "extract":
-        if not os.path.isfile(target):
-            print(f"❌ Erreur: Le fichier {target} n'existe pas")
-            return
-        
-        print(f"[INFO] Extraction complète...")
-        
-        # Créer le dossier de sortie
-        if level_name:
-            output_dir = level_name
-        else:
-            output_dir = find_next_level_dir()
-        
-        os.makedirs(output_dir, exist_ok=True)
-        print(f"[INFO] Dossier de sortie: {output_dir}")
-        
-        # Extraction simple des régions
-        extract_regions_from_dat(target, output_dir)
-        
-        print(f"✅ Extraction terminée dans {output_dir}")
-        print(f"📁 Structure: {output_dir}/default/[zones]")
-        
-    elif command == "repack":
-        if not os.path.isdir(target):
-            print(f"❌ Erreur: Le dossier {target} n'existe pas")
-            return
-        
-        print(f"[INFO] Repackage...")
-        print(f"[INFO] Dossier source: {target}")
-        
-        # Définir le fichier de sortie
-        output_path = sys.argv[3] if len(sys.argv) > 3 else f"{os.path.basename(target)}_rebuilt.dat"
-        print(f"[INFO] Fichier de sortie: {output_path}")
-        
-        # Appel à la fonction de rebuild (à implémenter)
-        rebuild_dat_from_folder(target, output_path)
-        
-        print(f"✅ Repackage terminé dans {output_path}")
-    
-    elif command == "mkheader":
-        # Créer un fichier IGHW vide (juste l'entête)
-        from rebuild.ighw_header import write_empty_ighw_file
-        output_path = target
-        version_major = int(sys.argv[3]) if len(sys.argv) > 3 else 1
-        version_minor = int(sys.argv[4]) if len(sys.argv) > 4 else 0
-        write_empty_ighw_file(output_path, version_major=version_major, version_minor=version_minor)
-        print(f"✅ En-tête IGHW écrit dans {output_path} (v{version_major}.{version_minor})")
-        
-    elif command == "genlua":
-        # Génère un fichier instances.lua depuis un dossier d'extraction
-        extraction_dir = target
-        if not os.path.isdir(extraction_dir):
-            print(f"❌ Erreur: Le dossier {extraction_dir} n'existe pas")
-            return
-        out_path = sys.argv[3] if len(sys.argv) > 3 else None
-        from tools.generate_instances_lua import generate_instances_lua
-        produced = generate_instances_lua(extraction_dir, out_path)
-        print(f"✅ instances.lua généré: {produced}")
-
-    elif command == "genhandles":
-        # Génère un fichier instance.lua (variables + handle:new(a,b,c,d))
-        extraction_dir = target
-        if not os.path.isdir(extraction_dir):
-            print(f"❌ Erreur: Le dossier {extraction_dir} n'existe pas")
-            return
-        out_path = sys.argv[3] if len(sys.argv) > 3 else None
-        from tools.generate_instance_handles_lua import generate_instance_handles_lua
-        produced = generate_instance_handles_lua(extraction_dir, out_path)
-        print(f"✅ instance.lua généré: {produced}")
 
-    elif command == "gui":
-        # Lance une GUI minimale pour éditer rapidement les instances JSON
-        initial_dir = target if os.path.isdir(target) else None
-        from gui.editor import launch
-        launch(initial_dir)
+    command = sys.argv[1].lower() if len(sys.argv) > 1 else ''
+    if len(sys.argv) < 3 and command not in NO_TARGET_COMMANDS:
+        _print_usage()
+        return
 
-    else:
+    handler = COMMANDS.get(command)
+    if handler is None:
         print(f"❌ Commande inconnue: {command}")
-        print("Commandes disponibles: extract, repack, mkheader, genlua, genhandles, gui")
+        print(f"Commandes disponibles: {', '.join(COMMANDS)}")
+        return
+    handler(sys.argv[2:])
+
+
+def main():
+    metrics_path, memprofile_path, quiet = _pop_global_options(sys.argv)
+    metrics.reset()
+    metrics.set_quiet(quiet)
+    command = sys.argv[1].lower() if len(sys.argv) > 1 else ''
+    if memprofile_path:
+        from shared import memprofile
+        memprofile.start()
+    try:
+        with metrics.span(command or 'main'):
+            _main()
+    finally:
+        if memprofile_path:
+            import json
+            mem = memprofile.stop()
+            with open(memprofile_path, 'w', encoding='utf-8') as f:
+                json.dump(dict(command=command, args=sys.argv[2:], **mem), f, indent=2, ensure_ascii=False)
+            print(memprofile.format_summary(mem))
+            print(f"🧠 Profil mémoire écrit dans {memprofile_path}")
+    if metrics_path:
+        metrics.write_metrics(metrics_path, command=command, args=sys.argv[2:])
+        print(metrics.format_summary())
+        print(f"📊 Métriques écrites dans {metrics_path}")
+
 
 if __name__ == "__main__":
-    print("[LOG] Lancement du script principal...")
     main()
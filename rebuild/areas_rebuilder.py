@@ -1,9 +1,9 @@
-import json
 import os
 import struct
 from typing import Dict, Any, List, Tuple
 
 from shared.constants import AREA_METADATA_ID, AREA_DATA_ID, AREA_OFFSETS_ID, NAME_TABLES_ID
+from shared.project_cache import load_json, walk
 from rebuild.instance_types_collector import collect_instance_types_for_groups
 
 
@@ -11,7 +11,7 @@ def _collect_areas(source_dir: str) -> List[dict]:
     areas: List[dict] = []
     # Collecter tous les fichiers dans un ordre déterministe
     all_files = []
-    for root, _dirs, files in os.walk(source_dir):
+    for root, _dirs, files in walk(source_dir):
         for fn in files:
             all_files.append((root, fn))
     
@@ -22,8 +22,7 @@ def _collect_areas(source_dir: str) -> List[dict]:
             if fn.endswith('.area.json'):
                 p = os.path.join(root, fn)
                 try:
-                    with open(p, 'r', encoding='utf-8') as f:
-                        areas.append(json.load(f))
+                    areas.append(load_json(p))
                 except Exception:
                     pass
     # Préserver l'ordre original - ne pas trier
@@ -102,10 +101,15 @@ def _build_area_offsets_and_data(areas: List[dict], inst_types_map: Dict[int, in
 
 def rebuild_areas_from_folder(source_dir: str, name_to_offset: Dict[str, int], inst_types_map: Dict[int, int] | None = None) -> Dict[int, Dict[str, Any]]:
     areas = _collect_areas(source_dir)
-    meta_blob = _build_area_metadata(areas, name_to_offset)
     # Utiliser le mapping fourni, sinon construire minimalement
     if inst_types_map is None:
         _sections, inst_types_map = collect_instance_types_for_groups(source_dir)
+    return build_area_sections(areas, name_to_offset, inst_types_map)
+
+
+def build_area_sections(areas: List[dict], name_to_offset: Dict[str, int], inst_types_map: Dict[int, int]) -> Dict[int, Dict[str, Any]]:
+    """Construit les sections AREA_* depuis une liste d'instances (ordre conservé)."""
+    meta_blob = _build_area_metadata(areas, name_to_offset)
     offsets_blob, data_blob, data_patches, offsets_patches = _build_area_offsets_and_data(areas, inst_types_map)
 
     sections: Dict[int, Dict[str, Any]] = {}
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 import hashlib
+import os
 
+from shared import metrics, project_cache
 from shared.constants import HOST_CLASS_ID, LOCAL_CLASS_ID
 
 
@@ -10,13 +12,18 @@ _host_blob = bytearray()
 _local_blob = bytearray()
 _host_index: Dict[bytes, int] = {}
 _local_index: Dict[bytes, int] = {}
+# Dernier subfile local lu par find_class_subfile et son SHA-1 connu du cache du projet
+# (register_local ne le recalcule pas si on lui repasse ces mêmes octets)
+_last_local: Tuple[bytes, bytes] | None = None
 
 
 def reset() -> None:
+    global _last_local
     _host_blob.clear()
     _local_blob.clear()
     _host_index.clear()
     _local_index.clear()
+    _last_local = None
 
 
 def register_host(data: bytes | bytearray) -> int:
@@ -32,7 +39,10 @@ def register_local(data: bytes | bytearray) -> int:
     # Déduplication par empreinte SHA-1 (comme l'original)
     if not isinstance(data, (bytes, bytearray)):
         raise TypeError("register_local attend bytes ou bytearray")
-    digest = hashlib.sha1(bytes(data)).digest()
+    if _last_local is not None and _last_local[0] is data:
+        digest = _last_local[1]
+    else:
+        digest = hashlib.sha1(bytes(data)).digest()
     if digest in _local_index:
         return _local_index[digest]
     offset = len(_local_blob)
@@ -41,6 +51,33 @@ def register_local(data: bytes | bytearray) -> int:
     return offset
 
 
+def find_class_subfile(base_dir: str | None, sname: str) -> Tuple[str, bytes] | None:
+    """Cherche <sname>_CLASS.host.dat puis <sname>_CLASS.local.dat dans base_dir.
+    Retourne (kind, data) avec kind 'host' ou 'local' (host prioritaire), ou None."""
+    global _last_local
+    if not base_dir:
+        return None
+    cache = project_cache.active()
+    for kind in ('host', 'local'):
+        path = os.path.join(base_dir, f"{sname}_CLASS.{kind}.dat")
+        if project_cache.isfile(path):
+            if kind == 'local' and cache is not None and cache.covers(path):
+                data, digest = cache.read_subfile(path)
+                _last_local = (data, digest)
+            else:
+                data = project_cache.read_bytes(path)
+            metrics.count('bytes_read', len(data))
+            return kind, data
+    return None
+
+
+def register_class_subfile(kind: str, data: bytes | bytearray) -> Tuple[int, int]:
+    """Enregistre un subfile dans le blob host ou local; retourne (section_id, offset relatif)."""
+    if kind == 'host':
+        return HOST_CLASS_ID, register_host(data)
+    return LOCAL_CLASS_ID, register_local(data)
+
+
 def build_sections() -> Dict[int, Dict[str, Any]]:
     sections: Dict[int, Dict[str, Any]] = {}
     if len(_host_blob) > 0:
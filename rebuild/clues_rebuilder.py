@@ -1,18 +1,19 @@
-import json
 import os
 import struct
-from typing import Dict, Any, List
+from typing import Callable, Dict, Any, List, Tuple
 
-from shared.constants import CLUE_INFO_ID, CLUE_METADATA_ID, VOLUME_METADATA_ID, NAME_TABLES_ID, HOST_CLASS_ID, LOCAL_CLASS_ID, INSTANCE_TYPES_ID
+from shared import metrics
+from shared.constants import CLUE_INFO_ID, CLUE_METADATA_ID, VOLUME_METADATA_ID, NAME_TABLES_ID, INSTANCE_TYPES_ID
+from shared.project_cache import load_json, walk
 from shared.utils import sanitize_name
-from rebuild.classfiles_aggregator import register_host, register_local
+from rebuild.classfiles_aggregator import find_class_subfile, register_class_subfile
 
 
 def _collect_clues(source_dir: str) -> List[dict]:
     clues: List[dict] = []
     # Collecter tous les fichiers dans un ordre déterministe
     all_files = []
-    for root, _dirs, files in os.walk(source_dir):
+    for root, _dirs, files in walk(source_dir):
         for fn in files:
             all_files.append((root, fn))
     
@@ -23,10 +24,9 @@ def _collect_clues(source_dir: str) -> List[dict]:
             if fn.endswith('.clue.json'):
                 p = os.path.join(root, fn)
                 try:
-                    with open(p, 'r', encoding='utf-8') as f:
-                        obj = json.load(f)
-                        obj['__base_dir__'] = root
-                        clues.append(obj)
+                    obj = load_json(p)
+                    obj['__base_dir__'] = root
+                    clues.append(obj)
                 except Exception:
                     pass
     # Tri par zone ascendante puis TUID pour matcher la structuration par zone
@@ -56,8 +56,7 @@ def _build_clue_metadata(clues: List[dict], name_to_offset: Dict[str, int]) -> b
 def _build_clue_info(
     clues: List[dict],
     per_clue_inst_type_rel: List[int | None],
-    host_blob: bytearray,
-    local_blob: bytearray,
+    subfile_lookup: Callable[[str | None, str], Tuple[str, bytes] | None] = find_class_subfile,
 ) -> tuple[bytes, List[dict]]:
     blob = bytearray()
     patches: List[dict] = []
@@ -78,32 +77,12 @@ def _build_clue_info(
         chosen_section = None
         chosen_rel = 0
         # host/local exclusifs, comme pour moby/controllers
-        base_dir = inst.get('__base_dir__')  # optionnel si on veut la source exacte
-        # Fallback: on cherchera plus haut pendant l'assemblage si base_dir absent
-
-        # Ces chemins seront renseignés par l'appelant si besoin; ici on ne dépend pas du base_dir
-        # Cette implémentation suppose que les .clue.json sont dans le même dossier que les subfiles
-        # Essai: recherche locale
         # Ne rechercher les subfiles que dans le dossier source de l'instance
-        for search_dir in [inst.get('__base_dir__')]:
-            if not search_dir:
-                continue
-            host_path = os.path.join(search_dir, f"{sname}_CLASS.host.dat")
-            local_path = os.path.join(search_dir, f"{sname}_CLASS.local.dat")
-            if os.path.isfile(host_path):
-                with open(host_path, 'rb') as f:
-                    data = f.read()
-                chosen_section = HOST_CLASS_ID
-                chosen_rel = register_host(data)
-                sub_len = len(data)
-                break
-            if os.path.isfile(local_path):
-                with open(local_path, 'rb') as f:
-                    data = f.read()
-                chosen_section = LOCAL_CLASS_ID
-                chosen_rel = register_local(data)
-                sub_len = len(data)
-                break
+        found = subfile_lookup(inst.get('__base_dir__'), sname)
+        if found is not None:
+            kind, data = found
+            chosen_section, chosen_rel = register_class_subfile(kind, data)
+            sub_len = len(data)
 
         struct.pack_into('>I', buf, 4, 0)  # subfile_offset patché
         struct.pack_into('>I', buf, 8, sub_len & 0xFFFFFFFF)
@@ -129,7 +108,7 @@ def _build_clue_info(
             except Exception:
                 vprint = str(inst.get('volume_tuid'))
             try:
-                print(f"[WARN] CLUE volume_tuid {vprint} absent de 0x25022 – pointeur restera 0")
+                metrics.log_item(f"[WARN] CLUE volume_tuid {vprint} absent de 0x25022 – pointeur restera 0")
             except Exception:
                 pass
         if chosen_section is not None and sub_len > 0:
@@ -148,8 +127,16 @@ def rebuild_clues_from_folder(
     name_to_offset: Dict[str, int],
     inst_types_map: Dict[int, int],
 ) -> Dict[int, Dict[str, Any]]:
-    clues = _collect_clues(source_dir)
+    return build_clue_sections(_collect_clues(source_dir), name_to_offset, inst_types_map)
+
 
+def build_clue_sections(
+    clues: List[dict],
+    name_to_offset: Dict[str, int],
+    inst_types_map: Dict[int, int],
+    subfile_lookup: Callable[[str | None, str], Tuple[str, bytes] | None] = find_class_subfile,
+) -> Dict[int, Dict[str, Any]]:
+    """Construit CLUE_METADATA_ID et CLUE_INFO_ID depuis des clues déjà triés (zone, TUID)."""
     meta_blob = _build_clue_metadata(clues, name_to_offset)
 
     # Utiliser le mapping global 0x25022 fourni (incluant Clue TUID et Volume TUID)
@@ -165,13 +152,10 @@ def rebuild_clues_from_folder(
         else:
             per_clue_inst_type_rel.append(inst_types_map.get(vol_tuid & 0xFFFFFFFFFFFFFFFF))
 
-    host_blob = bytearray()
-    local_blob = bytearray()
     info_blob, info_patches = _build_clue_info(
         clues,
         per_clue_inst_type_rel,
-        host_blob,
-        local_blob,
+        subfile_lookup,
     )
 
     sections: Dict[int, Dict[str, Any]] = {
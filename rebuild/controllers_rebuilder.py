@@ -1,24 +1,23 @@
-import json
 import os
 import struct
-from typing import Dict, Any, List, Tuple
+from typing import Callable, Dict, Any, List, Tuple
 
 from shared.constants import (
-    CONTROLLER_DATA_ID, CONTROLLER_METADATA_ID, HOST_CLASS_ID, LOCAL_CLASS_ID, NAME_TABLES_ID
+    CONTROLLER_DATA_ID, CONTROLLER_METADATA_ID, NAME_TABLES_ID
 )
+from shared.project_cache import load_json, walk
 from shared.utils import sanitize_name
-from rebuild.classfiles_aggregator import register_host, register_local
+from rebuild.classfiles_aggregator import find_class_subfile, register_class_subfile
 
 
 def _collect_controllers(source_dir: str) -> List[Tuple[dict, str]]:
     results: List[Tuple[dict, str]] = []
-    for root, _dirs, files in os.walk(source_dir):
+    for root, _dirs, files in walk(source_dir):
         for fn in files:
             if fn.endswith('.controller.json'):
                 p = os.path.join(root, fn)
                 try:
-                    with open(p, 'r', encoding='utf-8') as f:
-                        results.append((json.load(f), root))
+                    results.append((load_json(p), root))
                 except Exception:
                     pass
     return results
@@ -52,7 +51,10 @@ def _build_controller_metadata(controllers: List[dict], name_to_offset: Dict[str
     return bytes(blob)
 
 
-def _build_controller_data_and_patches(collected: List[Tuple[dict, str]]) -> tuple[bytes, List[dict], bytes, bytes]:
+def _build_controller_data_and_patches(
+    collected: List[Tuple[dict, str | None]],
+    subfile_lookup: Callable[[str | None, str], Tuple[str, bytes] | None] = find_class_subfile,
+) -> tuple[bytes, List[dict]]:
     data_blob = bytearray()
     patches: List[dict] = []
     # agrégation centrale
@@ -64,23 +66,14 @@ def _build_controller_data_and_patches(collected: List[Tuple[dict, str]]) -> tup
         # Subfile
         name = inst.get('name') or f"Controller_{idx+1}"
         sname = sanitize_name(name)
-        host_path = os.path.join(base_dir, f"{sname}_CLASS.host.dat")
-        local_path = os.path.join(base_dir, f"{sname}_CLASS.local.dat")
 
         chosen_section = None
         chosen_rel = 0
         sub_len = 0
-        if os.path.isfile(host_path):
-            with open(host_path, 'rb') as f:
-                d = f.read()
-            chosen_section = HOST_CLASS_ID
-            chosen_rel = register_host(d)
-            sub_len = len(d)
-        elif os.path.isfile(local_path):
-            with open(local_path, 'rb') as f:
-                d = f.read()
-            chosen_section = LOCAL_CLASS_ID
-            chosen_rel = register_local(d)
+        found = subfile_lookup(base_dir, sname)
+        if found is not None:
+            kind, d = found
+            chosen_section, chosen_rel = register_class_subfile(kind, d)
             sub_len = len(d)
 
         # Offsets: patchés plus tard
@@ -128,22 +121,37 @@ def _build_controller_data_and_patches(collected: List[Tuple[dict, str]]) -> tup
     return bytes(data_blob), patches
 
 
-def rebuild_controllers_from_folder(source_dir: str) -> Dict[int, Dict[str, Any]]:
+def rebuild_controllers_from_folder(source_dir: str, name_to_offset: Dict[str, int] | None = None) -> Dict[int, Dict[str, Any]]:
     collected = _collect_controllers(source_dir)
     # Tri: zone index puis TUID puis nom
     collected.sort(key=lambda t: (int(t[0].get('zone', 0)), int(t[0].get('tuid', 0))))
-    instances = [inst for inst, _ in collected]
 
-    # Reutiliser/étendre la section des noms depuis le dossier (commune à tout le fichier)
-    # Ici on ne l'écrit pas, c'est géré globalement par le premier rebuilder qui la produit
-    # mais on a besoin de name_to_offset pour patcher/écrire les metadata.
-    # On reconstruit localement la map (sans ajouter la section dupliquée si déjà présente).
-    from rebuild.names_registry import collect_names_from_folder
-    names = collect_names_from_folder(source_dir)
-    name_to_offset = {n: sum(len(x.encode('utf-8')) + 1 for x in names[:i]) for i, n in enumerate(names)}
+    if name_to_offset is None:
+        # Reutiliser/étendre la section des noms depuis le dossier (commune à tout le fichier)
+        # Ici on ne l'écrit pas, c'est géré globalement par le premier rebuilder qui la produit
+        # mais on a besoin de name_to_offset pour patcher/écrire les metadata.
+        # On reconstruit localement la map (sans ajouter la section dupliquée si déjà présente).
+        # Comme historiquement, un nom en double pointe vers sa dernière occurrence.
+        from rebuild.names_registry import collect_names_from_folder
+        name_to_offset = {}
+        current = 0
+        for n in collect_names_from_folder(source_dir):
+            name_to_offset[n] = current
+            current += len(n.encode('utf-8')) + 1
+
+    return build_controller_sections(collected, name_to_offset)
+
+
+def build_controller_sections(
+    collected: List[Tuple[dict, str | None]],
+    name_to_offset: Dict[str, int],
+    subfile_lookup: Callable[[str | None, str], Tuple[str, bytes] | None] = find_class_subfile,
+) -> Dict[int, Dict[str, Any]]:
+    """Construit CONTROLLER_METADATA_ID et CONTROLLER_DATA_ID depuis des instances déjà triées."""
+    instances = [inst for inst, _ in collected]
 
     meta_blob = _build_controller_metadata(instances, name_to_offset)
-    data_blob, patches = _build_controller_data_and_patches(collected)
+    data_blob, patches = _build_controller_data_and_patches(collected, subfile_lookup)
 
     sections: Dict[int, Dict[str, Any]] = {
         CONTROLLER_METADATA_ID: {
@@ -1,9 +1,9 @@
-import json
 import os
 import struct
 from typing import Dict, Any, List, Tuple
 
 from shared.constants import INSTANCE_TYPES_ID
+from shared.project_cache import load_json, walk
 
 
 def _safe_int(v):
@@ -28,7 +28,7 @@ def collect_instance_types_for_groups(source_dir: str) -> Tuple[Dict[int, Dict[s
 
     # Collecter tous les fichiers dans un ordre déterministe
     all_files = []
-    for root, _dirs, files in os.walk(source_dir):
+    for root, _dirs, files in walk(source_dir):
         for fn in files:
             all_files.append((root, fn))
     
@@ -39,8 +39,7 @@ def collect_instance_types_for_groups(source_dir: str) -> Tuple[Dict[int, Dict[s
             path = os.path.join(root, fn)
             try:
                 if fn.endswith('.clue.json'):
-                    with open(path, 'r', encoding='utf-8') as f:
-                        obj = json.load(f)
+                    obj = load_json(path)
                     # Runtime-only: ne pas ajouter systématiquement le TUID de la Clue
                     # Ajouter seulement le Volume référencé par la Clue (utilisé par CLUE_INFO)
                     vol_tuid = _safe_int(obj.get('volume_tuid'))
@@ -48,8 +47,7 @@ def collect_instance_types_for_groups(source_dir: str) -> Tuple[Dict[int, Dict[s
                         entries_raw.append((vol_tuid & 0xFFFFFFFFFFFFFFFF, 2))
                         tuid_to_type[vol_tuid & 0xFFFFFFFFFFFFFFFF] = 2
                 elif fn.endswith('.pod.json'):
-                    with open(path, 'r', encoding='utf-8') as f:
-                        obj = json.load(f)
+                    obj = load_json(path)
                     for ref in obj.get('instance_references', []) or []:
                         t = _safe_int(ref.get('type'))
                         tuid = _safe_int(ref.get('tuid'))
@@ -57,8 +55,7 @@ def collect_instance_types_for_groups(source_dir: str) -> Tuple[Dict[int, Dict[s
                             entries_raw.append((tuid & 0xFFFFFFFFFFFFFFFF, t & 0xFFFFFFFF))
                             tuid_to_type[tuid & 0xFFFFFFFFFFFFFFFF] = t & 0xFFFFFFFF
                 elif fn.endswith('.area.json'):
-                    with open(path, 'r', encoding='utf-8') as f:
-                        obj = json.load(f)
+                    obj = load_json(path)
                     for ref in obj.get('path_references', []) or []:
                         tuid = _safe_int(ref.get('tuid'))
                         if tuid is not None:
@@ -70,8 +67,7 @@ def collect_instance_types_for_groups(source_dir: str) -> Tuple[Dict[int, Dict[s
                             entries_raw.append((tuid & 0xFFFFFFFFFFFFFFFF, 2))
                             tuid_to_type[tuid & 0xFFFFFFFFFFFFFFFF] = 2
                 elif fn.endswith('.scent.json'):
-                    with open(path, 'r', encoding='utf-8') as f:
-                        obj = json.load(f)
+                    obj = load_json(path)
                     for ref in obj.get('instance_references', []) or []:
                         tuid = _safe_int(ref.get('tuid'))
                         if tuid is not None:
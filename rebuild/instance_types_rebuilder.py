@@ -1,9 +1,9 @@
-import json
 import os
 import struct
 from typing import Dict, Any, List, Tuple
 
 from shared.constants import INSTANCE_TYPES_ID
+from shared.project_cache import isfile, load_json, walk
 
 
 TYPE_BY_SUFFIX = {
@@ -24,10 +24,9 @@ def _collect_instance_types(source_dir: str) -> List[Tuple[int, int]]:
     
     # Essayer d'abord de lire l'ordre exact depuis extraction_metadata.json
     metadata_path = os.path.join(source_dir, "extraction_metadata.json")
-    if os.path.exists(metadata_path):
+    if isfile(metadata_path):
         try:
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                metadata = json.load(f)
+            metadata = load_json(metadata_path)
             if 'instance_types_entries' in metadata:
                 # Utiliser l'ordre exact de l'extraction
                 for entry in metadata['instance_types_entries']:
@@ -42,14 +41,13 @@ def _collect_instance_types(source_dir: str) -> List[Tuple[int, int]]:
             print(f"  ⚠️ Erreur lecture extraction_metadata.json: {e}")
     
     # Fallback: collecter dans l'ordre de parcours des fichiers
-    for root, _dirs, files in os.walk(source_dir):
+    for root, _dirs, files in walk(source_dir):
         for fn in files:
             for suffix, type_id in TYPE_BY_SUFFIX.items():
                 if fn.endswith(suffix):
                     p = os.path.join(root, fn)
                     try:
-                        with open(p, 'r', encoding='utf-8') as f:
-                            obj = json.load(f)
+                        obj = load_json(p)
                         tuid = int(obj.get('tuid', 0xFFFFFFFFFFFFFFFF)) & 0xFFFFFFFFFFFFFFFF
                         if tuid != 0xFFFFFFFFFFFFFFFF and tuid not in seen:
                             seen.add(tuid)
@@ -73,16 +71,11 @@ def build_instance_types_from_extraction(source_dir: str) -> Tuple[Dict[int, Dic
 
     Retourne: (sections_dict, mapping TUID -> offset relatif dans 0x25022)
     """
-    import json as _json
-    import os as _os
-    import struct as _struct
-
     entries: List[Tuple[int, int]] = []
-    metadata_path = _os.path.join(source_dir, "extraction_metadata.json")
-    if _os.path.exists(metadata_path):
+    metadata_path = os.path.join(source_dir, "extraction_metadata.json")
+    if isfile(metadata_path):
         try:
-            with open(metadata_path, 'r', encoding='utf-8') as f:
-                metadata = _json.load(f)
+            metadata = load_json(metadata_path)
             if 'instance_types_entries' in metadata:
                 for entry in metadata['instance_types_entries']:
                     tuid = int(entry['tuid']) & 0xFFFFFFFFFFFFFFFF
@@ -95,11 +88,17 @@ def build_instance_types_from_extraction(source_dir: str) -> Tuple[Dict[int, Dic
         # Fallback déterministe
         entries = _collect_instance_types(source_dir)
 
+    return build_instance_types_section(entries)
+
+
+def build_instance_types_section(entries: List[Tuple[int, int]]) -> Tuple[Dict[int, Dict[str, Any]], Dict[int, int]]:
+    """Construit 0x00025022 (single-block) depuis des (tuid, type_id) dans l'ordre donné.
+    Retourne: (sections_dict, mapping TUID -> offset relatif dans 0x25022)"""
     blob = bytearray()
     mapping: Dict[int, int] = {}
     for i, (tuid, type_id) in enumerate(entries):
         mapping[tuid] = i * 16
-        blob.extend(_struct.pack('>QII', tuid, type_id & 0xFFFFFFFF, 0x00000000))
+        blob.extend(struct.pack('>QII', tuid, type_id & 0xFFFFFFFF, 0x00000000))
 
     sections: Dict[int, Dict[str, Any]] = {}
     if len(blob) > 0:
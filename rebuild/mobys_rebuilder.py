@@ -1,11 +1,11 @@
-import json
 import os
 import struct
-from typing import Dict, Any, List, Tuple
+from typing import Callable, Dict, Any, List, Tuple
 
 from rebuild.mobys_metadata_rebuilder import rebuild_mobys_metadata
-from shared.constants import MOBY_DATA_ID, HOST_CLASS_ID, LOCAL_CLASS_ID
-from rebuild.classfiles_aggregator import register_host, register_local
+from shared.constants import MOBY_DATA_ID
+from shared.project_cache import load_json, walk
+from rebuild.classfiles_aggregator import find_class_subfile, register_class_subfile
 from shared.utils import sanitize_name
 
 
@@ -13,14 +13,12 @@ def _collect_moby_instances_from_folder(source_dir: str) -> List[Tuple[dict, str
     """Lit les fichiers *.moby.json sous source_dir.
     Retourne une liste de tuples (instance_dict, base_dir_du_fichier)."""
     results: List[Tuple[dict, str]] = []
-    for root, _dirs, files in os.walk(source_dir):
+    for root, _dirs, files in walk(source_dir):
         for fn in files:
             if fn.endswith('.moby.json'):
                 path = os.path.join(root, fn)
                 try:
-                    with open(path, 'r', encoding='utf-8') as f:
-                        inst = json.load(f)
-                        results.append((inst, root))
+                    results.append((load_json(path), root))
                 except Exception:
                     # Ignorer les JSON invalides
                     pass
@@ -119,10 +117,25 @@ def rebuild_mobys_from_folder(source_dir: str, name_to_offset: Dict[str, int] |
         )
     )
 
+    sections = {}
+    sections.update(name_sections)
+    sections.update(build_moby_sections(collected, name_to_offset))
+    return sections
+
+
+def build_moby_sections(
+    collected: List[Tuple[dict, str | None]],
+    name_to_offset: Dict[str, int],
+    subfile_lookup: Callable[[str | None, str], Tuple[str, bytes] | None] = find_class_subfile,
+) -> Dict[int, Dict[str, Any]]:
+    """Construit MOBY_METADATA_ID et MOBY_DATA_ID depuis des instances déjà triées.
+
+    collected: liste de tuples (instance_dict, base_dir). subfile_lookup(base_dir, sname)
+    renvoie (kind, data) pour le subfile de classe, ou None s'il n'y en a pas.
+    """
     instances_only = [inst for inst, _ in collected]
 
     sections = {}
-    sections.update(name_sections)
     sections.update(rebuild_mobys_metadata(instances_only, name_to_offset))
 
     # Agrégation host/local centralisée via aggregator
@@ -134,30 +147,16 @@ def rebuild_mobys_from_folder(source_dir: str, name_to_offset: Dict[str, int] |
     for idx, (inst, base_dir) in enumerate(collected):
         name = inst.get('name') or f"Moby_{idx+1}"
         sname = sanitize_name(name)
-        host_path = os.path.join(base_dir, f"{sname}_CLASS.host.dat")
-        local_path = os.path.join(base_dir, f"{sname}_CLASS.local.dat")
 
         chosen_section_id = None
         chosen_rel_offset = 0
         sub_len = 0
 
-        if os.path.isfile(host_path):
-            with open(host_path, 'rb') as f:
-                data = f.read()
-            chosen_section_id = HOST_CLASS_ID
-            chosen_rel_offset = register_host(data)
-            sub_len = len(data)
-        elif os.path.isfile(local_path):
-            with open(local_path, 'rb') as f:
-                data = f.read()
-            chosen_section_id = LOCAL_CLASS_ID
-            chosen_rel_offset = register_local(data)
+        found = subfile_lookup(base_dir, sname)
+        if found is not None:
+            kind, data = found
+            chosen_section_id, chosen_rel_offset = register_class_subfile(kind, data)
             sub_len = len(data)
-        else:
-            # Pas de subfile
-            chosen_section_id = None
-            chosen_rel_offset = 0
-            sub_len = 0
 
         entry = _pack_moby_data_entry(inst, sub_len)
         moby_data_bytes.extend(entry)
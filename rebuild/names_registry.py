@@ -1,8 +1,8 @@
-import json
 import os
 from typing import Dict, List, Tuple
 
 from shared.constants import NAME_TABLES_ID
+from shared.project_cache import load_json, walk
 
 
 def _encode_utf8z(s: str) -> bytes:
@@ -13,16 +13,14 @@ def collect_names_from_folder(source_dir: str) -> List[str]:
     """Collecte les noms depuis tous les JSON d'instances, en conservant les doublons.
     L'ordre est celui de la découverte (stable)."""
     names: List[str] = []
-    for root, _dirs, files in os.walk(source_dir):
+    for root, _dirs, files in walk(source_dir):
         for fn in files:
             if fn.endswith(('.moby.json', '.controller.json', '.path.json', '.volume.json', '.clue.json', '.area.json', '.pod.json', '.scent.json')):
                 path = os.path.join(root, fn)
                 try:
-                    with open(path, 'r', encoding='utf-8') as f:
-                        obj = json.load(f)
-                        n = obj.get('name')
-                        if n:
-                            names.append(n)
+                    n = load_json(path).get('name')
+                    if n:
+                        names.append(n)
                 except Exception:
                     pass
     return names
@@ -30,8 +28,11 @@ def collect_names_from_folder(source_dir: str) -> List[str]:
 
 def build_name_tables_section(source_dir: str) -> Tuple[Dict[int, dict], Dict[str, int]]:
     """Construit la section NAME_TABLES_ID et renvoie (sections, name_to_offset)."""
-    names = collect_names_from_folder(source_dir)
+    return build_name_tables_from_names(collect_names_from_folder(source_dir))
 
+
+def build_name_tables_from_names(names: List[str]) -> Tuple[Dict[int, dict], Dict[str, int]]:
+    """Variante sans dossier: construit NAME_TABLES_ID depuis une liste de noms (doublons conservés)."""
     blob = bytearray()
     name_to_offset: Dict[str, int] = {}
     current = 0
@@ -1,20 +1,20 @@
-import json
 import os
 import struct
 from typing import Dict, Any, List
 
 from shared.constants import PATH_DATA_ID, PATH_METADATA_ID, PATH_POINTS_ID
+from shared.path_points import count_points, points_bytes
+from shared.project_cache import load_json, walk
 
 
 def _collect_paths(source_dir: str) -> List[dict]:
     results: List[dict] = []
-    for root, _dirs, files in os.walk(source_dir):
+    for root, _dirs, files in walk(source_dir):
         for fn in files:
             if fn.endswith('.path.json'):
                 p = os.path.join(root, fn)
                 try:
-                    with open(p, 'r', encoding='utf-8') as f:
-                        results.append(json.load(f))
+                    results.append(load_json(p))
                 except Exception:
                     pass
     # Préserver l'ordre original - ne pas trier
@@ -39,17 +39,13 @@ def _build_path_metadata(paths: List[dict], name_to_offset: Dict[str, int]) -> b
 
 
 def _build_path_points(paths: List[dict]) -> tuple[bytes, List[int]]:
-    # Concaténer tous les points; retourner aussi les offsets de début pour chaque path
+    # Concaténer tous les points; retourner aussi les offsets de début pour chaque path.
+    # 'points_packed' (extraction compacte) est recopié tel quel, 'points' est repacké.
     points_blob = bytearray()
     offsets: List[int] = []
     for inst in paths:
         offsets.append(len(points_blob))
-        for pt in inst.get('points', []) or []:
-            x = float(pt.get('position', {}).get('x', 0.0))
-            y = float(pt.get('position', {}).get('y', 0.0))
-            z = float(pt.get('position', {}).get('z', 0.0))
-            t = float(pt.get('timestamp', 0.0))
-            points_blob.extend(struct.pack('>ffff', x, y, z, t))
+        points_blob += points_bytes(inst)
     return bytes(points_blob), offsets
 
 
@@ -58,7 +54,7 @@ def _build_path_data(paths: List[dict], points_section_id: int, per_path_points_
     blob = bytearray()
     patches: List[dict] = []
     for idx, inst in enumerate(paths):
-        point_count = int(inst.get('point_count', len(inst.get('points') or []))) & 0xFFFF
+        point_count = int(inst['point_count'] if 'point_count' in inst else count_points(inst)) & 0xFFFF
         unknown = int(inst.get('unknown', 0)) & 0xFFFFFFFF
         total_duration = float(inst.get('total_duration', 0.0))
         flags = int(inst.get('flags', 0)) & 0xFFFF
@@ -86,7 +82,11 @@ def _build_path_data(paths: List[dict], points_section_id: int, per_path_points_
 def rebuild_paths_from_folder(source_dir: str, name_to_offset: Dict[str, int]) -> Dict[int, Dict[str, Any]]:
     paths = _collect_paths(source_dir)
     # Préserver l'ordre original - ne pas trier
+    return build_path_sections(paths, name_to_offset)
 
+
+def build_path_sections(paths: List[dict], name_to_offset: Dict[str, int]) -> Dict[int, Dict[str, Any]]:
+    """Construit les sections PATH_* depuis une liste d'instances (ordre conservé)."""
     meta_blob = _build_path_metadata(paths, name_to_offset)
     points_blob, per_path_offsets = _build_path_points(paths)
     data_blob, data_patches = _build_path_data(paths, PATH_POINTS_ID, per_path_offsets)
@@ -1,9 +1,9 @@
-import json
 import os
 import struct
 from typing import Dict, Any, List, Tuple
 
 from shared.constants import POD_METADATA_ID, POD_DATA_ID, POD_OFFSETS_ID, NAME_TABLES_ID, INSTANCE_TYPES_ID
+from shared.project_cache import load_json, walk
 from rebuild.instance_types_collector import collect_instance_types_for_groups
 
 
@@ -11,7 +11,7 @@ def _collect_pods(source_dir: str) -> List[dict]:
     pods: List[dict] = []
     # Collecter tous les fichiers dans un ordre déterministe
     all_files = []
-    for root, _dirs, files in os.walk(source_dir):
+    for root, _dirs, files in walk(source_dir):
         for fn in files:
             all_files.append((root, fn))
     
@@ -22,8 +22,7 @@ def _collect_pods(source_dir: str) -> List[dict]:
             if fn.endswith('.pod.json'):
                 p = os.path.join(root, fn)
                 try:
-                    with open(p, 'r', encoding='utf-8') as f:
-                        pods.append(json.load(f))
+                    pods.append(load_json(p))
                 except Exception:
                     pass
     # Préserver l'ordre original - ne pas trier
@@ -104,11 +103,15 @@ def _build_pod_offsets_and_data(pods: List[dict], inst_types_map: Dict[int, int]
 
 def rebuild_pods_from_folder(source_dir: str, name_to_offset: Dict[str, int], inst_types_map: Dict[int, int] | None = None) -> Dict[int, Dict[str, Any]]:
     pods = _collect_pods(source_dir)
-    meta_blob = _build_pod_metadata(pods, name_to_offset)
     # Utiliser le mapping global si fourni, sinon construire localement (minimal)
     if inst_types_map is None:
         _sections, inst_types_map = collect_instance_types_for_groups(source_dir)
+    return build_pod_sections(pods, name_to_offset, inst_types_map)
+
 
+def build_pod_sections(pods: List[dict], name_to_offset: Dict[str, int], inst_types_map: Dict[int, int]) -> Dict[int, Dict[str, Any]]:
+    """Construit les sections POD_* depuis une liste d'instances (ordre conservé)."""
+    meta_blob = _build_pod_metadata(pods, name_to_offset)
     offsets_blob, data_blob, data_patches, offsets_patches = _build_pod_offsets_and_data(pods, inst_types_map)
 
     sections: Dict[int, Dict[str, Any]] = {}
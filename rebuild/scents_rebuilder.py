@@ -1,9 +1,10 @@
-import json
 import os
 import struct
 from typing import Dict, Any, List, Tuple
 
+from shared import metrics
 from shared.constants import SCENT_METADATA_ID, SCENT_DATA_ID, SCENT_OFFSETS_ID, NAME_TABLES_ID
+from shared.project_cache import load_json, walk
 from rebuild.instance_types_collector import collect_instance_types_for_groups
 
 
@@ -11,7 +12,7 @@ def _collect_scents(source_dir: str) -> List[dict]:
     scents: List[dict] = []
     # Collecter tous les fichiers dans un ordre déterministe
     all_files = []
-    for root, _dirs, files in os.walk(source_dir):
+    for root, _dirs, files in walk(source_dir):
         for fn in files:
             all_files.append((root, fn))
     
@@ -22,8 +23,7 @@ def _collect_scents(source_dir: str) -> List[dict]:
             if fn.endswith('.scent.json'):
                 p = os.path.join(root, fn)
                 try:
-                    with open(p, 'r', encoding='utf-8') as f:
-                        scents.append(json.load(f))
+                    scents.append(load_json(p))
                 except Exception:
                     pass
     # Tri nécessaire: par zone ascendante puis par TUID pour correspondre aux pointeurs de zones
@@ -84,7 +84,7 @@ def _build_scent_offsets_and_data(scents: List[dict], inst_types_map: Dict[int,
         else:
             # Avertir si une référence n'est pas résolue dans 0x25022
             try:
-                print(f"[WARN] SCENT ref TUID 0x{tuid:016X} absent de 0x25022 – offset restera 0")
+                metrics.log_item(f"[WARN] SCENT ref TUID 0x{tuid:016X} absent de 0x25022 – offset restera 0")
             except Exception:
                 pass
 
@@ -103,10 +103,15 @@ def _build_scent_offsets_and_data(scents: List[dict], inst_types_map: Dict[int,
 
 def rebuild_scents_from_folder(source_dir: str, name_to_offset: Dict[str, int], inst_types_map: Dict[int, int] | None = None) -> Dict[int, Dict[str, Any]]:
     scents = _collect_scents(source_dir)
-    meta_blob = _build_scent_metadata(scents, name_to_offset)
     if inst_types_map is None:
         from rebuild.instance_types_global import build_instance_types_global
         _sections, inst_types_map = build_instance_types_global(source_dir)
+    return build_scent_sections(scents, name_to_offset, inst_types_map)
+
+
+def build_scent_sections(scents: List[dict], name_to_offset: Dict[str, int], inst_types_map: Dict[int, int]) -> Dict[int, Dict[str, Any]]:
+    """Construit les sections SCENT_* depuis une liste d'instances (ordre conservé)."""
+    meta_blob = _build_scent_metadata(scents, name_to_offset)
     offsets_blob, data_blob, data_patches, offsets_patches = _build_scent_offsets_and_data(scents, inst_types_map)
 
     sections: Dict[int, Dict[str, Any]] = {}
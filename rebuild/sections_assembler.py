@@ -3,6 +3,7 @@ import struct
 from typing import Dict, Any, List
 
 from rebuild.ighw_header import build_ighw_header_bytes
+from shared import metrics
 
 
 ALIGNMENT = 0x80
@@ -55,9 +56,14 @@ def assemble_sections(
     *,
     version_major: int = 1,
     version_minor: int = 1,
+    progress=None,
 ) -> None:
     """Assemble un fichier IGHW à partir de sections prêtes à écrire.
 
+    progress(fait, total, étape): optionnel, appelé avant l'écriture de chaque section puis de la
+    table des pointeurs (total = sections + 1). Une exception levée par le callback interrompt
+    l'écriture (fichier incomplet).
+
     sections: dict section_id -> {
         'flag': int,
         'count': int,                # utile si flag == 0x10
@@ -75,6 +81,7 @@ def assemble_sections(
     }
     """
 
+    metrics.begin('layout')
     # Ordonner les sections selon un ordre préféré (proche de l'original) et filtrer celles vides
     present = {sid: info for sid, info in sections.items() if len((info.get('data') or b'')) > 0}
     ordered_items: List[tuple[int, Dict[str, Any]]] = []
@@ -103,6 +110,8 @@ def assemble_sections(
 
     # Ne pas réaligner la fin des données avant la table des pointeurs; l'offset peut être non multiple de ALIGNMENT
     end_of_data = current_offset
+    metrics.end('layout')
+    metrics.begin('patch')
 
     # Étape 2: Appliquer les patches dépendant des offsets finaux
     # Convertir 'data' en bytearray pour patcher
@@ -131,6 +140,9 @@ def assemble_sections(
                 struct.pack_into('>I', info['data'], at, absolute)
             else:
                 raise ValueError(f"Patch type non supporté: {ptype}")
+    metrics.count('patches_applied', sum(len(info.get('patches') or []) for _sid, info in ordered_items))
+    metrics.end('patch')
+    metrics.begin('write_sections')
 
     # Étape 3: Construire l'entête
     section_headers = []
@@ -165,13 +177,20 @@ def assemble_sections(
 
         # Sections
         written = len(header) + pad_len
-        for section_id, info in ordered_items:
+        steps = len(ordered_items) + 1
+        for done, (section_id, info) in enumerate(ordered_items):
+            if progress is not None:
+                progress(done, steps, 'sections')
             current_pos = f.tell()
             # Aligner si nécessaire
             if current_pos != layout[section_id]['offset']:
                 f.write(_pad_pattern(layout[section_id]['offset'] - current_pos))
             f.write(bytes(info['data']))
             written = layout[section_id]['offset'] + len(info['data'])
+        metrics.end('write_sections')
+        metrics.begin('pointer_table')
+        if progress is not None:
+            progress(steps - 1, steps, 'pointer_table')
 
         # Écrire la table des pointeurs absolute_u32
         # Collecter les enregistrements: chaque patch 'absolute_u32' génère UNE entrée
@@ -236,5 +255,9 @@ def assemble_sections(
         )
         f.write(header2)
         f.seek(final_pos)
+    metrics.end('pointer_table')
+    metrics.count('pointers_written', pointer_count)
+    metrics.count('bytes_written', final_pos)
+    metrics.count('files_written')
 
 
@@ -1,16 +1,16 @@
-import json
 import os
 import struct
 from typing import Dict, Any, List, Tuple
 
 from shared.constants import VOLUME_TRANSFORM_ID, VOLUME_METADATA_ID, NAME_TABLES_ID
+from shared.project_cache import load_json, walk
 
 
 def _collect_volumes(source_dir: str) -> List[dict]:
     volumes: List[dict] = []
     # Collecter tous les fichiers dans un ordre déterministe
     all_files = []
-    for root, _dirs, files in os.walk(source_dir):
+    for root, _dirs, files in walk(source_dir):
         for fn in files:
             all_files.append((root, fn))
     
@@ -21,8 +21,7 @@ def _collect_volumes(source_dir: str) -> List[dict]:
             if fn.endswith('.volume.json'):
                 p = os.path.join(root, fn)
                 try:
-                    with open(p, 'r', encoding='utf-8') as f:
-                        volumes.append(json.load(f))
+                    volumes.append(load_json(p))
                 except Exception:
                     pass
     # Préserver l'ordre original - ne pas trier
@@ -61,8 +60,11 @@ def _build_volume_transforms(volumes: List[dict]) -> bytes:
 
 
 def rebuild_volumes_from_folder(source_dir: str, name_to_offset: Dict[str, int]) -> Dict[int, Dict[str, Any]]:
-    volumes = _collect_volumes(source_dir)
+    return build_volume_sections(_collect_volumes(source_dir), name_to_offset)
 
+
+def build_volume_sections(volumes: List[dict], name_to_offset: Dict[str, int]) -> Dict[int, Dict[str, Any]]:
+    """Construit VOLUME_METADATA_ID et VOLUME_TRANSFORM_ID depuis une liste d'instances (ordre conservé)."""
     meta_blob = _build_volume_metadata(volumes, name_to_offset)
     xform_blob = _build_volume_transforms(volumes)
 
@@ -97,7 +99,11 @@ def compute_volume_meta_mapping(source_dir: str) -> Dict[int, int]:
     """Calcule un mapping TUID (u64) -> offset d'entrée dans VOLUME_METADATA_ID.
     L'ordre doit être strictement le même que celui utilisé par rebuild_volumes_from_folder.
     """
-    volumes = _collect_volumes(source_dir)
+    return volume_meta_mapping_from_list(_collect_volumes(source_dir))
+
+
+def volume_meta_mapping_from_list(volumes: List[dict]) -> Dict[int, int]:
+    """Variante de compute_volume_meta_mapping sur une liste déjà ordonnée."""
     entry_size = 16
     mapping: Dict[int, int] = {}
     for i, inst in enumerate(volumes):
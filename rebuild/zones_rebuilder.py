@@ -1,4 +1,3 @@
-import json
 import os
 import struct
 from typing import Dict, Any, List, Tuple
@@ -15,6 +14,7 @@ from shared.constants import (
     POD_DATA_ID, POD_METADATA_ID,
     SCENT_DATA_ID, SCENT_METADATA_ID,
 )
+from shared.project_cache import isfile, load_json, walk
 
 
 TYPE_INDEX_BY_SUFFIX = {
@@ -42,14 +42,13 @@ def _collect_zones(source_dir: str) -> Tuple[str, Dict[int, str], Dict[int, List
     counts_per_zone: Dict[int, List[int]] = {}
     detected_region_name: str | None = None
 
-    for root, _dirs, files in os.walk(source_dir):
+    for root, _dirs, files in walk(source_dir):
         for fn in files:
             if not any(fn.endswith(s) for s in TYPE_INDEX_BY_SUFFIX.keys()):
                 continue
             path = os.path.join(root, fn)
             try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    obj = json.load(f)
+                obj = load_json(path)
                 zone = int(obj.get('zone', 0))
             except Exception:
                 continue
@@ -72,6 +71,28 @@ def _collect_zones(source_dir: str) -> Tuple[str, Dict[int, str], Dict[int, List
 
 def rebuild_zones_from_folder(source_dir: str) -> Dict[int, Dict[str, Any]]:
     region_name, zone_names, counts_per_zone = _collect_zones(source_dir)
+
+    # Essayer de charger extraction_metadata.json pour réinjecter les 4x u16 inconnus
+    zone_tails = None
+    try:
+        meta_path = os.path.join(source_dir, 'extraction_metadata.json')
+        if isfile(meta_path):
+            meta = load_json(meta_path)
+            zone_tails = meta.get('zone_tail_u16') or None
+    except Exception:
+        zone_tails = None
+
+    return build_zone_sections(region_name, zone_names, counts_per_zone, zone_tails)
+
+
+def build_zone_sections(
+    region_name: str,
+    zone_names: Dict[int, str],
+    counts_per_zone: Dict[int, List[int]],
+    zone_tails: List[List[int]] | None = None,
+) -> Dict[int, Dict[str, Any]]:
+    """Construit zones/régions depuis les comptes par zone (index de type 0..8, cf. TYPE_INDEX_BY_SUFFIX).
+    Les données de chaque type doivent être rangées contiguës par zone croissante."""
     zones_sorted = sorted(counts_per_zone.keys())
 
     # Build Zone Metadata (0x00025008): 144 bytes/zone
@@ -122,26 +143,20 @@ def rebuild_zones_from_folder(source_dir: str) -> Dict[int, Dict[str, Any]]:
         },
     }
 
-    # Essayer de charger extraction_metadata.json pour réinjecter les 4x u16 inconnus
-    try:
-        import os, json
-        meta_path = os.path.join(source_dir, 'extraction_metadata.json')
-        if os.path.isfile(meta_path):
-            with open(meta_path, 'r', encoding='utf-8') as f:
-                meta = json.load(f)
-            tails = meta.get('zone_tail_u16') or []
-            if isinstance(tails, list) and len(tails) >= len(zones_sorted):
-                zb = bytearray(sections[ZONE_METADATA_ID]['data'])
-                for zi, zone in enumerate(zones_sorted):
-                    t = tails[zi]
-                    if not (isinstance(t, list) and len(t) == 4):
-                        continue
-                    base = zi * 144 + 64 + 9 * 8
-                    import struct as _s
-                    _s.pack_into('>HHHH', zb, base, int(t[0]) & 0xFFFF, int(t[1]) & 0xFFFF, int(t[2]) & 0xFFFF, int(t[3]) & 0xFFFF)
-                sections[ZONE_METADATA_ID]['data'] = bytes(zb)
-    except Exception:
-        pass
+    # Réinjecter les 4x u16 inconnus (zone_tail_u16 de extraction_metadata.json)
+    tails = zone_tails or []
+    if isinstance(tails, list) and len(tails) >= len(zones_sorted):
+        zb = bytearray(sections[ZONE_METADATA_ID]['data'])
+        for zi, zone in enumerate(zones_sorted):
+            t = tails[zi]
+            if not (isinstance(t, list) and len(t) == 4):
+                continue
+            base = zi * 144 + 64 + 9 * 8
+            try:
+                struct.pack_into('>HHHH', zb, base, int(t[0]) & 0xFFFF, int(t[1]) & 0xFFFF, int(t[2]) & 0xFFFF, int(t[3]) & 0xFFFF)
+            except Exception:
+                continue
+        sections[ZONE_METADATA_ID]['data'] = bytes(zb)
 
     # Patcher les pointeurs de 0x25008 (vers DATA par type) et 0x2500C (vers METADATA par type)
     # Mapping type index -> (data_section_id, data_elem_size, meta_section_id, meta_elem_size)
@@ -0,0 +1,206 @@
+# shared/class_enum.py
+"""ClassID des subfiles IGHW et noms de classes de Class_FFA.h (enum VkTGenEnumsClass).
+
+L'enum est parsé une fois par processus puis gardé en cache (clé: chemin, mtime, taille),
+ce qui permet à `main.py batch` de le partager entre tous les niveaux traités par un worker.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+
+from shared.constants import CLASS_ENUM_ID
+
+
+DEFAULT_CLASS_FFA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Class_FFA.h')
+
+# Cache des ClassID de subfiles, à la racine du dossier d'extraction (ignoré par le rebuild)
+CLASS_ID_CACHE_FILENAME = '.polaris-classids.json'
+CLASS_ID_CACHE_VERSION = 1
+# Borne de la table des sections lue par read_subfile_class_id (en-tête corrompu)
+MAX_SUBFILE_SECTIONS = 4096
+
+_ENUM_ENTRY = re.compile(r'^\s*(\w+)\s*=\s*(-?(?:0x[0-9A-Fa-f]+|\d+))\s*,?')
+
+_enum_cache: dict[tuple[str, int, int], dict[int, str]] = {}
+
+
+def parse_class_enum(text: str) -> dict[int, str]:
+    """Entrées `Nom_CLASS = id,` du bloc `enum ... { }` -> {id: 'Nom'} (suffixe _CLASS retiré)."""
+    classes: dict[int, str] = {}
+    in_enum = False
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not in_enum:
+            in_enum = stripped.startswith('enum ') and stripped.endswith('{')
+            continue
+        if stripped.startswith('}'):
+            break
+        m = _ENUM_ENTRY.match(line)
+        if not m:
+            continue
+        name, value = m.group(1), int(m.group(2), 0)
+        if value < 0:
+            continue
+        classes[value] = name[:-len('_CLASS')] if name.endswith('_CLASS') else name
+    return classes
+
+
+def load_class_enum(path: str = DEFAULT_CLASS_FFA_PATH) -> dict[int, str]:
+    """{class_id: nom} depuis Class_FFA.h (dict vide si le fichier est absent). Mis en cache."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return {}
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    classes = _enum_cache.get(key)
+    if classes is None:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            classes = parse_class_enum(f.read())
+        _enum_cache.clear()
+        _enum_cache[key] = classes
+    return classes
+
+
+def class_id_from_subfile(data: bytes) -> int | None:
+    """Valeur u32 de la section 0x2501C (ClassID) d'un subfile IGHW, ou None."""
+    if data[:4] != b'IGHW':
+        return None
+    version_major = int.from_bytes(data[4:6], 'big')
+    section_count = int.from_bytes(data[12:16], 'big') if version_major >= 1 else int.from_bytes(data[8:10], 'big')
+    section_start = 0x20 if version_major >= 1 else 0x10
+    for i in range(section_count):
+        off = section_start + i * 16
+        if off + 16 > len(data):
+            break
+        sid = int.from_bytes(data[off:off+4], 'big')
+        doff = int.from_bytes(data[off+4:off+8], 'big')
+        if sid == CLASS_ENUM_ID and doff + 4 <= len(data):
+            return int.from_bytes(data[doff:doff+4], 'big')
+    return None
+
+
+def moby_class_enum(data, subfile_offset: int, subfile_length: int) -> int:
+    """class_enum d'un moby tel que l'écrit l'extraction (-1 si absent), lu dans son subfile
+    sans le copier. Le nombre de sections est lu à +8 et la table commence à 0x20 à partir de la
+    version 2 (lecture historique de mobys_builder, conservée pour que les JSON ne changent pas)."""
+    if not (subfile_offset and subfile_length and subfile_offset + subfile_length <= len(data)):
+        return -1
+    if data[subfile_offset:subfile_offset + 4] != b'IGHW':
+        return -1
+    version_major = int.from_bytes(data[subfile_offset + 4:subfile_offset + 6], 'big')
+    section_count = int.from_bytes(data[subfile_offset + 8:subfile_offset + 12], 'big')
+    section_start = 0x20 if version_major >= 2 else 0x10
+    for j in range(section_count):
+        sub_offset = section_start + j * 16
+        if sub_offset + 16 > subfile_length:
+            break                    # la table déborde du subfile: les suivantes aussi
+        pos = subfile_offset + sub_offset
+        if int.from_bytes(data[pos:pos + 4], 'big') == CLASS_ENUM_ID:
+            class_offset = subfile_offset + int.from_bytes(data[pos + 4:pos + 8], 'big')
+            if class_offset + 4 <= len(data):
+                return int.from_bytes(data[class_offset:class_offset + 4], 'big')
+            break
+    return -1
+
+
+def read_subfile_class_id(subfile_path: str) -> int | None:
+    """ClassID d'un subfile sans le lire en entier: en-tête, table des sections, puis 4 octets."""
+    try:
+        with open(subfile_path, 'rb') as f:
+            head = f.read(0x20)
+            if head[:4] != b'IGHW':
+                return None
+            version_major = int.from_bytes(head[4:6], 'big')
+            section_count = int.from_bytes(head[12:16], 'big') if version_major >= 1 else int.from_bytes(head[8:10], 'big')
+            section_start = 0x20 if version_major >= 1 else 0x10
+            f.seek(section_start)
+            table = f.read(min(section_count, MAX_SUBFILE_SECTIONS) * 16)
+            for off in range(0, len(table) - 15, 16):
+                if int.from_bytes(table[off:off+4], 'big') == CLASS_ENUM_ID:
+                    f.seek(int.from_bytes(table[off+4:off+8], 'big'))
+                    value = f.read(4)
+                    return int.from_bytes(value, 'big') if len(value) == 4 else None
+    except Exception:
+        return None
+    return None
+
+
+class ClassIdCache:
+    """ClassID des subfiles d'un dossier d'extraction: {chemin: (mtime_ns, taille, class_id)}.
+
+    refresh() ne relit que les subfiles dont mtime/taille ont changé (peut tourner dans un thread:
+    le dictionnaire est remplacé d'un bloc); load()/save() le conservent entre deux sessions dans
+    <dossier>/CLASS_ID_CACHE_FILENAME (chemins relatifs au dossier)."""
+
+    def __init__(self):
+        self._entries: dict[str, tuple[int, int, int | None]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def peek(self, path: str) -> int | None:
+        """ClassID en cache, sans accès disque (None si inconnu)."""
+        entry = self._entries.get(path)
+        return entry[2] if entry is not None else None
+
+    def get(self, path: str) -> int | None:
+        """ClassID en cache, ou lu (en-tête seulement) et mis en cache si absent."""
+        entry = self._entries.get(path)
+        if entry is not None:
+            return entry[2]
+        return self._read(path, self._entries)
+
+    def invalidate(self, path: str) -> None:
+        self._entries.pop(path, None)
+
+    @staticmethod
+    def _read(path: str, into: dict) -> int | None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        class_id = read_subfile_class_id(path)
+        into[path] = (st.st_mtime_ns, st.st_size, class_id)
+        return class_id
+
+    def refresh(self, paths, progress=None) -> int:
+        """Met le cache en accord avec `paths`; renvoie le nombre de subfiles relus."""
+        fresh: dict[str, tuple[int, int, int | None]] = {}
+        read = 0
+        for n, path in enumerate(paths, 1):
+            entry = self._entries.get(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if entry is not None and entry[:2] == (st.st_mtime_ns, st.st_size):
+                fresh[path] = entry
+            else:
+                fresh[path] = (st.st_mtime_ns, st.st_size, read_subfile_class_id(path))
+                read += 1
+            if progress is not None and n % 500 == 0:
+                progress(n)
+        self._entries = fresh
+        return read
+
+    def load(self, root_dir: str) -> None:
+        self._entries = {}
+        try:
+            with open(os.path.join(root_dir, CLASS_ID_CACHE_FILENAME), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != CLASS_ID_CACHE_VERSION:
+            return
+        for rel, (mtime_ns, size, class_id) in data.get('entries', {}).items():
+            self._entries[os.path.join(root_dir, rel)] = (mtime_ns, size, class_id)
+
+    def save(self, root_dir: str) -> None:
+        entries = {os.path.relpath(p, root_dir): list(e) for p, e in self._entries.items()}
+        path = os.path.join(root_dir, CLASS_ID_CACHE_FILENAME)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': CLASS_ID_CACHE_VERSION, 'entries': entries}, f)
+        os.replace(tmp, path)
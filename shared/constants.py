@@ -64,6 +64,9 @@ INSTANCE_TYPES = {
     7: "Pod"
 }
 
+# Types d'instances comparés après un aller-retour extract -> repack -> extract
+COMPARED_TYPES = ['moby', 'controller', 'path', 'volume', 'clue', 'area', 'pod', 'scent']
+
 # Structure pour les zones de rendu
 ZONE_RENDERING_STRUCTURE = {
     "name_size": 64,
@@ -0,0 +1,396 @@
+# shared/dat_index.py
+"""Index persistant d'un .dat: sidecar binaire <fichier.dat>.polaris-idx (DAT_INDEX_SUFFIX).
+
+Tout ce que chaque outil recalcule à l'ouverture d'un niveau, calculé une fois:
+table des sections, colonnes par enregistrement (TUID, zone, offset du nom, classe), noms,
+table TUID -> enregistrement triée, plages de zones et de classes, subfiles (host/local,
+offset, longueur, ClassID) et table des pointeurs de l'en-tête.
+
+Format (little-endian, blocs alignés sur 8 octets: chaque colonne se lit telle quelle par
+memoryview.cast, sans décodage, que le fichier soit lu ou projeté en mémoire):
+    en-tête   magic 'PLRSIDX\\0', version u32, nombre de blocs u32, taille u64, mtime_ns u64,
+              blake2b des HEAD_HASH_BYTES premiers octets (16), blake2b du fichier entier (16)
+    répertoire   nombre de blocs x (tag 4s, réservé u32, offset u64, longueur u64)
+    SECT  sections (id, offset, flag, count, size) u32 x 5, dans l'ordre du fichier
+    TYPE  (base, count) u32 x 2 par type de TYPE_NAMES: slot = base + index d'enregistrement
+    TUID  u64 par slot          ZONE  u16 par slot (zone du JSON: zone_render_index des mobys)
+    NOFF  u32 par slot (offset du nom dans le .dat)
+    NAME  noms UTF-8 séparés par '\\0' (noms de repli de l'extraction compris)
+    CLAS  i32 par slot (class_enum des mobys, ClassID du subfile des controllers, class_id des
+          clues; -1 sinon)
+    TSRT / TSLT  TUID triés u64 et slot correspondant u32: TUID -> enregistrement par bisection
+    ZRNG / CRNG  (code de type, valeur, début, fin) u32 x 4: plages contiguës par zone / classe
+    SUBF  (slot, host 0 | local 1, offset, longueur, ClassID du subfile ou 0xFFFFFFFF) u32 x 5
+    PTRS  offset de la table des pointeurs, nombre, puis les positions u32
+
+Validité: taille, mtime et empreinte du début du fichier identiques; si seul le mtime a changé
+(copie, touch), l'empreinte du fichier entier décide. Le sidecar est optionnel: `main.py index`
+le crée, `main.py query` aussi; extraction, GUI, refs et outils l'utilisent s'il est valide.
+"""
+import hashlib
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from shared.class_enum import class_id_from_subfile, moby_class_enum
+from shared.tuid_index import INDEX_TYPES, TYPE_NAMES
+from shared.utils import parse_section_table, read_string
+
+
+DAT_INDEX_SUFFIX = '.polaris-idx'
+DAT_INDEX_VERSION = 1
+MAGIC = b'PLRSIDX\0'
+HEAD_HASH_BYTES = 64 * 1024
+NO_CLASS = 0xFFFFFFFF
+
+_HEADER = struct.Struct('<8sIIQQ16s16s')
+_BLOCK = struct.Struct('<4sIQQ')
+
+# Type -> position (subfile_offset, subfile_length) dans l'entrée de données
+SUBFILE_FIELDS = {'moby': 12, 'controller': 0, 'clue': 4}
+
+
+def _hash(data) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _file_hash(path: str) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.digest()
+
+
+def _column(buf, fmt: str):
+    """Bloc little-endian -> colonne indexable sans copie (copie retournée sur un hôte big-endian)."""
+    view = memoryview(buf).cast('B').cast(fmt)
+    if sys.byteorder == 'little':
+        return view
+    col = array(fmt, view.tobytes())
+    col.byteswap()
+    return col
+
+
+def _runs(typ_code: int, values) -> List[Tuple[int, int, int, int]]:
+    """Plages contiguës de valeurs égales: (type, valeur, début, fin), triées par valeur
+    (valeurs négatives ignorées)."""
+    runs = []
+    for i, value in enumerate(values):
+        if value < 0:
+            continue
+        if runs and runs[-1][1] == value and runs[-1][3] == i:
+            runs[-1][3] = i + 1
+        else:
+            runs.append([typ_code, value, i, i + 1])
+    runs.sort(key=lambda r: (r[1], r[2]))
+    return [tuple(r) for r in runs]
+
+
+class DatIndex:
+    def __init__(self):
+        self.source = (0, 0)                       # (taille, mtime_ns) du .dat indexé
+        self.head_hash = b''
+        self.file_hash = b''
+        self.sections: Dict[int, dict] = {}
+        self.section_order: List[int] = []
+        self.bases: Dict[str, int] = {}
+        self.counts: Dict[str, int] = {}
+        self.tuids = array('Q')
+        self.zones = array('H')
+        self.name_offsets = array('I')
+        self.names: List[str] = []
+        self.classes = array('i')
+        self.sorted_tuids = array('Q')
+        self.sorted_slots = array('I')
+        self.zone_ranges = array('I')              # (type, zone, début, fin) à plat
+        self.class_ranges = array('I')             # (type, classe, début, fin) à plat
+        self.subfile_table = array('I')            # (slot, host|local, offset, longueur, ClassID) à plat
+        self.pointer_table = (0, array('I'))        # (offset, positions)
+        self._name_slots: Optional[Dict[str, List[int]]] = None
+
+    def __len__(self) -> int:
+        return len(self.tuids)
+
+    # Construction
+    @classmethod
+    def build(cls, data, source: Tuple[int, int] = (0, 0)) -> 'DatIndex':
+        """Index d'un .dat en mémoire (bytes ou mmap). source: (taille, mtime_ns) du fichier."""
+        from extract.subfile_builder import determine_subfile_type, find_subfile_section_addresses
+        index = cls()
+        index.source = source
+        index.head_hash = _hash(data[:HEAD_HASH_BYTES])
+        index.file_hash = _hash(data)
+        index.sections = parse_section_table(data)
+        index.section_order = list(index.sections)
+        size = len(data)
+        subfile_sections = find_subfile_section_addresses(data)
+        subfile_classes: Dict[Tuple[int, int], Optional[int]] = {}
+        zone_ranges, class_ranges, subfiles = [], [], []
+        for code, typ in enumerate(TYPE_NAMES):
+            meta_id, data_id = INDEX_TYPES[typ]
+            meta, body = index.sections.get(meta_id), index.sections.get(data_id)
+            n = min(meta['count'], body['count']) if meta and body else 0
+            base = len(index.tuids)
+            index.bases[typ], index.counts[typ] = base, n
+            label = typ.capitalize()
+            for i in range(n):
+                pos = meta['offset'] + i * meta['size']
+                entry = body['offset'] + i * body['size']
+                tuid, name_offset, zone = struct.unpack_from('>QIH', data, pos)
+                if typ == 'moby':
+                    zone = struct.unpack_from('>H', data, entry + 2)[0]
+                name = f"Unknown_{label}"
+                if name_offset < size:
+                    name = read_string(data, name_offset) or f"{label}_{i+1}"
+                class_id = sub_class = -1
+                if typ in SUBFILE_FIELDS:
+                    sub_offset, sub_length = struct.unpack_from('>II', data, entry + SUBFILE_FIELDS[typ])
+                    if sub_offset and sub_length and sub_offset + sub_length <= size \
+                            and data[sub_offset:sub_offset + 4] == b'IGHW':
+                        key = (sub_offset, sub_length)
+                        if key not in subfile_classes:
+                            subfile_classes[key] = class_id_from_subfile(data[sub_offset:sub_offset + sub_length])
+                        sub_class = subfile_classes[key]
+                        kind = determine_subfile_type(sub_offset, data, subfile_sections)
+                        subfiles.extend((base + i, 1 if kind == 'local' else 0, sub_offset, sub_length,
+                                         NO_CLASS if sub_class is None else sub_class))
+                    if typ == 'moby':
+                        class_id = moby_class_enum(data, sub_offset, sub_length)
+                    elif typ == 'clue':
+                        class_id = struct.unpack_from('>I', data, entry + 12)[0]
+                    else:
+                        class_id = sub_class
+                index.tuids.append(tuid)
+                index.zones.append(zone)
+                index.name_offsets.append(name_offset)
+                index.names.append(name)
+                index.classes.append(-1 if class_id is None or class_id > 0x7FFFFFFF else class_id)
+            zone_ranges.extend(v for r in _runs(code, index.zones[base:base + n]) for v in r)
+            class_ranges.extend(v for r in _runs(code, index.classes[base:base + n]) for v in r)
+        index.zone_ranges = array('I', zone_ranges)
+        index.class_ranges = array('I', class_ranges)
+        index.subfile_table = array('I', subfiles)
+        order = sorted(range(len(index.tuids)), key=index.tuids.__getitem__)
+        index.sorted_tuids = array('Q', (index.tuids[s] for s in order))
+        index.sorted_slots = array('I', order)
+        version_major = struct.unpack_from('>H', data, 4)[0]
+        if version_major >= 1 and size >= 0x18:
+            ptr_offset, ptr_count = struct.unpack_from('>II', data, 0x10)
+            if ptr_offset and ptr_offset + 4 * ptr_count <= size:
+                index.pointer_table = (ptr_offset, array('I', struct.unpack_from(f'>{ptr_count}I', data, ptr_offset)))
+        return index
+
+    # Sidecar
+    @staticmethod
+    def sidecar_path(dat_path: str) -> str:
+        return dat_path + DAT_INDEX_SUFFIX
+
+    def save(self, dat_path: str) -> None:
+        blocks = []
+
+        def add(tag: bytes, payload) -> None:
+            blocks.append((tag, bytes(payload)))
+
+        def packed(fmt: str, values) -> bytes:
+            col = array(fmt, values)
+            if sys.byteorder != 'little':
+                col.byteswap()
+            return col.tobytes()
+
+        sections = []
+        for sid in self.section_order:
+            s = self.sections[sid]
+            sections.extend((sid, s['offset'], s['flag'], s['count'], s['size']))
+        add(b'SECT', packed('I', sections))
+        add(b'TYPE', packed('I', [v for typ in TYPE_NAMES for v in (self.bases[typ], self.counts[typ])]))
+        add(b'TUID', packed('Q', self.tuids))
+        add(b'ZONE', packed('H', self.zones))
+        add(b'NOFF', packed('I', self.name_offsets))
+        add(b'NAME', '\0'.join(self.names).encode('utf-8'))
+        add(b'CLAS', packed('i', self.classes))
+        add(b'TSRT', packed('Q', self.sorted_tuids))
+        add(b'TSLT', packed('I', self.sorted_slots))
+        add(b'ZRNG', packed('I', self.zone_ranges))
+        add(b'CRNG', packed('I', self.class_ranges))
+        add(b'SUBF', packed('I', self.subfile_table))
+        ptr_offset, positions = self.pointer_table
+        add(b'PTRS', packed('I', [ptr_offset, len(positions)]) + packed('I', positions))
+
+        header_size = _HEADER.size + len(blocks) * _BLOCK.size
+        out = bytearray(header_size)
+        directory = []
+        for tag, payload in blocks:
+            out += b'\0' * (-len(out) % 8)
+            directory.append(_BLOCK.pack(tag, 0, len(out), len(payload)))
+            out += payload
+        size, mtime_ns = self.source
+        _HEADER.pack_into(out, 0, MAGIC, DAT_INDEX_VERSION, len(blocks), size, mtime_ns,
+                          self.head_hash, self.file_hash)
+        out[_HEADER.size:header_size] = b''.join(directory)
+        path = self.sidecar_path(dat_path)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(out)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, dat_path: str) -> Optional['DatIndex']:
+        """Index du sidecar s'il existe et correspond au .dat, sinon None."""
+        try:
+            st = os.stat(dat_path)
+            with open(cls.sidecar_path(dat_path), 'rb') as f:
+                raw = f.read()
+        except OSError:
+            return None
+        if len(raw) < _HEADER.size:
+            return None
+        magic, version, block_count, size, mtime_ns, head_hash, file_hash = _HEADER.unpack_from(raw, 0)
+        if magic != MAGIC or version != DAT_INDEX_VERSION or size != st.st_size:
+            return None
+        try:
+            with open(dat_path, 'rb') as f:
+                head = f.read(HEAD_HASH_BYTES)
+        except OSError:
+            return None
+        if _hash(head) != head_hash:
+            return None
+        refreshed = mtime_ns != st.st_mtime_ns
+        if refreshed and _file_hash(dat_path) != file_hash:
+            return None
+        blocks = {}
+        pos = _HEADER.size
+        for _ in range(block_count):
+            tag, _reserved, offset, length = _BLOCK.unpack_from(raw, pos)
+            blocks[tag] = memoryview(raw)[offset:offset + length]
+            pos += _BLOCK.size
+        try:
+            index = cls._from_blocks(blocks)
+        except (KeyError, ValueError, TypeError):
+            return None
+        index.source = (st.st_size, st.st_mtime_ns)
+        index.head_hash, index.file_hash = head_hash, file_hash
+        if refreshed:
+            # Même contenu, autre mtime (copie, touch): le sidecar est remis à jour
+            try:
+                index.save(dat_path)
+            except OSError:
+                pass
+        return index
+
+    @classmethod
+    def _from_blocks(cls, blocks: dict) -> 'DatIndex':
+        index = cls()
+        sect = _column(blocks[b'SECT'], 'I')
+        for k in range(0, len(sect), 5):
+            sid, offset, flag, count, size = sect[k:k + 5]
+            index.sections[sid] = {'offset': offset, 'count': count, 'size': size, 'flag': flag}
+            index.section_order.append(sid)
+        types = _column(blocks[b'TYPE'], 'I')
+        for k, typ in enumerate(TYPE_NAMES):
+            index.bases[typ], index.counts[typ] = types[2 * k], types[2 * k + 1]
+        index.tuids = _column(blocks[b'TUID'], 'Q')
+        index.zones = _column(blocks[b'ZONE'], 'H')
+        index.name_offsets = _column(blocks[b'NOFF'], 'I')
+        names = bytes(blocks[b'NAME']).decode('utf-8')
+        index.names = names.split('\0') if index.tuids else []
+        index.classes = _column(blocks[b'CLAS'], 'i')
+        index.sorted_tuids = _column(blocks[b'TSRT'], 'Q')
+        index.sorted_slots = _column(blocks[b'TSLT'], 'I')
+        index.zone_ranges = _column(blocks[b'ZRNG'], 'I')
+        index.class_ranges = _column(blocks[b'CRNG'], 'I')
+        index.subfile_table = _column(blocks[b'SUBF'], 'I')
+        ptrs = _column(blocks[b'PTRS'], 'I')
+        index.pointer_table = (ptrs[0], ptrs[2:2 + ptrs[1]])
+        if not (len(index.tuids) == len(index.zones) == len(index.names) == len(index.classes)):
+            raise ValueError("colonnes incohérentes")
+        return index
+
+    @classmethod
+    def for_file(cls, dat_path: str, data=None, persist: bool = True) -> Tuple['DatIndex', bool]:
+        """(index, chargé du sidecar): sidecar valide, sinon construit depuis `data` (lu si None)
+        et enregistré si persist (ignoré si le dossier est en lecture seule)."""
+        index = cls.load(dat_path)
+        if index is not None:
+            return index, True
+        st = os.stat(dat_path)
+        if data is None:
+            with open(dat_path, 'rb') as f:
+                data = f.read()
+        index = cls.build(data, (st.st_size, st.st_mtime_ns))
+        if persist:
+            try:
+                index.save(dat_path)
+            except OSError:
+                pass
+        return index, False
+
+    # Requêtes
+    def locate(self, slot: int) -> Tuple[str, int]:
+        """(type, index d'enregistrement) d'un slot."""
+        for typ in reversed(TYPE_NAMES):
+            if self.counts[typ] and slot >= self.bases[typ]:
+                return typ, slot - self.bases[typ]
+        raise IndexError(slot)
+
+    def slot(self, typ: str, i: int) -> int:
+        return self.bases[typ] + i
+
+    def slot_of(self, tuid: int) -> Optional[int]:
+        """Slot du TUID (bisection dans la table triée; TUID en double: le dernier enregistrement)."""
+        pos = bisect_left(self.sorted_tuids, tuid)
+        if pos == len(self.sorted_tuids) or self.sorted_tuids[pos] != tuid:
+            return None
+        while pos + 1 < len(self.sorted_tuids) and self.sorted_tuids[pos + 1] == tuid:
+            pos += 1
+        return self.sorted_slots[pos]
+
+    def class_id(self, slot: int) -> Optional[int]:
+        value = self.classes[slot]
+        return None if value < 0 else value
+
+    @property
+    def subfile_count(self) -> int:
+        return len(self.subfile_table) // 5
+
+    def subfile(self, slot: int) -> Optional[Tuple[str, int, int, Optional[int]]]:
+        """(host|local, offset, longueur, ClassID du subfile) de l'enregistrement, ou None."""
+        table = self.subfile_table
+        lo, hi = 0, len(table) // 5
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if table[5 * mid] < slot:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(table) // 5 or table[5 * lo] != slot:
+            return None
+        _slot, kind, offset, length, class_id = table[5 * lo:5 * lo + 5]
+        return 'local' if kind else 'host', offset, length, None if class_id == NO_CLASS else class_id
+
+    def _ranges(self, ranges, typ: str) -> Dict[int, List[Tuple[int, int]]]:
+        code = TYPE_NAMES.index(typ)
+        groups: Dict[int, List[Tuple[int, int]]] = {}
+        for k in range(0, len(ranges), 4):
+            if ranges[k] == code:
+                groups.setdefault(ranges[k + 1], []).append((ranges[k + 2], ranges[k + 3]))
+        return groups
+
+    def zone_runs(self, typ: str) -> Dict[int, List[Tuple[int, int]]]:
+        """{zone: [(début, fin)]} des enregistrements de `typ` (index relatifs au type)."""
+        return self._ranges(self.zone_ranges, typ)
+
+    def class_runs(self, typ: str) -> Dict[int, List[Tuple[int, int]]]:
+        return self._ranges(self.class_ranges, typ)
+
+    def name_slots(self) -> Dict[str, List[int]]:
+        """{nom: [slots]}, construit au premier appel."""
+        if self._name_slots is None:
+            slots: Dict[str, List[int]] = {}
+            for slot, name in enumerate(self.names):
+                slots.setdefault(name, []).append(slot)
+            self._name_slots = slots
+        return self._name_slots
@@ -0,0 +1,329 @@
+# shared/dat_query.py
+"""Requêtes sur les instances d'un .dat, sans extraction (`main.py query <file.dat> "<expr>"`).
+
+Expression: termes `champ:valeur` séparés par des espaces, combinés en ET (même syntaxe que la
+recherche de l'éditeur); une valeur peut lister des alternatives séparées par des virgules (OU)
+et les champs numériques acceptent des intervalles inclusifs `a..b`.
+
+    type:moby,controller     zone:3  zone:2..5       class:0x1A2B  class:Crate
+    name:Crate_*  (motif, insensible à la casse)    tuid:0x10..0x1FF   model:12
+    bbox:x0,y0,z0,x1,y1,z1   (position dans la boîte; un path y a au moins un point)
+    near:x,y,z,r             (à distance <= r de (x,y,z); 'distance' = point le plus proche)
+    knn:x,y,z,k              (les k enregistrements les plus proches, par distance croissante)
+
+Le fichier n'est pas décodé: type, zone, classe, nom et TUID sont lus dans l'index du niveau
+(shared.dat_index.DatIndex: sidecar <file.dat>.polaris-idx, construit au premier appel), qui
+réduit d'abord les candidats; les autres prédicats (model, bbox) ne lisent que leurs colonnes,
+pour ces seuls candidats (struct.unpack_from sur le mmap). knn: range les positions des
+candidats restants dans une grille (shared.spatial_index) et n'en parcourt que le voisinage.
+"""
+import fnmatch
+import math
+import re
+import struct
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from shared.class_enum import load_class_enum
+from shared.dat_index import DatIndex
+from shared.spatial_index import POSITION_TYPES, SpatialIndex
+from shared.tuid_index import INDEX_TYPES, TYPE_NAMES
+
+
+FIELDS = ('type', 'zone', 'class', 'name', 'tuid', 'model', 'bbox', 'near', 'knn')
+# Types qui portent chaque colonne (les autres sont écartés par un terme sur ce champ)
+CLASS_TYPES = ('moby', 'controller', 'clue')
+MODEL_TYPES = ('moby',)
+
+_TERM = re.compile(r'(\w+):(\S+)')
+
+
+class QueryError(ValueError):
+    """Expression de requête invalide (message affichable tel quel)."""
+
+
+def _parse_int(text: str) -> int:
+    try:
+        return int(text, 0)
+    except ValueError:
+        try:
+            return int(text, 16)
+        except ValueError:
+            raise QueryError(f"nombre invalide: {text!r}") from None
+
+
+def _parse_ranges(text: str, names: Optional[Dict[str, int]] = None) -> List[Tuple[int, int]]:
+    """'3', '2..5', '1,4..6' -> [(lo, hi)] inclusifs; names: noms acceptés à la place d'un nombre."""
+    ranges = []
+    for part in text.split(','):
+        if names is not None and part.lower() in names:
+            value = names[part.lower()]
+            ranges.append((value, value))
+        elif '..' in part:
+            lo, hi = part.split('..', 1)
+            ranges.append((_parse_int(lo), _parse_int(hi)))
+        else:
+            value = _parse_int(part)
+            ranges.append((value, value))
+    return ranges
+
+
+def _parse_center(field: str, value: str, last: str) -> Tuple[Tuple[float, float, float], float]:
+    """'x,y,z,n' -> ((x, y, z), n) pour near: et knn:."""
+    try:
+        coords = [float(v) for v in value.split(',')]
+    except ValueError:
+        coords = []
+    if len(coords) != 4:
+        raise QueryError(f"{field} attend x,y,z,{last}: {value!r}")
+    return (coords[0], coords[1], coords[2]), coords[3]
+
+
+def _in_ranges(value, ranges) -> bool:
+    return value is not None and any(lo <= value <= hi for lo, hi in ranges)
+
+
+class Query:
+    """Expression analysée: un attribut par champ (None si absent)."""
+
+    def __init__(self, expr: str):
+        self.types: Optional[List[str]] = None
+        self.zones = self.classes = self.tuids = self.models = None
+        self.names: Optional[List[str]] = None
+        self.bbox: Optional[Tuple[float, ...]] = None
+        self.near: Optional[Tuple[Tuple[float, float, float], float]] = None
+        self.knn: Optional[Tuple[Tuple[float, float, float], int]] = None
+        rest = _TERM.sub(lambda m: self._term(m.group(1).lower(), m.group(2)) or '', expr)
+        if rest.strip():
+            raise QueryError(f"terme non reconnu: {rest.strip()!r} (champs: {', '.join(FIELDS)})")
+
+    def _term(self, field: str, value: str) -> None:
+        if field == 'type':
+            types = [t.lower() for t in value.split(',')]
+            unknown = [t for t in types if t not in INDEX_TYPES]
+            if unknown:
+                raise QueryError(f"type inconnu: {', '.join(unknown)} (types: {', '.join(TYPE_NAMES)})")
+            self.types = types
+        elif field == 'zone':
+            self.zones = _parse_ranges(value)
+        elif field == 'class':
+            by_name = {name.lower(): cid for cid, name in load_class_enum().items()}
+            self.classes = _parse_ranges(value, by_name)
+        elif field == 'name':
+            self.names = [p.lower() for p in value.split(',')]
+        elif field == 'tuid':
+            self.tuids = _parse_ranges(value)
+        elif field == 'model':
+            self.models = _parse_ranges(value)
+        elif field == 'bbox':
+            try:
+                coords = [float(v) for v in value.split(',')]
+            except ValueError:
+                coords = []
+            if len(coords) != 6:
+                raise QueryError(f"bbox attend x0,y0,z0,x1,y1,z1: {value!r}")
+            lo, hi = coords[:3], coords[3:]
+            self.bbox = tuple(min(a, b) for a, b in zip(lo, hi)) + tuple(max(a, b) for a, b in zip(lo, hi))
+        elif field == 'near':
+            center, r = _parse_center(field, value, 'r')
+            if not r >= 0:
+                raise QueryError(f"near: rayon négatif: {value!r}")
+            self.near = (center, r)
+        elif field == 'knn':
+            center, k = _parse_center(field, value, 'k')
+            if k != int(k) or k < 1:
+                raise QueryError(f"knn: k doit être un entier >= 1: {value!r}")
+            self.knn = (center, int(k))
+        else:
+            raise QueryError(f"champ inconnu: {field!r} (champs: {', '.join(FIELDS)})")
+
+    def candidate_types(self) -> List[str]:
+        types = list(self.types or TYPE_NAMES)
+        for restrict, active in ((CLASS_TYPES, self.classes), (MODEL_TYPES, self.models),
+                                 (POSITION_TYPES, self.bbox or self.near or self.knn)):
+            if active is not None:
+                types = [t for t in types if t in restrict]
+        return types
+
+
+class DatColumns:
+    """Colonnes non indexées des enregistrements d'un .dat (bytes ou mmap), lues à la demande."""
+
+    def __init__(self, data, index: DatIndex):
+        self.data = data
+        self.index = index
+
+    def _entry(self, typ: str, i: int) -> int:
+        body = self.index.sections[INDEX_TYPES[typ][1]]
+        return body['offset'] + i * body['size']
+
+    def model_index(self, typ: str, i: int) -> Optional[int]:
+        if typ != 'moby':
+            return None
+        return struct.unpack_from('>H', self.data, self._entry(typ, i))[0]
+
+    def volume_matrix(self, i: int) -> Tuple[float, ...]:
+        """Matrice 4x4 d'un volume (16 floats, ligne par ligne; translation: floats 12-14)."""
+        return struct.unpack_from('>16f', self.data, self._entry('volume', i))
+
+    def positions(self, typ: str, i: int) -> List[Tuple[float, float, float]]:
+        """Position(s) monde: une pour moby/controller/volume (translation de la matrice)/clue
+        (translation de son volume), les points d'un path."""
+        data, entry = self.data, self._entry(typ, i)
+        if typ == 'moby':
+            return [struct.unpack_from('>3f', data, entry + 20)]
+        if typ == 'controller':
+            return [struct.unpack_from('>3f', data, entry + 8)]
+        if typ == 'volume':
+            return [struct.unpack_from('>3f', data, entry + 48)]
+        if typ == 'clue':
+            volume_tuid_offset = struct.unpack_from('>I', data, entry)[0]
+            if not volume_tuid_offset or volume_tuid_offset + 8 > len(data):
+                return []
+            slot = self.index.slot_of(struct.unpack_from('>Q', data, volume_tuid_offset)[0])
+            if slot is None or self.index.locate(slot)[0] != 'volume':
+                return []
+            return self.positions('volume', slot - self.index.bases['volume'])
+        if typ == 'path':
+            point_offset = struct.unpack_from('>I', data, entry)[0]
+            point_count = struct.unpack_from('>H', data, entry + 14)[0]
+            points = []
+            for j in range(point_count):
+                addr = point_offset + j * 16
+                if addr + 12 > len(data):
+                    break
+                points.append(struct.unpack_from('>3f', data, addr))
+            return points
+        return []
+
+
+def _expand(runs) -> Iterator[int]:
+    for start, end in runs:
+        yield from range(start, end)
+
+
+def _name_slots(query: Query, index: DatIndex) -> set:
+    """Slots dont le nom correspond à l'un des motifs (noms distincts parcourus une seule fois;
+    un nom sans joker est cherché directement)."""
+    slots: set = set()
+    patterns = []
+    lowered = None
+    for pattern in query.names:
+        if any(c in pattern for c in '*?['):
+            patterns.append(re.compile(fnmatch.translate(pattern)))
+            continue
+        if lowered is None:
+            lowered = {}
+            for name, name_slots in index.name_slots().items():
+                lowered.setdefault(name.lower(), []).extend(name_slots)
+        slots.update(lowered.get(pattern, ()))
+    if patterns:
+        for name, name_slots in index.name_slots().items():
+            if any(p.match(name.lower()) for p in patterns):
+                slots.update(name_slots)
+    return slots
+
+
+def _indexed_candidates(query: Query, index: DatIndex, typ: str, name_slots: Optional[set]) -> Optional[set]:
+    """Indices d'enregistrements de `typ` retenus par les index (None: pas de terme indexé)."""
+    found: Optional[set] = None
+
+    def narrow(indices) -> None:
+        nonlocal found
+        indices = set(indices)
+        found = indices if found is None else found & indices
+
+    if query.zones is not None:
+        groups = index.zone_runs(typ)
+        narrow(i for zone, runs in groups.items() if _in_ranges(zone, query.zones) for i in _expand(runs))
+    if query.classes is not None:
+        groups = index.class_runs(typ)
+        narrow(i for cid, runs in groups.items() if _in_ranges(cid, query.classes) for i in _expand(runs))
+    if name_slots is not None:
+        base, n = index.bases[typ], index.counts[typ]
+        narrow(s - base for s in name_slots if base <= s < base + n)
+    if query.tuids is not None:
+        base, n = index.bases[typ], index.counts[typ]
+        tuids = index.tuids[base:base + n]
+        narrow(i for i, tuid in enumerate(tuids) if _in_ranges(tuid, query.tuids))
+    return found
+
+
+def _inside(point, box) -> bool:
+    return all(box[k] <= point[k] <= box[k + 3] for k in range(3))
+
+
+def _matches(data, query: Query, index: DatIndex) -> Iterator[Tuple[dict, List[Tuple[float, float, float]]]]:
+    """(enregistrement, positions) qui satisfont les termes autres que knn, dans l'ordre des
+    sections (positions lues seulement si un terme spatial les demande)."""
+    columns = DatColumns(data, index)
+    class_names = load_class_enum() if query.classes is not None else {}
+    name_slots = _name_slots(query, index) if query.names is not None else None
+    spatial = query.bbox is not None or query.near is not None or query.knn is not None
+    for typ in query.candidate_types():
+        n, base = index.counts.get(typ, 0), index.bases.get(typ, 0)
+        if not n:
+            continue
+        candidates = _indexed_candidates(query, index, typ, name_slots)
+        for i in (sorted(candidates) if candidates is not None else range(n)):
+            record = {'type': typ, 'index': i}
+            if query.models is not None:
+                model = columns.model_index(typ, i)
+                if not _in_ranges(model, query.models):
+                    continue
+                record['model_index'] = model
+            positions = columns.positions(typ, i) if spatial else []
+            if query.bbox is not None:
+                inside = [p for p in positions if _inside(p, query.bbox)]
+                if not inside:
+                    continue
+                record['position'] = dict(zip('xyz', inside[0]))
+                if typ == 'path':
+                    record['points_in_bbox'] = len(inside)
+            if query.near is not None:
+                center, r = query.near
+                close = [(math.dist(p, center), p) for p in positions]
+                close = [c for c in close if c[0] <= r]
+                if not close:
+                    continue
+                distance, point = min(close)
+                record['position'] = dict(zip('xyz', point))
+                record['distance'] = distance
+                if typ == 'path':
+                    record['points_in_radius'] = len(close)
+            tuid = index.tuids[base + i]
+            record.update({'tuid': tuid, 'tuid_hex': f"0x{tuid:016X}", 'name': index.names[base + i],
+                           'zone': index.zones[base + i]})
+            if query.classes is not None:
+                cid = index.class_id(base + i)
+                record['class_id'] = cid
+                if cid in class_names:
+                    record['class_name'] = class_names[cid]
+            yield record, positions
+
+
+def run_query(data, query: Query, index: DatIndex, limit: Optional[int] = None) -> Iterator[dict]:
+    """Enregistrements qui satisfont `query`, dans l'ordre des sections (par distance croissante
+    avec knn): dict JSON-sérialisable (type, index, tuid, name, zone, et les colonnes lues pour
+    les prédicats)."""
+    matches = _matches(data, query, index)
+    if query.knn is not None:
+        center, k = query.knn
+        records = []
+        items = []
+        for record, positions in matches:
+            items.append((len(records), positions))
+            records.append(record)
+        grid = SpatialIndex.build(items)
+        ordered = []
+        for distance, key, point in grid.nearest(center, k):
+            record = records[key]
+            record['position'] = dict(zip('xyz', point))
+            record['distance'] = distance
+            ordered.append(record)
+        matches = ((record, None) for record in ordered)
+    emitted = 0
+    for record, _positions in matches:
+        yield record
+        emitted += 1
+        if limit is not None and emitted >= limit:
+            return
@@ -0,0 +1,71 @@
+# shared/float32.py
+"""Écriture exacte et courte des float32 du .dat dans le JSON (`extract --short-floats`).
+
+Les float32 lus (read_float_be) deviennent des doubles Python, que json.dump écrit avec tous
+les chiffres du double: 0.1f s'écrit 0.10000000149011612. shortest() remplace chaque valeur
+par le double du plus court décimal (1 à 9 chiffres significatifs) qui redonne exactement le
+même float32: 0.1f s'écrit 0.1. Le rebuild n'a rien à changer: struct.pack('>f', 0.1) retombe
+sur les mêmes bits, -0.0 compris. Les NaN/inf sont laissés tels quels.
+
+Les doubles qui ne sont pas des float32 exacts (valeurs calculées, saisies de l'éditeur) ne
+sont jamais modifiés.
+"""
+import math
+import struct
+from typing import Any, Dict
+
+_F32 = struct.Struct('>f')
+
+# bits float32 -> double court (clé en octets: 0.0 et -0.0 sont égaux comme floats)
+_memo: Dict[bytes, float] = {}
+_MEMO_MAX = 1 << 16
+
+
+def is_float32(value: float) -> bool:
+    """True si `value` est exactement représentable en float32."""
+    try:
+        return _F32.unpack(_F32.pack(value))[0] == value
+    except OverflowError:
+        return False
+
+
+def shortest(value: float) -> float:
+    """Double du plus court décimal redonnant le même float32 que `value` (inchangé si `value`
+    n'est pas un float32 exact ou n'est pas fini)."""
+    if not math.isfinite(value):
+        return value
+    try:
+        bits = _F32.pack(value)
+    except OverflowError:
+        return value
+    if _F32.unpack(bits)[0] != value:
+        return value
+    cached = _memo.get(bits)
+    if cached is not None:
+        return cached
+    result = value
+    for digits in range(1, 10):
+        candidate = float('%.*g' % (digits, value))
+        try:
+            if _F32.pack(candidate) == bits:
+                result = candidate
+                break
+        except OverflowError:
+            # arrondi décimal au-delà du plus grand float32
+            continue
+    if len(_memo) >= _MEMO_MAX:
+        _memo.clear()
+    _memo[bits] = result
+    return result
+
+
+def shorten_floats(obj: Any) -> Any:
+    """Copie de `obj` (dicts/listes JSON) où chaque float32 exact est remplacé par shortest()."""
+    if isinstance(obj, float):
+        return shortest(obj)
+    if isinstance(obj, dict):
+        return {key: shorten_floats(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [shorten_floats(value) for value in obj]
+    return obj
+
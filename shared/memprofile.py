@@ -0,0 +1,253 @@
+# shared/memprofile.py
+"""Profilage mémoire par phase (option --memprofile), branché sur les spans de shared.metrics.
+
+Pour chaque span: pic tracemalloc (allocations Python), delta de mémoire tracée entre
+l'entrée et la sortie, pic RSS du processus pendant la phase, et pour les phases de
+premiers niveaux (profondeur < snapshot_depth) les principaux sites d'allocation
+(comparaison de snapshots tracemalloc entrée/sortie).
+
+Pic RSS par phase: sous Linux, VmHWM est remis à zéro à l'entrée de chaque phase via
+/proc/self/clear_refs; ailleurs on retombe sur psutil (si installé) ou sur
+resource.ru_maxrss, qui ne donne que le pic global du processus (rss_peak_exact=False).
+
+Usage typique:
+    memprofile.start()
+    ... pipeline instrumenté par metrics.span(...) ...
+    data = memprofile.stop()
+"""
+import os
+import sys
+import tracemalloc
+from typing import Dict, Any, List
+
+from shared import metrics
+
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_phases: Dict[str, Dict[str, Any]] = {}
+_order: Dict[str, int] = {}
+_frames: List[Dict[str, Any]] = []
+_options: Dict[str, int] = {'snapshot_depth': 2, 'top_n': 10}
+_rss_mode: str | None = None
+_active = False
+
+
+# --- RSS -------------------------------------------------------------------
+
+def _proc_status_kb(field: str) -> int | None:
+    try:
+        with open('/proc/self/status', 'r', encoding='ascii') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except Exception:
+        return None
+    return None
+
+
+def _reset_rss_peak() -> bool:
+    try:
+        with open('/proc/self/clear_refs', 'w', encoding='ascii') as f:
+            f.write('5')
+        return True
+    except Exception:
+        return False
+
+
+def _detect_rss_mode() -> str | None:
+    if _proc_status_kb('VmHWM') is not None and _reset_rss_peak():
+        return 'proc'
+    try:
+        import psutil  # optionnel
+        psutil.Process().memory_info()
+        return 'psutil'
+    except Exception:
+        pass
+    try:
+        import resource  # noqa: F401
+        return 'resource'
+    except Exception:
+        return None
+
+
+def current_rss() -> int | None:
+    """RSS courant du processus (octets), ou None si indisponible."""
+    if _rss_mode == 'proc':
+        return _proc_status_kb('VmRSS')
+    if _rss_mode == 'psutil':
+        import psutil
+        return int(psutil.Process().memory_info().rss)
+    return None
+
+
+def peak_rss() -> int | None:
+    """Pic RSS depuis la dernière remise à zéro (proc) ou depuis le démarrage du processus."""
+    if _rss_mode == 'proc':
+        return _proc_status_kb('VmHWM')
+    if _rss_mode == 'psutil':
+        import psutil
+        info = psutil.Process().memory_info()
+        return int(getattr(info, 'peak_wset', 0) or info.rss)
+    if _rss_mode == 'resource':
+        import resource
+        ru = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux: Ko, macOS: octets
+        return int(ru) if sys.platform == 'darwin' else int(ru) * 1024
+    return None
+
+
+# --- Listener sur les spans -------------------------------------------------
+
+def _site(frame: tracemalloc.Frame) -> str:
+    filename = frame.filename
+    try:
+        rel = os.path.relpath(filename, _ROOT)
+        if not rel.startswith('..'):
+            filename = rel
+    except ValueError:
+        pass
+    return f"{filename}:{frame.lineno}"
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    ))
+
+
+def _on_span(event: str, path: str) -> None:
+    depth = path.count('/')
+    if event == 'enter':
+        current, peak = tracemalloc.get_traced_memory()
+        rss = peak_rss()
+        if _frames:
+            parent = _frames[-1]
+            parent['traced_peak'] = max(parent['traced_peak'], peak)
+            if rss is not None:
+                parent['rss_peak'] = max(parent['rss_peak'] or 0, rss)
+        tracemalloc.reset_peak()
+        if _rss_mode == 'proc':
+            _reset_rss_peak()
+        _order.setdefault(path, len(_order))
+        _frames.append({
+            'path': path,
+            'traced_start': current,
+            'traced_peak': current,
+            'rss_peak': None if _rss_mode == 'proc' else rss,
+            'snapshot': _take_snapshot() if depth < _options['snapshot_depth'] else None,
+        })
+        return
+
+    if not _frames or _frames[-1]['path'] != path:
+        return
+    frame = _frames.pop()
+    current, peak = tracemalloc.get_traced_memory()
+    traced_peak = max(frame['traced_peak'], peak)
+    rss = peak_rss()
+    rss_peak = max(frame['rss_peak'] or 0, rss or 0) or None
+
+    top: List[Dict[str, Any]] = []
+    if frame['snapshot'] is not None:
+        stats = _take_snapshot().compare_to(frame['snapshot'], 'lineno')
+        for st in stats[:_options['top_n']]:
+            if st.size_diff <= 0:
+                break
+            top.append({
+                'site': _site(st.traceback[0]),
+                'size_diff': st.size_diff,
+                'count_diff': st.count_diff,
+                'size': st.size,
+            })
+
+    entry = _phases.get(path)
+    if entry is None:
+        entry = _phases[path] = {
+            'calls': 0,
+            'traced_peak': 0,
+            'traced_delta': 0,
+            'rss_peak': None,
+            'rss_end': None,
+            'top_sites': [],
+        }
+    entry['calls'] += 1
+    entry['traced_peak'] = max(entry['traced_peak'], traced_peak)
+    entry['traced_delta'] = current - frame['traced_start']
+    if rss_peak is not None:
+        entry['rss_peak'] = max(entry['rss_peak'] or 0, rss_peak)
+    entry['rss_end'] = current_rss()
+    if top:
+        entry['top_sites'] = top
+
+    # Le pic de l'enfant compte aussi pour le parent (les remises à zéro ne doivent pas le perdre)
+    if _frames:
+        parent = _frames[-1]
+        parent['traced_peak'] = max(parent['traced_peak'], traced_peak)
+        if rss_peak is not None:
+            parent['rss_peak'] = max(parent['rss_peak'] or 0, rss_peak)
+    tracemalloc.reset_peak()
+
+
+# --- API ---------------------------------------------------------------------
+
+def start(*, snapshot_depth: int = 2, top_n: int = 10, nframes: int = 1) -> None:
+    """Démarre tracemalloc et l'écoute des spans. snapshot_depth: profondeur max des phases
+    pour lesquelles on calcule les sites d'allocation (les snapshots sont coûteux)."""
+    global _rss_mode, _active
+    _phases.clear()
+    _order.clear()
+    _frames.clear()
+    _options['snapshot_depth'] = int(snapshot_depth)
+    _options['top_n'] = int(top_n)
+    _rss_mode = _detect_rss_mode()
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(nframes)
+    metrics.add_listener(_on_span)
+    _active = True
+
+
+def stop() -> Dict[str, Any]:
+    """Arrête le profilage et renvoie report()."""
+    global _active
+    metrics.remove_listener(_on_span)
+    data = report()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _frames.clear()
+    _active = False
+    return data
+
+
+def is_active() -> bool:
+    return _active
+
+
+def report() -> Dict[str, Any]:
+    return {
+        'rss_mode': _rss_mode,
+        'rss_peak_exact': _rss_mode in ('proc',),
+        'phases': {
+            path: dict(_phases[path])
+            for path in sorted(_phases, key=lambda p: _order.get(p, len(_order)))
+        },
+    }
+
+
+def _mb(value: int | None) -> str:
+    return '   n/a' if value is None else f"{value / (1024 * 1024):6.1f}"
+
+
+def format_summary(data: Dict[str, Any] | None = None, top_n: int = 3) -> str:
+    data = data or report()
+    lines = ["🧠 Mémoire par phase (Mo): pic tracé | delta tracé | pic RSS"]
+    for path, e in data['phases'].items():
+        indent = '  ' * path.count('/')
+        lines.append(f"  {indent}{path.rsplit('/', 1)[-1]}: {_mb(e['traced_peak'])} | {_mb(e['traced_delta'])} | {_mb(e['rss_peak'])}")
+        for site in e['top_sites'][:top_n]:
+            lines.append(f"  {indent}    + {site['size_diff'] / (1024 * 1024):.1f} Mo  {site['site']}")
+    if not data.get('rss_peak_exact'):
+        lines.append("  (pic RSS: valeur globale du processus, pas de remise à zéro par phase sur cette plateforme)")
+    return "\n".join(lines)
@@ -0,0 +1,198 @@
+# shared/metrics.py
+"""Instrumentation légère des pipelines extract/repack: spans (durées par phase) et compteurs.
+
+État global au module (comme rebuild/classfiles_aggregator): appeler reset() avant une
+commande, puis report()/write_metrics() à la fin. Les spans sont imbriqués: un span ouvert
+dans un autre est enregistré sous le chemin 'parent/enfant'. Les durées d'un même chemin
+sont agrégées (appels, total, min, max), ce qui permet d'instrumenter des boucles chaudes
+sans accumuler un événement par élément.
+
+Importé par main.py à chaque lancement: le module ne dépend que de `time` (pas de typing,
+json ni contextlib au chargement) pour ne pas alourdir le démarrage de la CLI.
+"""
+from __future__ import annotations
+
+import time
+
+
+_spans: dict[str, dict[str, float]] = {}
+_stack: list[str] = []
+_starts: list[float] = []
+_listeners: list = []
+_counters: dict[str, int] = {}
+_quiet = False
+_origin = time.perf_counter()
+
+
+def reset() -> None:
+    """Vide spans et compteurs. Les spans encore ouverts restent valides (ils seront enregistrés à leur fin)."""
+    global _origin
+    _spans.clear()
+    _counters.clear()
+    _origin = time.perf_counter()
+
+
+class _Isolated:
+    def __enter__(self):
+        global _origin
+        self._saved = (dict(_spans), list(_stack), list(_starts), dict(_counters), _origin)
+        reset()
+        _stack.clear()
+        _starts.clear()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        global _origin
+        saved = self._saved
+        _spans.clear()
+        _spans.update(saved[0])
+        _stack[:] = saved[1]
+        _starts[:] = saved[2]
+        _counters.clear()
+        _counters.update(saved[3])
+        _origin = saved[4]
+        return False
+
+
+def isolated() -> _Isolated:
+    """Mesures indépendantes dans le bloc `with`: l'état courant est mis de côté puis restauré à la sortie."""
+    return _Isolated()
+
+
+def add_listener(listener) -> None:
+    """listener(event, path) est appelé à l'ouverture ('enter') et à la fermeture ('exit') de chaque span
+    (ex: shared.memprofile). Les durées ajoutées via add_duration() ne le déclenchent pas."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def remove_listener(listener) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def set_quiet(quiet: bool) -> None:
+    """Active/désactive les prints par élément dans les boucles chaudes (option --quiet)."""
+    global _quiet
+    _quiet = bool(quiet)
+
+
+def is_quiet() -> bool:
+    return _quiet
+
+
+def log_item(*args, **kwargs) -> None:
+    """print() pour les messages émis par élément dans les boucles chaudes; muet en mode --quiet."""
+    if not _quiet:
+        print(*args, **kwargs)
+
+
+def _path(name: str) -> str:
+    return '/'.join(_stack + [name]) if _stack else name
+
+
+def add_duration(name: str, seconds: float, calls: int = 1) -> None:
+    """Ajoute une durée mesurée à la main au span `name` (relatif au span courant)."""
+    path = _path(name)
+    entry = _spans.get(path)
+    if entry is None:
+        _spans[path] = {
+            'calls': calls,
+            'total': seconds,
+            'min': seconds,
+            'max': seconds,
+            'start': time.perf_counter() - _origin - seconds,
+        }
+        return
+    entry['calls'] += calls
+    entry['total'] += seconds
+    entry['min'] = min(entry['min'], seconds)
+    entry['max'] = max(entry['max'], seconds)
+
+
+def begin(name: str) -> None:
+    """Ouvre un span sans bloc `with` (phases longues découpées dans une même fonction); fermer avec end()."""
+    _stack.append(name)
+    _starts.append(time.perf_counter())
+    if _listeners:
+        path = '/'.join(_stack)
+        for listener in list(_listeners):
+            listener('enter', path)
+
+
+def end(name: str) -> None:
+    """Ferme le span ouvert par begin(name). Les spans enfants restés ouverts (exception entre
+    begin/end) sont fermés au passage; un nom inconnu est ignoré."""
+    if name not in _stack:
+        return
+    while _stack:
+        current = _stack[-1]
+        path = '/'.join(_stack)
+        _stack.pop()
+        add_duration(current, time.perf_counter() - _starts.pop())
+        if _listeners:
+            for listener in list(_listeners):
+                listener('exit', path)
+        if current == name:
+            break
+
+
+class _Span:
+    __slots__ = ('name',)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        begin(self.name)
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        end(self.name)
+        return False
+
+
+def span(name: str) -> _Span:
+    """Mesure la durée du bloc `with` et l'enregistre sous le chemin du span courant."""
+    return _Span(name)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Incrémente un compteur (bytes_read, records_decoded, files_written, patches_applied, ...)."""
+    _counters[name] = _counters.get(name, 0) + int(n)
+
+
+def report() -> dict:
+    """Résultats sérialisables: spans dans l'ordre de démarrage et compteurs."""
+    spans = []
+    for path, e in sorted(_spans.items(), key=lambda kv: kv[1]['start']):
+        spans.append({
+            'name': path,
+            'depth': path.count('/'),
+            'calls': int(e['calls']),
+            'start': round(e['start'], 6),
+            'total': round(e['total'], 6),
+            'min': round(e['min'], 6),
+            'max': round(e['max'], 6),
+        })
+    return {'spans': spans, 'counters': dict(sorted(_counters.items()))}
+
+
+def format_summary() -> str:
+    data = report()
+    lines = ["⏱️  Métriques:"]
+    for s in data['spans']:
+        calls = f" ({s['calls']} appels)" if s['calls'] > 1 else ""
+        lines.append(f"  {'  ' * s['depth']}{s['name'].rsplit('/', 1)[-1]}: {s['total']:.3f}s{calls}")
+    for name, value in data['counters'].items():
+        lines.append(f"  # {name}: {value}")
+    return "\n".join(lines)
+
+
+def write_metrics(output_path: str, **extra) -> None:
+    """Écrit report() (plus des champs libres, ex: commande/cible) en JSON."""
+    import json
+    data = dict(extra)
+    data.update(report())
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
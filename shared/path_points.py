@@ -0,0 +1,89 @@
+# shared/path_points.py
+"""Points des paths: section PATH_POINTS_ID (0x00025058), 16 octets par point (x, y, z, t en
+float32 big-endian).
+
+Deux formes dans le JSON d'un path:
+    'points'         liste de {index, address, position{x,y,z}, timestamp, timestamp_ms} (défaut)
+    'points_packed'  les octets de la section tels quels, en base64 (`extract --compact-paths`):
+                     ~22 caractères par point au lieu de ~200, rien à analyser point par point;
+                     le rebuild les recopie sans repacker (aller-retour bit à bit, NaN compris).
+"""
+import base64
+import struct
+from typing import List
+
+POINT_SIZE = 16
+PACKED_KEY = 'points_packed'
+
+_POINT = struct.Struct('>ffff')
+
+
+def encode_packed(raw: bytes) -> str:
+    return base64.b64encode(raw).decode('ascii')
+
+
+def decode_packed(text: str) -> bytes:
+    raw = base64.b64decode(text)
+    if len(raw) % POINT_SIZE:
+        raise ValueError(f"{PACKED_KEY}: {len(raw)} octets, pas un multiple de {POINT_SIZE}")
+    return raw
+
+
+def expand_points(raw: bytes, point_offset: int = 0) -> List[dict]:
+    """Octets de points -> forme 'points' de l'extraction (address: offset dans le .dat)."""
+    return [
+        {
+            'index': j,
+            'address': point_offset + j * POINT_SIZE,
+            'position': {'x': x, 'y': y, 'z': z},
+            'timestamp': t,
+            'timestamp_ms': int(t * 1000 / 30),
+        }
+        for j, (x, y, z, t) in enumerate(_POINT.iter_unpack(raw))
+    ]
+
+
+def pack_points(points) -> bytes:
+    """Forme 'points' -> octets de la section (positions/timestamps absents: 0.0)."""
+    out = bytearray()
+    for pt in points or ():
+        pos = pt.get('position', {})
+        out += _POINT.pack(float(pos.get('x', 0.0)), float(pos.get('y', 0.0)), float(pos.get('z', 0.0)),
+                           float(pt.get('timestamp', 0.0)))
+    return bytes(out)
+
+
+def points_bytes(inst: dict) -> bytes:
+    """Octets des points d'un path JSON, quelle que soit sa forme."""
+    packed = inst.get(PACKED_KEY)
+    if packed is not None:
+        return decode_packed(packed)
+    return pack_points(inst.get('points'))
+
+
+def count_points(inst: dict) -> int:
+    packed = inst.get(PACKED_KEY)
+    if packed is not None:
+        return len(decode_packed(packed)) // POINT_SIZE
+    return len(inst.get('points') or [])
+
+
+def point_list(inst: dict) -> List[dict]:
+    """Points d'un path JSON en forme 'points' (liste de l'instance, ou dépaquetée: une copie)."""
+    packed = inst.get(PACKED_KEY)
+    if packed is not None:
+        return expand_points(decode_packed(packed), int(inst.get('point_offset') or 0))
+    return inst.get('points') or []
+
+
+def store_points(inst: dict, points: List[dict]) -> None:
+    """Écrit `points` dans l'instance en gardant sa forme (paquetée ou liste)."""
+    if PACKED_KEY in inst:
+        inst[PACKED_KEY] = encode_packed(pack_points(points))
+    else:
+        inst['points'] = points
+    inst['point_count'] = len(points)
+
+
+def is_path_record(inst: dict) -> bool:
+    return ('points' in inst or PACKED_KEY in inst) and 'total_duration' in inst
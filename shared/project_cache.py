@@ -0,0 +1,262 @@
+# shared/project_cache.py
+"""Cache binaire d'un dossier d'extraction: <dossier>/.polaris-cache (PROJECT_CACHE_FILENAME).
+
+L'éditeur et le repack relisent des dizaines de milliers de *.moby.json, *.path.json, ... à
+chaque ouverture. Le cache garde, par fichier (chemin relatif au dossier, mtime_ns, taille):
+    - le JSON déjà analysé (instances, points des paths, références), sérialisé par marshal;
+    - l'empreinte SHA-1 des subfiles *_CLASS.local.dat (dédup du blob local au repack).
+
+Revalidation paresseuse: rien n'est vérifié au chargement; chaque lecture (load_json,
+subfile_digest) compare mtime et taille au manifeste et ne réanalyse que les fichiers modifiés
+depuis l'écriture du cache. Chaque lecture renvoie un objet neuf (les rebuilders modifient les
+instances qu'ils reçoivent). Le cache est optionnel: absent, illisible ou écrit par une autre
+version (format ou Python), il est ignoré et reconstruit.
+
+Format: en-tête magic 'PLRSPRJ\\0', version u32, version marshal u16, Python (majeur, mineur)
+u8 x 2, puis marshal de {'json': {rel: (mtime_ns, taille, marshal de l'objet)},
+'subfiles': {rel: (mtime_ns, taille, sha1)}}.
+
+Le rebuild active le cache de son dossier source (activate()/deactivate(), état de module comme
+rebuild.classfiles_aggregator); les collecteurs parcourent et lisent par walk()/load_json()/
+isfile()/read_bytes(), qui retombent sur os.walk/json.load ordinaires hors de la source active.
+La source peut aussi être une base SQLite du projet (shared.project_store, même interface).
+"""
+import gc
+import hashlib
+import json
+import marshal
+import os
+import struct
+import sys
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from shared import metrics
+
+
+PROJECT_CACHE_FILENAME = '.polaris-cache'
+PROJECT_CACHE_VERSION = 1
+MAGIC = b'PLRSPRJ\0'
+
+_HEADER = struct.Struct('<8sIHBB')
+
+
+@contextmanager
+def paused_gc():
+    """Suspend le ramasse-miettes cyclique pendant la création de nombreux objets (les
+    collectes de génération 0 déclenchées par milliers de dicts JSON doublent le temps de
+    chargement; ces objets ne forment pas de cycles)."""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class ProjectCache:
+    """Manifeste + JSON analysés et empreintes des subfiles d'un dossier d'extraction."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.path = os.path.join(root, PROJECT_CACHE_FILENAME)
+        self._prefix = root if root.endswith(os.sep) else root + os.sep
+        self._json: Dict[str, Tuple[int, int, bytes]] = {}
+        self._subfiles: Dict[str, Tuple[int, int, bytes]] = {}
+        # Entrées lues pendant cette session (les autres sont vérifiées avant save())
+        self._seen: set = set()
+        self.dirty = False
+        self.hits = 0
+        self.parsed = 0
+
+    def __len__(self) -> int:
+        return len(self._json)
+
+    @classmethod
+    def load(cls, root: str) -> 'ProjectCache':
+        """Cache du dossier (vide si le fichier est absent ou invalide)."""
+        cache = cls(root)
+        try:
+            with open(cache.path, 'rb') as f:
+                raw = f.read()
+        except OSError:
+            return cache
+        if len(raw) < _HEADER.size:
+            return cache
+        magic, version, marshal_version, major, minor = _HEADER.unpack_from(raw, 0)
+        if (magic != MAGIC or version != PROJECT_CACHE_VERSION or marshal_version != marshal.version
+                or (major, minor) != sys.version_info[:2]):
+            return cache
+        try:
+            body = marshal.loads(memoryview(raw)[_HEADER.size:])
+            cache._json = body['json']
+            cache._subfiles = body['subfiles']
+        except (ValueError, EOFError, TypeError, KeyError):
+            cache._json, cache._subfiles = {}, {}
+        metrics.count('bytes_read', len(raw))
+        return cache
+
+    def covers(self, path: str) -> bool:
+        return path.startswith(self._prefix)
+
+    # Interface commune avec shared.project_store.ProjectStore (source du rebuild)
+    def walk(self, top: str):
+        return os.walk(top)
+
+    def isfile(self, path: str) -> bool:
+        return os.path.isfile(path)
+
+    def read_bytes(self, path: str) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def _rel(self, path: str) -> str:
+        return path[len(self._prefix):] if path.startswith(self._prefix) else os.path.relpath(path, self.root)
+
+    def load_json(self, path: str, st: Optional[os.stat_result] = None):
+        """Objet JSON de `path`: depuis le cache si mtime et taille n'ont pas changé, sinon
+        analysé (et mis en cache). Les erreurs de lecture/analyse sont celles de json.load."""
+        if st is None:
+            st = os.stat(path)
+        rel = self._rel(path)
+        self._seen.add(rel)
+        entry = self._json.get(rel)
+        if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            self.hits += 1
+            return marshal.loads(entry[2])
+        with open(path, 'r', encoding='utf-8') as f:
+            obj = json.load(f)
+        self._json[rel] = (st.st_mtime_ns, st.st_size, marshal.dumps(obj))
+        self.parsed += 1
+        self.dirty = True
+        return obj
+
+    def read_subfile(self, path: str) -> Tuple[bytes, bytes]:
+        """(contenu, SHA-1) d'un subfile; l'empreinte vient du cache si le fichier n'a pas changé."""
+        st = os.stat(path)
+        with open(path, 'rb') as f:
+            data = f.read()
+        return data, self._digest(path, st, data)
+
+    def subfile_digest(self, path: str) -> bytes:
+        """SHA-1 d'un subfile (lu seulement s'il a changé depuis l'écriture du cache)."""
+        return self._digest(path, os.stat(path), None)
+
+    def _digest(self, path: str, st: os.stat_result, data: Optional[bytes]) -> bytes:
+        rel = self._rel(path)
+        self._seen.add(rel)
+        entry = self._subfiles.get(rel)
+        if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            return entry[2]
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+        digest = hashlib.sha1(data).digest()
+        self._subfiles[rel] = (st.st_mtime_ns, st.st_size, digest)
+        self.dirty = True
+        return digest
+
+    def _prune(self) -> None:
+        """Retire les entrées non lues pendant la session dont le fichier n'existe plus."""
+        for entries in (self._json, self._subfiles):
+            gone = [rel for rel in entries
+                    if rel not in self._seen and not os.path.exists(os.path.join(self.root, rel))]
+            for rel in gone:
+                del entries[rel]
+            if gone:
+                self.dirty = True
+
+    def save(self) -> bool:
+        """Écrit le cache s'il a changé (fichier temporaire puis os.replace). Renvoie False si le
+        dossier n'est pas accessible en écriture (le cache reste alors seulement en mémoire)."""
+        self._prune()
+        if not self.dirty:
+            return True
+        body = marshal.dumps({'json': self._json, 'subfiles': self._subfiles})
+        header = _HEADER.pack(MAGIC, PROJECT_CACHE_VERSION, marshal.version, *sys.version_info[:2])
+        tmp = self.path + '.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(header)
+                f.write(body)
+            os.replace(tmp, self.path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return False
+        self.dirty = False
+        return True
+
+
+# Source du rebuild en cours (cf. activate): cache du dossier, ou base SQLite du projet
+_active = None
+
+
+def activate(root: str):
+    """Rend active la source du rebuild pour walk()/load_json()/isfile()/read_bytes(): le cache
+    de `root` si c'est un dossier, la base (shared.project_store) si c'est un fichier SQLite."""
+    global _active
+    if os.path.isfile(root):
+        from shared.project_store import ProjectStore, is_project_store
+        if not is_project_store(root):
+            raise ValueError(f"ni dossier d'extraction ni base de projet: {root}")
+        _active = ProjectStore(root)
+    else:
+        _active = ProjectCache.load(root)
+    return _active
+
+
+def active():
+    return _active
+
+
+def deactivate(save: bool = True) -> None:
+    """Désactive la source active; le cache d'un dossier est d'abord écrit s'il a changé."""
+    global _active
+    cache, _active = _active, None
+    if cache is None:
+        return
+    metrics.count('project_cache_hits', cache.hits)
+    metrics.count('project_cache_parsed', cache.parsed)
+    if save:
+        cache.save()
+    elif hasattr(cache, 'close'):
+        cache.close()
+
+
+def _source(path: str):
+    cache = _active
+    if cache is not None and (path == cache.root or cache.covers(path)):
+        return cache
+    return None
+
+
+def walk(top: str):
+    """os.walk(top), ou le parcours équivalent de la base active."""
+    source = _source(top)
+    return source.walk(top) if source is not None else os.walk(top)
+
+
+def isfile(path: str) -> bool:
+    source = _source(path)
+    return source.isfile(path) if source is not None else os.path.isfile(path)
+
+
+def read_bytes(path: str) -> bytes:
+    source = _source(path)
+    if source is not None:
+        return source.read_bytes(path)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def load_json(path: str):
+    """json.load de `path`, par la source active si `path` en fait partie."""
+    source = _source(path)
+    if source is not None:
+        return source.load_json(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,292 @@
+# shared/project_store.py
+"""Projet dans une base SQLite unique, à la place de l'arborescence d'un fichier par instance.
+
+`main.py extract <file.dat> <out.sqlite> --store sqlite` l'écrit, `main.py repack <out.sqlite>`
+la relit directement. Un fichier au lieu de dizaines de milliers: création, copie et sauvegarde
+bien moins chères, et des modifications transactionnelles et indexées (sqlite3).
+
+Schéma (version PROJECT_STORE_VERSION, table meta):
+    meta      (key, value)                          version, fichier source
+    regions   (id, name)                            dossiers de région (default, ...)
+    zones     (id, region_id, name, zone)           dossiers de zone, index de zone des instances
+    <type>    une table par type de TYPE_NAMES (moby, controller, path, volume, clue, area, pod,
+              scent): (seq, path, zone_id, tuid, zone, name, class_id, data)
+              index sur tuid, zone, name et class_id; data: le JSON de l'instance tel qu'extrait
+    refs      (src_type, src_tuid, kind, tuid)      références des areas/pods/scents/clues
+    blobs     (hash, data)                          subfiles dédupliqués par SHA-1
+    subfiles  (seq, path, hash, class_id)           *_CLASS.host.dat / *_CLASS.local.dat
+    files     (seq, path, data)                     autres fichiers (extraction_metadata.json...)
+
+`path` est le chemin relatif de l'arborescence d'extraction ('/' comme séparateur) et `seq`
+l'ordre de parcours (os.walk) au moment de l'import: le rebuild retrouve exactement l'ordre de
+découverte d'un dossier (walk()), donc un .dat identique à celui du dossier. Les TUID sont des
+u64 rangés en entiers signés 64 bits (SQLite), cf. to_sql_u64 / from_sql_u64.
+
+Pour le rebuild, ProjectStore offre la même interface que shared.project_cache.ProjectCache
+(walk, load_json, isfile, read_bytes, read_subfile): les chemins sont <base.sqlite>/<path>.
+"""
+import hashlib
+import json
+import marshal
+import os
+import sqlite3
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from shared.class_enum import class_id_from_subfile
+from shared.tuid_index import TYPE_NAMES, _record_references
+from shared.utils import sanitize_name
+
+
+PROJECT_STORE_VERSION = 1
+SQLITE_MAGIC = b'SQLite format 3\0'
+SUBFILE_SUFFIXES = ('_CLASS.host.dat', '_CLASS.local.dat')
+# Fichiers propres à un dossier de travail, jamais importés (caches, temporaires)
+SKIPPED_PREFIX = '.polaris-'
+
+_SCHEMA = [
+    "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)",
+    "CREATE TABLE regions (id INTEGER PRIMARY KEY, name TEXT UNIQUE)",
+    "CREATE TABLE zones (id INTEGER PRIMARY KEY, region_id INTEGER REFERENCES regions(id), "
+    "name TEXT, zone INTEGER)",
+    "CREATE TABLE refs (src_type TEXT, src_tuid INTEGER, kind TEXT, tuid INTEGER)",
+    "CREATE INDEX refs_tuid ON refs(tuid)",
+    "CREATE INDEX refs_src ON refs(src_tuid)",
+    "CREATE TABLE blobs (hash BLOB PRIMARY KEY, data BLOB) WITHOUT ROWID",
+    "CREATE TABLE subfiles (seq INTEGER PRIMARY KEY, path TEXT UNIQUE, hash BLOB REFERENCES blobs(hash), "
+    "class_id INTEGER)",
+    "CREATE TABLE files (seq INTEGER PRIMARY KEY, path TEXT UNIQUE, data BLOB)",
+]
+for _typ in TYPE_NAMES:
+    _SCHEMA.append(f"CREATE TABLE {_typ} (seq INTEGER PRIMARY KEY, path TEXT UNIQUE, "
+                   f"zone_id INTEGER REFERENCES zones(id), tuid INTEGER, zone INTEGER, name TEXT, "
+                   f"class_id INTEGER, data TEXT)")
+    for _col in ('tuid', 'zone', 'name', 'class_id'):
+        _SCHEMA.append(f"CREATE INDEX {_typ}_{_col} ON {_typ}({_col})")
+
+
+def to_sql_u64(value: Optional[int]) -> Optional[int]:
+    """u64 -> entier signé 64 bits (colonne SQLite), None inchangé."""
+    if value is None:
+        return None
+    value &= 0xFFFFFFFFFFFFFFFF
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def from_sql_u64(value: Optional[int]) -> Optional[int]:
+    return None if value is None else value & 0xFFFFFFFFFFFFFFFF
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value, 0) if isinstance(value, str) else int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_project_store(path: str) -> bool:
+    """Vrai si `path` est un fichier SQLite (base de projet candidate)."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC
+    except OSError:
+        return False
+
+
+def _instance_type(fn: str) -> Optional[str]:
+    if fn.endswith('.json'):
+        typ = fn[:-5].rsplit('.', 1)[-1]
+        if typ in TYPE_NAMES and fn.endswith(f'.{typ}.json'):
+            return typ
+    return None
+
+
+def import_folder(source_dir: str, db_path: str, source: str = '') -> Dict[str, int]:
+    """Écrit la base `db_path` (remplacée si elle existe) depuis un dossier d'extraction.
+    Renvoie le nombre de lignes par table d'instances (+ 'subfiles', 'blobs', 'files')."""
+    tmp = db_path + '.tmp'
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    conn = sqlite3.connect(tmp)
+    counts = {typ: 0 for typ in TYPE_NAMES}
+    counts.update(subfiles=0, blobs=0, files=0)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        with conn:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            conn.executemany("INSERT INTO meta VALUES (?, ?)",
+                             [('version', str(PROJECT_STORE_VERSION)), ('source', source)])
+            _import_rows(conn, source_dir, counts)
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    os.replace(tmp, db_path)
+    return counts
+
+
+def _import_rows(conn: sqlite3.Connection, source_dir: str, counts: Dict[str, int]) -> None:
+    regions: Dict[str, int] = {}
+    zones: Dict[Tuple[str, str], int] = {}
+    zone_index: Dict[int, Optional[int]] = {}
+    rows: Dict[str, list] = {typ: [] for typ in TYPE_NAMES}
+    refs = []
+    subfile_class: Dict[str, Optional[int]] = {}
+    blobs_seen = set()
+    seq = 0
+    for root, dirs, files in os.walk(source_dir):
+        dirs[:] = [d for d in dirs if not d.startswith(SKIPPED_PREFIX)]
+        rel_dir = os.path.relpath(root, source_dir).replace(os.sep, '/')
+        rel_dir = '' if rel_dir == '.' else rel_dir + '/'
+        parts = rel_dir.rstrip('/').split('/') if rel_dir else []
+        zone_id = None
+        if len(parts) >= 2:
+            region, zone_dir = parts[-2], parts[-1]
+            if region not in regions:
+                regions[region] = len(regions) + 1
+                conn.execute("INSERT INTO regions VALUES (?, ?)", (regions[region], region))
+            zone_id = zones.setdefault((region, zone_dir), len(zones) + 1)
+            zone_index.setdefault(zone_id, None)
+        for fn in files:
+            if fn.startswith(SKIPPED_PREFIX):
+                continue
+            seq += 1
+            path = os.path.join(root, fn)
+            rel = rel_dir + fn
+            typ = _instance_type(fn)
+            if typ is not None:
+                with open(path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+                obj = json.loads(text)
+                tuid = _to_int(obj.get('tuid'))
+                zone = _to_int(obj.get('zone'))
+                class_id = _to_int(obj.get('class_id', obj.get('class_enum')))
+                if zone_id is not None and zone_index[zone_id] is None:
+                    zone_index[zone_id] = zone
+                rows[typ].append([seq, rel, zone_id, to_sql_u64(tuid), zone, obj.get('name'), class_id, text,
+                                  rel_dir + sanitize_name(str(obj.get('name') or ''))])
+                for target, kind in _record_references(typ, obj):
+                    refs.append((typ, to_sql_u64(tuid), kind, to_sql_u64(target)))
+            elif fn.endswith(SUBFILE_SUFFIXES):
+                with open(path, 'rb') as f:
+                    data = f.read()
+                digest = hashlib.sha1(data).digest()
+                if digest not in blobs_seen:
+                    blobs_seen.add(digest)
+                    conn.execute("INSERT INTO blobs VALUES (?, ?)", (digest, data))
+                class_id = class_id_from_subfile(data)
+                subfile_class[rel] = class_id
+                conn.execute("INSERT INTO subfiles VALUES (?, ?, ?, ?)", (seq, rel, digest, class_id))
+                counts['subfiles'] += 1
+            else:
+                with open(path, 'rb') as f:
+                    conn.execute("INSERT INTO files VALUES (?, ?, ?)", (seq, rel, f.read()))
+                counts['files'] += 1
+    counts['blobs'] = len(blobs_seen)
+    conn.executemany("INSERT INTO zones VALUES (?, ?, ?, ?)",
+                     [(zid, regions[region], name, zone_index[zid]) for (region, name), zid in zones.items()])
+    for typ, typ_rows in rows.items():
+        for row in typ_rows:
+            stem = row.pop()
+            if row[6] is None:
+                # Pas de ClassID dans le JSON (controllers): celui du subfile de classe
+                for kind in ('host', 'local'):
+                    subfile = f"{stem}_CLASS.{kind}.dat"
+                    if subfile in subfile_class:
+                        row[6] = subfile_class[subfile]
+                        break
+        conn.executemany(f"INSERT INTO {typ} VALUES (?, ?, ?, ?, ?, ?, ?, ?)", typ_rows)
+        counts[typ] = len(typ_rows)
+    conn.executemany("INSERT INTO refs VALUES (?, ?, ?, ?)", refs)
+
+
+class ProjectStore:
+    """Base de projet ouverte en lecture pour le rebuild (interface de ProjectCache).
+
+    Les JSON sont analysés une fois par session puis servis en copies (marshal), comme le cache
+    d'un dossier; `root` est le chemin de la base, les chemins de fichiers <root>/<path>."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._prefix = root + os.sep
+        self._conn = sqlite3.connect(f"file:{root}?mode=ro", uri=True)
+        version = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if version is None or int(version[0]) != PROJECT_STORE_VERSION:
+            self._conn.close()
+            raise ValueError(f"base de projet de version inconnue: {root}")
+        # Chemin relatif -> (table, seq), dans l'ordre de parcours
+        self._where: Dict[str, Tuple[str, int]] = {}
+        order = []
+        for table in TYPE_NAMES + ('subfiles', 'files'):
+            for seq, rel in self._conn.execute(f"SELECT seq, path FROM {table}"):
+                order.append((seq, rel))
+                self._where[rel] = (table, seq)
+        order.sort()
+        self._order: List[str] = [rel for _seq, rel in order]
+        self._parsed: Dict[str, bytes] = {}
+        self.hits = 0
+        self.parsed = 0
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def save(self) -> bool:
+        # Lecture seule: rien à écrire
+        self.close()
+        return True
+
+    def covers(self, path: str) -> bool:
+        return path.startswith(self._prefix)
+
+    def _rel(self, path: str) -> str:
+        return path[len(self._prefix):].replace(os.sep, '/')
+
+    def walk(self, top: str) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """Équivalent de os.walk(top) sur l'arborescence importée (même ordre de découverte)."""
+        prefix = '' if top == self.root else self._rel(top).rstrip('/') + '/'
+        groups: Dict[str, List[str]] = {}
+        for rel in self._order:
+            if rel.startswith(prefix):
+                rel_dir, _, fn = rel.rpartition('/')
+                groups.setdefault(rel_dir, []).append(fn)
+        for rel_dir, files in groups.items():
+            root = os.path.join(self.root, *rel_dir.split('/')) if rel_dir else self.root
+            subdirs = sorted({d[len(rel_dir) + 1 if rel_dir else 0:].split('/', 1)[0] for d in groups
+                              if d != rel_dir and d.startswith(rel_dir)})
+            yield root, subdirs, files
+
+    def isfile(self, path: str) -> bool:
+        return self._rel(path) in self._where
+
+    def load_json(self, path: str, st=None):
+        rel = self._rel(path)
+        blob = self._parsed.get(rel)
+        if blob is not None:
+            self.hits += 1
+            return marshal.loads(blob)
+        table, seq = self._where.get(rel, (None, None))
+        if table in TYPE_NAMES:
+            text = self._conn.execute(f"SELECT data FROM {table} WHERE seq = ?", (seq,)).fetchone()[0]
+        elif table == 'files':
+            text = self._conn.execute("SELECT data FROM files WHERE seq = ?", (seq,)).fetchone()[0].decode('utf-8')
+        else:
+            raise FileNotFoundError(path)
+        obj = json.loads(text)
+        self._parsed[rel] = marshal.dumps(obj)
+        self.parsed += 1
+        return obj
+
+    def read_subfile(self, path: str) -> Tuple[bytes, bytes]:
+        row = self._conn.execute("SELECT blobs.data, blobs.hash FROM subfiles JOIN blobs USING (hash) "
+                                 "WHERE subfiles.path = ?", (self._rel(path),)).fetchone()
+        if row is None:
+            raise FileNotFoundError(path)
+        return row[0], row[1]
+
+    def read_bytes(self, path: str) -> bytes:
+        table, seq = self._where.get(self._rel(path), (None, None))
+        if table == 'subfiles':
+            return self.read_subfile(path)[0]
+        if table == 'files':
+            return self._conn.execute("SELECT data FROM files WHERE seq = ?", (seq,)).fetchone()[0]
+        raise FileNotFoundError(path)
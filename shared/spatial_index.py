@@ -0,0 +1,370 @@
+# shared/spatial_index.py
+"""Index spatial des positions d'instances: grille uniforme à cellules hachées.
+
+Chaque clé (slot d'un DatIndex, slot de l'index de recherche de l'éditeur, ...) porte un ou
+plusieurs points monde: la position d'un moby/controller, la translation de la matrice d'un
+volume, les points d'un path. Les coordonnées sont rangées dans un array('d') (x, y, z par
+entrée); un dictionnaire (i, j, k) -> entrées ne garde que les cellules occupées, si bien que
+la taille de la grille ne dépend que du nombre de points, pas de l'étendue du niveau.
+
+Requêtes (une réponse par clé, avec son point le plus proche du centre):
+    radius(centre, r)    clés à distance <= r, triées par distance
+    box(lo, hi)          clés ayant un point dans la boîte (bornes incluses, éventuellement
+                         infinies: vue de dessus sans limite de hauteur)
+    occupancy(lo, hi)    cellules occupées de la boîte et leur nombre de clés (agrégats de
+                         la carte de l'éditeur aux petits zooms)
+    nearest(centre, k)   k clés les plus proches: anneaux de cellules autour du centre, puis
+                         cellules occupées triées par distance minimale quand les anneaux
+                         deviennent plus grands que la grille
+Mise à jour incrémentale: insert()/remove()/move() ne touchent que les cellules de la clé.
+
+Construction: SpatialIndex.build(paires (clé, points)), from_dat() (colonnes du .dat, comme
+`main.py query`), ou instance_points() sur les instances JSON d'une extraction. Les points non
+finis (NaN, inf) ne sont pas indexés.
+"""
+import heapq
+import math
+from array import array
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+Point = Tuple[float, float, float]
+Cell = Tuple[int, int, int]
+
+# Points visés par cellule quand la taille n'est pas imposée
+DEFAULT_PER_CELL = 4
+QUANTILE_SAMPLE = 8192
+POSITION_TYPES = ('moby', 'controller', 'volume', 'clue', 'path')
+
+
+def instance_points(typ: str, data: dict) -> List[Point]:
+    """Points monde d'une instance JSON (mêmes règles que shared.dat_query.DatColumns.positions;
+    une clue n'a pas de position propre: celle de son volume, à résoudre par l'appelant)."""
+    try:
+        if typ in ('moby', 'controller'):
+            pos = data.get('position')
+            return [(float(pos['x']), float(pos['y']), float(pos['z']))] if pos else []
+        if typ == 'volume':
+            matrix = data.get('transform_matrix')
+            return [tuple(float(v) for v in matrix[3][:3])] if matrix else []
+        if typ == 'path':
+            from shared.path_points import point_list
+            points = []
+            for pt in point_list(data):
+                pos = pt.get('position') or {}
+                points.append((float(pos.get('x', 0.0)), float(pos.get('y', 0.0)), float(pos.get('z', 0.0))))
+            return points
+    except (KeyError, IndexError, TypeError, ValueError):
+        return []
+    return []
+
+
+def quantile_box(points: Sequence[Point]) -> Optional[Tuple[Point, Point]]:
+    """(lo, hi) des quantiles 2 % et 98 % de chaque axe de points finis (quelques objets isolés
+    loin du niveau n'en font pas partie), pris sur au plus QUANTILE_SAMPLE points régulièrement
+    espacés; None s'il y a moins de 2 points."""
+    total = len(points)
+    if total < 2:
+        return None
+    sample = points[::max(1, total // QUANTILE_SAMPLE)]
+    n = len(sample)
+    cut = n // 50
+    lo, hi = [], []
+    for k in range(3):
+        axis = sorted(p[k] for p in sample)
+        lo.append(axis[cut])
+        hi.append(axis[n - 1 - cut])
+    return tuple(lo), tuple(hi)
+
+
+def suggest_cell_size(points: Sequence[Point], per_cell: int = DEFAULT_PER_CELL) -> float:
+    """Taille de cellule visant `per_cell` points par cellule, d'après l'étendue de quantile_box()
+    (les axes plats, fréquents dans un niveau, ne comptent pas)."""
+    finite = [p for p in points if math.isfinite(p[0]) and math.isfinite(p[1]) and math.isfinite(p[2])]
+    total = len(finite)
+    core = quantile_box(finite)
+    if core is None:
+        return 1.0
+    extents = [core[1][k] - core[0][k] for k in range(3)]
+    widest = max(extents)
+    spread = [e for e in extents if e > 1e-6 * widest] if widest > 0 else []
+    if not spread:
+        return 1.0
+    inside = total - 2 * (total // 50)
+    return max((math.prod(spread) * per_cell / inside) ** (1.0 / len(spread)), 1e-6)
+
+
+class SpatialIndex:
+    def __init__(self, cell: float = 1.0):
+        if not cell > 0:
+            raise ValueError(f"taille de cellule invalide: {cell!r}")
+        self.cell = float(cell)
+        self._inv = 1.0 / self.cell
+        self._coords = array('d')                        # x, y, z par entrée
+        self._owner: List[Optional[Hashable]] = []       # clé de chaque entrée (None: libre)
+        self._free: List[int] = []
+        self._cells: Dict[Cell, List[int]] = {}
+        self._entries: Dict[Hashable, List[int]] = {}    # clé -> entrées
+        self._live = 0
+        self._bounds: Optional[Tuple[Cell, Cell]] = None  # cellules occupées extrêmes (à la demande)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    @property
+    def point_count(self) -> int:
+        return self._live
+
+    @classmethod
+    def build(cls, items: Iterable[Tuple[Hashable, Sequence[Point]]], cell: Optional[float] = None,
+              per_cell: int = DEFAULT_PER_CELL) -> 'SpatialIndex':
+        """Index de (clé, points); taille de cellule déduite des points si `cell` est None."""
+        items = [(key, list(points)) for key, points in items]
+        if cell is None:
+            cell = suggest_cell_size([p for _key, points in items for p in points], per_cell)
+        index = cls(cell)
+        for key, points in items:
+            index.insert(key, points)
+        return index
+
+    @classmethod
+    def from_dat(cls, data, dat_index, types: Iterable[str] = POSITION_TYPES,
+                 cell: Optional[float] = None) -> 'SpatialIndex':
+        """Index des positions lues dans les colonnes d'un .dat (clé: slot du DatIndex)."""
+        from shared.dat_query import DatColumns
+        columns = DatColumns(data, dat_index)
+        items = []
+        for typ in types:
+            base = dat_index.bases.get(typ, 0)
+            for i in range(dat_index.counts.get(typ, 0)):
+                items.append((base + i, columns.positions(typ, i)))
+        return cls.build(items, cell)
+
+    # Mise à jour
+    def _cell_of(self, x: float, y: float, z: float) -> Cell:
+        inv = self._inv
+        return (math.floor(x * inv), math.floor(y * inv), math.floor(z * inv))
+
+    def insert(self, key: Hashable, points: Iterable[Point]) -> None:
+        """Ajoute les points de `key` (s'ajoutent à ceux qu'elle a déjà)."""
+        entries = self._entries.get(key)
+        coords, owner, free, cells = self._coords, self._owner, self._free, self._cells
+        inv, floor, isfinite = self._inv, math.floor, math.isfinite
+        for point in points:
+            x, y, z = float(point[0]), float(point[1]), float(point[2])
+            if not (isfinite(x) and isfinite(y) and isfinite(z)):
+                continue
+            if free:
+                e = free.pop()
+                coords[3 * e], coords[3 * e + 1], coords[3 * e + 2] = x, y, z
+                owner[e] = key
+            else:
+                e = len(owner)
+                coords.extend((x, y, z))
+                owner.append(key)
+            cell = (floor(x * inv), floor(y * inv), floor(z * inv))
+            bucket = cells.get(cell)
+            if bucket is None:
+                cells[cell] = [e]
+                self._bounds = None
+            else:
+                bucket.append(e)
+            if entries is None:
+                entries = self._entries[key] = []
+            entries.append(e)
+            self._live += 1
+
+    def remove(self, key: Hashable) -> bool:
+        """Retire tous les points de `key`; False si elle n'était pas indexée."""
+        entries = self._entries.pop(key, None)
+        if entries is None:
+            return False
+        coords = self._coords
+        for e in entries:
+            cell = self._cell_of(coords[3 * e], coords[3 * e + 1], coords[3 * e + 2])
+            bucket = self._cells[cell]
+            bucket.remove(e)
+            if not bucket:
+                del self._cells[cell]
+                self._bounds = None
+            self._owner[e] = None
+            self._free.append(e)
+        self._live -= len(entries)
+        return True
+
+    def move(self, key: Hashable, points: Iterable[Point]) -> None:
+        """Remplace les points de `key` (position modifiée dans l'éditeur)."""
+        self.remove(key)
+        self.insert(key, points)
+
+    def points(self, key: Hashable) -> List[Point]:
+        coords = self._coords
+        return [(coords[3 * e], coords[3 * e + 1], coords[3 * e + 2]) for e in self._entries.get(key, ())]
+
+    def core_box(self) -> Optional[Tuple[Point, Point]]:
+        """quantile_box() des points indexés (cadrage de la carte de l'éditeur)."""
+        coords, owner = self._coords, self._owner
+        step = max(1, len(owner) // QUANTILE_SAMPLE)
+        return quantile_box([(coords[3 * e], coords[3 * e + 1], coords[3 * e + 2])
+                             for e in range(0, len(owner), step) if owner[e] is not None])
+
+    # Requêtes
+    def _cell_range(self, lo: Point, hi: Point) -> Optional[Tuple[Cell, Cell]]:
+        """Pavé de cellules de la boîte [lo, hi] ramené aux cellules occupées extrêmes (bornes
+        infinies admises); None si la boîte ne recoupe aucune d'elles."""
+        if not self._cells:
+            return None
+        if self._bounds is None:
+            cells = self._cells
+            self._bounds = (tuple(min(c[k] for c in cells) for k in range(3)),
+                            tuple(max(c[k] for c in cells) for k in range(3)))
+        low, high = self._bounds
+        first, last = [], []
+        for k in range(3):
+            a = math.floor(min(max(lo[k] * self._inv, low[k]), high[k] + 1))
+            b = math.floor(min(max(hi[k] * self._inv, low[k] - 1), high[k]))
+            if a > b:
+                return None
+            first.append(a)
+            last.append(b)
+        return tuple(first), tuple(last)
+
+    def _cells_in(self, lo: Cell, hi: Cell) -> Iterable[Tuple[Cell, List[int]]]:
+        """(cellule, entrées) des cellules occupées du pavé [lo, hi] (parcours du pavé ou des
+        cellules occupées, le plus petit des deux)."""
+        span = (hi[0] - lo[0] + 1) * (hi[1] - lo[1] + 1) * (hi[2] - lo[2] + 1)
+        cells = self._cells
+        if span > len(cells):
+            return [(cell, bucket) for cell, bucket in cells.items()
+                    if lo[0] <= cell[0] <= hi[0] and lo[1] <= cell[1] <= hi[1] and lo[2] <= cell[2] <= hi[2]]
+        out = []
+        for i in range(lo[0], hi[0] + 1):
+            for j in range(lo[1], hi[1] + 1):
+                for k in range(lo[2], hi[2] + 1):
+                    bucket = cells.get((i, j, k))
+                    if bucket is not None:
+                        out.append(((i, j, k), bucket))
+        return out
+
+    def _scan(self, buckets, center: Point, best: Dict[Hashable, Tuple[float, Point]],
+              limit: float = math.inf) -> None:
+        """Distance au carré de chaque entrée: garde par clé le point le plus proche (<= limit)."""
+        cx, cy, cz = center
+        coords, owner = self._coords, self._owner
+        for bucket in buckets:
+            for e in bucket:
+                x, y, z = coords[3 * e], coords[3 * e + 1], coords[3 * e + 2]
+                d2 = (x - cx) ** 2 + (y - cy) ** 2 + (z - cz) ** 2
+                if d2 > limit:
+                    continue
+                key = owner[e]
+                known = best.get(key)
+                if known is None or d2 < known[0]:
+                    best[key] = (d2, (x, y, z))
+
+    @staticmethod
+    def _sorted(best: Dict[Hashable, Tuple[float, Point]]) -> List[Tuple[float, Hashable, Point]]:
+        return [(math.sqrt(d2), key, point) for key, (d2, point)
+                in sorted(best.items(), key=lambda kv: kv[1][0])]
+
+    def radius(self, center: Point, r: float) -> List[Tuple[float, Hashable, Point]]:
+        """[(distance, clé, point le plus proche)] des clés à distance <= r, par distance."""
+        cx, cy, cz = (float(c) for c in center)
+        lo = self._cell_of(cx - r, cy - r, cz - r)
+        hi = self._cell_of(cx + r, cy + r, cz + r)
+        best: Dict[Hashable, Tuple[float, Point]] = {}
+        self._scan([bucket for _cell, bucket in self._cells_in(lo, hi)], (cx, cy, cz), best, r * r)
+        return self._sorted(best)
+
+    def box(self, lo: Point, hi: Point) -> List[Tuple[Hashable, Point]]:
+        """[(clé, premier point dans la boîte)] des clés ayant un point dans [lo, hi]."""
+        lo, hi = tuple(map(min, lo, hi)), tuple(map(max, lo, hi))
+        coords, owner = self._coords, self._owner
+        found: Dict[Hashable, Point] = {}
+        span = self._cell_range(lo, hi)
+        if span is None:
+            return []
+        for _cell, bucket in self._cells_in(*span):
+            for e in bucket:
+                x, y, z = coords[3 * e], coords[3 * e + 1], coords[3 * e + 2]
+                if lo[0] <= x <= hi[0] and lo[1] <= y <= hi[1] and lo[2] <= z <= hi[2]:
+                    found.setdefault(owner[e], (x, y, z))
+        return list(found.items())
+
+    def occupancy(self, lo: Point, hi: Point) -> List[Tuple[Cell, int]]:
+        """[(cellule, nombre de clés)] des cellules occupées qui recoupent [lo, hi] (une clé à
+        plusieurs points, un path, compte dans chacune de ses cellules)."""
+        span = self._cell_range(tuple(map(min, lo, hi)), tuple(map(max, lo, hi)))
+        if span is None:
+            return []
+        owner = self._owner
+        return [(cell, len({owner[e] for e in bucket})) for cell, bucket in self._cells_in(*span)]
+
+    def cell_center(self, cell: Cell) -> Point:
+        return ((cell[0] + 0.5) * self.cell, (cell[1] + 0.5) * self.cell, (cell[2] + 0.5) * self.cell)
+
+    @staticmethod
+    def _ring(c: Cell, d: int) -> Iterable[Cell]:
+        """Cellules à distance de Tchebychev exactement d de c."""
+        ci, cj, ck = c
+        if d == 0:
+            yield c
+            return
+        for i in range(-d, d + 1):
+            for j in range(-d, d + 1):
+                if abs(i) == d or abs(j) == d:
+                    for k in range(-d, d + 1):
+                        yield (ci + i, cj + j, ck + k)
+                else:
+                    yield (ci + i, cj + j, ck - d)
+                    yield (ci + i, cj + j, ck + d)
+
+    def _cell_distance2(self, cell: Cell, center: Point) -> float:
+        """Distance au carré du centre à la cellule (0 si dedans)."""
+        d2 = 0.0
+        for idx, c in zip(cell, center):
+            lo = idx * self.cell
+            if c < lo:
+                d2 += (lo - c) ** 2
+            elif c > lo + self.cell:
+                d2 += (c - lo - self.cell) ** 2
+        return d2
+
+    def nearest(self, center: Point, k: int = 1) -> List[Tuple[float, Hashable, Point]]:
+        """[(distance, clé, point le plus proche)] des k clés les plus proches, par distance."""
+        if k <= 0 or not self._entries:
+            return []
+        center = tuple(float(c) for c in center)
+        c = self._cell_of(*center)
+        cells = self._cells
+        best: Dict[Hashable, Tuple[float, Point]] = {}
+
+        def kth() -> float:
+            if len(best) < k:
+                return math.inf
+            return heapq.nsmallest(k, (v[0] for v in best.values()))[-1]
+
+        d = 0
+        visited = 0
+        while True:
+            ring_size = 1 if d == 0 else (2 * d + 1) ** 3 - (2 * d - 1) ** 3
+            if ring_size > len(cells):
+                break
+            buckets = [cells[cell] for cell in self._ring(c, d) if cell in cells]
+            visited += len(buckets)
+            self._scan(buckets, center, best)
+            # Les cellules au-delà de l'anneau d sont à plus de d cellules du centre
+            bound = d * self.cell
+            if kth() <= bound * bound or visited >= len(cells):
+                return self._sorted(best)[:k]
+            d += 1
+        # Anneaux plus grands que la grille: cellules restantes par distance minimale croissante
+        remaining = sorted((self._cell_distance2(cell, center), cell) for cell in cells
+                           if max(abs(cell[0] - c[0]), abs(cell[1] - c[1]), abs(cell[2] - c[2])) >= d)
+        for d2, cell in remaining:
+            if d2 > kth():
+                break
+            self._scan((cells[cell],), center, best)
+        return self._sorted(best)[:k]
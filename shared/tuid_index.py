@@ -0,0 +1,432 @@
+# shared/tuid_index.py
+"""Index global des TUID d'un niveau et graphe inverse des références.
+
+Construit une fois par niveau, depuis le .dat (from_dat: métadonnées + pointeurs de
+références lus directement, sans décoder les enregistrements) ou depuis des instances déjà
+décodées (from_instances: JSON d'un dossier d'extraction, modèle de l'éditeur).
+
+- TUID -> TuidEntry(tuid, type, section, index, zone, name) en O(1) (type, index, zone dans
+  des tableaux compacts, un slot par enregistrement).
+- Références des areas (paths, volumes), pods et scents (instances) et clues (volume) gardées
+  en graphe inverse au format CSR: pour la cible de slot s, ses référents sont
+  ref_sources[ref_offsets[s]:ref_offsets[s+1]] (genres dans ref_kinds). « Où ce volume est-il
+  utilisé ? », les références cassées et la vérification avant suppression coûtent O(degré)
+  au lieu d'un parcours de toutes les instances.
+- Mises à jour (update: instance modifiée ou ajoutée par l'éditeur) sans reconstruire le CSR:
+  les références sortantes de la source sont remplacées par un petit graphe par TUID cible
+  tenu à côté, les arêtes CSR de cette source étant ignorées aux requêtes.
+"""
+import struct
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from shared.constants import (
+    MOBY_DATA_ID, MOBY_METADATA_ID, CONTROLLER_DATA_ID, CONTROLLER_METADATA_ID,
+    PATH_DATA_ID, PATH_METADATA_ID, VOLUME_TRANSFORM_ID, VOLUME_METADATA_ID,
+    CLUE_INFO_ID, CLUE_METADATA_ID, AREA_DATA_ID, AREA_METADATA_ID,
+    POD_DATA_ID, POD_METADATA_ID, SCENT_DATA_ID, SCENT_METADATA_ID,
+    SCENT_OFFSETS_ID, INSTANCE_TYPES_ID,
+)
+from shared.utils import parse_section_table, read_string
+
+
+# Type d'instance -> (section des métadonnées, section des données); l'ordre donne le code de type
+INDEX_TYPES = {
+    'moby': (MOBY_METADATA_ID, MOBY_DATA_ID),
+    'controller': (CONTROLLER_METADATA_ID, CONTROLLER_DATA_ID),
+    'path': (PATH_METADATA_ID, PATH_DATA_ID),
+    'volume': (VOLUME_METADATA_ID, VOLUME_TRANSFORM_ID),
+    'clue': (CLUE_METADATA_ID, CLUE_INFO_ID),
+    'area': (AREA_METADATA_ID, AREA_DATA_ID),
+    'pod': (POD_METADATA_ID, POD_DATA_ID),
+    'scent': (SCENT_METADATA_ID, SCENT_DATA_ID),
+}
+TYPE_NAMES = tuple(INDEX_TYPES)
+
+# Genres de références (champ JSON -> genre), par type référent
+REF_KINDS = ('path', 'volume', 'instance')
+REFERENCE_FIELDS = {
+    'area': (('path_references', 'path'), ('volume_references', 'volume')),
+    'pod': (('instance_references', 'instance'),),
+    'scent': (('instance_references', 'instance'),),
+}
+
+
+class TuidEntry(NamedTuple):
+    tuid: int
+    type: str
+    section: int        # section des données du type
+    index: int          # index de l'enregistrement dans la section (ordre du modèle hors .dat)
+    zone: int
+    name: str
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value, 0) if isinstance(value, str) else int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _read_u32(data, offset: int) -> int:
+    return struct.unpack_from('>I', data, offset)[0]
+
+
+def _read_tuid(data, offset: int) -> Optional[int]:
+    if 0 <= offset and offset + 8 <= len(data):
+        return struct.unpack_from('>Q', data, offset)[0]
+    return None
+
+
+def scent_reference_tuid(data, offsets_list_addr: int, j: int, inst_start: Optional[int], inst_end: Optional[int]) -> int:
+    """TUID de la j-ième référence d'un scent (détection auto, 0 si illisible):
+    1) u32 adresse absolue vers une entrée de 0x25022, 2) offset relatif à 0x25022,
+    3) index d'entrée (valeur * 16), sinon 4) u64 TUID direct (format legacy)."""
+    ptr_pos = offsets_list_addr + j * 4
+    tuid_val = 0
+    if inst_start is not None and ptr_pos + 4 <= len(data):
+        addr = _read_u32(data, ptr_pos)
+
+        def read_tuid_at(a: int) -> int:
+            if inst_start <= a < inst_end:
+                rel = a - inst_start
+                base = a - (rel % 16)
+                if inst_start <= base < inst_end and base + 8 <= len(data):
+                    return struct.unpack_from('>Q', data, base)[0]
+            return 0
+
+        tuid_val = read_tuid_at(addr)
+        if tuid_val == 0:
+            tuid_val = read_tuid_at(inst_start + addr)
+        if tuid_val == 0:
+            tuid_val = read_tuid_at(inst_start + (addr * 16))
+    if tuid_val == 0:
+        q_addr = offsets_list_addr + j * 8
+        if q_addr + 8 <= len(data):
+            tuid_val = struct.unpack_from('>Q', data, q_addr)[0]
+    return tuid_val
+
+
+def _dat_references(typ: str, data, entry: int, sections: dict) -> Iterable[Tuple[int, str]]:
+    """(TUID cible, genre) des références d'une entrée de données, lues comme le font les builders."""
+    size = len(data)
+    if typ == 'area':
+        path_offset, volume_offset = struct.unpack_from('>II', data, entry)
+        path_count, volume_count = struct.unpack_from('>HH', data, entry + 8)
+        for list_offset, count, kind in ((path_offset, path_count, 'path'), (volume_offset, volume_count, 'volume')):
+            if not list_offset:
+                continue
+            for j in range(count):
+                pos = list_offset + j * 4
+                if pos + 4 > size:
+                    break
+                addr = _read_u32(data, pos)
+                if addr + 8 <= size:
+                    yield _read_tuid(data, addr), kind
+    elif typ == 'pod':
+        offset, count = struct.unpack_from('>II', data, entry)
+        if offset:
+            for j in range(count):
+                pos = offset + j * 4
+                if pos + 4 > size:
+                    break
+                addr = _read_u32(data, pos)
+                if addr + 16 <= size:
+                    yield _read_tuid(data, addr), 'instance'
+    elif typ == 'scent':
+        offset, count = struct.unpack_from('>II', data, entry)
+        types_section = sections.get(INSTANCE_TYPES_ID)
+        if offset and count and SCENT_OFFSETS_ID in sections:
+            inst_start = inst_end = None
+            if types_section:
+                inst_start = types_section['offset']
+                inst_end = inst_start + types_section['size'] * types_section['count']
+            for j in range(count):
+                yield scent_reference_tuid(data, offset, j, inst_start, inst_end), 'instance'
+    elif typ == 'clue':
+        volume_tuid_offset = _read_u32(data, entry)
+        if volume_tuid_offset:
+            tuid = _read_tuid(data, volume_tuid_offset)
+            if tuid is not None:
+                yield tuid, 'volume'
+
+
+def _record_references(typ: str, record: dict) -> Iterable[Tuple[int, str]]:
+    """(TUID cible, genre) des références d'un enregistrement décodé (JSON)."""
+    if typ == 'clue':
+        tuid = _to_int(record.get('volume_tuid'))
+        if tuid is not None:
+            yield tuid, 'volume'
+        return
+    for field, kind in REFERENCE_FIELDS.get(typ, ()):
+        for ref in record.get(field) or ():
+            tuid = _to_int(ref.get('tuid')) if isinstance(ref, dict) else None
+            if tuid is not None:
+                yield tuid, kind
+
+
+class TuidIndex:
+    def __init__(self):
+        self.tuids = array('Q')
+        self.types = bytearray()
+        self.indices = array('I')
+        self.zones = array('H')
+        self.names: List[str] = []
+        self._slot: Dict[int, int] = {}
+        self._edges: List[Tuple[int, int, int]] = []     # (slot source, TUID cible, genre) avant finish()
+        self.ref_offsets = array('I', [0])
+        self.ref_sources = array('I')
+        self.ref_kinds = bytearray()
+        self.dangling: List[Tuple[int, int, int]] = []   # (slot source, TUID cible absent, genre)
+        # Overlay des mises à jour (update) depuis finish()
+        self._out: Dict[int, List[Tuple[int, int]]] = {}        # slot source -> [(TUID cible, genre)]
+        self._incoming: Dict[int, List[Tuple[int, int]]] = {}   # TUID cible -> [(slot source, genre)]
+        self._origin: Dict[int, int] = {}     # slot dont le TUID a changé -> TUID à finish()
+        self._vacated: Dict[int, int] = {}    # TUID à finish() quitté par son slot -> slot
+        self._finished = 0                    # slots rangés dans le CSR
+
+    def __len__(self) -> int:
+        return len(self.tuids)
+
+    def __contains__(self, tuid) -> bool:
+        return _to_int(tuid) in self._slot
+
+    # Construction
+    def _add(self, typ: str, tuid: int, index: int, zone: int, name: str) -> int:
+        slot = len(self.tuids)
+        self.tuids.append(tuid & 0xFFFFFFFFFFFFFFFF)
+        self.types.append(TYPE_NAMES.index(typ))
+        self.indices.append(index)
+        self.zones.append(zone & 0xFFFF)
+        self.names.append(name)
+        # TUID en double: la dernière entrée l'emporte (comme les dictionnaires des builders)
+        self._slot[tuid] = slot
+        return slot
+
+    def _link(self, source: int, refs: Iterable[Tuple[int, str]]) -> None:
+        for tuid, kind in refs:
+            if tuid is not None:
+                self._edges.append((source, tuid, REF_KINDS.index(kind)))
+
+    def finish(self) -> 'TuidIndex':
+        """Range les références collectées en CSR (par cible) et relève celles vers des TUID absents."""
+        n = len(self.tuids)
+        counts = [0] * (n + 1)
+        resolved = []
+        self.dangling = []
+        for source, tuid, kind in self._edges:
+            target = self._slot.get(tuid)
+            if target is None:
+                self.dangling.append((source, tuid, kind))
+                continue
+            counts[target + 1] += 1
+            resolved.append((target, source, kind))
+        for s in range(n):
+            counts[s + 1] += counts[s]
+        self.ref_offsets = array('I', counts)
+        self.ref_sources = array('I', bytes(4 * len(resolved)))
+        self.ref_kinds = bytearray(len(resolved))
+        cursor = counts[:n]
+        for target, source, kind in resolved:
+            pos = cursor[target]
+            self.ref_sources[pos] = source
+            self.ref_kinds[pos] = kind
+            cursor[target] = pos + 1
+        self._edges = []
+        self._out, self._incoming, self._origin, self._vacated = {}, {}, {}, {}
+        self._finished = n
+        return self
+
+    @classmethod
+    def from_dat(cls, data, types: Optional[Iterable[str]] = None, references: bool = True,
+                 dat_index=None) -> 'TuidIndex':
+        """Index d'un fichier .dat en mémoire (bytes ou mmap). types: restreindre aux types donnés;
+        references=False: entrées seules (pas de graphe). dat_index: DatIndex valide du fichier
+        (sidecar .polaris-idx), dont les colonnes TUID/zone/nom remplacent la lecture des entrées."""
+        index = cls()
+        sections = dat_index.sections if dat_index is not None else parse_section_table(data)
+        size = len(data)
+        for typ in (types or TYPE_NAMES):
+            meta_id, data_id = INDEX_TYPES[typ]
+            meta, body = sections.get(meta_id), sections.get(data_id)
+            if not meta or not body:
+                continue
+            if dat_index is not None:
+                base = dat_index.bases[typ]
+                for i in range(dat_index.counts[typ]):
+                    slot = index._add(typ, dat_index.tuids[base + i], i, dat_index.zones[base + i],
+                                      dat_index.names[base + i])
+                    if references:
+                        index._link(slot, _dat_references(typ, data, body['offset'] + i * body['size'], sections))
+                continue
+            label = typ.capitalize()
+            for i in range(min(meta['count'], body['count'])):
+                pos = meta['offset'] + i * meta['size']
+                tuid, name_offset, zone = struct.unpack_from('>QIH', data, pos)
+                entry = body['offset'] + i * body['size']
+                if typ == 'moby':
+                    # JSON Moby: 'zone' = zone_render_index (entrée de données)
+                    zone = struct.unpack_from('>H', data, entry + 2)[0]
+                name = f"Unknown_{label}"
+                if name_offset < size:
+                    name = read_string(data, name_offset) or f"{label}_{i+1}"
+                slot = index._add(typ, tuid, i, zone, name)
+                if references:
+                    index._link(slot, _dat_references(typ, data, entry, sections))
+        return index.finish()
+
+    @classmethod
+    def from_instances(cls, instances: Iterable[dict]) -> 'TuidIndex':
+        """Index d'instances décodées ({'type', 'data', ...}: dossier d'extraction, modèle de
+        l'éditeur). index = rang de l'instance parmi celles de son type, dans l'ordre donné."""
+        index = cls()
+        ranks: Dict[str, int] = {}
+        for inst in instances:
+            typ, d = inst.get('type'), inst.get('data') or {}
+            tuid = _to_int(d.get('tuid'))
+            if typ not in INDEX_TYPES or tuid is None:
+                continue
+            rank = ranks.get(typ, 0)
+            ranks[typ] = rank + 1
+            zone = _to_int(d.get('zone')) or 0
+            slot = index._add(typ, tuid, rank, zone, str(d.get('name') or ''))
+            index._link(slot, _record_references(typ, d))
+        return index.finish()
+
+    @classmethod
+    def from_folder(cls, source_dir: str) -> 'TuidIndex':
+        """Index d'un dossier d'extraction (<Nom>.<type>.json), dans l'ordre de parcours."""
+        import json
+        import os
+        suffixes = {f".{typ}.json": typ for typ in TYPE_NAMES}
+        instances = []
+        for root, _dirs, files in os.walk(source_dir):
+            for fn in sorted(files):
+                typ = next((t for suffix, t in suffixes.items() if fn.endswith(suffix)), None)
+                if typ is None:
+                    continue
+                try:
+                    with open(os.path.join(root, fn), 'r', encoding='utf-8') as f:
+                        instances.append({'type': typ, 'data': json.load(f)})
+                except (OSError, ValueError):
+                    continue
+        return cls.from_instances(instances)
+
+    # Mises à jour
+    def update(self, typ: str, record: dict, old_tuid=None) -> None:
+        """(Ré)indexe un enregistrement décodé modifié ou ajouté, en O(nombre de ses références):
+        son entrée (TUID, zone, nom) et ses références sortantes. old_tuid: TUID sous lequel il
+        était indexé (None: nouvel enregistrement)."""
+        tuid = _to_int(record.get('tuid'))
+        if typ not in INDEX_TYPES or tuid is None:
+            return
+        old = _to_int(old_tuid)
+        slot = self._slot.get(old) if old is not None else None
+        if slot is None:
+            slot = self._add(typ, tuid, self.types.count(TYPE_NAMES.index(typ)), 0, '')
+            self.ref_offsets.append(self.ref_offsets[-1])
+        elif tuid != old:
+            self._move(slot, old, tuid)
+        self.zones[slot] = (_to_int(record.get('zone')) or 0) & 0xFFFF
+        self.names[slot] = str(record.get('name') or '')
+        for target, kind in self._out.get(slot, ()):
+            sources = self._incoming[target]
+            sources.remove((slot, kind))
+            if not sources:
+                del self._incoming[target]
+        out = self._out[slot] = []
+        for target, kind in _record_references(typ, record):
+            code = REF_KINDS.index(kind)
+            out.append((target, code))
+            self._incoming.setdefault(target, []).append((slot, code))
+
+    def _move(self, slot: int, old: int, tuid: int) -> None:
+        """Le slot passe de `old` à `tuid`; ses arêtes CSR restent celles du TUID de finish()."""
+        if self._slot.get(old) == slot:
+            del self._slot[old]
+        if slot < self._finished:
+            origin = self._origin.get(slot, old)
+            if tuid == origin:
+                self._origin.pop(slot, None)
+                self._vacated.pop(origin, None)
+            else:
+                self._origin[slot] = origin
+                self._vacated[origin] = slot
+        self.tuids[slot] = tuid & 0xFFFFFFFFFFFFFFFF
+        self._slot[tuid] = slot
+
+    def _base_slot(self, tuid: int) -> Optional[int]:
+        """Slot dont les arêtes CSR visent `tuid` (cible telle qu'à finish())."""
+        if tuid in self._vacated:
+            return self._vacated[tuid]
+        slot = self._slot.get(tuid)
+        if slot is None or slot >= self._finished or slot in self._origin:
+            return None
+        return slot
+
+    def _referrer_slots(self, tuid: int) -> List[Tuple[int, int]]:
+        if tuid not in self._slot:
+            return []
+        refs = []
+        base = self._base_slot(tuid)
+        if base is not None:
+            for p in range(self.ref_offsets[base], self.ref_offsets[base + 1]):
+                if self.ref_sources[p] not in self._out:
+                    refs.append((self.ref_sources[p], self.ref_kinds[p]))
+        else:
+            # TUID apparu depuis finish(): les références cassées vers lui sont résolues
+            refs.extend((source, kind) for source, target, kind in self.dangling
+                        if target == tuid and source not in self._out)
+        refs.extend(self._incoming.get(tuid, ()))
+        return refs
+
+    # Requêtes
+    def _entry(self, slot: int) -> TuidEntry:
+        typ = TYPE_NAMES[self.types[slot]]
+        return TuidEntry(self.tuids[slot], typ, INDEX_TYPES[typ][1], self.indices[slot], self.zones[slot], self.names[slot])
+
+    def get(self, tuid) -> Optional[TuidEntry]:
+        slot = self._slot.get(_to_int(tuid))
+        return None if slot is None else self._entry(slot)
+
+    def referrers(self, tuid) -> List[Tuple[TuidEntry, str]]:
+        """(référent, genre de référence) des instances qui pointent sur `tuid`, en O(degré)."""
+        return [(self._entry(source), REF_KINDS[kind]) for source, kind in self._referrer_slots(_to_int(tuid))]
+
+    def referrer_count(self, tuid) -> int:
+        t = _to_int(tuid)
+        slot = self._slot.get(t)
+        if slot is None:
+            return 0
+        if not self._out and not self._origin:
+            return self.ref_offsets[slot + 1] - self.ref_offsets[slot]
+        return len(self._referrer_slots(t))
+
+    def can_delete(self, tuid) -> bool:
+        """Aucune instance ne référence `tuid` (suppression sans référence cassée)."""
+        return self.referrer_count(tuid) == 0
+
+    def dangling_references(self) -> List[Tuple[TuidEntry, int, str]]:
+        """(référent, TUID cible introuvable, genre) de chaque référence cassée."""
+        if not self._out and not self._origin:
+            return [(self._entry(source), tuid, REF_KINDS[kind]) for source, tuid, kind in self.dangling]
+        found = [(source, tuid, kind) for source, tuid, kind in self.dangling
+                 if source not in self._out and tuid not in self._slot]
+        # Cibles dont le slot a changé de TUID: leurs arêtes CSR ne mènent plus nulle part
+        for tuid, slot in self._vacated.items():
+            if tuid not in self._slot:
+                for p in range(self.ref_offsets[slot], self.ref_offsets[slot + 1]):
+                    if self.ref_sources[p] not in self._out:
+                        found.append((self.ref_sources[p], tuid, self.ref_kinds[p]))
+        for source, refs in self._out.items():
+            found.extend((source, tuid, kind) for tuid, kind in refs if tuid not in self._slot)
+        return [(self._entry(source), tuid, REF_KINDS[kind]) for source, tuid, kind in found]
+
+    @property
+    def reference_count(self) -> int:
+        count = len(self.ref_sources) + len(self.dangling)
+        if self._out:
+            count -= sum(1 for source in self.ref_sources if source in self._out)
+            count -= sum(1 for source, _tuid, _kind in self.dangling if source in self._out)
+            count += sum(len(refs) for refs in self._out.values())
+        return count
@@ -1,4 +1,5 @@
 # shared/utils.py
+import contextlib
 import os
 import struct
 
@@ -15,13 +16,12 @@ def read_float_be(data: bytes, offset: int) -> float:
     return struct.unpack_from('>f', data, offset)[0]
 
 def read_string(data: bytes, offset: int, max_length: int = 64) -> str:
-    """Lit une chaîne null-terminée depuis les données"""
-    string_bytes = b""
-    for i in range(max_length):
-        if offset + i >= len(data) or data[offset + i] == 0:
-            break
-        string_bytes += bytes([data[offset + i]])
-    return string_bytes.decode('utf-8', errors='ignore')
+    """Lit une chaîne null-terminée depuis les données (bytes, bytearray ou mmap)"""
+    end = min(offset + max_length, len(data))
+    stop = data.find(b"\x00", offset, end)
+    if stop == -1:
+        stop = end
+    return bytes(data[offset:stop]).decode('utf-8', errors='ignore')
 
 def sanitize_name(name: str) -> str:
     return name.replace(" ", "_").replace("/", "_").replace("\\", "_")
@@ -63,3 +63,48 @@ def parse_sections(data: bytes) -> list:
         offset += 0x10
     
     return sections
+
+
+def parse_section_table(data) -> dict[int, dict]:
+    """{id: {'offset', 'count', 'size', 'flag'}} d'un fichier IGHW (en-têtes version 0 et 1).
+    Version 1: nombre de sections u32 @ 0x08 (0x0C est la longueur de l'en-tête, cf.
+    rebuild/ighw_header.py), sans quoi la suite des données serait lue comme des sections."""
+    version_major = struct.unpack_from('>H', data, 4)[0]
+    if version_major == 0:
+        section_count, section_start = struct.unpack_from('>H', data, 0x0A)[0], 0x10
+    else:
+        section_count, section_start = struct.unpack_from('>I', data, 0x08)[0], 0x20
+    sections = {}
+    for i in range(section_count):
+        offset = section_start + i * 16
+        if offset + 16 > len(data):
+            break
+        section_id, data_offset, flag = struct.unpack_from('>IIB', data, offset)
+        item_count = int.from_bytes(data[offset+9:offset+12], 'big')
+        size = struct.unpack_from('>I', data, offset + 12)[0]
+        sections[section_id] = {
+            'offset': data_offset,
+            'count': item_count if flag == 0x10 else 1,
+            'size': size,
+            'flag': flag,
+        }
+    return sections
+
+
+def pop_int_option(args: list, flag: str, default: int) -> int:
+    """Retire `flag N` de args (modifié en place) et renvoie N, ou default si absent."""
+    if flag in args:
+        i = args.index(flag)
+        if i + 1 < len(args):
+            value = int(args[i + 1], 0)
+            del args[i:i + 2]
+            return value
+        del args[i]
+    return default
+
+
+@contextlib.contextmanager
+def silenced():
+    """Coupe stdout dans le bloc (extracteurs et rebuilders très bavards: benchmarks, lots)."""
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        yield
@@ -0,0 +1,240 @@
+# shared/volume_index.py
+"""Volumes (cuboïdes, section 0x0002505C) en boîtes orientées + hiérarchie de boîtes (BVH).
+
+Un volume est le cube canonique [-CUBE_HALF, CUBE_HALF]^3 transformé par sa matrice 4x4
+(convention vecteur-ligne du .dat: monde = local x A + t, A = lignes 0-2 et t = ligne 3,
+floats 12-14). Chaque volume garde A, son inverse et sa boîte englobante alignée (AABB); le BVH
+(découpe médiane sur l'axe le plus long des centres, feuilles de LEAF_SIZE volumes, nœuds
+aplatis en préordre: fils gauche = nœud suivant) range ces AABB.
+
+Requêtes:
+    at(point)            volumes contenant un point (sélection dans l'éditeur): descente du BVH
+    in_box(lo, hi)       volumes dont l'AABB recoupe une boîte (vue courante de la carte de
+                         l'éditeur, bornes infinies admises)
+    containing(points)   volumes contenant chacun des N points: pour de gros lots, les points
+                         sont rangés dans une grille (shared.spatial_index) et chaque volume ne
+                         teste que les points de son AABB, sinon un at() par point
+    overlaps()           paires de volumes qui se chevauchent: AABB par le BVH, puis test des
+                         axes séparateurs (parallélépipèdes quelconques, cisaillement compris)
+Un volume à matrice singulière (aplati) ne contient aucun point mais peut en chevaucher d'autres.
+"""
+import math
+from array import array
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from shared.spatial_index import SpatialIndex
+
+Point = Tuple[float, float, float]
+
+CUBE_HALF = 1.0
+LEAF_SIZE = 4
+# Tolérance (coordonnées locales) des tests de contenance: un point sur une face est dedans
+EPSILON = 1e-6
+# Au-delà de ce nombre de points par volume, containing() passe par une grille des points
+GRID_BATCH_RATIO = 8
+
+
+def _matrix16(matrix) -> Tuple[float, ...]:
+    """4x4 (listes de lignes, JSON) ou 16 floats -> 16 floats."""
+    if len(matrix) == 4:
+        return tuple(float(v) for row in matrix for v in row[:4])
+    return tuple(float(v) for v in matrix[:16])
+
+
+def _inverse3(a: Sequence[float]) -> Optional[Tuple[float, ...]]:
+    """Inverse d'une 3x3 (9 floats, ligne par ligne); None si singulière."""
+    a0, a1, a2, a3, a4, a5, a6, a7, a8 = a
+    c0, c1, c2 = a4 * a8 - a5 * a7, a5 * a6 - a3 * a8, a3 * a7 - a4 * a6
+    det = a0 * c0 + a1 * c1 + a2 * c2
+    scale = max(abs(v) for v in a)
+    if scale == 0 or abs(det) <= 1e-12 * scale ** 3:
+        return None
+    inv = 1.0 / det
+    return (c0 * inv, (a2 * a7 - a1 * a8) * inv, (a1 * a5 - a2 * a4) * inv,
+            c1 * inv, (a0 * a8 - a2 * a6) * inv, (a2 * a3 - a0 * a5) * inv,
+            c2 * inv, (a1 * a6 - a0 * a7) * inv, (a0 * a4 - a1 * a3) * inv)
+
+
+def _cross(u: Sequence[float], v: Sequence[float]) -> Tuple[float, float, float]:
+    return (u[1] * v[2] - u[2] * v[1], u[2] * v[0] - u[0] * v[2], u[0] * v[1] - u[1] * v[0])
+
+
+class VolumeIndex:
+    def __init__(self, items: Iterable[Tuple[Hashable, Sequence]]):
+        """items: (clé, matrice 4x4 ou 16 floats). Les matrices non finies sont ignorées."""
+        self.keys: List[Hashable] = []
+        self._axes = array('d')      # A: 9 floats par volume
+        self._origin = array('d')    # t: 3 floats par volume
+        self._inv: List[Optional[Tuple[float, ...]]] = []
+        self._box = array('d')       # AABB: lo x, y, z, hi x, y, z par volume
+        for key, matrix in items:
+            m = _matrix16(matrix)
+            if not all(math.isfinite(v) for v in m[:15]):
+                continue
+            axes, origin = m[0:3] + m[4:7] + m[8:11], m[12:15]
+            self.keys.append(key)
+            self._axes.extend(axes)
+            self._origin.extend(origin)
+            self._inv.append(_inverse3(axes))
+            extent = [CUBE_HALF * (abs(axes[k]) + abs(axes[3 + k]) + abs(axes[6 + k])) for k in range(3)]
+            self._box.extend([origin[k] - extent[k] for k in range(3)] + [origin[k] + extent[k] for k in range(3)])
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_dat(cls, data, dat_index) -> 'VolumeIndex':
+        """Volumes d'un .dat (clé: slot du DatIndex), matrices lues dans leur colonne."""
+        from shared.dat_query import DatColumns
+        columns = DatColumns(data, dat_index)
+        base = dat_index.bases.get('volume', 0)
+        return cls((base + i, columns.volume_matrix(i)) for i in range(dat_index.counts.get('volume', 0)))
+
+    @classmethod
+    def from_instances(cls, instances: Iterable[dict]) -> 'VolumeIndex':
+        """Volumes d'instances JSON ({'type', 'data'}); clé: position dans `instances`."""
+        return cls((n, inst['data']['transform_matrix']) for n, inst in enumerate(instances)
+                   if inst.get('type') == 'volume' and inst['data'].get('transform_matrix'))
+
+    # BVH
+    def _build(self) -> None:
+        n = len(self.keys)
+        box = self._box
+        centers = [tuple((box[6 * i + k] + box[6 * i + 3 + k]) * 0.5 for k in range(3)) for i in range(n)]
+        self._order: List[int] = list(range(n))
+        self._nodes = array('d')                 # AABB du nœud: 6 floats
+        self._start: List[int] = []              # feuille: début dans _order
+        self._count: List[int] = []              # feuille: nombre de volumes (0: nœud interne)
+        self._right: List[int] = []              # nœud interne: fils droit (le gauche suit)
+        if n:
+            self._build_node(0, n, centers)
+
+    def _build_node(self, start: int, end: int, centers) -> int:
+        order, box = self._order, self._box
+        lo = [min(box[6 * i + k] for i in order[start:end]) for k in range(3)]
+        hi = [max(box[6 * i + 3 + k] for i in order[start:end]) for k in range(3)]
+        node = len(self._start)
+        self._nodes.extend(lo + hi)
+        self._start.append(start)
+        self._count.append(0)
+        self._right.append(0)
+        if end - start <= LEAF_SIZE:
+            self._count[node] = end - start
+            return node
+        spans = [max(centers[i][k] for i in order[start:end]) - min(centers[i][k] for i in order[start:end])
+                 for k in range(3)]
+        axis = spans.index(max(spans))
+        order[start:end] = sorted(order[start:end], key=lambda i: centers[i][axis])
+        mid = (start + end) // 2
+        self._build_node(start, mid, centers)
+        self._right[node] = self._build_node(mid, end, centers)
+        return node
+
+    def _candidates(self, lo: Sequence[float], hi: Sequence[float]) -> List[int]:
+        """Volumes dont l'AABB recoupe la boîte [lo, hi]."""
+        out: List[int] = []
+        if not self.keys:
+            return out
+        nodes, box, order = self._nodes, self._box, self._order
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            b = 6 * node
+            if (nodes[b] > hi[0] or nodes[b + 1] > hi[1] or nodes[b + 2] > hi[2]
+                    or nodes[b + 3] < lo[0] or nodes[b + 4] < lo[1] or nodes[b + 5] < lo[2]):
+                continue
+            count = self._count[node]
+            if count:
+                start = self._start[node]
+                for i in order[start:start + count]:
+                    v = 6 * i
+                    if not (box[v] > hi[0] or box[v + 1] > hi[1] or box[v + 2] > hi[2]
+                            or box[v + 3] < lo[0] or box[v + 4] < lo[1] or box[v + 5] < lo[2]):
+                        out.append(i)
+            else:
+                stack.append(self._right[node])
+                stack.append(node + 1)
+        return out
+
+    def corners(self, i: int) -> List[Point]:
+        """Les 8 sommets monde du volume n° i."""
+        a, o = self._axes[9 * i:9 * i + 9], self._origin[3 * i:3 * i + 3]
+        h = CUBE_HALF
+        return [tuple(o[k] + sx * a[k] + sy * a[3 + k] + sz * a[6 + k] for k in range(3))
+                for sx in (-h, h) for sy in (-h, h) for sz in (-h, h)]
+
+    # Tests exacts
+    def contains(self, i: int, point: Point) -> bool:
+        """Le volume n° i (ordre de keys) contient-il `point` ?"""
+        inv = self._inv[i]
+        if inv is None:
+            return False
+        o = self._origin
+        dx, dy, dz = point[0] - o[3 * i], point[1] - o[3 * i + 1], point[2] - o[3 * i + 2]
+        limit = CUBE_HALF + EPSILON
+        return (abs(dx * inv[0] + dy * inv[3] + dz * inv[6]) <= limit
+                and abs(dx * inv[1] + dy * inv[4] + dz * inv[7]) <= limit
+                and abs(dx * inv[2] + dy * inv[5] + dz * inv[8]) <= limit)
+
+    def _radius(self, i: int, axis: Sequence[float]) -> float:
+        a = self._axes
+        return CUBE_HALF * sum(abs(a[9 * i + 3 * r] * axis[0] + a[9 * i + 3 * r + 1] * axis[1]
+                                   + a[9 * i + 3 * r + 2] * axis[2]) for r in range(3))
+
+    def intersects(self, i: int, j: int) -> bool:
+        """Les volumes i et j se chevauchent-ils ? (théorème des axes séparateurs: normales des
+        faces de chacun et produits vectoriels de leurs arêtes)."""
+        a = self._axes
+        ea = [a[9 * i + 3 * r:9 * i + 3 * r + 3] for r in range(3)]
+        eb = [a[9 * j + 3 * r:9 * j + 3 * r + 3] for r in range(3)]
+        o = self._origin
+        d = (o[3 * j] - o[3 * i], o[3 * j + 1] - o[3 * i + 1], o[3 * j + 2] - o[3 * i + 2])
+        axes = [_cross(e[1], e[2]) for e in (ea, eb)] + [_cross(e[2], e[0]) for e in (ea, eb)] \
+            + [_cross(e[0], e[1]) for e in (ea, eb)] + [_cross(u, v) for u in ea for v in eb]
+        for axis in axes:
+            norm = math.sqrt(axis[0] ** 2 + axis[1] ** 2 + axis[2] ** 2)
+            if norm < 1e-12:
+                continue
+            gap = abs(d[0] * axis[0] + d[1] * axis[1] + d[2] * axis[2])
+            if gap > (self._radius(i, axis) + self._radius(j, axis)) * (1 + 1e-9) + EPSILON * norm:
+                return False
+        return True
+
+    # Requêtes
+    def at(self, point: Point) -> List[Hashable]:
+        """Clés des volumes contenant `point` (ordre de keys)."""
+        p = tuple(float(c) for c in point[:3])
+        found = [i for i in self._candidates(p, p) if self.contains(i, p)]
+        return [self.keys[i] for i in sorted(found)]
+
+    def in_box(self, lo: Sequence[float], hi: Sequence[float]) -> List[int]:
+        """N° (ordre de keys) des volumes dont l'AABB recoupe la boîte [lo, hi]."""
+        return sorted(self._candidates(lo, hi))
+
+    def containing(self, points: Sequence[Point]) -> List[List[Hashable]]:
+        """Pour chaque point, clés des volumes qui le contiennent (ordre de keys)."""
+        points = [tuple(float(c) for c in p[:3]) for p in points]
+        if len(points) <= GRID_BATCH_RATIO * max(len(self.keys), 1):
+            return [self.at(p) for p in points]
+        grid = SpatialIndex.build((n, (p,)) for n, p in enumerate(points))
+        hits: Dict[int, List[int]] = {}
+        box = self._box
+        for i in range(len(self.keys)):
+            if self._inv[i] is None:
+                continue
+            for n, p in grid.box(box[6 * i:6 * i + 3], box[6 * i + 3:6 * i + 6]):
+                if self.contains(i, p):
+                    hits.setdefault(n, []).append(i)
+        keys = self.keys
+        return [[keys[i] for i in hits.get(n, ())] for n in range(len(points))]
+
+    def overlaps(self) -> List[Tuple[Hashable, Hashable]]:
+        """Paires (clé, clé) de volumes qui se chevauchent, dans l'ordre de keys."""
+        box, keys = self._box, self.keys
+        pairs = []
+        for i in range(len(keys)):
+            for j in sorted(self._candidates(box[6 * i:6 * i + 3], box[6 * i + 3:6 * i + 6])):
+                if j > i and self.intersects(i, j):
+                    pairs.append((keys[i], keys[j]))
+        return pairs
@@ -0,0 +1,37 @@
+"""compare_extractions: extraction par défaut contre extraction --compact-paths."""
+import json
+from pathlib import Path
+
+from extract.region_builder import extract_regions_from_dat
+from shared.path_points import PACKED_KEY
+from tools.compare_extractions import IGNORE_SUFFIXES_DEFAULT, compare_instance_files
+from tools.generate_synthetic_level import generate_synthetic_level
+
+
+def _extract_both(tmp_path):
+    dat = str(tmp_path / 'level.dat')
+    generate_synthetic_level(dat, 200, seed=1)
+    full, compact = tmp_path / 'full', tmp_path / 'compact'
+    extract_regions_from_dat(dat, str(full))
+    extract_regions_from_dat(dat, str(compact), compact_paths=True)
+    return full, compact
+
+
+def test_default_and_compact_paths_compare_equal(tmp_path):
+    full, compact = _extract_both(tmp_path)
+    packed = list(compact.rglob('*.path.json'))
+    assert packed and all(PACKED_KEY in json.loads(p.read_text(encoding='utf-8')) for p in packed)
+    for ignore in (IGNORE_SUFFIXES_DEFAULT, None):
+        count, diffs = compare_instance_files(full, compact, 'path', ignore, exact=True)
+        assert count == len(packed)
+        assert diffs == []
+
+
+def test_point_change_still_reported(tmp_path):
+    full, compact = _extract_both(tmp_path)
+    path = next(full.rglob('*.path.json'))
+    data = json.loads(path.read_text(encoding='utf-8'))
+    data['points'][0]['position']['x'] += 1.0
+    path.write_text(json.dumps(data), encoding='utf-8')
+    _count, diffs = compare_instance_files(full, compact, 'path', IGNORE_SUFFIXES_DEFAULT, exact=True)
+    assert len(diffs) == 1 and 'points[0].position.x' in diffs[0]
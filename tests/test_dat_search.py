@@ -0,0 +1,26 @@
+"""Recherche class: dans un .dat ouvert directement (DatModel), sans instance décodée."""
+from collections import Counter
+
+from gui.dat_model import DatModel
+from gui.search_index import SearchIndex
+from shared.dat_index import DatIndex
+from tools.generate_synthetic_level import generate_synthetic_level
+
+
+def test_class_search_on_freshly_opened_dat(tmp_path):
+    dat = str(tmp_path / 'level.dat')
+    generate_synthetic_level(dat, 300, seed=3)
+    DatIndex.for_file(dat)      # sidecar .polaris-idx: ClassID des subfiles sans décodage
+    model = DatModel(dat)
+    try:
+        # Construit comme EditorApp.open_dat (thread de chargement, avant que l'éditeur ne garde le modèle)
+        index = SearchIndex(lambda inst: ('default', ''), model.search_class_id)
+        index.sync(model.instances)
+        counts = Counter(model.class_id(inst) for inst in model.instances)
+        counts.pop(None, None)
+        class_id, expected = counts.most_common(1)[0]
+        found = index.search(f"class:{class_id}")
+        assert len(found) == expected
+        assert all(not model.is_decoded(inst) for inst in found)
+    finally:
+        model.close()
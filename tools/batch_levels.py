@@ -0,0 +1,345 @@
+"""
+Traitement par lots: extract / repack / verify sur tout un corpus de niveaux avec un pool de processus.
+
+Les niveaux sont répartis sur --jobs workers (défaut: nombre de cœurs), du plus gros au plus
+petit pour que la durée totale tende vers celle du plus gros niveau. Les workers vivent
+pendant tout le lot: imports (extracteurs, rebuilders) et enum Class_FFA.h ne sont chargés
+qu'une fois par worker au lieu d'une fois par niveau. Un échec n'arrête pas le lot; le
+résumé donne, par niveau, statut, durée, phases (shared.metrics) et erreur éventuelle.
+
+Entrées: un glob (ex: 'build/**/gp_prius.dat', guillemets conseillés) ou un manifeste:
+  - .json: liste de chemins ou d'objets {"input": ..., "output": ...}
+  - autre: un chemin par ligne (# = commentaire), sortie optionnelle après une tabulation
+Les chemins relatifs d'un manifeste sont relatifs à son dossier.
+
+Modes:
+  extract  <niveau.dat>          -> <out>/<chemin relatif sans .dat>/
+  repack   <dossier d'extraction> -> <out>/<chemin relatif>.dat
+  verify   <niveau.dat>          extract -> repack -> re-extract -> comparaison (dossier temporaire)
+
+Usage:
+  python -m tools.batch_levels <extract|repack|verify> <manifeste|glob> [--out DIR] [--jobs N] [--summary summary.json]
+  python main.py batch <extract|repack|verify> <manifeste|glob> [...]
+"""
+
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+from shared import metrics
+from shared.constants import COMPARED_TYPES
+from shared.utils import pop_int_option, silenced
+
+
+MODES = ('extract', 'repack', 'verify')
+DEFAULT_OUT_DIR = 'batch_out'
+
+
+# --- Entrées ------------------------------------------------------------------
+
+def _read_manifest(path: str) -> List[Tuple[str, str | None]]:
+    base = os.path.dirname(os.path.abspath(path))
+
+    def _abs(p: str | None) -> str | None:
+        if not p:
+            return None
+        return p if os.path.isabs(p) else os.path.join(base, p)
+
+    entries: List[Tuple[str, str | None]] = []
+    if path.lower().endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for item in data:
+            if isinstance(item, str):
+                entries.append((_abs(item), None))
+            else:
+                entries.append((_abs(item['input']), _abs(item.get('output'))))
+        return entries
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            src, _sep, dst = line.partition('\t')
+            entries.append((_abs(src.strip()), _abs(dst.strip())))
+    return entries
+
+
+def resolve_inputs(spec: str, mode: str) -> List[Tuple[str, str | None]]:
+    """Manifeste ou glob -> [(entrée, sortie explicite | None)], dans l'ordre, sans doublons."""
+    want_dir = mode == 'repack'
+    if os.path.isfile(spec) and not spec.lower().endswith('.dat'):
+        raw = _read_manifest(spec)
+    else:
+        raw = [(p, None) for p in sorted(glob.glob(spec, recursive=True))]
+
+    entries: List[Tuple[str, str | None]] = []
+    seen = set()
+    for src, dst in raw:
+        src = os.path.normpath(src)
+        # repack: accepter aussi le extraction_metadata.json d'un dossier d'extraction
+        if want_dir and os.path.basename(src) == 'extraction_metadata.json':
+            src = os.path.dirname(src)
+        if (os.path.isdir(src) if want_dir else os.path.isfile(src)) and src not in seen:
+            seen.add(src)
+            entries.append((src, dst))
+    return entries
+
+
+def _output_for(src: str, root: str, mode: str, out_dir: str) -> str | None:
+    rel = os.path.relpath(src, root)
+    if mode == 'extract':
+        stem, ext = os.path.splitext(rel)
+        return os.path.join(out_dir, stem if ext.lower() == '.dat' else rel)
+    if mode == 'repack':
+        return os.path.join(out_dir, rel + '.dat')
+    return None
+
+
+def _input_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for base, _dirs, files in os.walk(path):
+        for fn in files:
+            try:
+                total += os.path.getsize(os.path.join(base, fn))
+            except OSError:
+                pass
+    return total
+
+
+def plan_jobs(entries: List[Tuple[str, str | None]], mode: str, out_dir: str) -> List[Dict[str, Any]]:
+    """Un job par niveau; sorties par défaut sous out_dir en gardant les chemins relatifs."""
+    if not entries:
+        return []
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(src)) for src, _dst in entries])
+    jobs = []
+    for index, (src, dst) in enumerate(entries):
+        jobs.append({
+            'index': index,
+            'mode': mode,
+            'input': src,
+            'output': dst or _output_for(os.path.abspath(src), root, mode, out_dir),
+            'size': _input_size(src),
+        })
+    return jobs
+
+
+# --- Worker ---------------------------------------------------------------------
+
+def _init_worker() -> None:
+    """Initialisation d'un worker: imports et caches partagés chargés une fois."""
+    metrics.set_quiet(True)
+    with silenced():
+        _warm_caches()
+
+
+def _warm_caches() -> None:
+    import extract.region_builder  # noqa: F401
+    import main  # noqa: F401  (rebuild_dat_from_folder importe les rebuilders au premier appel)
+    from shared.class_enum import load_class_enum
+    load_class_enum()
+
+
+def _collect_class_ids(extract_dir: str) -> set:
+    from shared.class_enum import read_subfile_class_id
+    ids = set()
+    for base, _dirs, files in os.walk(extract_dir):
+        for fn in files:
+            if fn.endswith(('_CLASS.host.dat', '_CLASS.local.dat')):
+                cid = read_subfile_class_id(os.path.join(base, fn))
+                if cid is not None:
+                    ids.add(cid)
+    return ids
+
+
+def _verify_level(dat_path: str) -> Dict[str, Any]:
+    from main import rebuild_dat_from_folder
+    from extract.region_builder import extract_regions_from_dat
+    from shared.class_enum import load_class_enum
+    from tools.compare_extractions import compare_instance_files, IGNORE_SUFFIXES_DEFAULT
+
+    work_dir = tempfile.mkdtemp(prefix='polaris_verify_')
+    try:
+        extract_dir = os.path.join(work_dir, 'extract')
+        rebuilt_path = os.path.join(work_dir, 'rebuilt.dat')
+        reextract_dir = os.path.join(work_dir, 'reextract')
+        with metrics.span('extract'):
+            if extract_regions_from_dat(dat_path, extract_dir) is None:
+                raise RuntimeError("extraction échouée")
+        with metrics.span('repack'):
+            rebuild_dat_from_folder(extract_dir, rebuilt_path)
+        with metrics.span('reextract'):
+            if extract_regions_from_dat(rebuilt_path, reextract_dir) is None:
+                raise RuntimeError("ré-extraction échouée")
+        differences: List[str] = []
+        with metrics.span('compare'):
+            for typ in COMPARED_TYPES:
+                _count, diffs = compare_instance_files(Path(extract_dir), Path(reextract_dir), typ, IGNORE_SUFFIXES_DEFAULT)
+                differences.extend(f"{typ}: {d}" for d in diffs)
+        with open(dat_path, 'rb') as a, open(rebuilt_path, 'rb') as b:
+            identical = a.read() == b.read()
+        known = load_class_enum()
+        unknown = sorted(cid for cid in _collect_class_ids(extract_dir) if cid not in known)
+        return {
+            'differences': len(differences),
+            'first_differences': differences[:10],
+            'byte_identical': identical,
+            'unknown_class_ids': unknown,
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Exécute un job dans le worker courant; ne lève jamais (l'erreur va dans le résultat)."""
+    result = {k: job[k] for k in ('index', 'mode', 'input', 'output', 'size')}
+    result.update({'status': 'ok', 'error': None, 'pid': os.getpid()})
+    with metrics.isolated(), silenced():
+        t0 = time.perf_counter()
+        try:
+            if job['mode'] == 'extract':
+                from extract.region_builder import extract_regions_from_dat
+                os.makedirs(job['output'], exist_ok=True)
+                if extract_regions_from_dat(job['input'], job['output']) is None:
+                    raise RuntimeError("extraction échouée (fichier IGHW invalide ?)")
+            elif job['mode'] == 'repack':
+                from main import rebuild_dat_from_folder
+                os.makedirs(os.path.dirname(os.path.abspath(job['output'])), exist_ok=True)
+                rebuild_dat_from_folder(job['input'], job['output'])
+            else:
+                result.update(_verify_level(job['input']))
+                if result['differences']:
+                    result['status'] = 'diff'
+        except Exception as e:
+            result['status'] = 'failed'
+            result['error'] = f"{type(e).__name__}: {e}"
+            result['traceback'] = traceback.format_exc(limit=8)
+        result['seconds'] = round(time.perf_counter() - t0, 6)
+        result['phases'] = metrics.report()
+    return result
+
+
+# --- Lot ------------------------------------------------------------------------
+
+def run_batch(jobs: List[Dict[str, Any]], *, workers: int | None = None, progress=None) -> Dict[str, Any]:
+    """Exécute les jobs (plus gros d'abord) sur un pool de processus; workers=1: dans ce processus."""
+    workers = max(1, workers or os.cpu_count() or 1)
+    ordered = sorted(jobs, key=lambda j: -j['size'])
+    results: List[Dict[str, Any]] = []
+    t0 = time.perf_counter()
+
+    def _done(res: Dict[str, Any]) -> None:
+        results.append(res)
+        if progress:
+            progress(len(results), len(jobs), res)
+
+    if workers == 1 or len(jobs) <= 1:
+        was_quiet = metrics.is_quiet()
+        metrics.set_quiet(True)
+        try:
+            for job in ordered:
+                _done(run_job(job))
+        finally:
+            metrics.set_quiet(was_quiet)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=_init_worker) as pool:
+            futures = {pool.submit(run_job, job): job for job in ordered}
+            for fut in as_completed(futures):
+                try:
+                    res = fut.result()
+                except Exception as e:  # worker tué (mémoire, signal...)
+                    job = futures[fut]
+                    res = {k: job[k] for k in ('index', 'mode', 'input', 'output', 'size')}
+                    res.update({'status': 'failed', 'error': f"{type(e).__name__}: {e}", 'seconds': None, 'phases': None})
+                _done(res)
+
+    wall = time.perf_counter() - t0
+    results.sort(key=lambda r: r['index'])
+    level_times = [r['seconds'] for r in results if r.get('seconds') is not None]
+    return {
+        'workers': workers,
+        'wall_seconds': round(wall, 6),
+        'sum_level_seconds': round(sum(level_times), 6),
+        'max_level_seconds': round(max(level_times), 6) if level_times else 0.0,
+        'ok': sum(1 for r in results if r['status'] == 'ok'),
+        'diff': sum(1 for r in results if r['status'] == 'diff'),
+        'failed': sum(1 for r in results if r['status'] == 'failed'),
+        'results': results,
+    }
+
+
+def _print_progress(done: int, total: int, res: Dict[str, Any]) -> None:
+    mark = {'ok': '✅', 'diff': '⚠️', 'failed': '❌'}[res['status']]
+    secs = f"{res['seconds']:.2f}s" if res.get('seconds') is not None else '-'
+    print(f"[BATCH] {done}/{total} {mark} {res['input']} ({secs})", flush=True)
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    lines = [
+        f"📦 {len(summary['results'])} niveaux | {summary['workers']} workers | "
+        f"{summary['wall_seconds']:.2f}s (somme des niveaux {summary['sum_level_seconds']:.2f}s, "
+        f"plus gros {summary['max_level_seconds']:.2f}s)",
+        f"   ✅ {summary['ok']}  ⚠️ {summary['diff']}  ❌ {summary['failed']}",
+    ]
+    for r in summary['results']:
+        if r['status'] == 'failed':
+            lines.append(f"   ❌ {r['input']}: {r['error']}")
+        elif r['status'] == 'diff':
+            lines.append(f"   ⚠️ {r['input']}: {r['differences']} différences")
+        if r.get('unknown_class_ids'):
+            shown = ', '.join(str(c) for c in r['unknown_class_ids'][:8])
+            lines.append(f"   ℹ️  {r['input']}: ClassID absents de Class_FFA.h: {shown}")
+    return "\n".join(lines)
+
+
+def main(argv: List[str] | None = None):
+    args = list(sys.argv[1:] if argv is None else argv)
+    workers = pop_int_option(args, '--jobs', 0) or None
+    options: Dict[str, str] = {}
+    for flag in ('--out', '--summary'):
+        if flag in args:
+            i = args.index(flag)
+            if i + 1 >= len(args):
+                print(f"❌ Valeur manquante pour {flag}")
+                sys.exit(2)
+            options[flag] = args[i + 1]
+            del args[i:i + 2]
+
+    if len(args) < 2 or args[0] not in MODES:
+        print("Usage: python main.py batch <extract|repack|verify> <manifeste|glob> [--out DIR] [--jobs N] [--summary summary.json]")
+        sys.exit(2)
+    mode, spec = args[0], args[1]
+
+    entries = resolve_inputs(spec, mode)
+    if not entries:
+        print(f"❌ Aucun niveau trouvé pour {spec}")
+        sys.exit(2)
+    jobs = plan_jobs(entries, mode, options.get('--out', DEFAULT_OUT_DIR))
+    print(f"[BATCH] {mode}: {len(jobs)} niveaux")
+
+    summary = run_batch(jobs, workers=workers, progress=_print_progress)
+    summary['mode'] = mode
+    print(format_summary(summary))
+
+    if '--summary' in options:
+        with open(options['--summary'], 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        print(f"📊 Résumé écrit dans {options['--summary']}")
+
+    if summary['failed'] or summary['diff']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Benchmark de montée en charge sur des niveaux synthétiques (tools/generate_synthetic_level.py).
+
+Pour chaque échelle (nombre d'instances): generate → extract → repack → re-extract →
+compare → chargement GUI. Les durées (secondes, perf_counter) et tailles sont écrites
+en JSON pour suivre les régressions entre versions.
+
+Usage:
+  python -m tools.bench_scaling [scales] [--out results.json] [--work DIR] [--seed N] [--no-gui] [--keep]
+  python main.py bench [scales] [...]
+  scales: liste séparée par des virgules (défaut: 1000,10000,100000,1000000)
+"""
+
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, List
+
+from shared import metrics
+from shared.constants import COMPARED_TYPES
+from shared.utils import pop_int_option, silenced
+from tools.generate_synthetic_level import generate_synthetic_level
+
+
+DEFAULT_SCALES = [1000, 10000, 100000, 1000000]
+RESULTS_FORMAT_VERSION = 1
+
+
+def _timed(timings: Dict[str, float], key: str, func, *args, phases: Dict[str, Any] | None = None, **kwargs):
+    with metrics.isolated():
+        t0 = time.perf_counter()
+        with silenced():
+            result = func(*args, **kwargs)
+        timings[key] = round(time.perf_counter() - t0, 6)
+        if phases is not None:
+            # Détail par phase (spans/compteurs de shared.metrics) pour extract/repack
+            phases[key] = metrics.report()
+    return result
+
+
+def _gui_load(extract_dir: str) -> float | None:
+    """Durée de chargement d'un dossier dans l'éditeur (reload_instances + rendu de l'arbre).
+    Retourne None si aucun affichage n'est disponible."""
+    try:
+        from gui.editor import EditorApp
+        app = EditorApp()
+    except Exception:
+        return None
+    try:
+        app.withdraw()
+        t0 = time.perf_counter()
+        app.extract_dir = extract_dir
+        app.reload_instances(background=False)
+        app.update_idletasks()
+        return round(time.perf_counter() - t0, 6)
+    finally:
+        app.destroy()
+
+
+def bench_scale(total_instances: int, work_dir: str, *, seed: int = 0, gui: bool = True) -> Dict[str, Any]:
+    """Exécute toutes les étapes pour une échelle; renvoie timings, tailles et nombre de différences."""
+    from main import rebuild_dat_from_folder
+    from extract.region_builder import extract_regions_from_dat
+    from gui.editor import _scan_instances
+    from tools.compare_extractions import compare_instance_files, IGNORE_SUFFIXES_DEFAULT
+
+    base = os.path.join(work_dir, f"synthetic_{total_instances}")
+    os.makedirs(base, exist_ok=True)
+    dat_path = os.path.join(base, 'gp_prius.dat')
+    extract_dir = os.path.join(base, 'extract')
+    rebuilt_path = os.path.join(base, 'gp_prius_rebuilt.dat')
+    reextract_dir = os.path.join(base, 'reextract')
+
+    timings: Dict[str, float] = {}
+    phases: Dict[str, Any] = {}
+    counts = _timed(timings, 'generate', generate_synthetic_level, dat_path, total_instances, seed=seed)
+    _timed(timings, 'extract', extract_regions_from_dat, dat_path, extract_dir, phases=phases)
+    _timed(timings, 'repack', rebuild_dat_from_folder, extract_dir, rebuilt_path, phases=phases)
+    _timed(timings, 'reextract', extract_regions_from_dat, rebuilt_path, reextract_dir)
+
+    def compare_all() -> int:
+        n = 0
+        for typ in COMPARED_TYPES:
+            _count, diffs = compare_instance_files(Path(extract_dir), Path(reextract_dir), typ, IGNORE_SUFFIXES_DEFAULT)
+            n += len(diffs)
+        return n
+
+    differences = _timed(timings, 'compare', compare_all)
+    _timed(timings, 'gui_scan', _scan_instances, extract_dir)
+    if gui:
+        load = _gui_load(extract_dir)
+        if load is not None:
+            timings['gui_load'] = load
+
+    return {
+        'instances': total_instances,
+        'counts': counts,
+        'timings': timings,
+        'sizes': {
+            'dat': os.path.getsize(dat_path),
+            'rebuilt_dat': os.path.getsize(rebuilt_path),
+        },
+        'differences': differences,
+        'phases': phases,
+    }
+
+
+def run_benchmark(
+    scales: List[int],
+    *,
+    work_dir: str | None = None,
+    seed: int = 0,
+    gui: bool = True,
+    keep: bool = False,
+) -> Dict[str, Any]:
+    own_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix='polaris_bench_')
+    results: List[Dict[str, Any]] = []
+    try:
+        for scale in scales:
+            print(f"[BENCH] {scale} instances...")
+            res = bench_scale(scale, work_dir, seed=seed, gui=gui)
+            t = res['timings']
+            print("  " + "  ".join(f"{k}={v:.3f}s" for k, v in t.items()) + f"  diffs={res['differences']}")
+            results.append(res)
+            if not keep:
+                shutil.rmtree(os.path.join(work_dir, f"synthetic_{scale}"), ignore_errors=True)
+    finally:
+        if own_dir and not keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'format_version': RESULTS_FORMAT_VERSION,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'results': results,
+    }
+
+
+def main(argv: List[str] | None = None):
+    args = list(sys.argv[1:] if argv is None else argv)
+    seed = pop_int_option(args, '--seed', 0)
+    out_path = 'bench_results.json'
+    work_dir = None
+    for flag in ('--out', '--work'):
+        if flag in args:
+            i = args.index(flag)
+            if i + 1 >= len(args):
+                print(f"❌ Valeur manquante pour {flag}")
+                return
+            if flag == '--out':
+                out_path = args[i + 1]
+            else:
+                work_dir = args[i + 1]
+            del args[i:i + 2]
+    gui = '--no-gui' not in args
+    keep = '--keep' in args
+    args = [a for a in args if a not in ('--no-gui', '--keep')]
+
+    scales = [int(s) for s in args[0].split(',') if s.strip()] if args else DEFAULT_SCALES
+    report = run_benchmark(scales, work_dir=work_dir, seed=seed, gui=gui, keep=keep)
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✅ Résultats écrits dans {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Vérifie les budgets mémoire par phase d'extract/repack sur un niveau synthétique.
+
+Le niveau est généré par tools/generate_synthetic_level.py puis extrait et repacké
+sous shared.memprofile. Chaque phase budgétée (chemin de span, ex: 'extract/decode')
+doit rester sous base_mb + per_instance_kb * instances pour la métrique choisie
+('traced_peak' = pic tracemalloc, 'rss_peak' = pic RSS). Code de sortie 1 si un budget
+est dépassé: à lancer en CI pour bloquer les régressions mémoire.
+
+Usage:
+  python -m tools.check_memory_budget [instances] [--budgets tools/memory_budgets.json] [--seed N] [--out report.json] [--keep DIR]
+  python main.py membudget [instances] [...]
+"""
+
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from typing import Dict, Any, List, Tuple
+
+from shared import metrics, memprofile
+from shared.utils import pop_int_option
+from tools.generate_synthetic_level import generate_synthetic_level
+
+
+DEFAULT_BUDGETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'memory_budgets.json')
+DEFAULT_INSTANCES = 5000
+MB = 1024 * 1024
+KB = 1024
+
+
+def load_budgets(path: str) -> Dict[str, Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get('phases', {})
+
+
+def budget_bytes(rule: Dict[str, Any], instances: int) -> int:
+    return int(float(rule.get('base_mb', 0)) * MB + float(rule.get('per_instance_kb', 0)) * KB * instances)
+
+
+def profile_pipeline(dat_path: str, work_dir: str) -> Dict[str, Any]:
+    """Extract puis repack de dat_path sous memprofile; renvoie le rapport mémoire."""
+    from main import rebuild_dat_from_folder
+    from extract.region_builder import extract_regions_from_dat
+
+    extract_dir = os.path.join(work_dir, 'extract')
+    rebuilt_path = os.path.join(work_dir, 'rebuilt.dat')
+    was_quiet = metrics.is_quiet()
+    metrics.set_quiet(True)
+    try:
+        with metrics.isolated(), open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+            memprofile.start()
+            try:
+                with metrics.span('extract'):
+                    extract_regions_from_dat(dat_path, extract_dir)
+                with metrics.span('repack'):
+                    rebuild_dat_from_folder(extract_dir, rebuilt_path)
+            finally:
+                mem = memprofile.stop()
+    finally:
+        metrics.set_quiet(was_quiet)
+    return mem
+
+
+def check_budgets(mem: Dict[str, Any], budgets: Dict[str, Dict[str, Any]], instances: int) -> List[Dict[str, Any]]:
+    """Renvoie une ligne par phase budgétée: mesure, budget, statut ('ok', 'over', 'missing')."""
+    rows: List[Dict[str, Any]] = []
+    phases = mem.get('phases', {})
+    for key, rule in budgets.items():
+        # 'phase' permet plusieurs budgets (métriques) pour un même chemin: "extract@rss": {"phase": "extract", ...}
+        path = rule.get('phase', key)
+        metric = rule.get('metric', 'traced_peak')
+        limit = budget_bytes(rule, instances)
+        measured = (phases.get(path) or {}).get(metric)
+        if measured is None:
+            status = 'missing'
+        else:
+            status = 'ok' if measured <= limit else 'over'
+        rows.append({'phase': path, 'metric': metric, 'measured': measured, 'budget': limit, 'status': status})
+    return rows
+
+
+def run_memory_check(
+    instances: int = DEFAULT_INSTANCES,
+    *,
+    budgets_path: str = DEFAULT_BUDGETS_PATH,
+    seed: int = 0,
+    keep_dir: str | None = None,
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    budgets = load_budgets(budgets_path)
+    work_dir = keep_dir or tempfile.mkdtemp(prefix='polaris_mem_')
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        dat_path = os.path.join(work_dir, 'gp_prius.dat')
+        generate_synthetic_level(dat_path, instances, seed=seed)
+        mem = profile_pipeline(dat_path, work_dir)
+    finally:
+        if keep_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return mem, check_budgets(mem, budgets, instances)
+
+
+def main(argv: List[str] | None = None):
+    args = list(sys.argv[1:] if argv is None else argv)
+    seed = pop_int_option(args, '--seed', 0)
+    options: Dict[str, str] = {}
+    for flag in ('--budgets', '--out', '--keep'):
+        if flag in args:
+            i = args.index(flag)
+            if i + 1 >= len(args):
+                print(f"❌ Valeur manquante pour {flag}")
+                sys.exit(2)
+            options[flag] = args[i + 1]
+            del args[i:i + 2]
+    instances = int(args[0]) if args else DEFAULT_INSTANCES
+
+    print(f"[MEM] Niveau synthétique: {instances} instances (graine {seed})")
+    mem, rows = run_memory_check(
+        instances,
+        budgets_path=options.get('--budgets', DEFAULT_BUDGETS_PATH),
+        seed=seed,
+        keep_dir=options.get('--keep'),
+    )
+    print(memprofile.format_summary(mem))
+
+    failed = False
+    print("\nBudgets:")
+    for r in rows:
+        measured = 'n/a' if r['measured'] is None else f"{r['measured'] / MB:.1f} Mo"
+        mark = {'ok': '✅', 'over': '❌', 'missing': '⚠️'}[r['status']]
+        print(f"  {mark} {r['phase']} [{r['metric']}]: {measured} / {r['budget'] / MB:.1f} Mo")
+        failed = failed or r['status'] == 'over'
+
+    if '--out' in options:
+        with open(options['--out'], 'w', encoding='utf-8') as f:
+            json.dump({'instances': instances, 'seed': seed, 'budgets': rows, 'memory': mem}, f, indent=2, ensure_ascii=False)
+        print(f"📊 Rapport écrit dans {options['--out']}")
+
+    if failed:
+        print("❌ Budget mémoire dépassé")
+        sys.exit(1)
+    print("✅ Budgets mémoire respectés")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Benchmark de démarrage de la CLI: temps d'import par commande de main.py (python -X importtime).
+
+Chaque commande de tools/startup_budgets.json est lancée dans un sous-processus avec
+-X importtime. On retire les modules déjà chargés par un `python -c pass` (site, encodings...)
+et on somme les temps d'import propres du reste: c'est le coût de démarrage propre à la
+commande. Échec (code de sortie 1) si ce coût dépasse import_ms ou si un module interdit
+est importé (ex: les extracteurs pour `mkheader`). La durée totale du processus (médiane
+sur --runs lancements, moins celle de `python -c pass`) est indiquée à titre informatif.
+
+Usage:
+  python -m tools.check_startup_time [commande,...] [--runs N] [--budgets tools/startup_budgets.json] [--out report.json] [--keep DIR]
+  python main.py startup [commande,...] [...]
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Any, List, Tuple
+
+from shared.utils import pop_int_option
+from tools.generate_synthetic_level import generate_synthetic_level
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_PATH = os.path.join(ROOT, 'main.py')
+DEFAULT_BUDGETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_budgets.json')
+TINY_INSTANCES = 200
+
+
+def load_budgets(path: str) -> Dict[str, Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get('commands', {})
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """Lignes 'import time: self [us] | cumulative | imported package' -> [(module, self_us, cumul_us)]."""
+    entries: List[Tuple[str, int, int]] = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # ligne d'en-tête
+        entries.append((parts[2].strip(), self_us, cumulative_us))
+    return entries
+
+
+def _run(args: List[str], cwd: str) -> Tuple[float, str, int]:
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable] + args,
+        cwd=cwd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding='utf-8',
+        errors='replace',
+    )
+    return time.perf_counter() - t0, proc.stderr, proc.returncode
+
+
+def _median(values: List[float]) -> float:
+    values = sorted(values)
+    mid = len(values) // 2
+    return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+
+
+def measure_baseline(cwd: str, runs: int) -> Tuple[set, float]:
+    """Modules chargés par l'interpréteur seul et durée médiane de `python -c pass`."""
+    _elapsed, stderr, _rc = _run(['-X', 'importtime', '-c', 'pass'], cwd)
+    modules = {name for name, _s, _c in parse_importtime(stderr)}
+    wall = _median([_run(['-c', 'pass'], cwd)[0] for _ in range(runs)])
+    return modules, wall
+
+
+def _is_forbidden(module: str, forbidden: List[str]) -> bool:
+    return any(module == f or module.startswith(f + '.') for f in forbidden)
+
+
+def measure_command(args: List[str], cwd: str, baseline: set, runs: int) -> Dict[str, Any]:
+    _elapsed, stderr, returncode = _run(['-X', 'importtime', MAIN_PATH] + args, cwd)
+    extra = [(name, self_us) for name, self_us, _c in parse_importtime(stderr) if name not in baseline]
+    walls = [_run([MAIN_PATH] + args, cwd)[0] for _ in range(runs)]
+    return {
+        'args': args,
+        'returncode': returncode,
+        'import_us': sum(self_us for _n, self_us in extra),
+        'modules': [name for name, _s in extra],
+        'top_imports': sorted(extra, key=lambda e: -e[1])[:10],
+        'wall': _median(walls),
+    }
+
+
+def _prepare_work_dir(work_dir: str) -> None:
+    """Petit niveau synthétique pour les commandes qui lisent un .dat ou un dossier d'extraction."""
+    import contextlib
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        generate_synthetic_level(os.path.join(work_dir, 'tiny.dat'), TINY_INSTANCES, seed=0)
+
+
+def run_startup_check(
+    commands: List[str] | None = None,
+    *,
+    budgets_path: str = DEFAULT_BUDGETS_PATH,
+    runs: int = 5,
+    keep_dir: str | None = None,
+) -> List[Dict[str, Any]]:
+    budgets = load_budgets(budgets_path)
+    names = commands or list(budgets)
+    work_dir = keep_dir or tempfile.mkdtemp(prefix='polaris_startup_')
+    os.makedirs(work_dir, exist_ok=True)
+    rows: List[Dict[str, Any]] = []
+    try:
+        _prepare_work_dir(work_dir)
+        baseline, baseline_wall = measure_baseline(work_dir, runs)
+        # Les commandes s'enchaînent dans l'ordre du fichier (repack lit la sortie d'extract)
+        for name in budgets:
+            if name not in names:
+                continue
+            rule = budgets[name]
+            args = [a.replace('{work}', work_dir) for a in rule.get('args', [])]
+            res = measure_command(args, work_dir, baseline, runs)
+            forbidden = [m for m in res['modules'] if _is_forbidden(m, rule.get('forbidden', []))]
+            limit_us = int(float(rule.get('import_ms', 0)) * 1000)
+            over = bool(limit_us) and res['import_us'] > limit_us
+            rows.append({
+                'command': name,
+                'args': rule.get('args', []),
+                'returncode': res['returncode'],
+                'import_us': res['import_us'],
+                'budget_us': limit_us,
+                'forbidden_imports': forbidden,
+                'top_imports': res['top_imports'],
+                'overhead_ms': round((res['wall'] - baseline_wall) * 1000, 2),
+                'status': 'over' if over or forbidden or res['returncode'] != 0 else 'ok',
+            })
+    finally:
+        if keep_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return rows
+
+
+def main(argv: List[str] | None = None):
+    args = list(sys.argv[1:] if argv is None else argv)
+    runs = max(1, pop_int_option(args, '--runs', 5))
+    options: Dict[str, str] = {}
+    for flag in ('--budgets', '--out', '--keep'):
+        if flag in args:
+            i = args.index(flag)
+            if i + 1 >= len(args):
+                print(f"❌ Valeur manquante pour {flag}")
+                sys.exit(2)
+            options[flag] = args[i + 1]
+            del args[i:i + 2]
+    commands = [c for c in args[0].split(',') if c.strip()] if args else None
+
+    rows = run_startup_check(
+        commands,
+        budgets_path=options.get('--budgets', DEFAULT_BUDGETS_PATH),
+        runs=runs,
+        keep_dir=options.get('--keep'),
+    )
+
+    failed = False
+    print("🚀 Démarrage par commande: imports propres / budget | surcoût processus (médiane)")
+    for r in rows:
+        mark = '✅' if r['status'] == 'ok' else '❌'
+        print(f"  {mark} {r['command']}: {r['import_us'] / 1000:.1f} ms / {r['budget_us'] / 1000:.1f} ms | {r['overhead_ms']:.1f} ms")
+        if r['status'] != 'ok':
+            failed = True
+            if r['forbidden_imports']:
+                print(f"      modules interdits: {', '.join(r['forbidden_imports'])}")
+            if r['returncode'] != 0:
+                print(f"      code de sortie {r['returncode']}")
+            for name, self_us in r['top_imports'][:5]:
+                print(f"      {self_us / 1000:6.1f} ms  {name}")
+
+    if '--out' in options:
+        with open(options['--out'], 'w', encoding='utf-8') as f:
+            json.dump({'runs': runs, 'python': sys.version.split()[0], 'commands': rows}, f, indent=2, ensure_ascii=False)
+        print(f"📊 Rapport écrit dans {options['--out']}")
+
+    if failed:
+        print("❌ Budget de démarrage dépassé")
+        sys.exit(1)
+    print("✅ Budgets de démarrage respectés")
+
+
+if __name__ == "__main__":
+    main()
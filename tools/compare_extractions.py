@@ -7,15 +7,24 @@ mêmes données.
 Par défaut, la comparaison JSON est sémantique: elle ignore les champs d'adresses
 et d'offset (ex: offset, name_offset, *address, subfile_offset), qui varient
 naturellement entre extractions. Utiliser --strict pour comparer tous les champs.
+
+Les floats sont comparés avec une tolérance; --exact les compare bit à bit en float32 (les
+valeurs extraites sont des float32 exacts, et `extract --short-floats` rend les fichiers
+directement comparables octet par octet). Deux fichiers identiques octet par octet ne sont
+pas analysés. Les points des paths sont comparés sous leur forme liste ('points'), qu'ils
+aient été extraits ainsi ou paquetés (`extract --compact-paths`, 'points_packed').
 """
 
 import os
 import json
 import sys
 import hashlib
+import struct
 from pathlib import Path
 from typing import Dict, Any, List, Tuple, Optional
 
+from shared.path_points import PACKED_KEY, point_list
+
 IGNORE_SUFFIXES_DEFAULT = {
     # champs top-level courants
     "offset",
@@ -37,8 +46,18 @@ def load_json_file(file_path: Path) -> Dict[str, Any]:
         print(f"Erreur lecture {file_path}: {e}")
         return {}
 
+def _same_float32(val1: float, val2: float) -> bool:
+    """Égalité bit à bit en float32."""
+    try:
+        return struct.pack('>f', val1) == struct.pack('>f', val2)
+    except OverflowError:
+        return val1 == val2
+
+
 def compare_float_values(val1: float, val2: float, tolerance: float = 1e-6) -> bool:
-    """Compare deux valeurs float avec une tolérance."""
+    """Compare deux valeurs float avec une tolérance (None: égalité bit à bit en float32)."""
+    if tolerance is None:
+        return _same_float32(val1, val2)
     return abs(val1 - val2) < tolerance
 
 def _should_ignore(current_path: str, ignore_suffixes: Optional[set]) -> bool:
@@ -54,11 +73,12 @@ def compare_dicts(
     dict1: Dict[str, Any],
     dict2: Dict[str, Any],
     path: str = "",
-    tolerance: float = 1e-6,
+    tolerance: Optional[float] = 1e-6,
     ignore_suffixes: Optional[set] = None,
 ) -> List[str]:
     """Compare deux dictionnaires récursivement et retourne les différences.
 
+    tolerance=None compare les nombres bit à bit en float32 (mode --exact).
     Si ignore_suffixes est fourni, les chemins se terminant par l'un de ces suffixes
     sont ignorés dans la comparaison (permet de rendre la comparaison sémantique).
     """
@@ -107,6 +127,17 @@ def compare_dicts(
     
     return differences
 
+def _same_point_form(data1: Dict[str, Any], data2: Dict[str, Any]) -> None:
+    """Path paqueté d'un côté seulement ('points_packed' vs 'points'): dépaquète ses points
+    pour que les deux JSON se comparent champ par champ."""
+    if (PACKED_KEY in data1) == (PACKED_KEY in data2):
+        return
+    for data in (data1, data2):
+        if PACKED_KEY in data:
+            data['points'] = point_list(data)
+            del data[PACKED_KEY]
+
+
 def _get_instance_base_name(json_path: Path, instance_type: str) -> str:
     """Retourne le nom de base de l'instance (sans suffixe .{type}.json)."""
     suffix = f".{instance_type}.json"
@@ -178,11 +209,12 @@ def compare_instance_files(
     rebuilt_dir: Path,
     instance_type: str,
     ignore_suffixes: Optional[set],
+    exact: bool = False,
 ) -> Tuple[int, List[str]]:
     """Compare tous les fichiers d'un type d'instance entre deux répertoires.
 
-    Pour chaque JSON, compare la structure/valeurs (avec tolérance float) puis
-    compare les .dat frères éventuels.
+    Pour chaque JSON, compare la structure/valeurs (avec tolérance float, ou bit à bit en
+    float32 si exact) puis compare les .dat frères éventuels.
     """
     pattern = f"*.{instance_type}.json"
     original_files = list(original_dir.rglob(pattern))
@@ -208,15 +240,21 @@ def compare_instance_files(
             total_differences.append(f"Fichier manquant: {rebuilt_file}")
             continue
         
-        # Charger et comparer JSON
-        orig_data = load_json_file(orig_file)
-        rebuilt_data = load_json_file(rebuilt_file)
-        
-        if not orig_data or not rebuilt_data:
-            total_differences.append(f"Erreur lecture: {orig_file} ou {rebuilt_file}")
-            continue
-        
-        differences = compare_dicts(orig_data, rebuilt_data, ignore_suffixes=ignore_suffixes)
+        # JSON identiques octet par octet: rien à analyser
+        if orig_file.read_bytes() == rebuilt_file.read_bytes():
+            differences = []
+        else:
+            # Charger et comparer JSON
+            orig_data = load_json_file(orig_file)
+            rebuilt_data = load_json_file(rebuilt_file)
+
+            if not orig_data or not rebuilt_data:
+                total_differences.append(f"Erreur lecture: {orig_file} ou {rebuilt_file}")
+                continue
+
+            _same_point_form(orig_data, rebuilt_data)
+            differences = compare_dicts(orig_data, rebuilt_data, tolerance=None if exact else 1e-6,
+                                        ignore_suffixes=ignore_suffixes)
 
         # Comparer les .dat frères s'il y en a
         base_name = _get_instance_base_name(orig_file, instance_type)
@@ -239,17 +277,21 @@ def compare_instance_files(
     return len(original_files), total_differences
 
 def main():
-    if len(sys.argv) < 3 or len(sys.argv) > 4:
-        print("Usage: python tools/compare_extractions.py <original_extraction_dir> <rebuilt_extraction_dir> [--strict]")
+    flags = [a for a in sys.argv[1:] if a.startswith("--")]
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if len(args) != 2 or any(f not in ("--strict", "--exact") for f in flags):
+        print("Usage: python -m tools.compare_extractions <original_extraction_dir> <rebuilt_extraction_dir> [--strict] [--exact]")
         print("Exemples:")
-        print("  python tools/compare_extractions.py gp_prius gp_prius2")
-        print("  python tools/compare_extractions.py gp_prius gp_prius2 --strict")
+        print("  python -m tools.compare_extractions gp_prius gp_prius2")
+        print("  python -m tools.compare_extractions gp_prius gp_prius2 --strict")
+        print("  python -m tools.compare_extractions gp_prius gp_prius2 --exact")
         sys.exit(1)
 
-    original_dir = Path(sys.argv[1])
-    rebuilt_dir = Path(sys.argv[2])
+    original_dir = Path(args[0])
+    rebuilt_dir = Path(args[1])
 
-    strict = len(sys.argv) == 4 and sys.argv[3] == "--strict"
+    strict = "--strict" in flags
+    exact = "--exact" in flags
     ignore_suffixes = None if strict else IGNORE_SUFFIXES_DEFAULT
     
     if not original_dir.exists():
@@ -269,7 +311,7 @@ def main():
     all_differences = []
     
     for instance_type in instance_types:
-        count, differences = compare_instance_files(original_dir, rebuilt_dir, instance_type, ignore_suffixes)
+        count, differences = compare_instance_files(original_dir, rebuilt_dir, instance_type, ignore_suffixes, exact)
         all_differences.extend(differences)
     
     # Résumé global
@@ -61,6 +61,23 @@ def read_header(data: bytes):
     return secs, ptrs
 
 
+def load_header(path: str, data: bytes):
+    """read_header(), ou sections et pointeurs du sidecar .polaris-idx s'il est valide
+    (python -m tools.diff_pointer_tables: shared/ importable)."""
+    try:
+        from shared.dat_index import DatIndex
+    except ImportError:
+        return read_header(data)
+    index = DatIndex.load(path)
+    if index is None:
+        return read_header(data)
+    secs = []
+    for sid in index.section_order:
+        s = index.sections[sid]
+        secs.append((sid, s['offset'], s['flag'], s['count'], s['size']))
+    return secs, list(index.pointer_table[1])
+
+
 def section_for_pos(sections, pos: int):
     for sid, off, flag, cnt, size in sections:
         total = size if flag == 0x00 else cnt * size
@@ -111,8 +128,8 @@ def main():
         A = f.read()
     with open(sys.argv[2], "rb") as f:
         B = f.read()
-    SA, Aptrs = read_header(A)
-    SB, Bptrs = read_header(B)
+    SA, Aptrs = load_header(sys.argv[1], A)
+    SB, Bptrs = load_header(sys.argv[2], B)
     setB = set(Bptrs)
     missing = [p for p in Aptrs if p not in setB]
     print(f"Pointers: A={len(Aptrs)} B={len(Bptrs)} missing_in_B={len(missing)}")
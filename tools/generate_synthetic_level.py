@@ -0,0 +1,322 @@
+"""
+Génère un gp_prius.dat synthétique, déterministe (graine), sans fichier de niveau réel.
+
+Le fichier est construit en mémoire avec les mêmes builders que `repack`
+(rebuild/*_rebuilder.py) puis assemblé par `rebuild.sections_assembler`, donc il
+suit exactement le format produit par le rebuild: zones, région, 0x25022 global,
+subfiles host/local (IGHW v0.2 avec section 0x2501C = ClassID).
+
+Usage:
+  python -m tools.generate_synthetic_level <output.dat> [instances] [--seed N] [--zones N] [--points N]
+  python main.py gensynth <output.dat> [instances] [--seed N] [--zones N] [--points N]
+"""
+
+import random
+import struct
+import sys
+from typing import Dict, Any, List, Tuple
+
+from shared.constants import CLASS_ENUM_ID
+from shared.utils import pop_int_option, sanitize_name
+
+
+# Répartition par défaut des instances (proche d'un niveau réel: beaucoup de mobys/volumes)
+DEFAULT_RATIOS: Dict[str, float] = {
+    'moby': 0.40,
+    'controller': 0.05,
+    'path': 0.08,
+    'volume': 0.20,
+    'clue': 0.10,
+    'area': 0.05,
+    'pod': 0.07,
+    'scent': 0.05,
+}
+
+# Index de type dans les zones (cf. zones_rebuilder.TYPE_INDEX_BY_SUFFIX)
+ZONE_TYPE_INDEX = {'moby': 0, 'path': 1, 'volume': 2, 'clue': 3, 'controller': 4, 'area': 5, 'pod': 6, 'scent': 7}
+# Type dans 0x25022 (cf. shared.constants.INSTANCE_TYPES)
+INSTANCE_TYPE_ID = {'moby': 0, 'path': 1, 'volume': 2, 'clue': 3, 'controller': 4, 'scent': 5, 'area': 6, 'pod': 7}
+
+# Proportion de subfiles écrits en local (dédupliqués par contenu), le reste en host
+LOCAL_SUBFILE_RATIO = 0.25
+# Nombre de ClassID distincts utilisés par les subfiles
+CLASS_ID_POOL = 64
+
+
+def _f32(value: float) -> float:
+    """Arrondit à la précision float32 pour que l'aller-retour extract/rebuild soit exact."""
+    return struct.unpack('>f', struct.pack('>f', value))[0]
+
+
+def _coord(rng: random.Random, extent: float) -> float:
+    return _f32(round(rng.uniform(-extent, extent), 2))
+
+
+def build_class_subfile(class_id: int, payload_len: int = 0x20) -> bytes:
+    """Subfile IGHW v0.2 minimal: une section 0x2501C contenant le ClassID (u32)."""
+    data_off = 0x20
+    buf = bytearray(data_off + 4 + payload_len)
+    buf[0:4] = b'IGHW'
+    struct.pack_into('>HHH', buf, 4, 0, 2, 1)
+    struct.pack_into('>IIB', buf, 0x10, CLASS_ENUM_ID, data_off, 0x00)
+    buf[0x19:0x1C] = (1).to_bytes(3, 'big')
+    struct.pack_into('>I', buf, 0x1C, 4)
+    struct.pack_into('>I', buf, data_off, class_id & 0xFFFFFFFF)
+    return bytes(buf)
+
+
+def _split_counts(total: int, ratios: Dict[str, float]) -> Dict[str, int]:
+    weight = sum(ratios.values()) or 1.0
+    counts = {typ: int(total * r / weight) for typ, r in ratios.items()}
+    # Reste attribué aux mobys pour tomber exactement sur le total demandé
+    counts['moby'] = counts.get('moby', 0) + total - sum(counts.values())
+    return counts
+
+
+def generate_synthetic_instances(
+    total_instances: int = 1000,
+    *,
+    seed: int = 0,
+    zones: int = 8,
+    path_points: int = 8,
+    ratios: Dict[str, float] | None = None,
+) -> Tuple[Dict[str, List[dict]], Dict[str, Tuple[str, bytes]]]:
+    """Génère les instances (dicts au format des JSON d'extraction) et les subfiles.
+
+    Retourne (instances_par_type, subfiles) où subfiles[nom_sanitisé] = (kind, data).
+    Chaque liste est triée par (zone, TUID), comme l'exigent les offsets de zones.
+    """
+    rng = random.Random(seed)
+    counts = _split_counts(max(0, int(total_instances)), ratios or DEFAULT_RATIOS)
+    zones = max(1, int(zones))
+    extent = 2000.0
+
+    used_tuids: set[int] = set()
+
+    def new_tuid() -> int:
+        while True:
+            t = rng.getrandbits(64)
+            if t not in used_tuids and t not in (0, 0xFFFFFFFFFFFFFFFF):
+                used_tuids.add(t)
+                return t
+
+    def position() -> Dict[str, float]:
+        return {'x': _coord(rng, extent), 'y': _coord(rng, 200.0), 'z': _coord(rng, extent)}
+
+    def rotation() -> Dict[str, float]:
+        return {'x': 0.0, 'y': _f32(round(rng.uniform(-3.14, 3.14), 2)), 'z': 0.0}
+
+    subfiles: Dict[str, Tuple[str, bytes]] = {}
+    local_cache: Dict[int, bytes] = {}
+
+    def attach_subfile(name: str) -> int:
+        class_id = rng.randrange(CLASS_ID_POOL) + 1
+        if rng.random() < LOCAL_SUBFILE_RATIO:
+            data = local_cache.get(class_id)
+            if data is None:
+                data = local_cache[class_id] = build_class_subfile(class_id)
+            subfiles[sanitize_name(name)] = ('local', data)
+        else:
+            subfiles[sanitize_name(name)] = ('host', build_class_subfile(class_id))
+        return class_id
+
+    instances: Dict[str, List[dict]] = {typ: [] for typ in ZONE_TYPE_INDEX}
+
+    def base(typ: str, idx: int) -> dict:
+        return {'tuid': new_tuid(), 'name': f"{typ.capitalize()}_{idx:07d}", 'zone': rng.randrange(zones)}
+
+    # Types sans références d'abord: ils servent de cibles aux listes (clues, areas, pods, scents)
+    for i in range(counts.get('moby', 0)):
+        inst = base('moby', i)
+        inst.update({
+            'model_index': rng.randrange(512),
+            'zone_render_index': inst['zone'],
+            'update_dist': -1.0,
+            'display_dist': _f32(float(rng.choice((-1.0, 64.0, 128.0, 256.0)))),
+            'position': position(),
+            'rotation': rotation(),
+            'scale': 1.0,
+            'flags': f"{rng.getrandbits(16):04X}000000000000",
+            'unknown': '00000000',
+            'padding': 'FFFFFFFF',
+        })
+        attach_subfile(inst['name'])
+        instances['moby'].append(inst)
+
+    for i in range(counts.get('controller', 0)):
+        inst = base('controller', i)
+        inst.update({
+            'position': position(),
+            'rotation': rotation(),
+            'scale': 1.0,
+            'scale_y': 1.0,
+            'scale_z': 1.0,
+        })
+        attach_subfile(inst['name'])
+        instances['controller'].append(inst)
+
+    for i in range(counts.get('path', 0)):
+        inst = base('path', i)
+        start = position()
+        points = []
+        for p in range(max(0, int(path_points))):
+            points.append({
+                'position': {
+                    'x': _f32(start['x'] + p * 4.0),
+                    'y': start['y'],
+                    'z': _f32(start['z'] + _coord(rng, 8.0)),
+                },
+                'timestamp': _f32(p * 0.5),
+            })
+        inst.update({
+            'points': points,
+            'point_count': len(points),
+            'total_duration': _f32(max(0, len(points) - 1) * 0.5),
+            'unknown': 0,
+            'flags': 0,
+        })
+        instances['path'].append(inst)
+
+    for i in range(counts.get('volume', 0)):
+        inst = base('volume', i)
+        pos = position()
+        sx, sy, sz = (_f32(round(rng.uniform(1.0, 32.0), 1)) for _ in range(3))
+        inst['transform_matrix'] = [
+            [sx, 0.0, 0.0, 0.0],
+            [0.0, sy, 0.0, 0.0],
+            [0.0, 0.0, sz, 0.0],
+            [pos['x'], pos['y'], pos['z'], 1.0],
+        ]
+        instances['volume'].append(inst)
+
+    volume_tuids = [v['tuid'] for v in instances['volume']]
+    for i in range(counts.get('clue', 0)):
+        inst = base('clue', i)
+        inst['volume_tuid'] = rng.choice(volume_tuids) if volume_tuids else None
+        inst['class_id'] = attach_subfile(inst['name'])
+        instances['clue'].append(inst)
+
+    path_tuids = [p['tuid'] for p in instances['path']]
+    for i in range(counts.get('area', 0)):
+        inst = base('area', i)
+        inst['path_references'] = [{'tuid': t} for t in rng.sample(path_tuids, min(len(path_tuids), rng.randint(0, 3)))]
+        inst['volume_references'] = [{'tuid': t} for t in rng.sample(volume_tuids, min(len(volume_tuids), rng.randint(1, 3)))]
+        instances['area'].append(inst)
+
+    pod_targets = [(m['tuid'], INSTANCE_TYPE_ID['moby']) for m in instances['moby']]
+    pod_targets += [(c['tuid'], INSTANCE_TYPE_ID['controller']) for c in instances['controller']]
+    for i in range(counts.get('pod', 0)):
+        inst = base('pod', i)
+        refs = rng.sample(pod_targets, min(len(pod_targets), rng.randint(1, 6)))
+        inst['instance_references'] = [{'tuid': t, 'type': ty} for t, ty in refs]
+        instances['pod'].append(inst)
+
+    clue_tuids = [c['tuid'] for c in instances['clue']]
+    for i in range(counts.get('scent', 0)):
+        inst = base('scent', i)
+        inst['instance_references'] = [{'tuid': t} for t in rng.sample(clue_tuids, min(len(clue_tuids), rng.randint(1, 4)))]
+        instances['scent'].append(inst)
+
+    for lst in instances.values():
+        lst.sort(key=lambda inst: (int(inst['zone']), int(inst['tuid'])))
+
+    return instances, subfiles
+
+
+def build_synthetic_sections(
+    instances: Dict[str, List[dict]],
+    subfiles: Dict[str, Tuple[str, bytes]],
+    *,
+    zones: int = 8,
+    region_name: str = 'default',
+) -> Dict[int, Dict[str, Any]]:
+    """Construit toutes les sections du niveau avec les builders du rebuild (même ordre que main.rebuild_dat_from_folder)."""
+    from rebuild.classfiles_aggregator import reset, build_sections
+    from rebuild.names_registry import build_name_tables_from_names
+    from rebuild.mobys_rebuilder import build_moby_sections
+    from rebuild.controllers_rebuilder import build_controller_sections
+    from rebuild.paths_rebuilder import build_path_sections
+    from rebuild.volumes_rebuilder import build_volume_sections
+    from rebuild.instance_types_rebuilder import build_instance_types_section
+    from rebuild.clues_rebuilder import build_clue_sections
+    from rebuild.areas_rebuilder import build_area_sections
+    from rebuild.pods_rebuilder import build_pod_sections
+    from rebuild.scents_rebuilder import build_scent_sections
+    from rebuild.zones_rebuilder import build_zone_sections
+
+    def lookup(_base_dir, sname):
+        return subfiles.get(sname)
+
+    reset()
+    all_sections: Dict[int, Dict[str, Any]] = {}
+
+    names = [inst['name'] for typ in ('moby', 'controller', 'path', 'volume', 'clue', 'area', 'pod', 'scent') for inst in instances[typ]]
+    name_sections, name_to_offset = build_name_tables_from_names(names)
+    all_sections.update(name_sections)
+
+    all_sections.update(build_moby_sections([(m, None) for m in instances['moby']], name_to_offset, lookup))
+    all_sections.update(build_controller_sections([(c, None) for c in instances['controller']], name_to_offset, lookup))
+    all_sections.update(build_path_sections(instances['path'], name_to_offset))
+    all_sections.update(build_volume_sections(instances['volume'], name_to_offset))
+
+    entries = sorted(
+        (inst['tuid'], INSTANCE_TYPE_ID[typ]) for typ, lst in instances.items() for inst in lst
+    )
+    inst_sections, inst_types_map = build_instance_types_section(entries)
+    all_sections.update(inst_sections)
+
+    all_sections.update(build_clue_sections(instances['clue'], name_to_offset, inst_types_map, lookup))
+    all_sections.update(build_area_sections(instances['area'], name_to_offset, inst_types_map))
+    all_sections.update(build_pod_sections(instances['pod'], name_to_offset, inst_types_map))
+    all_sections.update(build_scent_sections(instances['scent'], name_to_offset, inst_types_map))
+
+    counts_per_zone: Dict[int, List[int]] = {}
+    for typ, lst in instances.items():
+        t = ZONE_TYPE_INDEX[typ]
+        for inst in lst:
+            counts_per_zone.setdefault(int(inst['zone']), [0] * 9)[t] += 1
+    zone_names = {z: f"zone_{z:02d}" for z in range(max(1, int(zones)))}
+    all_sections.update(build_zone_sections(region_name, zone_names, counts_per_zone))
+
+    all_sections.update(build_sections())
+    return all_sections
+
+
+def generate_synthetic_level(
+    output_path: str,
+    total_instances: int = 1000,
+    *,
+    seed: int = 0,
+    zones: int = 8,
+    path_points: int = 8,
+    ratios: Dict[str, float] | None = None,
+) -> Dict[str, int]:
+    """Écrit un niveau synthétique dans output_path. Retourne le nombre d'instances par type."""
+    from rebuild.sections_assembler import assemble_sections
+
+    instances, subfiles = generate_synthetic_instances(
+        total_instances, seed=seed, zones=zones, path_points=path_points, ratios=ratios,
+    )
+    sections = build_synthetic_sections(instances, subfiles, zones=zones)
+    assemble_sections(sections, output_path, version_major=1, version_minor=1)
+    return {typ: len(lst) for typ, lst in instances.items()}
+
+
+def main(argv: List[str] | None = None):
+    args = list(sys.argv[1:] if argv is None else argv)
+    seed = pop_int_option(args, '--seed', 0)
+    zones = pop_int_option(args, '--zones', 8)
+    points = pop_int_option(args, '--points', 8)
+    if not args:
+        print("Usage: python -m tools.generate_synthetic_level <output.dat> [instances] [--seed N] [--zones N] [--points N]")
+        return
+    output_path = args[0]
+    total = int(args[1]) if len(args) > 1 else 1000
+    counts = generate_synthetic_level(output_path, total, seed=seed, zones=zones, path_points=points)
+    print(f"✅ Niveau synthétique écrit dans {output_path} ({sum(counts.values())} instances, graine {seed})")
+    for typ, n in counts.items():
+        print(f"  {typ}: {n}")
+
+
+if __name__ == "__main__":
+    main()